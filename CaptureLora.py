@@ -6,24 +6,33 @@ import os
 import json
 from datetime import datetime
 import asyncio
+from contextvars import ContextVar
 from utils.api_client import get_secret
-import aiohttp
 from dotenv import load_dotenv
-from aiohttp import BasicAuth
 
 load_dotenv()
 
 #Import Config
 from utils.config import API_URL, API_TIMEOUT, DEBUG, HOME_DIR, \
     TOPIC, TOPIC_PREFIX, MQTT_BROKER, MQTT_PORT,  MQTT_TRANSPORT,  MQTT_KEEPALIVE,   \
+    MQTT_QUEUE_SIZE, MQTT_BATCH, MQTT_JOURNAL_FILE, \
     LOG_FILENAME, MAX_LOG_SIZE, BACKUP_COUNT, RFM9X_SEND_DELAY, RMF9X_POOLING, BEACON_LOCATIONS, IDFACILITY, \
-    LORA_NODE_ID, LORA_FREQUENCY, LORA_TX_POWER, LORA_ENABLE_CA, \
+    LORA_NODE_ID, LORA_FREQUENCY, LORA_TX_POWER, LORA_ENABLE_CA, LORA_NEXT_HOP_ROUTING, LORA_ROUTE_MAX_AGE, \
     RESTRICTED_GRADES, UNRESTRICTED_DATES, \
-    API_ENABLED, LOOKUP_TIMEOUT
+    API_ENABLED, LOOKUP_TIMEOUT, API_FAILURE_THRESHOLD, API_RETRY_INTERVAL, API_NEGATIVE_TTL, \
+    RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL, SCANNER_QUEUE_SIZE, \
+    METRICS_PORT, METRICS_SOCKET, METRICS_SNAPSHOT_FILE, METRICS_SNAPSHOT_INTERVAL, METRICS_REFRESH_INTERVAL
 from utils.offline_data import OfflineData
+from utils.student_directory import StudentDirectory, DIRECTORY_MARKER
+from utils.grades import GradeRestrictions, grade_label
+from utils.rendered_responses import RenderedResponses, RenderedStudent
+from utils.mqtt_publisher import MqttPublisher
+from utils.lookup_client import ApiLookupClient
 
 # Import enhanced LoRa packet handler
-from lora import LoRaTransceiver, LoRaPacket, PacketType, NodeType, CollisionAvoidance
+from lora import LoRaTransceiver, LoRaPacket, PacketType, NodeType, RECORD_SEPARATOR, pack_records, NACK_MARKER, parse_nack, \
+    ResponseCache, ScannerDispatcher, TxPriority, MetricsRegistry, RequestTrace, MetricsServer, SnapshotWriter, RouteTable
+from lora.async_transceiver import AsyncLoRaTransceiver
     
 
 #Import MQ Libraries
@@ -68,6 +77,16 @@ transceiver = LoRaTransceiver(
     tx_power=LORA_TX_POWER
 )
 
+# Next-hop routing: learn which repeater (or none) each scanner is heard
+# through, and send replies hinted for that repeater so only it forwards
+if LORA_NEXT_HOP_ROUTING:
+    transceiver.routes = RouteTable(max_age=LORA_ROUTE_MAX_AGE)
+    logging.info(f"Next-hop routing enabled (routes expire after {LORA_ROUTE_MAX_AGE}s)")
+
+# asyncio front end: one thread owns the SPI radio and keeps receiving while
+# lookups run and while responses wait for their TX slot
+radio = AsyncLoRaTransceiver(transceiver)
+
 
 # Broadcast HELLO on startup — clears repeater caches for server node.
 # Without this, if the server reboots while repeaters are running, the
@@ -104,11 +123,17 @@ client.username_pw_set("IQRight", "123456")
  
 properties=Properties(PacketTypes.CONNECT)
 properties.SessionExpiryInterval=30*60 # in seconds
-client.connect(MQTT_BROKER,
-               port=MQTT_PORT,
-               clean_start=mqtt.MQTT_CLEAN_START_FIRST_ONLY,
-               properties=properties,
-               keepalive=MQTT_KEEPALIVE);
+
+
+def connectMQTT():
+    client.connect(MQTT_BROKER,
+                   port=MQTT_PORT,
+                   clean_start=mqtt.MQTT_CLEAN_START_FIRST_ONLY,
+                   properties=properties,
+                   keepalive=MQTT_KEEPALIVE)
+
+
+connectMQTT()
 logging.info('Connected to MQTT Server')
 logging.info(f"Lookup mode: {'API + Local' if API_ENABLED else 'LOCAL ONLY'} | Timeout: {LOOKUP_TIMEOUT}s | API Timeout: {API_TIMEOUT}s")
 
@@ -142,122 +167,238 @@ client.subscribe("IQRHandshake", qos=1)
 client.loop_start()
 logging.info("[MQTT] Subscribed to IQRHandshake, loop started")
 
+# Publishing runs on its own thread: the radio loop only enqueues, reconnects
+# never block reception, and messages survive a broker outage in the journal
+publisher = MqttPublisher(client, MQTT_JOURNAL_FILE, reconnect=connectMQTT,
+                          max_queue=MQTT_QUEUE_SIZE, batch=MQTT_BATCH)
+publisher.start()
+
 # Per-scanner response cache for retry dedup.
-# Key: (source_node, code) → Value: list of result dicts (payload_to_scanner)
-# Each scanner has its own independent entries — activity on one scanner never
+# scanner → code → list of (items, message) frames from buildDataFrames
+# (kept as built so a NACK can re-send individual parts exactly as first sent)
+# Each scanner has its own LRU-bounded entries — activity on one scanner never
 # evicts another scanner's cached response. This guarantees that if scanner 102
 # scans P123 and the response is lost, scanner 102 can retry and still get the
 # cached response even after scanner 103 processed P888 in between.
-scanner_response_cache = {}
+scanner_response_cache = ResponseCache(max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl=RESPONSE_CACHE_TTL)
+
+# Requests are handled by one worker per scanner: a scanner's requests stay in
+# order, different scanners are served concurrently, and all their frames go
+# out through the radio thread's single TX queue
+dispatcher = ScannerDispatcher(max_pending=SCANNER_QUEUE_SIZE)
 
 offlineData = OfflineData()
 offlineData.start_scheduled_refresh()
 
-def getGrade(strGrade: str):
-    if strGrade == 'First Grade' or strGrade[0:2] == '01':
-        return '1st'
-    elif strGrade == 'Second Grade' or strGrade[0:2] == '02':
-        return '2nd'
-    elif strGrade == 'Third Grade' or strGrade[0:2] == '03':
-        return '3rd'
-    elif strGrade == 'Fourth Grade' or strGrade[0:2] == '04':
-        return '4th'
-    elif strGrade == 'Fifth Grade' or strGrade[0:2] == '05':
-        return '5th'
-    elif strGrade == 'Sixth Grade' or strGrade[0:2] == '06':
-        return '6th'
-    elif strGrade == 'Seventh Grade' or strGrade[0:2] == '07':
-        return '7th'
-    elif strGrade == 'Eighth Grade' or strGrade[0:2] == '08':
-        return '8th'
-    elif strGrade[0:1] == 'K': # Assuming 'K' for Kindergarten
-        return 'Kind'
-    else:
-        return 'N/A'
+def apiCredentials():
+    apiUsername = get_secret('apiUsername')
+    apiPassword = get_secret('apiPassword')
+    if apiUsername and apiPassword:
+        return apiUsername["value"], apiPassword["value"]
+    return None
+
+# One pooled API session for the API + local race; after repeated failures the
+# API leg is skipped (probed every API_RETRY_INTERVAL) and codes the API did not
+# know skip it for API_NEGATIVE_TTL, so a dead backend costs nothing per scan
+api_lookup = ApiLookupClient(f"{API_URL}apiGetUserInfo", IDFACILITY, credentials=apiCredentials,
+                             timeout=API_TIMEOUT, failure_threshold=API_FAILURE_THRESHOLD,
+                             retry_interval=API_RETRY_INTERVAL, negative_ttl=API_NEGATIVE_TTL)
+
+# Per-request stage latencies (RX -> worker -> lookup -> first/last TX -> MQTT)
+# and counters per scanner and packet type, plus the component stats above,
+# served on localhost as Prometheus text and written as a JSON snapshot. The
+# component stats are read on the event loop (refresh task in serve()), never
+# from the exporter threads
+metrics = MetricsRegistry(prefix="lora_server")
+metrics.add_source("radio", radio.metrics)
+metrics.add_source("airtime", transceiver.tx_scheduler.stats)
+metrics.add_source("response_cache", scanner_response_cache.stats)
+metrics.add_source("mqtt", publisher.metrics)
+metrics.add_source("dispatch", dispatcher.stats)
+if transceiver.routes is not None:
+    metrics.add_source("routes", transceiver.routes.stats)
+if API_ENABLED:
+    metrics.add_source("api", api_lookup.stats)
+
+# Trace of the request the current scanner worker is handling
+request_trace: ContextVar = ContextVar("request_trace", default=None)
+
+
+def startMetrics():
+    """Start the /metrics endpoint and snapshot writer; returns what to stop on exit"""
+    started = []
+    if METRICS_SOCKET or METRICS_PORT:
+        try:
+            server = MetricsServer(metrics, port=METRICS_PORT, unix_path=METRICS_SOCKET or None)
+            server.start()
+            started.append(server)
+        except OSError as e:
+            logging.error(f"[METRICS] Could not serve metrics: {e}")
+    if METRICS_SNAPSHOT_FILE:
+        writer = SnapshotWriter(metrics, METRICS_SNAPSHOT_FILE, interval=METRICS_SNAPSHOT_INTERVAL)
+        writer.start()
+        started.append(writer)
+    return started
+
+
+async def traced(trace: RequestTrace, handler, *args):
+    """Run a request handler on its scanner worker with its trace as the current one"""
+    token = request_trace.set(trace)
+    trace.mark('start')
+    try:
+        await handler(*args)
+    except Exception:
+        trace.outcome = 'error'
+        raise
+    finally:
+        request_trace.reset(token)
+        trace.finish()
+
+
+def traceMark(name: str = None, outcome: str = None):
+    """Mark a stage boundary and/or set the outcome of the request being handled"""
+    trace = request_trace.get()
+    if trace is not None:
+        if name:
+            trace.mark(name)
+        if outcome:
+            trace.outcome = outcome
+
+
+async def radioSend(packet: LoRaPacket, **kwargs) -> bool:
+    """radio.send() that counts frames and marks response TX on the current request"""
+    success = await radio.send(packet, **kwargs)
+    metrics.inc('tx_frames', {'scanner': packet.dest_node, 'type': packet.packet_type.name,
+                              'result': 'sent' if success else 'failed'})
+    trace = request_trace.get()
+    if success and trace is not None:
+        trace.mark_tx()
+    return success
+
+# Directory-ID response mode: scanners advertise their students.csv directory
+# version in HELLO; when it matches ours, DATA responses carry compact row IDs
+# instead of "name|classCode" text. Key: scanner node → version (None = text).
+# Rebuilt whenever the scheduled refresh swaps in a new DataFrame.
+scanner_directory_versions = {}
+student_directory = None
+_directory_source = None
+
+
+def getStudentDirectory():
+    """Current StudentDirectory (rebuilt if offline data was refreshed), or None"""
+    global student_directory, _directory_source
+    try:
+        df = offlineData.getAppUsers()
+        if df is not _directory_source:
+            _directory_source = df
+            student_directory = StudentDirectory.from_dataframe(df) if df is not None else None
+            transceiver.directory_version = student_directory.version if student_directory else None
+    except Exception as e:
+        logging.error(f"[DIRECTORY] Failed to build student directory: {e}")
+        student_directory = None
+        transceiver.directory_version = None
+    return student_directory
 
-def is_grade_restricted(grade_raw: str) -> bool:
-    """Check if a grade should be filtered out today based on RESTRICTED_GRADES config."""
-    if not RESTRICTED_GRADES:
-        return False
-    today = datetime.now().strftime('%Y-%m-%d')
-    if today in UNRESTRICTED_DATES:
-        return False
-    grade = getGrade(grade_raw)
-    return grade in RESTRICTED_GRADES
+
+getStudentDirectory()
+
+# Restricted-grade decision (RESTRICTED_GRADES / UNRESTRICTED_DATES), taken once per day
+grade_restrictions = GradeRestrictions(RESTRICTED_GRADES, UNRESTRICTED_DATES)
+
+def grade_restrictions_active() -> bool:
+    """True if RESTRICTED_GRADES apply today (not an unrestricted date)."""
+    return grade_restrictions.active()
 
 def filter_restricted_grades(results: list) -> list:
     """Remove restricted grade students from results. Returns filtered list."""
-    if not RESTRICTED_GRADES:
-        return results
-    today = datetime.now().strftime('%Y-%m-%d')
-    if today in UNRESTRICTED_DATES:
-        logging.info(f"[GRADE-FILTER] Today ({today}) is an unrestricted date - allowing all grades")
-        return results
-
-    filtered = []
-    removed = []
-    for item in results:
-        grade_raw = item.get('hierarchyLevel1', '')
-        if is_grade_restricted(grade_raw):
-            removed.append(f"{item.get('name', '?')} ({getGrade(grade_raw)})")
-        else:
-            filtered.append(item)
-
+    filtered, removed = grade_restrictions.filter(results)
     if removed:
-        logging.info(f"[GRADE-FILTER] Filtered out {len(removed)} restricted student(s): {', '.join(removed)}")
-
+        names = [f"{item.get('name', '?')} ({grade_label(item.get('hierarchyLevel1'))})" for item in removed]
+        logging.info(f"[GRADE-FILTER] Filtered out {len(removed)} restricted student(s): {', '.join(names)}")
     return filtered
 
-async def get_user_from_api(code):
-    async with aiohttp.ClientSession() as session:
-        api_url = f"{API_URL}apiGetUserInfo"  # Replace with your actual API endpoint
-        payload = {"searchCode": code}
-        headers = {
-            "Content-Type": "application/json",
-            "accept": "application/json",
-            "caller": "LocalApp",
-            "idFacility": str(IDFACILITY)
-        }
-
-        # Debug logging
-        logging.info(f"API URL: {api_url}")
-        logging.info(f"Payload: {payload}")
-        logging.info(f"Headers: {headers}")
-        logging.info(f"Timeout: {API_TIMEOUT} seconds")
-        
-        apiUsername = get_secret('apiUsername')
-        apiPassword = get_secret('apiPassword')
 
-        if apiUsername and apiPassword:
-            auth = BasicAuth(apiUsername["value"], apiPassword["value"])
-            logging.info(f"Auth username: {apiUsername['value']}")
-            
-            try:
-                logging.info("Attempting API call...")
-                async with session.post(api_url, json=payload, timeout=API_TIMEOUT, headers=headers, auth=auth) as response:
-                    print(f"Status: {response.status}")
-                    print(await response.json())
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        logging.error(f"API getUserAccess request failed with status: {response.status}")
-                        return None
-            except asyncio.TimeoutError:
-                logging.error(f"API call timed out after {API_TIMEOUT} seconds")
-                logging.error(f"Failed URL: {api_url}")
-                return None
-            except aiohttp.ClientError as e:
-                logging.error(f"Client error during API call: {e}")
-                logging.error(f"Failed URL: {api_url}")
-                return None
-            except Exception as e:
-                logging.error(f"Unexpected error during API call: {e}")
-                logging.error(f"Failed URL: {api_url}")
-                return None
+# Pre-rendered local responses (DATA payloads + MQTT JSON per DeviceID), rebuilt
+# when the scheduled refresh swaps in new data. Used in local-only lookup mode;
+# API mode keeps the per-scan path since API data may be newer than the file.
+rendered_responses = None
+
+
+def warmRenderedResponses(index=None):
+    """Pre-render every DeviceID's response from the current student index"""
+    global rendered_responses
+    try:
+        responses = RenderedResponses(
+            index if index is not None else offlineData.getStudentIndex(),
+            getStudentDirectory(),
+            restricted_grade=grade_restrictions.restricts if RESTRICTED_GRADES else None
+        )
+        rendered_responses = responses
+        logging.info(f"[RENDER] Responses pre-rendered: {responses.stats()}")
+    except Exception as e:
+        logging.error(f"[RENDER] Failed to pre-render responses: {e}")
+        rendered_responses = None
+
+
+warmRenderedResponses()
+offlineData.add_refresh_listener(warmRenderedResponses)
+
+
+async def sendRestricted(payload_code: str, source_node: int):
+    """Tell the scanner every student for this code is a restricted grade today"""
+    restricted_msg = f"RESTRICTED|{payload_code}|00"
+    restricted_packet = transceiver.create_data_packet(
+        dest_node=source_node,
+        payload=restricted_msg.encode('utf-8'),
+        use_ack=True
+    )
+    success = await radioSend(restricted_packet, use_ack=True,
+                              collision_avoidance=LORA_ENABLE_CA,
+                              delay=RFM9X_SEND_DELAY, priority=TxPriority.CONTROL)
+    if success:
+        logging.info(f"RESTRICTED response sent to scanner {source_node} for code {payload_code}")
+    else:
+        logging.error(f"FAILED to send RESTRICTED response to scanner {source_node}")
+
+
+def renderedFrames(payload_code: str, source_node: int):
+    """
+    Pre-rendered response for a scan: (frames, all_restricted), or None to use
+    the per-scan lookup (API mode, unknown or unrendered code)
+    """
+    responses = rendered_responses
+    if API_ENABLED or responses is None:
+        return None
+    variant = responses.get(payload_code, grade_restrictions_active())
+    if variant is None:
+        return None
+    if variant.removed:
+        removed = [f"{s.record.name} ({s.record.grade})" for s in variant.removed]
+        logging.info(f"[GRADE-FILTER] Filtered out {len(removed)} restricted student(s): {', '.join(removed)}")
+    if variant.all_restricted:
+        logging.info(f"[GRADE-FILTER] All {len(variant.removed)} student(s) for code {payload_code} are restricted grades")
+        return None, True
+    directory = student_directory
+    if directory and responses.directory_version == directory.version \
+            and scanner_directory_versions.get(source_node) == directory.version:
+        if variant.directory is not None:
+            return list(variant.directory), False
+        logging.info(f"[DIRECTORY] Student missing from directory {directory.version}, sending text to scanner {source_node}")
+    return list(variant.text), False
+
+
+def mqttMessages(items: list, beacon: str, payload_code: str, distance: str, timestamp: str):
+    """(JSON body, hierarchyID) to publish for each student of a sent frame"""
+    location = beaconLocator(beacon)
+    for item in items:
+        if isinstance(item, RenderedStudent):
+            yield (item.mqtt_body(beacon, payload_code, abs(int(distance)), location, timestamp),
+                   item.record.hierarchyID)
         else:
-            logging.error("API getUserAccess request failed on getting secrets")
-            return None
-                
+            yield json.dumps(item), str(item.get("hierarchyID", '00'))
+
+async def get_user_from_api(code):
+    return await api_lookup.lookup(code)
 
 async def get_user_local(beacon, code, distance):
     if not code:  # Return early if code is missing
@@ -266,32 +407,12 @@ async def get_user_local(beacon, code, distance):
 
     try:
         logging.debug(f'Attempting Student Local Lookup...')
-        df = offlineData.getAppUsers()
-        filtered_df = df[df['DeviceID'] == code]
-        matches = filtered_df.drop_duplicates(subset=['ChildName'])
-        if matches.empty:
+        index = offlineData.getStudentIndex()
+        if code not in index:
             logging.debug(f"Couldn't find Code: {code} locally")
             return None  # Return None if not found locally
-        else:
-            results = []
-            # Iterate through all matching rows
-            for _, row in matches.iterrows():
-                result = {
-                    "name": row['ChildName'],
-                    "hierarchyLevel2": row['HierarchyLevel2'],
-                    "hierarchyLevel1": row['HierarchyLevel1'],
-                    "hierarchyID": f"{int(row['IDHierarchy']):02d}",
-                    "node": beacon,
-                    "externalID": code,
-                    "distance": abs(int(distance)),
-                    "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    "externalNumber": row['ExternalNumber'],
-                    "location": beaconLocator(beacon),
-                    "classCode": row['ClassCode'],
-                    "source": "local"
-                }
-                results.append(result)
-            return results
+        return index.results(code, beacon, distance, beaconLocator(beacon),
+                             datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
     except Exception as e:
         logging.error(f'Error converting local data: {e}')
         return None
@@ -305,12 +426,19 @@ async def getInfo(beacon, code, distance):
         API_ENABLED=TRUE  → Race API + local in parallel (original behavior)
         API_ENABLED=FALSE → Local-only lookup (fastest, no network dependency)
         LOOKUP_TIMEOUT    → Overall timeout in seconds (default 2.0)
+
+    In API mode the API leg is skipped while its circuit is open or the code
+    was recently unknown to the API (see ApiLookupClient).
     """
     # Local-only mode — skip API entirely
     if not API_ENABLED:
         logging.debug("API disabled - local-only lookup")
         return await get_user_local(beacon, code, distance)
 
+    if not api_lookup.available(code):
+        logging.debug(f"API skipped ({api_lookup.breaker.state}) - local-only lookup")
+        return await get_user_local(beacon, code, distance)
+
     # Dual mode — race API and local in parallel
     api_task = asyncio.create_task(get_user_from_api(code))
     local_task = asyncio.create_task(get_user_local(beacon, code, distance))
@@ -363,6 +491,8 @@ async def getInfo(beacon, code, distance):
                     return result
 
             # Cancel anything still running
+            if api_task in remaining_pending:
+                api_lookup.record_failure()
             for task in remaining_pending:
                 task.cancel()
 
@@ -398,25 +528,28 @@ async def handleInfo(packet_payload_str: str, source_node: int, packet_type: Pac
         # Clear this scanner's cache on cleanup (fresh session)
         cmd_name = command[2]
         if cmd_name == 'cleanup':
-            cleared = {k for k in scanner_response_cache if k[0] == source_node}
-            for k in cleared:
-                del scanner_response_cache[k]
-            logging.info(f"[DEDUP] Cleared cache for scanner {source_node} on cleanup ({len(cleared)} entries)")
+            cleared = scanner_response_cache.invalidate(source_node)
+            logging.info(f"[DEDUP] Cleared cache for scanner {source_node} on cleanup ({cleared} entries)")
 
         payload_to_scanner = {'command': cmd_name}
-        if sendDataScanner(payload_to_scanner, source_node, packet_type=PacketType.CMD) == False:
+        traceMark(outcome='cmd')
+        if await sendDataScanner(payload_to_scanner, source_node, packet_type=PacketType.CMD) == False:
             logging.error(f'FAILED to send command ACK to Scanner: {json.dumps(payload_to_scanner)}')
         else:
             sendObj = json.dumps(payload_to_scanner)
             logging.info(f"Command ACK sent to scanner {source_node}: {sendObj}")
             if publishMQTT(sendObj, topicSufix="command"): # Use command as suffix for MQTT topic
-                logging.info(' Command ACK Message Sent to MQTT')
+                logging.info(' Command ACK Message queued for MQTT')
             else:
-                logging.error('MQTT ERROR publishing command ACK')
+                logging.error('MQTT ERROR queuing command ACK')
 
     elif packet_type == PacketType.DATA:
         # Data packet format: "beacon|code|distance"
         parts = packet_payload_str.split('|')
+        if parts[0] == NACK_MARKER:
+            traceMark(outcome='nack')
+            await resendMissingParts(tuple(parts), source_node)
+            return
         if len(parts) != 3:
             logging.error(f"Invalid DATA packet format from node {source_node}: {packet_payload_str}")
             return
@@ -426,13 +559,22 @@ async def handleInfo(packet_payload_str: str, source_node: int, packet_type: Pac
 
         # Per-scanner retry dedup — if same scanner retries the same code,
         # re-send the cached response without redoing the lookup or republishing MQTT.
-        # Each scanner has independent cache entries keyed by (source_node, code).
-        cache_key = (source_node, payload_code)
-        is_retry = cache_key in scanner_response_cache
+        # Each scanner has independent cache entries (scanner → code).
+        traceMark('lookup_start')
+        cached = scanner_response_cache.get(source_node, payload_code)
+        is_retry = cached is not None
 
+        rendered = None if is_retry else renderedFrames(payload_code, source_node)
         if is_retry:
-            payload_to_scanner = scanner_response_cache[cache_key]
+            frames = cached
             logging.warning(f"[DEDUP] Retry for code {payload_code} from scanner {source_node} - re-sending cached, skipping MQTT")
+            dropRoute(source_node, "Retry")
+        elif rendered is not None:
+            frames, all_restricted = rendered
+            if all_restricted:
+                traceMark('lookup_end', outcome='restricted')
+                await sendRestricted(payload_code, source_node)
+                return
         else:
             sendObj = await getInfo(beacon, payload_code, distance)
             if sendObj:
@@ -442,48 +584,38 @@ async def handleInfo(packet_payload_str: str, source_node: int, packet_type: Pac
                 if not sendObj and original_count > 0:
                     # All students were restricted grades — send RESTRICTED response
                     logging.info(f"[GRADE-FILTER] All {original_count} student(s) for code {payload_code} are restricted grades")
-                    restricted_msg = f"RESTRICTED|{payload_code}|00"
-                    restricted_packet = transceiver.create_data_packet(
-                        dest_node=source_node,
-                        payload=restricted_msg.encode('utf-8'),
-                        use_ack=True
-                    )
-                    time.sleep(RFM9X_SEND_DELAY)
-                    if LORA_ENABLE_CA and transceiver.rfm9x:
-                        data = restricted_packet.serialize()
-                        success = CollisionAvoidance.send_with_ca(
-                            transceiver.rfm9x, data,
-                            max_retries=3, enable_rx_guard=True, enable_random_delay=True
-                        )
-                    else:
-                        success = transceiver.send_packet(restricted_packet, use_ack=True)
-                    if success:
-                        logging.info(f"RESTRICTED response sent to scanner {source_node} for code {payload_code}")
-                    else:
-                        logging.error(f"FAILED to send RESTRICTED response to scanner {source_node}")
+                    traceMark('lookup_end', outcome='restricted')
+                    await sendRestricted(payload_code, source_node)
                     return
-            payload_to_scanner = sendObj if sendObj else None
+            # Pack as many students as fit into each frame; multi-part only on overflow
+            frames = buildDataFrames(sendObj, source_node) if sendObj else None
+        traceMark('lookup_end', outcome='retry' if is_retry else 'found' if frames else 'not_found')
 
-        if payload_to_scanner:
-            # Cache the response on fresh lookup — preserved per-scanner until cleanup/HELLO
+        if frames:
+            # Cache the response on fresh lookup — kept per-scanner until cleanup/HELLO, TTL or LRU eviction
             if not is_retry:
-                scanner_response_cache[cache_key] = payload_to_scanner
-
-            total_packets = len(payload_to_scanner)
-            for idx, item in enumerate(payload_to_scanner, start=1):
-                time.sleep(RFM9X_SEND_DELAY)
-                if sendDataScanner(item, source_node, packet_type=PacketType.DATA, packet_index=idx, total_packets=total_packets) == False:
-                    logging.error(f'FAILED to send data to Scanner: {json.dumps(item)}')
+                scanner_response_cache.put(source_node, payload_code, frames)
+
+            total_packets = len(frames)
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            mqtt_messages = []
+            for idx, (items, message) in enumerate(frames, start=1):
+                delay = frameDelay(idx == 1, message)
+                if await sendDataScanner(items, source_node, packet_type=PacketType.DATA, packet_index=idx, total_packets=total_packets, message=message, delay=delay) == False:
+                    logging.error(f'FAILED to send data to Scanner: {frameText(message)}')
+                    continue
+                if is_retry:
+                    logging.info(f"[DEDUP] Skipped MQTT publish for retry of {payload_code} from scanner {source_node}")
+                    continue
+                mqtt_messages.extend((mqttTopic(hierarchyID), sendObj_json) for sendObj_json, hierarchyID
+                                     in mqttMessages(items, beacon, payload_code, distance, timestamp))
+            # One hand-off per scan (one message per topic when MQTT_BATCH is on)
+            if mqtt_messages:
+                if publisher.publish_scan(mqtt_messages):
+                    traceMark('mqtt')
+                    logging.debug(f'MQTT Data Message(s) queued: {len(mqtt_messages)}')
                 else:
-                    if not is_retry:
-                        sendObj_json = json.dumps(item)
-                        hierarchyID = str(item.get("hierarchyID", '00'))
-                        if publishMQTT(sendObj_json, hierarchyID):
-                            logging.debug('MQTT Data Message Sent')
-                        else:
-                            logging.error('MQTT ERROR publishing data')
-                    else:
-                        logging.info(f"[DEDUP] Skipped MQTT publish for retry of {payload_code} from scanner {source_node}")
+                    logging.error('MQTT ERROR queuing data')
         else:
             logging.warning(f"No data found for code {payload_code} from scanner {source_node}. Sending NOT_FOUND response.")
             # Send NOT_FOUND response so scanner doesn't timeout waiting
@@ -493,15 +625,9 @@ async def handleInfo(packet_payload_str: str, source_node: int, packet_type: Pac
                 payload=not_found_msg.encode('utf-8'),
                 use_ack=True
             )
-            time.sleep(RFM9X_SEND_DELAY)
-            if LORA_ENABLE_CA and transceiver.rfm9x:
-                data = not_found_packet.serialize()
-                success = CollisionAvoidance.send_with_ca(
-                    transceiver.rfm9x, data,
-                    max_retries=3, enable_rx_guard=True, enable_random_delay=True
-                )
-            else:
-                success = transceiver.send_packet(not_found_packet, use_ack=True)
+            success = await radioSend(not_found_packet, use_ack=True,
+                                      collision_avoidance=LORA_ENABLE_CA,
+                                      delay=RFM9X_SEND_DELAY, priority=TxPriority.CONTROL)
             if success:
                 logging.info(f"NOT_FOUND response sent to scanner {source_node} for code {payload_code}")
             else:
@@ -510,28 +636,126 @@ async def handleInfo(packet_payload_str: str, source_node: int, packet_type: Pac
         logging.warning(f"Unhandled packet type {packet_type} from node {source_node}")
 
 
-def sendDataScanner(payload: dict, dest_node: int, packet_type: PacketType, packet_index: int = 0, total_packets: int = 0):
+def dropRoute(source_node: int, reason: str):
+    """A reply was lost (retry / NACK): forget the scanner's route so the re-send floods"""
+    routes = transceiver.routes
+    if routes is not None and routes.forget(source_node):
+        logging.info(f"[ROUTE] {reason} from scanner {source_node}: route dropped, re-send floods")
+
+
+async def resendMissingParts(fields: tuple, source_node: int):
+    """
+    Selective repeat: re-send only the parts of a multi-part response a scanner missed
+
+    Args:
+        fields: NACK payload fields ("NACK", code, "2,4")
+        source_node: Scanner that sent the NACK
+    """
+    nack = parse_nack(fields)
+    if nack is None:
+        logging.error(f"Invalid NACK from scanner {source_node}: {'|'.join(fields)}")
+        return
+    payload_code, indexes = nack
+    frames = scanner_response_cache.get(source_node, payload_code)
+    if not frames:
+        # Cache cleared (cleanup/HELLO/restart) — scanner times out and re-requests
+        logging.warning(f"[NACK] No cached response for {payload_code} from scanner {source_node}")
+        return
+
+    dropRoute(source_node, "NACK")
+    total_packets = len(frames)
+    indexes = [idx for idx in indexes if 1 <= idx <= total_packets]
+    logging.info(f"[NACK] Scanner {source_node} missing parts {indexes} of {total_packets} for {payload_code}")
+    for position, idx in enumerate(indexes):
+        items, message = frames[idx - 1]
+        delay = frameDelay(position == 0, message)
+        if await sendDataScanner(items, source_node, packet_type=PacketType.DATA, packet_index=idx,
+                                 total_packets=total_packets, message=message, delay=delay) == False:
+            logging.error(f"[NACK] FAILED to re-send part {idx}/{total_packets} to scanner {source_node}")
+
+
+def frameDelay(first: bool, message: str) -> float:
+    """
+    Radio-thread delay before a response frame
+
+    The first frame gives the scanner time to turn around to RX; follow-up
+    frames are paced by the TxScheduler (airtime + jitter, duty-cycle budget)
+    on the radio thread, or by this delay when CA is disabled. The radio
+    keeps receiving while a frame waits for its slot.
+    """
+    if first:
+        return RFM9X_SEND_DELAY
+    if not LORA_ENABLE_CA:
+        payload = message if isinstance(message, bytes) else message.encode('utf-8')
+        frame_size = LoRaPacket.HEADER_SIZE + len(payload) + LoRaPacket.CRC_SIZE
+        return transceiver.tx_scheduler.delay_for(frame_size)
+    return 0.0
+
+
+def frameText(message) -> str:
+    """DATA payload as text for logging (pre-rendered payloads are bytes)"""
+    return message.decode('utf-8', errors='replace') if isinstance(message, bytes) else message
+
+
+def studentRecord(item: dict) -> str:
+    """Encode one student as a DATA record — scanner displays classCode directly (e.g., "4W")"""
+    return f"{item['name']}|{item['classCode']}"
+
+
+def buildDataFrames(items: list, dest_node: int) -> list:
+    """
+    Split a student response into per-frame (items, message) pairs
+
+    Uses directory row IDs when the scanner's directory version matches ours
+    and every student is in it; otherwise packed "name|classCode" records.
+    """
+    directory = getStudentDirectory()
+    if directory and scanner_directory_versions.get(dest_node) == directory.version:
+        row_ids = [directory.lookup_id(item['name'], item['classCode']) for item in items]
+        if None not in row_ids:
+            per_frame = directory.ids_per_frame(LoRaPacket.MAX_PAYLOAD)
+            return [(items[i:i + per_frame], directory.encode(row_ids[i:i + per_frame]))
+                    for i in range(0, len(items), per_frame)]
+        logging.info(f"[DIRECTORY] Student missing from directory {directory.version}, sending text to scanner {dest_node}")
+
+    frames = []
+    start = 0
+    for group in pack_records([studentRecord(item) for item in items], LoRaPacket.MAX_PAYLOAD):
+        frames.append((items[start:start + len(group)], RECORD_SEPARATOR.join(group)))
+        start += len(group)
+    return frames
+
+
+async def sendDataScanner(payload, dest_node: int, packet_type: PacketType, packet_index: int = 0, total_packets: int = 0,
+                          message: str = None, delay: float = 0.0):
     """
     Send data or command to scanner using enhanced packet protocol
 
     Args:
-        payload: Dictionary with student info or command
+        payload: Dictionary with command, or student dict / list of student dicts
+                 (packed into one multi-record DATA frame)
         dest_node: Destination scanner node ID
         packet_type: Type of packet to send (DATA or CMD)
         packet_index: Index in multi-packet sequence (0 if single)
         total_packets: Total packets in sequence (0 if single)
+        message: Pre-encoded DATA payload from buildDataFrames or a pre-rendered
+                 response (bytes); built from payload if None
+        delay: Seconds the radio thread waits (still receiving) before sending
     """
     try:
         msg = ""
         if packet_type == PacketType.DATA:
-            if 'name' in payload:
-                # Send name and classCode only — scanner displays classCode directly (e.g., "4W")
-                msg = f"{payload['name']}|{payload['classCode']}"
+            students = payload if isinstance(payload, list) else [payload]
+            if message is None and students and all('name' in item for item in students):
+                # Send name and classCode only, one record per student
+                message = RECORD_SEPARATOR.join(studentRecord(item) for item in students)
 
+            if message:
+                msg = frameText(message)
                 # Create packet using transceiver helper
                 packet = transceiver.create_data_packet(
                     dest_node=dest_node,
-                    payload=msg.encode('utf-8'),
+                    payload=message if isinstance(message, bytes) else message.encode('utf-8'),
                     use_ack=True,
                     multi_part_index=packet_index,
                     multi_part_total=total_packets
@@ -552,28 +776,23 @@ def sendDataScanner(payload: dict, dest_node: int, packet_type: PacketType, pack
             logging.error(f"Unsupported packet type for sending: {packet_type}")
             return False
 
-
+        # Log records separated by " + "; directory-coded payloads as [dir]<ids>
+        readable = msg.replace(RECORD_SEPARATOR, " + ").replace(DIRECTORY_MARKER, "[dir]")
 
         # CMD ACKs send directly (like HELLO_ACK) — scanner is already listening
         # DATA packets use collision avoidance for multi-packet spacing
+        # Control replies go ahead of queued data; later parts yield to first frames
         if packet_type == PacketType.CMD:
-            success = transceiver.send_packet(packet, use_ack=False)
-        elif LORA_ENABLE_CA and transceiver.rfm9x:
-            data = packet.serialize()
-            success = CollisionAvoidance.send_with_ca(
-                transceiver.rfm9x,
-                data,
-                max_retries=3,
-                enable_rx_guard=True,
-                enable_random_delay=True
-            )
+            success = await radioSend(packet, use_ack=False, delay=delay, priority=TxPriority.CONTROL)
         else:
-            success = transceiver.send_packet(packet, use_ack=True)
+            priority = TxPriority.DATA if packet_index <= 1 else TxPriority.CONTINUATION
+            success = await radioSend(packet, use_ack=True,
+                                      collision_avoidance=LORA_ENABLE_CA, delay=delay, priority=priority)
 
         if success:
-            logging.info(f'Sent {packet_type.name} to scanner {dest_node}: {msg} [{packet_index}/{total_packets}]')
+            logging.info(f'Sent {packet_type.name} to scanner {dest_node}: {readable} [{packet_index}/{total_packets}]')
         else:
-            logging.error(f'Failed to send {packet_type.name} to scanner {dest_node}: {msg}')
+            logging.error(f'Failed to send {packet_type.name} to scanner {dest_node}: {readable}')
 
         return success
 
@@ -582,41 +801,17 @@ def sendDataScanner(payload: dict, dest_node: int, packet_type: PacketType, pack
         return False
 
 def publishMQTT(payload: str, topicSufix: str = None):
-    count = 5
-    while count > 0:
-        if sendMessageMQTT(payload, topicSufix):
-            return True
-        else:
-            count = count -1
-            #IF failed, reconnect to MQTT Server
-            client.disconnect()
-            logging.info(f"Disconnected from MQTT")
-            client.connect(MQTT_BROKER,
-                   port=MQTT_PORT,
-                   clean_start=mqtt.MQTT_CLEAN_START_FIRST_ONLY,
-                   properties=properties,
-                   keepalive=MQTT_KEEPALIVE);
-            logging.info('Connected to MQTT Server')
-    return False
+    """Queue a message for the publisher thread (never blocks the radio loop)"""
+    logging.info(f"[MQTT-TX] Queuing for MQTT: {payload}")
+    return publisher.publish(mqttTopic(topicSufix), payload)
 
-def sendMessageMQTT(payload: str, topicSufix: str = None):
-    logging.info(f"[MQTT-TX] Sending to MQTT: {payload}")
+def mqttTopic(topicSufix: str = None) -> str:
     if topicPrefix and topicSufix:
         if topicSufix=="command":
-            sendTopic = COMMAND_TOPIC
-        else:
-            sendTopic = f'{Topic}{topicSufix}'
-    else: # If no topic prefix or suffix, use COMMAND_TOPIC for commands, or default Topic for data
-        sendTopic = Topic
-
-    # Use QoS 1 for reliable delivery (at least once)
-    ret = client.publish(sendTopic, payload, qos=1)
-    if ret[0] == 0:
-        logging.info(f'[MQTT-TX] SUCCESS: Topic={sendTopic}, MsgID={ret[1]}, QoS=1')
-        return True
-    else:
-        logging.error(f'[MQTT-TX] FAILED: Topic={sendTopic}, Status={ret[0]}, Error={ret[1]}')
-        return False
+            return COMMAND_TOPIC
+        return f'{Topic}{topicSufix}'
+    # If no topic prefix or suffix, use default Topic
+    return Topic
 
 def beaconLocator(idBeacon):
     try:
@@ -647,9 +842,11 @@ def handle_status_packet(packet: LoRaPacket):
     Handle STATUS packet from repeater (device health monitoring)
 
     PiSugar 3 sends periodic status updates via I2C.
-    Format: "battery|charging|voltage|temperature|model[|event]"
+    Format: "battery|charging|voltage|temperature|model[|event][|range=...]"
     Example: "85.5|true|3.95|25|PiSugar3"
     With event: "85.5|true|3.95|25|PiSugar3|STARTUP"
+    With min/avg/max since the previous STATUS (event slot may be empty):
+        "85.5|true|3.95|25|PiSugar3||range=battery:84.0/85.1/86.2;voltage:3.93/3.95/3.96;n=600"
 
     Args:
         packet: STATUS packet from repeater
@@ -657,10 +854,10 @@ def handle_status_packet(packet: LoRaPacket):
     try:
         source_node = packet.source_node
         sender_node = packet.sender_node
-        payload_str = packet.payload.decode('utf-8')
+        payload_str = packet.text
 
         # Parse STATUS payload
-        parts = payload_str.split('|')
+        parts = packet.fields
 
         if len(parts) >= 5:
             battery = parts[0]
@@ -668,10 +865,13 @@ def handle_status_packet(packet: LoRaPacket):
             voltage = parts[2]
             temperature = parts[3]
             model = parts[4]
-            event = parts[5] if len(parts) >= 6 else None
+            extra = parts[5:]
+            ranges = next((field[len('range='):] for field in extra if field.startswith('range=')), None)
+            event = next((field for field in extra if field and not field.startswith('range=')), None)
 
             # Build log message
             event_label = f" [{event}]" if event else ""
+            range_label = f" | Range: {ranges}" if ranges else ""
             status_msg = (
                 f"Node {source_node}{event_label} | "
                 f"Battery: {battery}% | "
@@ -679,6 +879,7 @@ def handle_status_packet(packet: LoRaPacket):
                 f"Charging: {charging} | "
                 f"Temp: {temperature}°C | "
                 f"Model: {model}"
+                f"{range_label}"
             )
 
             device_status_logger.info(status_msg)
@@ -698,7 +899,7 @@ def handle_status_packet(packet: LoRaPacket):
         logging.error(f"Error handling STATUS packet: {e}", exc_info=True)
 
 
-def handle_hello_packet(packet: LoRaPacket):
+async def handle_hello_packet(packet: LoRaPacket):
     """
     Handle HELLO handshake from scanner or repeater
 
@@ -714,10 +915,10 @@ def handle_hello_packet(packet: LoRaPacket):
         logging.info(f"Full packet: {packet}")
 
         source_node = packet.source_node
-        payload_str = packet.payload.decode('utf-8')
+        payload_str = packet.text
         logging.info(f"Payload string: {payload_str}")
 
-        parts = payload_str.split('|')
+        parts = packet.fields
         logging.info(f"Payload parts: {parts}")
 
         if parts[0] != "HELLO" or len(parts) < 3:
@@ -730,22 +931,25 @@ def handle_hello_packet(packet: LoRaPacket):
 
         logging.info(f"HELLO from {node_type} node {source_node}, seq={scanner_seq}")
 
+        # Directory-ID mode only if the scanner's students.csv matches our data
+        scanner_version = parts[3] if len(parts) > 3 else None
+        scanner_directory_versions[source_node] = scanner_version
+        directory = getStudentDirectory()
+        if directory and scanner_version == directory.version:
+            logging.info(f"[DIRECTORY] Node {source_node} directory {scanner_version} matches - sending row IDs")
+        elif scanner_version:
+            logging.warning(f"[DIRECTORY] Node {source_node} directory {scanner_version} != "
+                            f"{directory.version if directory else 'none'} - sending text")
+
         # Clear response cache for this node only (scanner rebooted)
         # Other scanners' entries are untouched.
-        cleared = {k for k in scanner_response_cache if k[0] == source_node}
-        for k in cleared:
-            del scanner_response_cache[k]
+        cleared = scanner_response_cache.invalidate(source_node)
         if cleared:
-            logging.info(f"[DEDUP] Cleared cache for node {source_node} on HELLO ({len(cleared)} entries)")
+            logging.info(f"[DEDUP] Cleared cache for node {source_node} on HELLO ({cleared} entries)")
 
         # Clear sequence tracking for this node (reset duplicate detection)
-        cache_size_before = len(transceiver.seen_packets)
-        transceiver.seen_packets = {
-            (src, seq) for src, seq in transceiver.seen_packets
-            if src != source_node
-        }
-        cache_size_after = len(transceiver.seen_packets)
-        logging.info(f"Cleared sequence cache for node {source_node} (removed {cache_size_before - cache_size_after} entries)")
+        removed = transceiver.seen_packets.forget_source(source_node)
+        logging.info(f"Cleared sequence cache for node {source_node} (removed {removed} entries)")
 
         # Send HELLO_ACK response
         logging.info(f"Creating HELLO_ACK for node {source_node}...")
@@ -753,7 +957,7 @@ def handle_hello_packet(packet: LoRaPacket):
         logging.info(f"HELLO_ACK packet created: {ack_packet}")
 
         logging.info("Sending HELLO_ACK...")
-        success = transceiver.send_packet(ack_packet, use_ack=False)
+        success = await radioSend(ack_packet, use_ack=False, priority=TxPriority.CONTROL)
 
         if success:
             logging.info(f"HELLO_ACK sent successfully to node {source_node}")
@@ -775,18 +979,23 @@ async def main_loop_async():
     #   WIND_DOWN  - 15 min with no valid packets; back to every 5 min
     IDLE_LOG_INTERVAL = 300        # 5 minutes in seconds
     WIND_DOWN_THRESHOLD = 900      # 15 minutes in seconds
+    AIRTIME_LOG_INTERVAL = 60      # Channel utilization log while ACTIVE
 
     is_active = False
     last_valid_packet_time = None
     last_timeout_log_time = time.time()
+    last_airtime_log_time = time.time()
 
     logging.info("Server started in IDLE mode - logging timeouts every 5 minutes until HELLO received")
 
+    radio.start()
     while True:
-        # Receive packet using enhanced packet handler
-        packet = transceiver.receive_packet(timeout=RMF9X_POOLING)
+        # Packets arrive from the radio thread; waiting here never blocks TX
+        packet = await radio.recv(timeout=RMF9X_POOLING)
 
         if packet:
+            metrics.inc('rx_packets', {'scanner': packet.source_node, 'type': packet.packet_type.name})
+            trace = RequestTrace(metrics, packet.source_node, packet.packet_type.name, rx=radio.last_received_at)
             try:
                 # Check for HELLO packet first
                 if packet.packet_type == PacketType.HELLO:
@@ -794,7 +1003,7 @@ async def main_loop_async():
                         is_active = True
                         logging.info("=== SWITCHING TO ACTIVE MODE - monitoring all packets ===")
                     last_valid_packet_time = time.time()
-                    handle_hello_packet(packet)
+                    dispatcher.submit(packet.source_node, traced, trace, handle_hello_packet, packet)
                     continue
 
                 # Check for STATUS packet (device health monitoring)
@@ -804,7 +1013,7 @@ async def main_loop_async():
                     continue
 
                 # Extract payload and source node from packet
-                packet_text = packet.payload.decode('utf-8')
+                packet_text = packet.text
                 source_node = packet.source_node
                 last_valid_packet_time = time.time()
 
@@ -814,8 +1023,11 @@ async def main_loop_async():
                     logging.debug('RX: ')
                     logging.debug(packet_text)
 
-                # Process the packet
-                await handleInfo(packet_text, source_node, packet.packet_type)
+                # Process the packet on the scanner's worker; keep receiving meanwhile
+                if not dispatcher.submit(source_node, traced, trace, handleInfo, packet_text, source_node,
+                                         packet.packet_type):
+                    metrics.inc('requests', {'scanner': source_node, 'type': packet.packet_type.name,
+                                             'outcome': 'dropped'})
 
             except UnicodeDecodeError as e:
                 logging.error(f'{packet.payload}: Invalid UTF-8 String')
@@ -836,26 +1048,55 @@ async def main_loop_async():
                 if DEBUG and (now - last_timeout_log_time) >= 10:
                     logging.debug('No packet received (timeout)')
                     last_timeout_log_time = now
+                if (now - last_airtime_log_time) >= AIRTIME_LOG_INTERVAL:
+                    last_airtime_log_time = now
+                    logging.info(f"[AIRTIME] {transceiver.tx_scheduler.stats()}")
+                    logging.info(f"[RADIO] {radio.metrics()}")
+                    logging.info(f"[DEDUP] Response cache {scanner_response_cache.stats()}")
+                    logging.info(f"[MQTT] Publisher {publisher.metrics()}")
+                    logging.info(f"[DISPATCH] {dispatcher.stats()}")
+                    if API_ENABLED:
+                        logging.info(f"[API] Lookup client {api_lookup.stats()}")
             # In IDLE/WIND_DOWN mode: log only every 5 minutes
             else:
                 if (now - last_timeout_log_time) >= IDLE_LOG_INTERVAL:
                     last_timeout_log_time = now
                     logging.info('No packet received - server idle (next check in 5 min)')
 
-        await asyncio.sleep(0.1)  # Brief sleep to prevent CPU spinning
+async def serve():
+    refresher = asyncio.create_task(metrics.refresh_loop(METRICS_REFRESH_INTERVAL))
+    exporters = startMetrics()
+    try:
+        await main_loop_async()
+    finally:
+        refresher.cancel()
+        await dispatcher.close()
+        for exporter in exporters:
+            exporter.stop()
+        # Pooled API session belongs to this event loop
+        await api_lookup.close()
 
 # Main Loop
 if os.getenv("LOCAL") == 'TRUE':
     # In LOCAL mode, we might want to simulate a packet or run a test
     # For now, just log and exit as there's no hardware to listen on.
     logging.info("Running in LOCAL mode. No LoRa hardware detected. Exiting after test call.")
-    asyncio.run(handleInfo('102|123456789|1', 102, PacketType.DATA)) # Simulate a data packet
+    async def local_test():
+        radio.start()
+        try:
+            await handleInfo('102|123456789|1', 102, PacketType.DATA) # Simulate a data packet
+        finally:
+            radio.stop()
+            await api_lookup.close()
+    asyncio.run(local_test())
 else:
     try:
-        asyncio.run(main_loop_async())
+        asyncio.run(serve())
     except KeyboardInterrupt:
         logging.info("Server shutting down...")
     finally:
+        radio.stop()
+        publisher.stop()
         client.loop_stop()
         client.disconnect()
         logging.info("MQTT client disconnected.")
@@ -60,6 +60,9 @@ LORA_ENABLE_CA = os.getenv('LORA_ENABLE_CA', 'TRUE') == 'TRUE'  # Collision avoi
 LORA_CA_MIN_DELAY_MS = int(os.getenv('LORA_CA_MIN_DELAY_MS', '10'))
 LORA_CA_MAX_DELAY_MS = int(os.getenv('LORA_CA_MAX_DELAY_MS', '100'))
 LORA_RX_GUARD_MS = int(os.getenv('LORA_RX_GUARD_MS', '50'))
+LORA_CONTENTION_FLOODING = os.getenv('LORA_CONTENTION_FLOODING', 'FALSE') == 'TRUE'  # Repeaters: suppress rebroadcasts overheard from other repeaters
+LORA_NEXT_HOP_ROUTING = os.getenv('LORA_NEXT_HOP_ROUTING', 'FALSE') == 'TRUE'  # Learn next hops; replies forwarded only along the known path
+LORA_ROUTE_MAX_AGE = int(os.getenv('LORA_ROUTE_MAX_AGE', '300'))  # Seconds a learned route stays usable before replies flood again
 
 # Power Management HAT selection (WAVESHARE or PISUGAR)
 POWER_HAT = os.getenv('POWER_HAT', 'WAVESHARE').upper()
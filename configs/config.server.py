@@ -28,6 +28,9 @@ FILE_DTYPE = {
 API_ENABLED = os.getenv('API_ENABLED', 'FALSE') == 'TRUE'
 API_TIMEOUT = float(os.getenv('API_TIMEOUT', '10.0'))
 LOOKUP_TIMEOUT = float(os.getenv('LOOKUP_TIMEOUT', '2.0'))  # Overall timeout for getInfo()
+API_FAILURE_THRESHOLD = int(os.getenv('API_FAILURE_THRESHOLD', '3'))  # Consecutive failures before lookups go local-only
+API_RETRY_INTERVAL = float(os.getenv('API_RETRY_INTERVAL', '30.0'))  # Seconds between API probes while local-only
+API_NEGATIVE_TTL = float(os.getenv('API_NEGATIVE_TTL', '60.0'))  # Seconds an unknown code skips the API
 if os.getenv('DEBUGSERVICE', 'FALSE') == 'TRUE':
     API_URL = 'http://127.0.0.1:5001/api/'
 else:
@@ -53,6 +56,9 @@ MQTT_USERNAME = 'iqright'
 MQTT_TRANSPORT = 'tcp'
 MQTT_VERSION = '5'
 MQTT_KEEPALIVE = 60
+MQTT_QUEUE_SIZE = int(os.getenv('MQTT_QUEUE_SIZE', '1000'))  # Messages waiting for the publisher thread
+MQTT_BATCH = os.getenv('MQTT_BATCH', 'FALSE') == 'TRUE'  # One JSON array per topic per scan
+MQTT_JOURNAL_FILE = os.getenv('MQTT_JOURNAL_FILE', f'{HOME_DIR}/log/mqtt_journal.jsonl')  # Spill-over while broker is down
 
 # LORA Configuration (Legacy - kept for backwards compatibility)
 RFM9X_FREQUENCE = 915.23
@@ -72,6 +78,20 @@ LORA_ENABLE_CA = os.getenv('LORA_ENABLE_CA', 'TRUE') == 'TRUE'  # Collision avoi
 LORA_CA_MIN_DELAY_MS = int(os.getenv('LORA_CA_MIN_DELAY_MS', '10'))
 LORA_CA_MAX_DELAY_MS = int(os.getenv('LORA_CA_MAX_DELAY_MS', '100'))
 LORA_RX_GUARD_MS = int(os.getenv('LORA_RX_GUARD_MS', '50'))
+LORA_NEXT_HOP_ROUTING = os.getenv('LORA_NEXT_HOP_ROUTING', 'FALSE') == 'TRUE'  # Learn next hops; replies forwarded only along the known path
+LORA_ROUTE_MAX_AGE = int(os.getenv('LORA_ROUTE_MAX_AGE', '300'))  # Seconds a learned route stays usable before replies flood again
+
+# Per-scanner response cache (retry dedup / NACK re-sends)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '200'))  # Per scanner, LRU beyond
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '3600'))  # Seconds a cached response stays valid
+SCANNER_QUEUE_SIZE = int(os.getenv('SCANNER_QUEUE_SIZE', '16'))  # Requests pending per scanner before new ones are dropped
+
+# Local metrics surface (per-stage request latency, counters)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))  # GET /metrics on 127.0.0.1; 0 disables
+METRICS_SOCKET = os.getenv('METRICS_SOCKET', '')  # Serve on this Unix socket instead of the TCP port
+METRICS_SNAPSHOT_FILE = os.getenv('METRICS_SNAPSHOT_FILE', f'{HOME_DIR}/log/metrics.json')  # Periodic JSON snapshot ('' disables)
+METRICS_SNAPSHOT_INTERVAL = int(os.getenv('METRICS_SNAPSHOT_INTERVAL', '60'))  # Seconds between snapshots
+METRICS_REFRESH_INTERVAL = int(os.getenv('METRICS_REFRESH_INTERVAL', '5'))  # Seconds between reads of component stats
 
 # Grade Restriction Configuration
 # Grades that are restricted during normal car line operation
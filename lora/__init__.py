@@ -10,8 +10,26 @@ Enhanced LoRa communication with:
 """
 
 from lora.node_types import PacketType, PacketFlags, MultiPartFlags, NodeType
-from lora.packet_handler import LoRaPacket, LoRaTransceiver
+from lora.packet_handler import (
+    LoRaPacket, LoRaTransceiver, CRC16_ENGINES, set_crc_engine, get_crc_engine,
+    RECORD_SEPARATOR, pack_records,
+)
 from lora.collision_avoidance import CollisionAvoidance
+from lora.seen_cache import SeenPacketCache
+from lora.response_cache import ResponseCache
+from lora.tx_scheduler import TxScheduler, lora_airtime_ms
+from lora.tx_queue import TxPriority, PriorityTxQueue
+from lora.async_transceiver import AsyncLoRaTransceiver
+from lora.scanner_dispatcher import ScannerDispatcher
+from lora.metrics import MetricsRegistry, RequestTrace, MetricsServer, SnapshotWriter, WaitStat
+from lora.radio_backend import RadioBackend, RFM9xBackend
+from lora.sim_medium import SimulatedMedium, SimulatedRadio, SimLink
+from lora.capture import FrameCapture, ReplayRadio, load_capture
+from lora.repeater_node import RepeaterRadio, RepeaterStats
+from lora.routing import RouteTable
+from lora.multipart import (
+    MultiPartAssembly, ReassemblyBuffer, NACK_MARKER, MAX_NACK_ROUNDS, nack_payload, parse_nack,
+)
 
 __all__ = [
     'PacketType',
@@ -20,5 +38,40 @@ __all__ = [
     'NodeType',
     'LoRaPacket',
     'LoRaTransceiver',
+    'AsyncLoRaTransceiver',
+    'ScannerDispatcher',
+    'MetricsRegistry',
+    'RequestTrace',
+    'MetricsServer',
+    'SnapshotWriter',
+    'WaitStat',
+    'RadioBackend',
+    'RFM9xBackend',
+    'SimulatedMedium',
+    'SimulatedRadio',
+    'SimLink',
+    'FrameCapture',
+    'ReplayRadio',
+    'load_capture',
+    'RepeaterRadio',
+    'RepeaterStats',
+    'RouteTable',
+    'MultiPartAssembly',
+    'ReassemblyBuffer',
+    'NACK_MARKER',
+    'MAX_NACK_ROUNDS',
+    'nack_payload',
+    'parse_nack',
     'CollisionAvoidance',
+    'SeenPacketCache',
+    'ResponseCache',
+    'TxScheduler',
+    'lora_airtime_ms',
+    'TxPriority',
+    'PriorityTxQueue',
+    'CRC16_ENGINES',
+    'set_crc_engine',
+    'get_crc_engine',
+    'RECORD_SEPARATOR',
+    'pack_records',
 ]
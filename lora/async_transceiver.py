@@ -0,0 +1,321 @@
+"""
+Asyncio LoRa Transceiver
+
+Wraps a LoRaTransceiver so that only one background thread ever touches the
+SPI radio, and asyncio code talks to it through bounded queues:
+
+    radio = AsyncLoRaTransceiver(transceiver)
+    radio.start()                                   # from inside the event loop
+    packet = await radio.recv(timeout=0.9)          # None on timeout
+    ok = await radio.send(packet, collision_avoidance=True, delay=0.3)
+
+The radio thread keeps receiving while a transmission is scheduled: a TX
+request carries a due time (turnaround delay + TxScheduler jitter) and the
+thread polls RX in short slices until it is due, instead of sleeping. Frames
+are never left waiting in the radio FIFO while the event loop does lookups.
+
+Queued sends go out by TxPriority class (control replies before bulk data,
+with aging and per-destination round robin, see tx_queue.py); queue wait is
+reported per class as percentiles.
+
+Packets are still created with the wrapped transceiver's helpers
+(`radio.transceiver.create_data_packet(...)`); its seen-packet cache and
+TxScheduler are shared. When the transceiver has a RouteTable
+(transceiver.routes), a packet's first attempt carries the learned next hop
+toward its destination (see routing.py); retries, and destinations without a
+fresh route, flood.
+"""
+
+import asyncio
+import threading
+import time
+import logging
+from typing import Optional, Union
+
+from lora.metrics import WaitStat
+from lora.packet_handler import LoRaPacket, LoRaTransceiver, set_next_hop
+from lora.tx_queue import LatencyWindow, PriorityTxQueue, TxPriority
+
+
+class _TxRequest:
+    """One queued transmission, resolved on the event loop when done"""
+
+    __slots__ = ('data', 'use_ack', 'collision_avoidance', 'max_retries',
+                 'attempt', 'delay', 'due', 'created', 'enqueued', 'popped', 'future', 'priority', 'dest')
+
+    def __init__(self, data: bytes, use_ack: bool, collision_avoidance: bool,
+                 max_retries: int, delay: float, future: asyncio.Future,
+                 priority: TxPriority = TxPriority.DATA, dest=None):
+        self.data = data
+        self.use_ack = use_ack
+        self.collision_avoidance = collision_avoidance
+        self.max_retries = max_retries
+        self.attempt = 0
+        self.delay = delay
+        self.due = 0.0
+        self.created = time.monotonic()
+        self.enqueued = self.created   # Aging clock: moved past any hold before a preemption
+        self.popped = 0.0
+        self.future = future
+        self.priority = priority
+        self.dest = dest
+
+
+class AsyncLoRaTransceiver:
+    """asyncio front end for a LoRaTransceiver driven by a dedicated radio thread"""
+
+    def __init__(self, transceiver: LoRaTransceiver, rx_queue_size: int = 64,
+                 tx_queue_size: int = 32, poll_interval: float = 0.05, tx_aging: float = 1.0):
+        """
+        Args:
+            transceiver: Initialized LoRaTransceiver (owns the radio hardware)
+            rx_queue_size: Received packets buffered for recv(); oldest dropped when full
+            tx_queue_size: Outstanding send() calls before callers wait for space
+            poll_interval: Longest RX slice before the thread checks for due TX (seconds)
+            tx_aging: Seconds of queue wait that promote a TX class by one level
+        """
+        self.transceiver = transceiver
+        self.poll_interval = poll_interval
+        self.rx_queue_size = rx_queue_size
+        self.tx_queue_size = tx_queue_size
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._rx_queue: Optional[asyncio.Queue] = None
+        self._tx_slots: Optional[asyncio.Semaphore] = None
+        self._tx_pending = PriorityTxQueue(tx_aging)   # Thread-side TX requests (bounded by _tx_slots)
+        self._wake = threading.Event()      # Set when TX is queued or on stop
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Metrics
+        self.rx_frames = 0
+        self.rx_dropped = 0       # Oldest packets dropped because recv() fell behind
+        self.tx_frames = 0
+        self.tx_failed = 0
+        self.tx_retries = 0
+        self.tx_preempted = 0     # Waiting sends put back for a more urgent class
+        self.tx_routed = 0        # Frames sent with a next-hop hint instead of flooding
+        self._rx_wait = WaitStat()   # Radio RX -> picked up by recv()
+        self.last_received_at = 0.0   # time.monotonic() the last frame returned by recv() came off the radio
+        self._tx_wait = WaitStat()   # send() -> frame on air
+        self._class_wait = {priority: LatencyWindow() for priority in TxPriority}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        """Start the radio thread; must be called from inside the running event loop"""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._rx_queue = asyncio.Queue(maxsize=self.rx_queue_size)
+        self._tx_slots = asyncio.Semaphore(self.tx_queue_size)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="lora-radio", daemon=True)
+        self._thread.start()
+        logging.info(f"Async LoRa radio thread started (rx_queue={self.rx_queue_size}, "
+                     f"tx_queue={self.tx_queue_size})")
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop the radio thread; queued sends that never went out resolve to False"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        for request in self._tx_pending.drain():
+            self._resolve(request, False)
+        logging.info("Async LoRa radio thread stopped")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ------------------------------------------------------------------
+    # asyncio API
+    # ------------------------------------------------------------------
+    async def recv(self, timeout: Optional[float] = None) -> Optional[LoRaPacket]:
+        """Next validated packet from the radio, or None after timeout seconds"""
+        try:
+            if timeout is None:
+                received_at, packet = await self._rx_queue.get()
+            else:
+                received_at, packet = await asyncio.wait_for(self._rx_queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._rx_wait.add(time.monotonic() - received_at)
+        self.last_received_at = received_at
+        return packet
+
+    async def send(self, packet: Union[LoRaPacket, bytes], use_ack: bool = True,
+                   collision_avoidance: bool = False, max_retries: int = 3,
+                   delay: float = 0.0, priority: TxPriority = TxPriority.DATA) -> bool:
+        """
+        Queue a packet (or pre-encoded frame) and wait until it was transmitted
+
+        Args:
+            packet: LoRaPacket, or frame bytes (e.g. from LoRaPacket.repeat_frame)
+            use_ack: Use send_with_ack (always on with collision_avoidance)
+            collision_avoidance: Pace with the TxScheduler and retry like send_with_ca
+            max_retries: Attempts when collision_avoidance is on
+            delay: Extra seconds before the first attempt (e.g. RX turnaround);
+                   RX continues meanwhile
+            priority: TxPriority class deciding the order among queued sends
+
+        Returns:
+            True if sent (and ACKed when requested)
+        """
+        if not self.running:
+            raise RuntimeError("AsyncLoRaTransceiver not started")
+
+        data = packet.serialize() if isinstance(packet, LoRaPacket) else bytes(packet)
+        if len(data) > LoRaTransceiver.MAX_FRAME_SIZE:
+            logging.error(f"Packet too large: {len(data)} bytes")
+            return False
+
+        await self._tx_slots.acquire()
+        future = self._loop.create_future()
+        request = _TxRequest(data, use_ack or collision_avoidance, collision_avoidance,
+                             max_retries if collision_avoidance else 1, delay, future, priority,
+                             packet.dest_node if isinstance(packet, LoRaPacket) else None)
+        self._tx_pending.push(request, priority, request.dest)
+        self._wake.set()
+        try:
+            return await future
+        finally:
+            self._tx_slots.release()
+
+    def metrics(self) -> dict:
+        """Queue depths, wait times and frame counters for status logging"""
+        return {
+            'rx_queue_depth': self._rx_queue.qsize() if self._rx_queue else 0,
+            'tx_queue_depth': len(self._tx_pending),
+            'rx_frames': self.rx_frames,
+            'rx_dropped': self.rx_dropped,
+            'tx_frames': self.tx_frames,
+            'tx_failed': self.tx_failed,
+            'tx_retries': self.tx_retries,
+            'rx_wait': self._rx_wait.as_dict(),
+            'tx_wait': self._tx_wait.as_dict(),
+            'tx_queue_by_class': self._tx_pending.depths(),
+            'tx_wait_by_class': {priority.name.lower(): window.as_dict()
+                                 for priority, window in self._class_wait.items() if window.count},
+            'tx_promoted': self._tx_pending.promoted,
+            'tx_preempted': self.tx_preempted,
+            'tx_routed': self.tx_routed,
+        }
+
+    # ------------------------------------------------------------------
+    # Radio thread
+    # ------------------------------------------------------------------
+    def _run(self) -> None:
+        """Radio loop: transmit what is due, otherwise receive in short slices"""
+        scheduler = self.transceiver.tx_scheduler
+        current: Optional[_TxRequest] = None
+
+        while not self._stop.is_set():
+            now = time.monotonic()
+
+            if current is not None and current.attempt == 0 and now < current.due \
+                    and self._tx_pending.preempts(current.priority, current.popped - current.enqueued, now):
+                # A more urgent send arrived while this one waited for its slot; that
+                # hold was pacing, not queueing, so it does not count toward aging
+                current.enqueued += now - current.popped
+                self._tx_pending.push_front(current, current.priority, current.dest)
+                self.tx_preempted += 1
+                current = None
+
+            if current is None and self._tx_pending:
+                current = self._tx_pending.pop(now)
+                current.popped = now
+                current.due = now + current.delay
+                if current.collision_avoidance:
+                    current.due += scheduler.delay_for(len(current.data))
+
+            if current is not None and now >= current.due:
+                current = self._transmit(current)
+                continue
+
+            timeout = self.poll_interval
+            if current is not None:
+                timeout = min(timeout, current.due - now)
+
+            if self.transceiver.rfm9x is None:
+                # LOCAL mode: nothing to receive, just wait for TX work or the due time
+                self._wake.wait(timeout)
+                self._wake.clear()
+                continue
+
+            try:
+                packet = self.transceiver.receive_packet(timeout=timeout)
+            except Exception as e:
+                logging.error(f"Radio thread receive error: {e}")
+                time.sleep(timeout)
+                continue
+
+            if packet is not None:
+                self._loop.call_soon_threadsafe(self._deliver, time.monotonic(), packet)
+
+        if current is not None:
+            self._resolve(current, False)
+
+    def _transmit(self, request: _TxRequest) -> Optional[_TxRequest]:
+        """Send one attempt; returns the request again if it should be retried"""
+        if request.attempt == 0:
+            waited = time.monotonic() - request.created
+            self._tx_wait.add(waited)
+            self._class_wait[request.priority].add(waited)
+        try:
+            success = self.transceiver.send_frame(self._routed(request), use_ack=request.use_ack)
+        except Exception as e:
+            logging.error(f"Radio thread send error: {e}")
+            success = False
+
+        if success:
+            self.tx_frames += 1
+            self._resolve(request, True)
+            return None
+
+        request.attempt += 1
+        if request.attempt < request.max_retries:
+            self.tx_retries += 1
+            request.due = time.monotonic() + self.transceiver.tx_scheduler.delay_for(
+                len(request.data), request.attempt
+            )
+            logging.warning(f"Send failed (attempt {request.attempt}/{request.max_retries}), retrying")
+            return request
+
+        self.tx_failed += 1
+        logging.error(f"Send failed after {request.max_retries} attempts")
+        self._resolve(request, False)
+        return None
+
+    def _routed(self, request: _TxRequest) -> bytes:
+        """Frame for this attempt: the first one carries the next hop if the route is fresh"""
+        routes = self.transceiver.routes
+        if routes is None or request.attempt or request.dest is None:
+            return request.data
+        next_hop = routes.next_hop(request.dest)
+        if next_hop is None:
+            return request.data
+        self.tx_routed += 1
+        return set_next_hop(request.data, next_hop)
+
+    def _resolve(self, request: _TxRequest, result: bool) -> None:
+        """Complete a send() future from any thread"""
+        def _set():
+            if not request.future.done():
+                request.future.set_result(result)
+        if self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(_set)
+
+    def _deliver(self, received_at: float, packet: LoRaPacket) -> None:
+        """Event-loop side of RX: enqueue, dropping the oldest packet when full"""
+        self.rx_frames += 1
+        if self._rx_queue.full():
+            self._rx_queue.get_nowait()
+            self.rx_dropped += 1
+            logging.warning(f"RX queue full ({self.rx_queue_size}), dropped oldest packet")
+        self._rx_queue.put_nowait((received_at, packet))
@@ -0,0 +1,401 @@
+"""
+Frame Capture and Replay
+
+Capture: LoRaTransceiver appends every raw frame it receives (before
+validation, so duplicates and foreign frames are kept) and every frame it
+sends to a compact binary file, with the monotonic time, RSSI and SNR:
+
+    file    := b"LORACAP1" epoch:f64 monotonic:f64 record*
+    record  := direction:u8 (0 RX, 1 TX) time:f64 rssi:i16 snr:f32 length:u16 frame
+
+(big endian; rssi -32768 / snr NaN = unknown). The file rotates like
+logging's RotatingFileHandler (capture.bin.1 is the previous file, ...).
+A capture left by an earlier run is rotated away when a process starts
+writing, so every file holds one process's monotonic clock (it restarts on
+reboot) and maps to wall time through its own header.
+Enable it with `LoRaTransceiver(..., capture=FrameCapture(path))` or, for
+unmodified programs, the environment:
+
+    LORA_CAPTURE_FILE      Capture path (e.g. /etc/iqright/LoraService/log/capture.bin)
+    LORA_CAPTURE_MAX_MB    Size before rotating (default 16)
+    LORA_CAPTURE_BACKUPS   Rotated files kept (default 5)
+
+Replay: ReplayRadio is a RadioBackend that hands the captured RX frames back
+to a node at their recorded pace (1x), N x faster, or as fast as they are
+read (speed 0), and records what the node sends. Its report() gives
+throughput, response latency percentiles (replayed request -> first frame
+back to that scanner) and the divergence between the recorded and replayed
+responses, compared per scanner on packet type, payload and part numbers
+(sequence numbers and timestamps always differ). LORA_BACKEND=replay runs an
+unmodified CaptureLora against a capture; utility_tools/replay_capture.py
+drives that and prints the report.
+
+    LORA_REPLAY_FILE       Capture to replay (rotated files included)
+    LORA_REPLAY_SPEED      1 (recorded pace), N (N x faster) or "max"
+    LORA_REPLAY_REPORT     Write the JSON report here when done, then stop
+                           the program (KeyboardInterrupt in the main thread)
+    LORA_REPLAY_SETTLE     Seconds without traffic after the last frame
+                           before the replay counts as done (default 3)
+"""
+
+import _thread
+import difflib
+import json
+import logging
+import math
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from lora.packet_handler import LoRaPacket
+from lora.radio_backend import RadioBackend, RH_BROADCAST_ADDRESS
+
+MAGIC = b"LORACAP1"
+_FILE_HEADER = struct.Struct('>dd')       # epoch, monotonic when the file was opened
+_RECORD = struct.Struct('>BdhfH')         # direction, monotonic, rssi, snr, length
+NO_RSSI = -32768
+
+RX = 0
+TX = 1
+
+
+class CapturedFrame(NamedTuple):
+    direction: int          # RX or TX
+    time: float             # Epoch seconds, from the capturing process's monotonic clock
+    rssi: Optional[int]
+    snr: Optional[float]
+    frame: bytes            # LoRaPacket frame (RadioHead header stripped)
+
+
+class FrameCapture:
+    """Thread-safe, rotating binary capture of raw frames"""
+
+    FLUSH_INTERVAL = 1.0   # Seconds between flushes (bounded loss on a crash)
+
+    def __init__(self, path: str, max_bytes: int = 16 * 1024 * 1024, backup_count: int = 5):
+        """
+        Args:
+            path: Capture file (one left by an earlier run is rotated to path.1 first)
+            max_bytes: Rotate before a record would grow the file past this (0 never)
+            backup_count: Rotated files kept as path.1 .. path.N
+        """
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.frames = 0
+        self.rotations = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._flushed = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional['FrameCapture']:
+        path = os.getenv('LORA_CAPTURE_FILE')
+        if not path:
+            return None
+        return cls(path, max_bytes=int(float(os.getenv('LORA_CAPTURE_MAX_MB', '16')) * 1024 * 1024),
+                   backup_count=int(os.getenv('LORA_CAPTURE_BACKUPS', '5')))
+
+    def record(self, direction: int, frame, rssi: Optional[int] = None, snr: Optional[float] = None) -> None:
+        """Append one frame (bytes / bytearray / memoryview) stamped with time.monotonic()"""
+        now = time.monotonic()
+        header = _RECORD.pack(direction, now, NO_RSSI if rssi is None else int(rssi),
+                              math.nan if snr is None else snr, len(frame))
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._open()
+                elif self.max_bytes and self._size + len(header) + len(frame) > self.max_bytes:
+                    self._rotate()
+                self._file.write(header)
+                self._file.write(frame)
+                self._size += len(header) + len(frame)
+                self.frames += 1
+                if now - self._flushed >= self.FLUSH_INTERVAL:
+                    self._file.flush()
+                    self._flushed = now
+            except OSError as e:
+                logging.error(f"[CAPTURE] Write to {self.path} failed: {e}")
+
+    def record_rx(self, frame, rssi: Optional[int] = None, snr: Optional[float] = None) -> None:
+        self.record(RX, frame, rssi, snr)
+
+    def record_tx(self, frame) -> None:
+        self.record(TX, frame)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self) -> None:
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            # Written by an earlier run: its header's monotonic base is not ours
+            self._shift()
+        self._file = open(self.path, 'ab')
+        self._file.write(MAGIC + _FILE_HEADER.pack(time.time(), time.monotonic()))
+        self._size = len(MAGIC) + _FILE_HEADER.size
+        logging.info(f"[CAPTURE] Capturing frames to {self.path}")
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        self._shift()
+        self._open()
+
+    def _shift(self) -> None:
+        """Move the current file to path.1 (older ones up, the oldest dropped)"""
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                older = f"{self.path}.{index}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+
+
+def capture_files(path: str) -> List[str]:
+    """A capture and its rotated files that exist, oldest first"""
+    path = str(path)
+    rotated = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        rotated.append(f"{path}.{index}")
+        index += 1
+    files = list(reversed(rotated))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_capture(path: str) -> Iterator[CapturedFrame]:
+    """Frames of one capture file; a record cut short by a crash ends the file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a LoRa capture file")
+    # Monotonic stamps mapped to epoch via the file header, so captures taken
+    # across restarts keep their order and spacing
+    epoch, monotonic = _FILE_HEADER.unpack_from(data, len(MAGIC))
+    offset = len(MAGIC) + _FILE_HEADER.size
+    while offset + _RECORD.size <= len(data):
+        direction, stamp, rssi, snr, length = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        if offset + length > len(data):
+            break
+        yield CapturedFrame(direction, epoch + (stamp - monotonic), None if rssi == NO_RSSI else rssi,
+                            None if math.isnan(snr) else round(snr, 2), data[offset:offset + length])
+        offset += length
+
+
+def load_capture(path: str) -> List[CapturedFrame]:
+    """Every frame of a capture including its rotated files, in order"""
+    frames = []
+    for name in capture_files(path):
+        frames.extend(read_capture(name))
+    return frames
+
+
+def _response_key(packet: LoRaPacket) -> tuple:
+    """What must match between a recorded and a replayed response"""
+    return packet.packet_type, bytes(packet.payload), packet.multi_part_index, packet.multi_part_total
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class ReplayRadio(RadioBackend):
+    """RadioBackend feeding a capture's RX frames to a node and recording its responses"""
+
+    def __init__(self, frames: List[CapturedFrame], speed: float = 1.0, settle: float = 3.0,
+                 on_done=None):
+        """
+        Args:
+            frames: Captured frames (load_capture); RX ones are replayed,
+                    TX ones are the reference responses
+            speed: 1.0 recorded pace, N for N x faster, 0 as fast as they are read
+            settle: Seconds without traffic after the last RX before the replay is done
+            on_done: Called once (from the radio thread) with report() when done
+        """
+        self.speed = speed
+        self.settle = settle
+        self.on_done = on_done
+        self.node = None
+        self.destination = RH_BROADCAST_ADDRESS
+        self.tx_power = 23
+        self.ack_delay = 0.1
+        self.last_rssi = None
+        self.last_snr = None
+
+        self._rx = [frame for frame in frames if frame.direction == RX]
+        self._recorded: Dict[int, list] = defaultdict(list)
+        for frame in frames:
+            if frame.direction == TX:
+                packet = LoRaPacket.deserialize(frame.frame)
+                if packet is not None:
+                    self._recorded[packet.dest_node].append(_response_key(packet))
+        self._replayed: Dict[int, list] = defaultdict(list)
+
+        self._lock = threading.Lock()
+        self._next = 0
+        self._origin = self._rx[0].time if self._rx else 0.0
+        self._started: Optional[float] = None
+        self._last_activity = 0.0
+        self._awaiting: Dict[int, float] = {}   # scanner -> replay time of its last request
+        self._latencies: List[float] = []
+        self._tx_frames = 0
+        self._finished_at: Optional[float] = None
+        self.done = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> 'ReplayRadio':
+        path = os.environ['LORA_REPLAY_FILE']
+        speed = os.getenv('LORA_REPLAY_SPEED', '1')
+        report_path = os.getenv('LORA_REPLAY_REPORT')
+
+        def finish(report: dict) -> None:
+            logging.info(f"[REPLAY] Done: {json.dumps(report)}")
+            if report_path:
+                with open(report_path, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, indent=2)
+                _thread.interrupt_main()
+
+        frames = load_capture(path)
+        logging.info(f"[REPLAY] Replaying {len(frames)} frames from {path} at speed {speed}")
+        return cls(frames, speed=0.0 if speed == 'max' else float(speed),
+                   settle=float(os.getenv('LORA_REPLAY_SETTLE', '3')), on_done=finish)
+
+    # ------------------------------------------------------------------
+    # RadioBackend
+    # ------------------------------------------------------------------
+    def receive(self, *, keep_listening: bool = True, with_header: bool = False,
+                with_ack: bool = False, timeout: Optional[float] = None):
+        timeout = 0.5 if timeout is None else timeout
+        now = time.monotonic()
+        if self._started is None:
+            self._started = self._last_activity = now
+        if self._next >= len(self._rx):
+            self._check_done(now)
+            time.sleep(timeout)
+            return None
+
+        frame = self._rx[self._next]
+        wait = self._due(frame) - now
+        if wait > timeout:
+            time.sleep(timeout)
+            return None
+        if wait > 0:
+            time.sleep(wait)
+        self._next += 1
+
+        now = time.monotonic()
+        packet = LoRaPacket.deserialize(frame.frame)
+        source = packet.source_node if packet is not None else 0
+        if packet is not None:
+            with self._lock:
+                self._awaiting[source] = now
+        self._last_activity = now
+        self.last_rssi = frame.rssi
+        self.last_snr = frame.snr
+        header = bytes((RH_BROADCAST_ADDRESS, source & 0xFF, 0, 0))
+        return bytearray(header + frame.frame) if with_header else bytearray(frame.frame)
+
+    def send(self, data, **kwargs) -> bool:
+        now = time.monotonic()
+        packet = LoRaPacket.deserialize(bytes(data))
+        with self._lock:
+            self._tx_frames += 1
+            self._last_activity = now
+            if packet is not None:
+                self._replayed[packet.dest_node].append(_response_key(packet))
+                requested = self._awaiting.pop(packet.dest_node, None)
+                if requested is not None:
+                    self._latencies.append(now - requested)
+        return True
+
+    def send_with_ack(self, data) -> bool:
+        return self.send(data)
+
+    # ------------------------------------------------------------------
+    # Replay state
+    # ------------------------------------------------------------------
+    def _due(self, frame: CapturedFrame) -> float:
+        if self.speed <= 0:
+            return 0.0
+        return self._started + (frame.time - self._origin) / self.speed
+
+    def _check_done(self, now: float) -> None:
+        if self.done.is_set() or now - self._last_activity < self.settle:
+            return
+        self._finished_at = self._last_activity
+        self.done.set()
+        if self.on_done is not None:
+            try:
+                self.on_done(self.report())
+            except Exception as e:
+                logging.error(f"[REPLAY] Report failed: {e}")
+
+    def divergence(self) -> dict:
+        """Recorded vs replayed responses, aligned per scanner"""
+        result = {'matched': 0, 'mismatched': 0, 'missing': 0, 'extra': 0, 'scanners': {}}
+        with self._lock:
+            replayed = {dest: list(keys) for dest, keys in self._replayed.items()}
+        for dest in sorted(set(self._recorded) | set(replayed)):
+            recorded = self._recorded.get(dest, [])
+            got = replayed.get(dest, [])
+            counts = {'matched': 0, 'mismatched': 0, 'missing': 0, 'extra': 0}
+            matcher = difflib.SequenceMatcher(a=recorded, b=got, autojunk=False)
+            for tag, a1, a2, b1, b2 in matcher.get_opcodes():
+                if tag == 'equal':
+                    counts['matched'] += a2 - a1
+                elif tag == 'replace':
+                    paired = min(a2 - a1, b2 - b1)
+                    counts['mismatched'] += paired
+                    counts['missing'] += (a2 - a1) - paired
+                    counts['extra'] += (b2 - b1) - paired
+                elif tag == 'delete':
+                    counts['missing'] += a2 - a1
+                else:
+                    counts['extra'] += b2 - b1
+            for key, value in counts.items():
+                result[key] += value
+            if counts['mismatched'] or counts['missing'] or counts['extra']:
+                result['scanners'][dest] = counts
+        return result
+
+    def report(self) -> dict:
+        """Throughput, response latency percentiles and divergence so far"""
+        started = self._started or time.monotonic()
+        elapsed = max((self._finished_at or time.monotonic()) - started, 1e-9)
+        with self._lock:
+            latencies = sorted(self._latencies)
+            tx_frames = self._tx_frames
+        recorded_span = (self._rx[-1].time - self._origin) if self._rx else 0.0
+        return {
+            'speed': self.speed or 'max',
+            'rx_replayed': self._next,
+            'rx_total': len(self._rx),
+            'tx_frames': tx_frames,
+            'recorded_s': round(recorded_span, 3),
+            'elapsed_s': round(elapsed, 3),
+            'requests_per_s': round(self._next / elapsed, 2),
+            'tx_frames_per_s': round(tx_frames / elapsed, 2),
+            'latency_ms': {
+                'count': len(latencies),
+                'p50': round(_percentile(latencies, 0.50) * 1000, 1),
+                'p95': round(_percentile(latencies, 0.95) * 1000, 1),
+                'p99': round(_percentile(latencies, 0.99) * 1000, 1),
+                'max': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+            },
+            'divergence': self.divergence(),
+        }
@@ -13,12 +13,17 @@ Primary collision avoidance strategy:
 1. Randomized transmission delays (statistical avoidance)
 2. Exponential backoff on retry
 3. ACK/retry at application layer
+
+When send_with_ca() is given a TxScheduler, delays scale with each frame's
+actual airtime and respect the node's duty-cycle budget (see tx_scheduler.py).
 """
 
 import random
 import time
 import logging
 
+from lora.tx_scheduler import lora_airtime_ms
+
 
 class CollisionAvoidance:
     """Implements collision avoidance mechanisms for LoRa transmission"""
@@ -83,7 +88,7 @@ class CollisionAvoidance:
         """
         Estimate LoRa packet air time in milliseconds
 
-        Based on Semtech formula for LoRa air time calculation
+        Based on Semtech formula for LoRa air time calculation (see lora.tx_scheduler)
 
         Args:
             payload_size: Payload size in bytes
@@ -94,23 +99,7 @@ class CollisionAvoidance:
         Returns:
             Estimated air time in milliseconds
         """
-        # Symbol duration in seconds
-        Ts = (2 ** spreading_factor) / bandwidth
-
-        # Preamble time (8 symbols + 4.25)
-        Tpreamble = (8 + 4.25) * Ts
-
-        # Payload symbols
-        payload_symb_nb = 8 + max(
-            ((8 * payload_size - 4 * spreading_factor + 28 + 16) / (4 * spreading_factor)) * coding_rate,
-            0
-        )
-
-        # Payload time
-        Tpayload = payload_symb_nb * Ts
-
-        # Total time in milliseconds
-        total_ms = (Tpreamble + Tpayload) * 1000
+        total_ms = lora_airtime_ms(payload_size, spreading_factor, bandwidth, coding_rate)
 
         logging.debug(f"Estimated airtime: {total_ms:.1f}ms for {payload_size} bytes")
         return total_ms
@@ -118,11 +107,14 @@ class CollisionAvoidance:
     @staticmethod
     def send_with_ca(rfm9x, data: bytes, max_retries: int = 3,
                     enable_rx_guard: bool = True,
-                    enable_random_delay: bool = True) -> bool:
+                    enable_random_delay: bool = True,
+                    scheduler=None) -> bool:
         """
         Send with collision avoidance mechanisms
 
-        Combines randomized delay + RX guard (channel sensing) + exponential backoff
+        Combines randomized delay + RX guard (channel sensing) + exponential backoff.
+        With a TxScheduler, the fixed delays are replaced by airtime-proportional
+        jitter (doubling per retry) and the node's duty-cycle budget.
 
         Args:
             rfm9x: RFM9x radio object
@@ -130,10 +122,17 @@ class CollisionAvoidance:
             max_retries: Maximum retry attempts
             enable_rx_guard: Enable RX guard (channel sensing)
             enable_random_delay: Enable randomized delay
+            scheduler: TxScheduler for airtime pacing (e.g. transceiver.tx_scheduler)
 
         Returns:
             True if sent successfully, False if failed
         """
+        if scheduler is not None:
+            return CollisionAvoidance._send_scheduled(
+                rfm9x, data, max_retries, scheduler,
+                pace=enable_rx_guard or enable_random_delay
+            )
+
         for attempt in range(max_retries):
             # Random backoff (increases with attempts)
             if enable_random_delay:
@@ -160,3 +159,23 @@ class CollisionAvoidance:
 
         logging.error(f"Send failed after {max_retries} attempts")
         return False  # Failed after retries
+
+    @staticmethod
+    def _send_scheduled(rfm9x, data: bytes, max_retries: int, scheduler, pace: bool = True) -> bool:
+        """send_with_ca() path paced by a TxScheduler instead of fixed delays"""
+        frame_size = len(data)
+        for attempt in range(max_retries):
+            if pace:
+                scheduler.wait_for_slot(frame_size, attempt)
+
+            logging.debug(f"Sending with CA (attempt {attempt + 1}/{max_retries}, "
+                          f"{scheduler.airtime_ms(frame_size):.1f}ms airtime)")
+            success = rfm9x.send_with_ack(bytes(data))
+            scheduler.record_tx(frame_size)
+            if success:
+                logging.debug("Send successful")
+                return True
+            logging.warning(f"Send failed (attempt {attempt + 1}/{max_retries})")
+
+        logging.error(f"Send failed after {max_retries} attempts")
+        return False
@@ -0,0 +1,390 @@
+"""
+LoRa Node Metrics
+
+Lightweight in-process instrumentation for the server (and any other node
+that wants it), replacing after-the-fact regex correlation of log lines:
+
+    metrics = MetricsRegistry(prefix="lora_server")
+    trace = RequestTrace(metrics, scanner=102, packet_type="DATA")   # RX time
+    trace.mark('start')                                               # handler picked it up
+    trace.mark('lookup_start'); ...; trace.mark('lookup_end')
+    trace.mark_tx()                                                   # every frame sent
+    trace.mark('mqtt')
+    trace.outcome = "found"
+    trace.finish()
+
+- counters and latency histograms keyed by name + labels (scanner, packet
+  type, stage, ...); recording is a dict lookup, a bisect and an increment
+- histograms use fixed log-linear buckets (HDR style: two per power of two,
+  0.5ms .. 96s), so memory is constant and percentiles are estimated with
+  bounded relative error
+- render_prometheus(): Prometheus text exposition format
+- snapshot(): JSON-able dict with counters, histogram percentiles and any
+  registered sources (e.g. radio.metrics())
+- WaitStat: running count / mean / max for component stats dicts (radio
+  queues, MQTT publish latency, dispatcher queueing)
+- MetricsServer serves both on 127.0.0.1 (or a Unix socket) from a daemon
+  thread; SnapshotWriter writes the JSON snapshot to a file periodically
+- sources read state owned by the event loop, so they are only called from
+  it (refresh_loop() task); the exporter threads render the cached values
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import socketserver
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+# Upper bounds (seconds): 2^e and 1.5 * 2^e from ~0.5ms up to 96s
+BUCKETS = tuple(sorted({round(m * 2.0 ** e, 6) for e in range(-11, 7) for m in (1.0, 1.5)} | {64.0}))
+
+# Request stages derived from RequestTrace marks: (stage, from mark, to mark)
+STAGES = (
+    ('queue', 'rx', 'start'),               # Waiting for the scanner's worker
+    ('lookup', 'lookup_start', 'lookup_end'),
+    ('first_tx', 'rx', 'first_tx'),         # RX -> first response frame on air
+    ('total', 'rx', 'last_tx'),             # RX -> last response frame on air
+    ('mqtt', 'rx', 'mqtt'),                 # RX -> MQTT hand-off
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[dict]) -> LabelKey:
+    if not labels:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _label_text(key: LabelKey, extra: str = '') -> str:
+    parts = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class WaitStat:
+    """Running count / mean / max of a wait or latency in milliseconds"""
+
+    __slots__ = ('count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def as_dict(self) -> dict:
+        return {
+            'avg_ms': round(self.total_ms / self.count, 1) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 1),
+        }
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (seconds)"""
+
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # Last slot: above the largest bound
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (capped at the max seen)"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                bound = BUCKETS[index] if index < len(BUCKETS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'avg_ms': round(self.sum / self.count * 1000, 1) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.50) * 1000, 1),
+            'p95_ms': round(self.percentile(0.95) * 1000, 1),
+            'p99_ms': round(self.percentile(0.99) * 1000, 1),
+            'max_ms': round(self.max * 1000, 1),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms, exported as Prometheus text or JSON"""
+
+    def __init__(self, prefix: str = 'lora'):
+        self.prefix = prefix
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._sources: Dict[str, Callable[[], dict]] = {}
+        self._source_values: Dict[str, dict] = {}
+
+    def inc(self, name: str, labels: Optional[dict] = None, value: float = 1) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, labels: Optional[dict] = None) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+
+    def add_source(self, name: str, provider: Callable[[], dict]) -> None:
+        """Include provider() (e.g. radio.metrics) in snapshots and as gauges, as of the last refresh"""
+        self._sources[name] = provider
+
+    def refresh_sources(self) -> None:
+        """Call every source and cache the results; run on the thread that owns their state"""
+        values = {name: self._read_source(name, provider) for name, provider in list(self._sources.items())}
+        with self._lock:
+            self._source_values = values
+
+    async def refresh_loop(self, interval: float = 5.0) -> None:
+        """Refresh the sources every `interval` seconds (run as a task on the event loop)"""
+        while True:
+            self.refresh_sources()
+            await asyncio.sleep(interval)
+
+    def snapshot(self) -> dict:
+        """Counters, histogram summaries and source dicts, JSON-serializable"""
+        with self._lock:
+            data = {
+                'timestamp': time.time(),
+                'uptime_s': round(time.time() - self.started, 1),
+                'counters': {name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                             for name, series in self._counters.items()},
+                'histograms': {name: [{'labels': dict(key), **histogram.as_dict()}
+                                      for key, histogram in series.items()]
+                               for name, series in self._histograms.items()},
+                'sources': dict(self._source_values),
+            }
+        return data
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric = f'{self.prefix}_{name}_total'
+                lines.append(f'# TYPE {metric} counter')
+                lines.extend(f'{metric}{_label_text(key)} {value:g}' for key, value in series.items())
+            for name, series in sorted(self._histograms.items()):
+                metric = f'{self.prefix}_{name}_seconds'
+                lines.append(f'# TYPE {metric} histogram')
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, bucket_count in zip(BUCKETS, histogram.counts):
+                        cumulative += bucket_count
+                        le = 'le="%g"' % bound
+                        lines.append(f'{metric}_bucket{_label_text(key, le)} {cumulative}')
+                    le = 'le="+Inf"'
+                    lines.append(f'{metric}_bucket{_label_text(key, le)} {histogram.count}')
+                    lines.append(f'{metric}_sum{_label_text(key)} {histogram.sum:.6f}')
+                    lines.append(f'{metric}_count{_label_text(key)} {histogram.count}')
+            sources = self._source_values
+        for name, values in sources.items():
+            for path, value in _flatten(values):
+                metric = re.sub(r'[^a-zA-Z0-9_]', '_', f'{self.prefix}_{name}_{path}')
+                lines.append(f'{metric} {value:g}')
+        lines.append(f'{self.prefix}_uptime_seconds {time.time() - self.started:.0f}')
+        return '\n'.join(lines) + '\n'
+
+    def _read_source(self, name: str, provider: Callable[[], dict]) -> dict:
+        try:
+            return provider()
+        except Exception as e:
+            logging.error(f"[METRICS] Source {name} failed: {e}")
+            return {}
+
+
+def _flatten(values: dict, path: str = ''):
+    """(path, number) leaves of a nested stats dict; booleans as 0/1"""
+    for key, value in values.items():
+        name = f'{path}_{key}' if path else str(key)
+        if isinstance(value, dict):
+            yield from _flatten(value, name)
+        elif isinstance(value, (bool, int, float)):
+            yield name, float(value)
+
+
+class RequestTrace:
+    """Monotonic timestamps of one scanner request, turned into stage latencies on finish()"""
+
+    __slots__ = ('registry', 'labels', 'marks', 'outcome')
+
+    def __init__(self, registry: MetricsRegistry, scanner, packet_type: str, rx: Optional[float] = None):
+        """
+        Args:
+            registry: Where stage latencies and counters are recorded
+            scanner: Requesting node ID (label)
+            packet_type: Request packet type name (label)
+            rx: time.monotonic() when the frame was received (default now)
+        """
+        self.registry = registry
+        self.labels = {'scanner': scanner, 'type': packet_type}
+        self.marks = {'rx': time.monotonic() if rx is None else rx}
+        self.outcome = 'ok'
+
+    def mark(self, name: str) -> None:
+        """Record a stage boundary now ('start', 'lookup_start', 'lookup_end', 'mqtt')"""
+        self.marks[name] = time.monotonic()
+
+    def mark_tx(self) -> None:
+        """Record a response frame on air (first_tx once, last_tx every time)"""
+        now = time.monotonic()
+        self.marks.setdefault('first_tx', now)
+        self.marks['last_tx'] = now
+
+    def finish(self, outcome: Optional[str] = None) -> None:
+        """Record every stage whose marks are present, plus a request counter by outcome"""
+        outcome = outcome or self.outcome
+        registry = self.registry
+        for stage, start, end in STAGES:
+            if start in self.marks and end in self.marks:
+                registry.observe('request_stage', self.marks[end] - self.marks[start],
+                                 {**self.labels, 'stage': stage})
+        registry.inc('requests', {**self.labels, 'outcome': outcome})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = None
+
+    def do_GET(self):
+        if self.path in ('/metrics', '/'):
+            body = self.registry.render_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path == '/metrics.json':
+            body = json.dumps(self.registry.snapshot(), default=str).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        return str(self.client_address or 'unix')
+
+    def log_message(self, format, *args):
+        logging.debug(f"[METRICS] {self.address_string()} {format % args}")
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ''
+
+
+class MetricsServer:
+    """GET /metrics (Prometheus) and /metrics.json on localhost or a Unix socket"""
+
+    def __init__(self, registry: MetricsRegistry, port: int = 0, host: str = '127.0.0.1',
+                 unix_path: Optional[str] = None):
+        """
+        Args:
+            registry: Metrics to serve
+            port: TCP port on host (0 picks a free one; ignored with unix_path)
+            host: Bind address; keep local
+            unix_path: Serve on this Unix socket instead of TCP
+        """
+        handler = type('MetricsHandler', (_Handler,), {'registry': registry})
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            self._server = _UnixHTTPServer(unix_path, handler)
+            self.address = unix_path
+        else:
+            self._server = ThreadingHTTPServer((host, port), handler)
+            self._server.daemon_threads = True
+            self.address = self._server.server_address
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        logging.info(f"[METRICS] Serving /metrics on {self.address}")
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+
+class SnapshotWriter:
+    """Writes registry.snapshot() as JSON to a file every `interval` seconds"""
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float = 60.0):
+        self.registry = registry
+        self.path = str(path)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self) -> bool:
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.registry.snapshot(), f, default=str)
+            os.replace(tmp_path, self.path)
+            return True
+        except OSError as e:
+            logging.error(f"[METRICS] Could not write snapshot {self.path}: {e}")
+            return False
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(2.0)
+        self._thread = None
+        self.write()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.write()
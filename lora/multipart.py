@@ -0,0 +1,115 @@
+"""
+Multi-Part Reassembly and Selective Repeat
+
+A response too large for one frame is sent as parts 1..N (multi_part_index /
+multi_part_total). Instead of timing out and re-sending the whole request
+when a part is lost, the scanner keeps the parts it has, keyed by
+(source, request), and asks for the missing ones only:
+
+    DATA payload  "NACK|<request>|<index>,<index>,..."   e.g. "NACK|P12345|2,4"
+
+The server answers by re-sending just those parts from its response cache.
+Partial responses survive a full re-request too, so parts received on any
+attempt count toward completing the response.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+NACK_MARKER = 'NACK'
+MAX_NACK_ROUNDS = 2  # Selective-repeat requests per response before a full re-request
+
+
+def nack_payload(request: str, missing: Iterable[int]) -> bytes:
+    """DATA payload asking for the missing parts of a response"""
+    return f"{NACK_MARKER}|{request}|{','.join(str(i) for i in missing)}".encode('utf-8')
+
+
+def parse_nack(fields: Tuple[str, ...]) -> Optional[Tuple[str, List[int]]]:
+    """(request, indexes) from NACK payload fields, or None if not a valid NACK"""
+    if len(fields) != 3 or fields[0] != NACK_MARKER:
+        return None
+    try:
+        indexes = sorted({int(i) for i in fields[2].split(',') if i})
+    except ValueError:
+        return None
+    return fields[1], indexes
+
+
+class MultiPartAssembly:
+    """Parts received so far for one multi-part response"""
+
+    __slots__ = ('total', 'parts', 'nacks', 'updated')
+
+    def __init__(self, total: int):
+        self.total = total
+        self.parts: Dict[int, list] = {}
+        self.nacks = 0          # Selective-repeat requests sent for this response
+        self.updated = time.monotonic()
+
+    def add(self, index: int, records: Iterable) -> None:
+        if 1 <= index <= self.total:
+            self.parts[index] = list(records)
+            self.updated = time.monotonic()
+
+    @property
+    def complete(self) -> bool:
+        return len(self.parts) == self.total
+
+    def missing(self) -> List[int]:
+        return [i for i in range(1, self.total + 1) if i not in self.parts]
+
+    def records(self) -> list:
+        """All records in part order"""
+        return [record for index in sorted(self.parts) for record in self.parts[index]]
+
+
+class ReassemblyBuffer:
+    """Partial multi-part responses keyed by (source, request), bounded and aged"""
+
+    def __init__(self, max_entries: int = 8, max_age: float = 60.0):
+        """
+        Args:
+            max_entries: Partial responses kept (least recently updated dropped first)
+            max_age: Seconds since the last part before a partial response is dropped
+        """
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._assemblies: 'OrderedDict[Tuple[int, Hashable], MultiPartAssembly]' = OrderedDict()
+
+    def add(self, source: int, request: Hashable, index: int, total: int,
+            records: Iterable) -> MultiPartAssembly:
+        """Store one part; a different total for the same key starts over"""
+        self._expire()
+        key = (source, request)
+        assembly = self._assemblies.get(key)
+        if assembly is None or assembly.total != total:
+            assembly = MultiPartAssembly(total)
+            self._assemblies[key] = assembly
+        self._assemblies.move_to_end(key)
+        assembly.add(index, records)
+        while len(self._assemblies) > self.max_entries:
+            self._assemblies.popitem(last=False)
+        return assembly
+
+    def get(self, source: int, request: Hashable) -> Optional[MultiPartAssembly]:
+        self._expire()
+        return self._assemblies.get((source, request))
+
+    def discard(self, source: int, request: Hashable) -> None:
+        self._assemblies.pop((source, request), None)
+
+    def clear(self) -> None:
+        self._assemblies.clear()
+
+    def __len__(self) -> int:
+        return len(self._assemblies)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.max_age
+        while self._assemblies:
+            key, assembly = next(iter(self._assemblies.items()))
+            if assembly.updated >= cutoff:
+                break
+            del self._assemblies[key]
@@ -22,6 +22,7 @@ class PacketFlags(IntEnum):
     """General packet flags"""
     ACK_REQ = 0x01       # Acknowledgment requested
     IS_REPEAT = 0x02     # Packet was repeated by a repeater
+    NEXT_HOP = 0x04      # 2-byte next-hop node after the payload: only that node forwards
 
 
 class MultiPartFlags(IntEnum):
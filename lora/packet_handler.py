@@ -5,19 +5,191 @@ Handles binary packet serialization/deserialization, CRC validation,
 multi-packet sequences, and transceiver operations with hardware initialization.
 """
 
-from dataclasses import dataclass
-from typing import Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple, Union
 import struct
 import time
 import logging
 import os
 
 from lora.node_types import PacketType, PacketFlags, MultiPartFlags, NodeType
+from lora.seen_cache import SeenPacketCache
+from lora.tx_scheduler import TxScheduler
+from lora.radio_backend import RadioBackend, RFM9xBackend
+from lora.multipart import nack_payload
+
+try:
+    import binascii
+except ImportError:  # Stripped-down interpreters may not ship binascii
+    binascii = None
+
+# Anything exposing the buffer protocol: bytes from the codec, bytearray from
+# rfm9x.receive(), memoryview slices over either. Deliberately not annotated as
+# `bytes` — Cython enforces builtin annotations and would reject the others.
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Precompiled wire formats (format strings are parsed once, at import)
+HEADER_STRUCT = struct.Struct('>HBBBBHHHHBBBBI')  # 14 fields, 22 bytes, big-endian
+CRC_STRUCT = struct.Struct('>H')
+NODE_STRUCT = struct.Struct('>H')
+
+# Header byte offsets patched in place when a repeater re-sends a frame
+FLAGS_OFFSET = 4
+SENDER_OFFSET = 10
+TTL_OFFSET = 14
+PAYLOAD_LEN_OFFSET = 15
+
+# Next-hop hint (PacketFlags.NEXT_HOP): a node ID between payload and CRC.
+# payload_len does not count it, so nodes without routing decode the payload
+# unchanged and simply ignore the two extra bytes.
+NEXT_HOP_SIZE = 2
+
+
+# ---------------------------------------------------------------------------
+# CRC16-CCITT engines (poly 0x1021, init 0xFFFF, no reflection, no xorout)
+#
+# All engines produce identical results. The bitwise version is kept as the
+# reference implementation; the table and binascii versions are the fast paths
+# used on the wire. Select with LORA_CRC_ENGINE or set_crc_engine().
+# ---------------------------------------------------------------------------
+
+CRC16_POLY = 0x1021
+CRC16_INIT = 0xFFFF
+
+
+def crc16_bitwise(data: BytesLike) -> int:
+    """Reference CRC16-CCITT, one bit at a time"""
+    crc = CRC16_INIT
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = (crc << 1) ^ CRC16_POLY
+            else:
+                crc = crc << 1
+            crc &= 0xFFFF
+    return crc
+
+
+def _build_crc16_table() -> tuple:
+    """Precompute the 256-entry CRC16-CCITT lookup table"""
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ CRC16_POLY) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC16_TABLE = _build_crc16_table()
+
+
+def crc16_table(data: BytesLike) -> int:
+    """CRC16-CCITT using the precomputed table (one lookup per byte)"""
+    crc = CRC16_INIT
+    table = _CRC16_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFF00) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+
+def crc16_binascii(data: BytesLike) -> int:
+    """CRC16-CCITT using the C implementation in binascii.crc_hqx"""
+    return binascii.crc_hqx(data, CRC16_INIT)
+
+
+CRC16_ENGINES = {
+    'bitwise': crc16_bitwise,
+    'table': crc16_table,
+}
+if binascii is not None and hasattr(binascii, 'crc_hqx'):
+    CRC16_ENGINES['binascii'] = crc16_binascii
+
+DEFAULT_CRC_ENGINE = 'binascii' if 'binascii' in CRC16_ENGINES else 'table'
+
+_crc16 = CRC16_ENGINES[DEFAULT_CRC_ENGINE]
+_crc16_engine_name = DEFAULT_CRC_ENGINE
+
+
+def set_crc_engine(name: str) -> None:
+    """
+    Select the CRC16 engine used by LoRaPacket serialize/deserialize
+
+    Args:
+        name: 'binascii', 'table' or 'bitwise'
+
+    Raises:
+        ValueError: if the engine is unknown or not available on this interpreter
+    """
+    global _crc16, _crc16_engine_name
+    if name not in CRC16_ENGINES:
+        raise ValueError(f"Unknown CRC engine '{name}', available: {', '.join(CRC16_ENGINES)}")
+    _crc16 = CRC16_ENGINES[name]
+    _crc16_engine_name = name
+    logging.debug(f"CRC16 engine set to {name}")
+
+
+def get_crc_engine() -> str:
+    """Name of the CRC16 engine currently in use"""
+    return _crc16_engine_name
+
+
+if os.getenv('LORA_CRC_ENGINE'):
+    try:
+        set_crc_engine(os.getenv('LORA_CRC_ENGINE').lower())
+    except ValueError as e:
+        logging.warning(f"{e} — using {DEFAULT_CRC_ENGINE}")
+
+
+# Multi-record DATA payloads: several "name|classCode" records share one frame,
+# joined by ASCII RS (never present in names or class codes). A payload with a
+# single record is byte-identical to the old one-record-per-frame format.
+RECORD_SEPARATOR = '\x1e'
+
+
+def pack_records(records: Iterable[str], max_payload: int = 229) -> List[List[str]]:
+    """
+    Group records, in order, so each group joined by RECORD_SEPARATOR fits one payload
+
+    Args:
+        records: Encoded records, e.g. "Ana|4W"
+        max_payload: Payload bytes available per frame (LoRaPacket.MAX_PAYLOAD)
+
+    Returns:
+        List of groups; one group per frame. A record larger than max_payload
+        gets a group of its own (and is truncated by LoRaPacket.create()).
+    """
+    groups: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+
+    for record in records:
+        size = len(record.encode('utf-8'))
+        needed = size + 1 if current else size  # +1 for the separator
+        if current and used + needed > max_payload:
+            groups.append(current)
+            current, used, needed = [], 0, size
+        current.append(record)
+        used += needed
+
+    if current:
+        groups.append(current)
+    return groups
 
 
-@dataclass
+@dataclass(slots=True)
 class LoRaPacket:
-    """Enhanced LoRa packet with collision avoidance, repeater, and multi-packet support"""
+    """
+    Enhanced LoRa packet with collision avoidance, repeater, and multi-packet support
+
+    Slotted (no per-instance __dict__) to keep per-frame allocations small on
+    the Pi Zero. The payload is decoded lazily: `text` and `fields` are computed
+    on first access and cached on the packet.
+    """
 
     # Header fields
     packet_type: PacketType
@@ -33,10 +205,19 @@ class LoRaPacket:
     timestamp: int
     payload: bytes
 
+    # Routing hint (NEXT_HOP flag): only this node forwards the frame; None = flood
+    next_hop: Optional[int] = None
+
     # Radio metrics (populated on receive, not transmitted)
     rssi: Optional[int] = None    # Signal strength in dBm
     snr: Optional[float] = None   # Signal-to-noise ratio in dB
 
+    # Lazily populated caches (not part of the packet's identity)
+    _text: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _fields: Optional[Tuple[str, ...]] = field(default=None, init=False, repr=False, compare=False)
+    _records: Optional[Tuple[Tuple[str, ...], ...]] = field(default=None, init=False, repr=False, compare=False)
+    _frame: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)  # Frame as received
+
     # Constants
     MAGIC = 0x4951  # "IQ" in hex
     VERSION = 1
@@ -49,6 +230,38 @@ class LoRaPacket:
         """Check if packet has IS_REPEAT flag set"""
         return bool(self.flags & PacketFlags.IS_REPEAT)
 
+    @property
+    def text(self) -> str:
+        """Payload decoded as UTF-8 (cached; raises UnicodeDecodeError on bad payload)"""
+        text = self._text
+        if text is None:
+            text = self.payload.decode('utf-8')
+            self._text = text
+        return text
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """Payload split on '|' — e.g. ('HELLO', '12', 'SCANNER') (cached)"""
+        fields = self._fields
+        if fields is None:
+            fields = tuple(self.text.split('|'))
+            self._fields = fields
+        return fields
+
+    @property
+    def records(self) -> Tuple[Tuple[str, ...], ...]:
+        """
+        Multi-record payload split into records, each split on '|' (cached)
+
+        e.g. "Ana|4W\x1eLeo|2E" -> (('Ana', '4W'), ('Leo', '2E')). A payload
+        without RECORD_SEPARATOR is a single record equal to `fields`.
+        """
+        records = self._records
+        if records is None:
+            records = tuple(tuple(r.split('|')) for r in self.text.split(RECORD_SEPARATOR))
+            self._records = records
+        return records
+
     @classmethod
     def create(cls,
                packet_type: PacketType,
@@ -77,44 +290,92 @@ class LoRaPacket:
             payload=payload[:cls.MAX_PAYLOAD]  # Truncate if needed
         )
 
-    def serialize(self) -> bytes:
-        """Convert packet to bytes for transmission"""
-        # Pack header (20 bytes total)
-        header = struct.pack(
-            '>HBBBBHHHHBBBBI',  # Big-endian format (14 fields, 20 bytes)
+    @property
+    def frame_size(self) -> int:
+        """Size of the serialized frame in bytes (header + payload [+ next hop] + CRC)"""
+        size = self.HEADER_SIZE + len(self.payload) + self.CRC_SIZE
+        if self.next_hop is not None:
+            size += NEXT_HOP_SIZE
+        return size
+
+    def serialize_into(self, buffer: bytearray, offset: int = 0) -> int:
+        """
+        Pack this packet into a preallocated buffer
+
+        Writes header, payload and CRC in place — no intermediate bytes objects.
+        The CRC is computed over a memoryview of the buffer.
+
+        Args:
+            buffer: Writable buffer with at least frame_size bytes after offset
+            offset: Position in buffer where the frame starts
+
+        Returns:
+            Number of bytes written
+        """
+        payload_len = len(self.payload)
+        payload_end = offset + self.HEADER_SIZE + payload_len
+        crc_offset = payload_end
+        flags = self.flags & ~PacketFlags.NEXT_HOP
+        if self.next_hop is not None:
+            flags |= PacketFlags.NEXT_HOP
+            crc_offset += NEXT_HOP_SIZE
+
+        HEADER_STRUCT.pack_into(
+            buffer, offset,
             self.MAGIC,              # 2 bytes - H
             self.VERSION,            # 1 byte  - B
             self.packet_type,        # 1 byte  - B
-            self.flags,              # 1 byte  - B
+            flags,                   # 1 byte  - B
             self.multi_flags,        # 1 byte  - B
             self.source_node,        # 2 bytes - H
             self.dest_node,          # 2 bytes - H
             self.sender_node,        # 2 bytes - H
             self.sequence_num,       # 2 bytes - H
             self.ttl,                # 1 byte  - B
-            len(self.payload),       # 1 byte  - B
+            payload_len,             # 1 byte  - B
             self.multi_part_index,   # 1 byte  - B (0-255)
             self.multi_part_total,   # 1 byte  - B (0-255)
             self.timestamp           # 4 bytes - I
         )
+        buffer[offset + self.HEADER_SIZE:payload_end] = self.payload
+        if self.next_hop is not None:
+            NODE_STRUCT.pack_into(buffer, payload_end, self.next_hop)
 
-        # Calculate CRC
-        data = header + self.payload
-        crc = self._calculate_crc16(data)
+        CRC_STRUCT.pack_into(buffer, crc_offset, _crc16(memoryview(buffer)[offset:crc_offset]))
 
-        return data + struct.pack('>H', crc)
+        return crc_offset + self.CRC_SIZE - offset
+
+    def serialize(self) -> bytes:
+        """Convert packet to bytes for transmission"""
+        buffer = bytearray(self.frame_size)
+        self.serialize_into(buffer)
+        return bytes(buffer)
 
     @classmethod
-    def deserialize(cls, data: bytes) -> Optional['LoRaPacket']:
-        """Parse bytes into LoRaPacket object"""
-        if len(data) < cls.HEADER_SIZE + cls.CRC_SIZE:
-            logging.warning(f"Packet too short: {len(data)} bytes")
+    def deserialize(cls, data: BytesLike, keep_frame: bool = False) -> Optional['LoRaPacket']:
+        """
+        Parse a frame into a LoRaPacket object
+
+        Accepts bytes, bytearray or a memoryview (e.g. over the radio buffer,
+        past the RFM9x header). Header and CRC are read in place with
+        unpack_from; only the payload is copied out.
+
+        Args:
+            data: Raw frame
+            keep_frame: Also keep a copy of the encoded frame so repeat_frame()
+                        can patch it instead of re-serializing (repeaters)
+        """
+        view = data if isinstance(data, memoryview) else memoryview(data)
+        frame_len = len(view)
+
+        if frame_len < cls.HEADER_SIZE + cls.CRC_SIZE:
+            logging.warning(f"Packet too short: {frame_len} bytes")
             return None
 
-        # Extract and validate CRC
-        packet_data = data[:-cls.CRC_SIZE]
-        received_crc = struct.unpack('>H', data[-cls.CRC_SIZE:])[0]
-        calculated_crc = cls._calculate_crc16(packet_data)
+        # Validate CRC
+        crc_offset = frame_len - cls.CRC_SIZE
+        received_crc = CRC_STRUCT.unpack_from(view, crc_offset)[0]
+        calculated_crc = _crc16(view[:crc_offset])
 
         if received_crc != calculated_crc:
             logging.error(f"CRC mismatch: received=0x{received_crc:04X}, calculated=0x{calculated_crc:04X}")
@@ -122,10 +383,9 @@ class LoRaPacket:
 
         # Unpack header
         try:
-            header_data = struct.unpack('>HBBBBHHHHBBBBI', data[:cls.HEADER_SIZE])
             (magic, version, pkt_type, flags, multi_flags,
              src, dst, sender, seq, ttl, payload_len,
-             multi_idx, multi_total, timestamp) = header_data
+             multi_idx, multi_total, timestamp) = HEADER_STRUCT.unpack_from(view, 0)
         except struct.error as e:
             logging.error(f"Failed to unpack header: {e}")
             return None
@@ -139,10 +399,14 @@ class LoRaPacket:
         if version != cls.VERSION:
             logging.warning(f"Version mismatch: {version}, expected {cls.VERSION}")
 
-        # Extract payload
-        payload = data[cls.HEADER_SIZE:cls.HEADER_SIZE + payload_len]
+        # Extract payload (the only copy made from the radio buffer)
+        payload_end = min(cls.HEADER_SIZE + payload_len, crc_offset)
+        payload = view[cls.HEADER_SIZE:payload_end].tobytes()
+        next_hop = None
+        if flags & PacketFlags.NEXT_HOP and payload_end + NEXT_HOP_SIZE <= crc_offset:
+            next_hop = NODE_STRUCT.unpack_from(view, payload_end)[0]
 
-        return cls(
+        packet = cls(
             packet_type=PacketType(pkt_type),
             flags=flags,
             multi_flags=multi_flags,
@@ -154,20 +418,52 @@ class LoRaPacket:
             multi_part_index=multi_idx,
             multi_part_total=multi_total,
             timestamp=timestamp,
-            payload=payload
+            payload=payload,
+            next_hop=next_hop
         )
+        if keep_frame:
+            packet._frame = view.tobytes()
+        return packet
+
+    @classmethod
+    def deserialize_many(cls, frames: Iterable[BytesLike],
+                         skip: int = 0) -> List[Optional['LoRaPacket']]:
+        """
+        Decode a batch of raw frames in one call (log replay, capture tooling)
+
+        Args:
+            frames: Raw frames (bytes, bytearray or memoryview)
+            skip: Leading bytes to skip in each frame (4 for raw RFM9x buffers
+                  captured with_header=True)
+
+        Returns:
+            One entry per input frame, in order — None where decoding failed
+        """
+        deserialize = cls.deserialize
+        if skip:
+            return [deserialize(memoryview(frame)[skip:]) for frame in frames]
+        return [deserialize(frame) for frame in frames]
 
     def should_process(self, my_node_id: int, node_type: NodeType,
-                      seen_packets: set) -> Tuple[bool, str]:
+                      seen_packets, contention: bool = False) -> Tuple[bool, str]:
         """
         Determine if this packet should be processed
 
+        seen_packets is a SeenPacketCache (any container of (source, seq)
+        tuples works; left unannotated so Cython does not enforce a type).
+
+        contention: repeater contention flooding — a duplicate that another
+        repeater already rebroadcast is reported as "overheard_repeat", so a
+        pending forward of the same (source, seq) can be cancelled.
+
         Returns: (should_process, reason)
         """
         packet_id = (self.source_node, self.sequence_num)
 
         # Check for duplicate (already seen)
         if packet_id in seen_packets:
+            if contention and self.is_repeat and self.sender_node != my_node_id:
+                return False, "overheard_repeat"
             return False, "duplicate"
 
         # Check if packet originated from self (loop detection)
@@ -206,22 +502,35 @@ class LoRaPacket:
             multi_part_index=self.multi_part_index,
             multi_part_total=self.multi_part_total,
             timestamp=self.timestamp,  # Keep original timestamp
-            payload=self.payload
+            payload=self.payload,
+            next_hop=self.next_hop
         )
 
+    def repeat_frame(self, repeater_node_id: int) -> bytes:
+        """
+        Encoded frame for repeating: updated sender, TTL - 1, IS_REPEAT set
+
+        If the packet kept its received frame (deserialize(keep_frame=True)),
+        only the flags/sender/TTL bytes and the CRC are patched in a copy of
+        it — no new LoRaPacket is built. Otherwise falls back to
+        create_repeat().serialize(). Both produce identical bytes.
+        """
+        frame = self._frame
+        if frame is None:
+            return self.create_repeat(repeater_node_id).serialize()
+
+        buffer = bytearray(frame)
+        buffer[FLAGS_OFFSET] = self.flags | PacketFlags.IS_REPEAT
+        NODE_STRUCT.pack_into(buffer, SENDER_OFFSET, repeater_node_id)
+        buffer[TTL_OFFSET] = self.ttl - 1
+        crc_offset = len(buffer) - self.CRC_SIZE
+        CRC_STRUCT.pack_into(buffer, crc_offset, _crc16(memoryview(buffer)[:crc_offset]))
+        return bytes(buffer)
+
     @staticmethod
-    def _calculate_crc16(data: bytes) -> int:
-        """Calculate CRC16-CCITT checksum"""
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte << 8
-            for _ in range(8):
-                if crc & 0x8000:
-                    crc = (crc << 1) ^ 0x1021
-                else:
-                    crc = crc << 1
-                crc &= 0xFFFF
-        return crc
+    def _calculate_crc16(data: BytesLike) -> int:
+        """Calculate CRC16-CCITT checksum using the selected engine"""
+        return _crc16(data)
 
     def get_age_ms(self) -> int:
         """Get packet age in milliseconds"""
@@ -237,6 +546,8 @@ class LoRaPacket:
         if self.is_multi_part():
             multi_str = f" [{self.multi_part_index}/{self.multi_part_total}]"
 
+        route_str = f", via={self.next_hop}" if self.next_hop is not None else ""
+
         signal_str = ""
         if self.rssi is not None:
             signal_str = f", RSSI={self.rssi}dBm"
@@ -245,10 +556,35 @@ class LoRaPacket:
 
         return (f"LoRaPacket(type={self.packet_type.name}, "
                 f"src={self.source_node}, dst={self.dest_node}, "
-                f"seq={self.sequence_num}, ttl={self.ttl}{multi_str}, "
+                f"seq={self.sequence_num}, ttl={self.ttl}{multi_str}{route_str}, "
                 f"age={self.get_age_ms()}ms{signal_str})")
 
 
+def set_next_hop(frame: BytesLike, next_hop: Optional[int]) -> bytes:
+    """
+    Encoded frame with its next-hop hint replaced; None removes it (flood)
+
+    Only the flags byte, the hint and the CRC change. A hint that would push
+    the frame past the radio's frame size is left out.
+    """
+    view = memoryview(frame)
+    payload_end = LoRaPacket.HEADER_SIZE + view[PAYLOAD_LEN_OFFSET]
+    if next_hop is not None and payload_end + NEXT_HOP_SIZE + LoRaPacket.CRC_SIZE > LoRaTransceiver.MAX_FRAME_SIZE:
+        next_hop = None
+
+    buffer = bytearray(payload_end + LoRaPacket.CRC_SIZE + (NEXT_HOP_SIZE if next_hop is not None else 0))
+    buffer[:payload_end] = view[:payload_end]
+    if next_hop is None:
+        buffer[FLAGS_OFFSET] &= ~PacketFlags.NEXT_HOP
+        crc_offset = payload_end
+    else:
+        buffer[FLAGS_OFFSET] |= PacketFlags.NEXT_HOP
+        NODE_STRUCT.pack_into(buffer, payload_end, next_hop)
+        crc_offset = payload_end + NEXT_HOP_SIZE
+    CRC_STRUCT.pack_into(buffer, crc_offset, _crc16(memoryview(buffer)[:crc_offset]))
+    return bytes(buffer)
+
+
 class LoRaTransceiver:
     """
     High-level interface for sending/receiving LoRa packets
@@ -256,9 +592,11 @@ class LoRaTransceiver:
     Centralizes hardware initialization and provides clean API for packet operations.
     """
 
+    MAX_FRAME_SIZE = 253  # RFM9x FIFO (256) minus what the driver reserves
+
     def __init__(self, node_id: int, node_type: NodeType,
                  frequency: float = 915.0, tx_power: int = 23,
-                 cs_pin=None, reset_pin=None):
+                 cs_pin=None, reset_pin=None, radio: Optional[RadioBackend] = None, capture=None):
         """
         Initialize LoRa transceiver with hardware setup
 
@@ -269,54 +607,89 @@ class LoRaTransceiver:
             tx_power: Transmission power in dBm (default 23)
             cs_pin: Chip select pin (default: board.CE1 / GPIO 7)
             reset_pin: Reset pin (default: board.D25 / GPIO 25)
+            radio: Radio backend to use instead of the one picked from the
+                   environment (LORA_BACKEND=sim: shared SimulatedMedium,
+                   LORA_BACKEND=replay: ReplayRadio on LORA_REPLAY_FILE,
+                   LOCAL=TRUE: none, otherwise the RFM9x on SPI)
+            capture: lora.capture.FrameCapture recording every raw frame
+                     received and sent (default: from LORA_CAPTURE_FILE)
         """
         self.node_id = node_id
         self.node_type = node_type
         self.sequence_num = 0
-        self.seen_packets: set = set()  # Track (source, seq) tuples
         self.max_seen = 1000  # Limit memory usage
-
-        # Initialize hardware only if not in LOCAL mode
-        if os.getenv("LOCAL") != 'TRUE':
-            import busio
-            import digitalio
-            import board
-            import adafruit_rfm9x
-
-            # Configure LoRa Radio (pins configurable for different HATs)
-            CS = digitalio.DigitalInOut(cs_pin if cs_pin else board.CE1)
-            RESET = digitalio.DigitalInOut(reset_pin if reset_pin else board.D25)
-            spi = busio.SPI(board.SCK, MOSI=board.MOSI, MISO=board.MISO)
-
-            self.rfm9x = adafruit_rfm9x.RFM9x(spi, CS, RESET, frequency)
+        self.seen_packets = SeenPacketCache(max_entries=self.max_seen)  # Track (source, seq) tuples
+        self.contention = False  # Repeater contention flooding: also return overheard repeats (RepeaterRadio)
+        self.routes = None  # lora.routing.RouteTable learning next hops from every frame heard (routing nodes)
+        self._tx_buffer = bytearray(self.MAX_FRAME_SIZE)  # Reused for every send_packet
+        self.directory_version: Optional[str] = None  # Local student directory, advertised in HELLO/HELLO_ACK
+        self.peer_directory_version: Optional[str] = None  # Server's directory version from last HELLO_ACK
+
+        if radio is None and os.getenv('LORA_BACKEND', 'rfm9x') == 'sim':
+            from lora.sim_medium import SimulatedMedium
+            radio = SimulatedMedium.shared().attach(node_id)
+        elif radio is None and os.getenv('LORA_BACKEND', 'rfm9x') == 'replay':
+            from lora.capture import ReplayRadio
+            radio = ReplayRadio.from_env()
+        elif radio is None and os.getenv("LOCAL") != 'TRUE':
+            radio = RFM9xBackend(frequency, cs_pin, reset_pin)
+
+        # LOCAL mode without a backend: sends report success, receive returns None
+        if radio is not None:
+            self.rfm9x = radio
             self.rfm9x.tx_power = tx_power
             self.rfm9x.node = node_id
             self.rfm9x.ack_delay = 0.1
 
-            logging.info(f'LoRa initialized: Node={node_id}, Type={node_type.name}, Freq={frequency}MHz')
+            logging.info(f'LoRa initialized: Node={node_id}, Type={node_type.name}, Freq={frequency}MHz, '
+                         f'Radio={type(radio).__name__}')
         else:
             self.rfm9x = None
             logging.info('LoRa bypassed (LOCAL mode)')
 
+        # Airtime pacing + channel utilization, from the radio's actual modulation
+        self.tx_scheduler = TxScheduler.for_radio(self.rfm9x)
+
+        if capture is None and os.getenv('LORA_CAPTURE_FILE'):
+            from lora.capture import FrameCapture
+            capture = FrameCapture.from_env()
+        self.capture = capture
+
     def send_packet(self, packet: LoRaPacket, use_ack: bool = True) -> bool:
         """Send a LoRa packet"""
         if self.rfm9x is None:
             logging.debug("LOCAL mode: simulating send")
             return True
 
-        data = packet.serialize()
-
-        if len(data) > 253:
-            logging.error(f"Packet too large: {len(data)} bytes")
+        frame_size = packet.frame_size
+        if frame_size > self.MAX_FRAME_SIZE:
+            logging.error(f"Packet too large: {frame_size} bytes")
             return False
 
         logging.debug(f"Sending {packet}")
 
-        data = bytes(data)
+        # Pack straight into the reusable TX buffer; the driver copies it to the FIFO
+        packet.serialize_into(self._tx_buffer)
+        return self.send_frame(memoryview(self._tx_buffer)[:frame_size], use_ack=use_ack)
+
+    def send_frame(self, data: BytesLike, use_ack: bool = True) -> bool:
+        """Send an already-encoded frame (e.g. from LoRaPacket.repeat_frame)"""
+        if self.rfm9x is None:
+            logging.debug("LOCAL mode: simulating send")
+            return True
+
+        if len(data) > self.MAX_FRAME_SIZE:
+            logging.error(f"Packet too large: {len(data)} bytes")
+            return False
+
+        if self.capture is not None:
+            self.capture.record_tx(data)
         if use_ack:
-            return self.rfm9x.send_with_ack(data)
+            success = self.rfm9x.send_with_ack(data)
         else:
-            return self.rfm9x.send(data)
+            success = self.rfm9x.send(data)
+        self.tx_scheduler.record_tx(len(data))
+        return success
 
     def receive_packet(self, timeout: float = 0.5) -> Optional[LoRaPacket]:
         """Receive and parse a LoRa packet"""
@@ -327,12 +700,15 @@ class LoRaTransceiver:
 
         if raw_data is None:
             return None
+        self.tx_scheduler.observe(len(raw_data) - 4)
+        if self.capture is not None:
+            self.capture.record_rx(memoryview(raw_data)[4:], getattr(self.rfm9x, 'last_rssi', None),
+                                   getattr(self.rfm9x, 'last_snr', None))
 
-        # Skip RFM9x header (first 4 bytes: to, from, id, flags)
-        # Convert to bytes — rfm9x returns bytearray which Cython rejects
-        packet_data = bytes(raw_data[4:])
-
-        packet = LoRaPacket.deserialize(packet_data)
+        # Skip RFM9x header (first 4 bytes: to, from, id, flags) without copying.
+        # deserialize() takes any buffer (not annotated `bytes`, so Cython accepts it)
+        packet = LoRaPacket.deserialize(memoryview(raw_data)[4:],
+                                        keep_frame=self.node_type == NodeType.REPEATER)
 
         if packet is None:
             logging.warning("Failed to deserialize packet")
@@ -342,24 +718,26 @@ class LoRaTransceiver:
         packet.rssi = getattr(self.rfm9x, 'last_rssi', None)
         packet.snr = getattr(self.rfm9x, 'last_snr', None)
 
+        # Learn the way back to the source from every copy heard, duplicates included
+        routes = self.routes
+        if routes is not None and self.node_id not in (packet.source_node, packet.sender_node):
+            routes.observe(packet.source_node, packet.sender_node, packet.rssi, packet.snr, packet.ttl)
+
         # Validate and track
         should_process, reason = packet.should_process(
-            self.node_id, self.node_type, self.seen_packets
+            self.node_id, self.node_type, self.seen_packets, contention=self.contention
         )
 
         if not should_process:
+            if reason == "overheard_repeat":
+                return packet  # Another repeater sent it: RepeaterRadio cancels its pending copy
             logging.debug(f"Discarding packet: {reason} - {packet}")
             return None
 
         if reason != "forward":
             # Add to seen packets (but not for forwarding)
             packet_id = (packet.source_node, packet.sequence_num)
-            self.seen_packets.add(packet_id)
-
-            # Prevent unbounded growth
-            if len(self.seen_packets) > self.max_seen:
-                # Remove oldest half
-                self.seen_packets = set(list(self.seen_packets)[500:])
+            self.seen_packets.add(packet_id)  # Bounded: evicts oldest beyond max_seen
 
         logging.debug(f"Received {packet}")
         return packet
@@ -407,6 +785,10 @@ class LoRaTransceiver:
             multi_part_total=multi_part_total
         )
 
+    def create_nack_packet(self, dest_node: int, request: str, missing: Iterable[int]) -> LoRaPacket:
+        """Helper to request only the missing parts of a multi-part response"""
+        return self.create_data_packet(dest_node, nack_payload(request, missing))
+
     def create_cmd_packet(self, dest_node: int, command: str) -> LoRaPacket:
         """Helper to create a command packet"""
         payload = f"cmd|ack|{command}".encode('utf-8')
@@ -426,7 +808,7 @@ class LoRaTransceiver:
         Create HELLO handshake packet to synchronize sequence numbers
 
         Sent on startup to notify server of sequence reset.
-        Payload format: "HELLO|{current_seq}|{node_type}"
+        Payload format: "HELLO|{current_seq}|{node_type}[|{directory_version}]"
 
         Args:
             dest_node: Destination node ID (typically server = 1)
@@ -435,7 +817,10 @@ class LoRaTransceiver:
             HELLO packet
         """
         node_type_name = self.node_type.name  # "SCANNER", "SERVER", or "REPEATER"
-        payload = f"HELLO|{self.sequence_num}|{node_type_name}".encode('utf-8')
+        payload = f"HELLO|{self.sequence_num}|{node_type_name}"
+        if self.directory_version:
+            payload += f"|{self.directory_version}"
+        payload = payload.encode('utf-8')
 
         return LoRaPacket.create(
             packet_type=PacketType.HELLO,
@@ -452,7 +837,7 @@ class LoRaTransceiver:
         Create HELLO_ACK response packet
 
         Sent by server in response to HELLO.
-        Payload format: "HELLO_ACK|{server_seq}|OK"
+        Payload format: "HELLO_ACK|{server_seq}|OK[|{directory_version}]"
 
         Args:
             dest_node: Node that sent HELLO
@@ -460,7 +845,10 @@ class LoRaTransceiver:
         Returns:
             HELLO_ACK packet
         """
-        payload = f"HELLO_ACK|{self.sequence_num}|OK".encode('utf-8')
+        payload = f"HELLO_ACK|{self.sequence_num}|OK"
+        if self.directory_version:
+            payload += f"|{self.directory_version}"
+        payload = payload.encode('utf-8')
 
         return LoRaPacket.create(
             packet_type=PacketType.HELLO_ACK,
@@ -506,11 +894,12 @@ class LoRaTransceiver:
                 if ack_packet and ack_packet.packet_type == PacketType.HELLO_ACK:
                     if ack_packet.source_node == dest_node:
                         try:
-                            payload = ack_packet.payload.decode('utf-8')
-                            parts = payload.split('|')
+                            parts = ack_packet.fields
                             if parts[0] == "HELLO_ACK" and parts[2] == "OK":
                                 server_seq = int(parts[1])
-                                logging.info(f"HELLO_ACK received from node {dest_node}, server_seq={server_seq}")
+                                self.peer_directory_version = parts[3] if len(parts) > 3 else None
+                                logging.info(f"HELLO_ACK received from node {dest_node}, server_seq={server_seq}, "
+                                             f"directory={self.peer_directory_version}")
                                 return True
                         except Exception as e:
                             logging.error(f"Error parsing HELLO_ACK: {e}")
@@ -0,0 +1,93 @@
+"""
+Radio Backends
+
+LoRaTransceiver talks to its radio through the subset of the
+adafruit_rfm9x.RFM9x API the project uses, so anything exposing it can be
+plugged in with `LoRaTransceiver(..., radio=backend)`:
+
+    send(data, *, keep_listening=False, destination=None, node=None,
+         identifier=None, flags=None) -> bool
+    send_with_ack(data) -> bool
+    receive(*, keep_listening=True, with_header=False, with_ack=False,
+            timeout=None) -> Optional[bytearray]
+
+plus the attributes node, destination, tx_power, ack_delay, last_rssi,
+last_snr and the modulation settings read by TxScheduler.for_radio
+(spreading_factor, signal_bandwidth, coding_rate, preamble_length, enable_crc).
+
+Backends:
+- RFM9xBackend: the SPI radio on the Pi (default outside LOCAL mode)
+- SimulatedRadio (lora.sim_medium): virtual node on a shared SimulatedMedium,
+  selected with LORA_BACKEND=sim so CaptureLora / repeater / scanners run
+  unmodified against simulated nodes
+- ReplayRadio (lora.capture): plays back a frame capture and records the
+  node's responses, selected with LORA_BACKEND=replay
+"""
+
+from typing import Optional
+
+RH_BROADCAST_ADDRESS = 0xFF
+RH_FLAGS_ACK = 0x80
+RH_FLAGS_RETRY = 0x40
+
+
+class RadioBackend:
+    """Interface LoRaTransceiver expects from a radio (adafruit_rfm9x.RFM9x subset)"""
+
+    def send(self, data, *, keep_listening: bool = False, destination: Optional[int] = None,
+             node: Optional[int] = None, identifier: Optional[int] = None,
+             flags: Optional[int] = None) -> bool:
+        """Transmit one frame (RadioHead header prepended); blocks for the airtime"""
+        raise NotImplementedError
+
+    def send_with_ack(self, data) -> bool:
+        """Transmit and wait for a RadioHead ACK (immediately True for broadcast)"""
+        raise NotImplementedError
+
+    def receive(self, *, keep_listening: bool = True, with_header: bool = False,
+                with_ack: bool = False, timeout: Optional[float] = None):
+        """Next frame addressed to this node or broadcast, or None on timeout"""
+        raise NotImplementedError
+
+
+class RFM9xBackend(RadioBackend):
+    """
+    adafruit_rfm9x radio on SPI
+
+    Method calls and every other attribute (tx_power, node, last_rssi, ...)
+    are forwarded to the driver object, so existing `transceiver.rfm9x.*`
+    code behaves exactly as with a bare RFM9x.
+    """
+
+    def __init__(self, frequency: float, cs_pin=None, reset_pin=None):
+        """
+        Args:
+            frequency: LoRa frequency in MHz
+            cs_pin: Chip select pin (default: board.CE1 / GPIO 7)
+            reset_pin: Reset pin (default: board.D25 / GPIO 25)
+        """
+        import busio
+        import digitalio
+        import board
+        import adafruit_rfm9x
+
+        # Configure LoRa Radio (pins configurable for different HATs)
+        cs = digitalio.DigitalInOut(cs_pin if cs_pin else board.CE1)
+        reset = digitalio.DigitalInOut(reset_pin if reset_pin else board.D25)
+        spi = busio.SPI(board.SCK, MOSI=board.MOSI, MISO=board.MISO)
+        object.__setattr__(self, '_radio', adafruit_rfm9x.RFM9x(spi, cs, reset, frequency))
+
+    def send(self, data, **kwargs) -> bool:
+        return self._radio.send(data, **kwargs)
+
+    def send_with_ack(self, data) -> bool:
+        return self._radio.send_with_ack(data)
+
+    def receive(self, **kwargs):
+        return self._radio.receive(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__['_radio'], name)
+
+    def __setattr__(self, name, value):
+        setattr(self._radio, name, value)
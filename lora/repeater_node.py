@@ -0,0 +1,456 @@
+"""
+Repeater Radio Loop
+
+The repeater's radio thread: it only receives and forwards. Everything slow
+(OLED screens, GPIO switch, power HAT reads, stats logging) runs on the
+housekeeping side (repeater.main) and talks to this thread through:
+
+- RepeaterStats counters: written only by the radio thread, read by
+  housekeeping without locks (single writer, plain int attributes). The
+  seen-packet cache and TxScheduler that log_stats() also reads are shared
+  with the radio thread and lock internally
+- last_forward: (source, dest) of the latest forward, for the OLED
+- a small bounded command queue (e.g. send_status), executed by the radio
+  thread only when the channel is idle, like the old in-loop status send
+
+so an info screen sequence or a slow power read never stops reception.
+
+Forwarding goes through a bounded forward queue (PriorityTxQueue keyed by
+source node) instead of a blocking send per packet:
+
+    CONTROL   HELLO, HELLO_ACK, CMD, ACK
+    DATA      scanner requests and server responses
+    STATUS    STATUS, BEACON
+
+- a full class drops its oldest frame from the source with the most frames
+  queued (one flooding scanner loses its own backlog)
+- round robin across sources inside a class
+- the frame at the head waits for its TxScheduler slot (airtime jitter,
+  duty-cycle budget, retry backoff) while the thread keeps receiving, the
+  way AsyncLoRaTransceiver's radio thread paces the server
+
+Contention flooding (optional, for sites where repeaters overlap): each
+forward first waits a delay derived from the received signal, weaker link =
+shorter wait, so the repeater farthest from the sender tends to go first.
+If another repeater is overheard rebroadcasting the same (source, seq)
+before our copy goes out, the pending forward is cancelled (suppressed).
+
+Next-hop routing (optional): the repeater learns a RouteTable from every
+frame it hears (routing.py). A frame carrying a next-hop hint is forwarded
+only by the repeater it names; that repeater replaces the hint with its own
+next hop toward the destination, or drops it (flood from here) when it has
+no fresh route. With contention flooding on as well, frames hinted for this
+repeater skip the contention delay: nobody else forwards them.
+"""
+
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from lora.node_types import NodeType, PacketType
+from lora.packet_handler import LoRaPacket, LoRaTransceiver, set_next_hop
+from lora.routing import RouteTable, link_quality
+from lora.tx_queue import PriorityTxQueue, TxPriority
+
+# Forward queue class per packet type (anything else: DATA)
+FORWARD_PRIORITY = {
+    PacketType.HELLO: TxPriority.CONTROL,
+    PacketType.HELLO_ACK: TxPriority.CONTROL,
+    PacketType.CMD: TxPriority.CONTROL,
+    PacketType.ACK: TxPriority.CONTROL,
+    PacketType.DATA: TxPriority.DATA,
+    PacketType.STATUS: TxPriority.STATUS,
+    PacketType.BEACON: TxPriority.STATUS,
+}
+
+class RepeaterStats:
+    """Repeater counters; incremented by the radio thread only"""
+
+    def __init__(self):
+        self.packets_received = 0
+        self.packets_forwarded = 0
+        self.packets_forward_failed = 0
+        self.packets_dropped_ttl = 0
+        self.packets_dropped_duplicate = 0
+        self.packets_dropped_crc = 0
+        self.packets_dropped_queue = 0   # Forward queue overflow (drop-oldest)
+        self.queue_drops = {priority.name.lower(): 0 for priority in TxPriority}
+        self.queue_depth = 0             # Frames waiting to be forwarded
+        self.queue_peak = 0
+        self.forward_retries = 0
+        self.forwards_suppressed = 0     # Contention: pending forward cancelled by an overheard repeat
+        self.repeats_overheard = 0       # Contention: copies rebroadcast by other repeaters
+        self.forwards_routed = 0         # Routing: hinted frames forwarded with our next hop
+        self.forwards_flooded = 0        # Routing: hinted for us, no fresh route onward (hint dropped)
+        self.forwards_off_path = 0       # Routing: hinted for another repeater, not forwarded
+        self.status_sent = 0
+        self.commands_dropped = 0
+        self.start_time = time.time()
+
+    @property
+    def packets_dropped(self) -> int:
+        return (self.packets_dropped_ttl + self.packets_dropped_duplicate + self.packets_dropped_crc
+                + self.packets_dropped_queue)
+
+    def log_stats(self, seen_cache=None, tx_scheduler=None, routes=None):
+        """Log statistics periodically (plus duplicate-cache, airtime and route-table metrics if given)"""
+        uptime = time.time() - self.start_time
+        logging.info(f"=== Repeater Stats (Uptime: {uptime/3600:.1f}h) ===")
+        logging.info(f"Received: {self.packets_received}")
+        logging.info(f"Forwarded: {self.packets_forwarded}")
+        logging.info(f"Forward failed: {self.packets_forward_failed}")
+        logging.info(f"Dropped (TTL): {self.packets_dropped_ttl}")
+        logging.info(f"Dropped (Duplicate): {self.packets_dropped_duplicate}")
+        logging.info(f"Dropped (CRC): {self.packets_dropped_crc}")
+        logging.info(f"Dropped (Queue full): {self.packets_dropped_queue} {self.queue_drops}")
+        logging.info(f"Forward queue: depth={self.queue_depth}, peak={self.queue_peak}, "
+                     f"retries={self.forward_retries}")
+        if self.repeats_overheard:
+            logging.info(f"Contention: suppressed={self.forwards_suppressed}, "
+                         f"overheard repeats={self.repeats_overheard}")
+        if self.forwards_routed or self.forwards_flooded or self.forwards_off_path:
+            logging.info(f"Routing: routed={self.forwards_routed}, flooded={self.forwards_flooded}, "
+                         f"off path={self.forwards_off_path}")
+        logging.info(f"Forward Rate: {self.packets_forwarded/max(self.packets_received, 1)*100:.1f}%")
+        if seen_cache is not None:
+            cache = seen_cache.stats()
+            logging.info(f"Seen Cache: size={cache['size']}, hits={cache['hits']}, "
+                         f"evictions={cache['evictions']}, expirations={cache['expirations']}, "
+                         f"forgets={cache['forgets']}")
+        if tx_scheduler is not None:
+            airtime = tx_scheduler.stats()
+            logging.info(f"Airtime: utilization={airtime['utilization']:.1%}, "
+                         f"channel={airtime['channel_utilization']:.1%}, "
+                         f"budget={airtime['duty_cycle_budget']:.0%}, deferrals={airtime['budget_deferrals']}")
+        if routes is not None:
+            table = routes.stats()
+            logging.info(f"Routes: destinations={table['destinations']}, hits={table['hits']}, "
+                         f"stale={table['stale']}, misses={table['misses']}")
+
+
+class _StatusCommand:
+    __slots__ = ('payload', 'on_sent', 'done')
+
+    def __init__(self, payload: bytes, on_sent: Optional[Callable[[bool], None]]):
+        self.payload = payload
+        self.on_sent = on_sent
+        self.done = threading.Event()
+
+
+class _ForwardRequest:
+    __slots__ = ('frame', 'source', 'dest', 'sequence', 'priority', 'enqueued', 'not_before', 'due',
+                 'attempt')
+
+    def __init__(self, packet: LoRaPacket, frame: bytes, priority: TxPriority):
+        self.frame = frame
+        self.source = packet.source_node
+        self.dest = packet.dest_node
+        self.sequence = packet.sequence_num
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.not_before = self.enqueued   # Contention delay end
+        self.due = 0.0
+        self.attempt = 0
+
+
+class RepeaterRadio:
+    """
+    Receive-and-forward loop on its own thread.
+
+    Usage:
+        radio = RepeaterRadio(transceiver, stats, collision_avoidance=LORA_ENABLE_CA)
+        radio.start()
+        radio.send_status(payload, on_sent=log_result)   # from housekeeping
+        ...
+        radio.stop()
+    """
+
+    def __init__(self, transceiver: LoRaTransceiver, stats: Optional[RepeaterStats] = None,
+                 collision_avoidance: bool = True, server_node: int = 1,
+                 poll_interval: float = 0.5, max_commands: int = 8,
+                 queue_per_class: int = 16, max_retries: int = 3, aging: float = 1.0,
+                 contention: bool = False, contention_slots: float = 8.0,
+                 routing: bool = False, route_max_age: float = 300.0):
+        """
+        Args:
+            transceiver: Repeater transceiver (owned by this thread once started)
+            stats: Counters to update (a new RepeaterStats if None)
+            collision_avoidance: Pace forwards with the TxScheduler (airtime
+                jitter, duty-cycle budget) and send with ACK + retries, like
+                CollisionAvoidance.send_with_ca
+            server_node: Destination of STATUS packets
+            poll_interval: Receive timeout; idle work runs between polls
+            max_commands: Pending housekeeping commands before new ones are dropped
+            queue_per_class: Forward queue frames per priority class before the
+                oldest is dropped
+            max_retries: Send attempts per forwarded frame (collision avoidance on)
+            aging: Seconds of waiting that promote a queued class one level
+            contention: Contention flooding: signal-derived forward delay, and
+                cancel the forward when another repeater is heard sending it
+            contention_slots: Contention window in frame airtimes (the delay
+                spans 0 .. slots x airtime from weakest to strongest link)
+            routing: Learn next hops from received frames and honour next-hop
+                hints (forward only frames hinted for this repeater)
+            route_max_age: Seconds a learned route stays usable
+        """
+        self.transceiver = transceiver
+        self.node_id = transceiver.node_id
+        self.stats = stats if stats is not None else RepeaterStats()
+        self.collision_avoidance = collision_avoidance
+        self.server_node = server_node
+        self.poll_interval = poll_interval
+        self.max_retries = max_retries
+        self.contention = contention
+        self.contention_slots = contention_slots
+        transceiver.contention = contention   # Hand overheard repeats up to handle()
+        self.routes: Optional[RouteTable] = RouteTable(max_age=route_max_age) if routing else None
+        transceiver.routes = self.routes      # Learns from every frame the transceiver receives
+        self.last_forward: Optional[Tuple[int, int]] = None   # (source, dest), for the OLED
+        self.forward_queue = PriorityTxQueue(aging, max_per_class=queue_per_class)
+        self._current: Optional[_ForwardRequest] = None
+        self._pending: Dict[Tuple[int, int], _ForwardRequest] = {}   # Contention: cancellable forwards
+        self._commands: queue.Queue = queue.Queue(maxsize=max_commands)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle (housekeeping side)
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="repeater-radio", daemon=True)
+        self._thread.start()
+        logging.info("Repeater radio thread started")
+
+    def stop(self, timeout: float = 3.0) -> None:
+        """Stop the loop; pending commands (e.g. a SHUTDOWN status) are sent first"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        unsent = len(self.forward_queue.drain())
+        unsent += self._current is not None
+        self._current = None
+        self._pending.clear()
+        self.stats.queue_depth = 0
+        logging.info(f"Repeater radio thread stopped ({unsent} queued forwards discarded)")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def send_status(self, payload: bytes, on_sent: Optional[Callable[[bool], None]] = None) -> threading.Event:
+        """
+        Queue a STATUS packet for the server; sent by the radio thread when idle
+
+        Returns an Event set once it was sent (or dropped). on_sent(success)
+        runs on the radio thread, so it must be quick (e.g. a log line).
+        """
+        command = _StatusCommand(payload, on_sent)
+        try:
+            self._commands.put_nowait(command)
+        except queue.Full:
+            self.stats.commands_dropped += 1
+            logging.warning("Repeater command queue full - status dropped")
+            command.done.set()
+        return command.done
+
+    # ------------------------------------------------------------------
+    # Radio thread
+    # ------------------------------------------------------------------
+    def _run(self) -> None:
+        """Radio loop: forward what is due, otherwise receive in short slices"""
+        scheduler = self.transceiver.tx_scheduler
+        while not self._stop.is_set():
+            try:
+                now = time.monotonic()
+                current = self._current
+                if current is None and self.forward_queue:
+                    current = self._current = self.forward_queue.pop(now)
+                    current.due = max(now, current.not_before)
+                    if self.collision_avoidance:
+                        current.due += scheduler.delay_for(len(current.frame))
+                    self.stats.queue_depth = len(self.forward_queue)
+
+                if current is not None and now >= current.due:
+                    self._current = self._transmit(current)
+                    continue
+
+                timeout = self.poll_interval
+                if current is not None:
+                    timeout = min(timeout, current.due - now)
+                if self.transceiver.rfm9x is None:
+                    # LOCAL mode: nothing to receive
+                    self._stop.wait(timeout)
+                    packet = None
+                else:
+                    packet = self.transceiver.receive_packet(timeout=timeout)
+                if packet is not None:
+                    self.handle(packet)
+                elif current is None:
+                    # Channel idle and nothing to forward: safe for housekeeping transmissions
+                    self._run_commands()
+            except Exception as e:
+                logging.error(f"Repeater radio loop error: {e}", exc_info=True)
+                time.sleep(self.poll_interval)
+        self._run_commands()
+
+    def _run_commands(self) -> None:
+        while True:
+            try:
+                command = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            success = False
+            try:
+                status_packet = LoRaPacket.create(
+                    packet_type=PacketType.STATUS,
+                    source_node=self.node_id,
+                    dest_node=self.server_node,
+                    payload=command.payload,
+                    sequence_num=self.transceiver.get_next_sequence()
+                )
+                success = self.transceiver.send_packet(status_packet, use_ack=False)
+                if success:
+                    self.stats.status_sent += 1
+                if command.on_sent is not None:
+                    command.on_sent(success)
+            except Exception as e:
+                logging.error(f"Error sending status: {e}")
+            finally:
+                command.done.set()
+
+    def handle(self, packet: LoRaPacket) -> bool:
+        """Validate one received packet and queue it for forwarding; True if queued"""
+        stats = self.stats
+        stats.packets_received += 1
+        seen = self.transceiver.seen_packets
+
+        # Check if packet should be processed
+        should_process, reason = packet.should_process(self.node_id, NodeType.REPEATER, seen,
+                                                       contention=self.contention)
+        if not should_process:
+            if reason == "overheard_repeat":
+                stats.packets_dropped_duplicate += 1
+                stats.repeats_overheard += 1
+                self._suppress((packet.source_node, packet.sequence_num), packet.sender_node)
+            elif reason == "duplicate":
+                stats.packets_dropped_duplicate += 1
+                logging.debug(f"Dropped duplicate packet: {packet}")
+            elif reason == "ttl_expired":
+                stats.packets_dropped_ttl += 1
+                logging.debug(f"Dropped TTL expired packet: {packet}")
+            elif reason == "own_packet_looped":
+                logging.warning(f"Detected own packet loop: {packet}")
+            else:
+                logging.debug(f"Dropped packet ({reason}): {packet}")
+            return False
+
+        # Next-hop hint for another repeater: it forwards, we stay quiet. Not marked
+        # seen, so a flooded copy (no fresh route past that hop) is still forwarded
+        hint = packet.next_hop
+        if hint is not None and self.routes is not None and hint != self.node_id:
+            stats.forwards_off_path += 1
+            logging.debug(f"Not on path (next hop {hint}): {packet}")
+            return False
+
+        # Mark as seen to prevent re-forwarding
+        seen.add((packet.source_node, packet.sequence_num))  # Bounded: evicts oldest beyond max_seen
+
+        # Special handling for HELLO packets: clear cache for source node
+        if packet.packet_type == PacketType.HELLO:
+            seen.forget_source(packet.source_node)
+            logging.info(f"HELLO from node {packet.source_node}: cleared sequence cache before forwarding")
+
+        # Patch sender/TTL/flags + CRC into the received frame (no re-serialize)
+        repeated_frame = packet.repeat_frame(self.node_id)
+        if hint is not None:
+            repeated_frame = self._next_hop_frame(packet, repeated_frame)
+        priority = FORWARD_PRIORITY.get(packet.packet_type, TxPriority.DATA)
+        request = _ForwardRequest(packet, repeated_frame, priority)
+        if self.contention and hint is None:   # A hinted frame has one forwarder: nothing to contend with
+            request.not_before += self.contention_delay(packet.rssi, packet.snr, len(repeated_frame))
+            self._pending[(request.source, request.sequence)] = request
+        dropped = self.forward_queue.push(request, priority, dest=packet.source_node)
+        if dropped is not None:
+            self._pending.pop((dropped.source, dropped.sequence), None)
+            stats.packets_dropped_queue += 1
+            stats.queue_drops[priority.name.lower()] += 1
+            logging.warning(f"Forward queue full ({priority.name}): dropped oldest frame from node {dropped.source}")
+        depth = len(self.forward_queue)
+        stats.queue_depth = depth
+        stats.queue_peak = max(stats.queue_peak, depth)
+        logging.info(f"Queued packet for forwarding ({priority.name}, depth {depth}): {packet}")
+        return True
+
+    def _next_hop_frame(self, packet: LoRaPacket, frame: bytes) -> bytes:
+        """
+        Hinted frame: hint our own next hop toward dest, or drop the hint (flood
+        from here) without a fresh route — always when routing is off, so
+        routing repeaters further on do not wait for a hint meant for us
+        """
+        next_hop = None
+        if self.routes is not None:
+            next_hop = self.routes.next_hop(packet.dest_node, exclude=(packet.sender_node, self.node_id))
+            if next_hop is None:
+                self.stats.forwards_flooded += 1
+            else:
+                self.stats.forwards_routed += 1
+        return set_next_hop(frame, next_hop)
+
+    def contention_delay(self, rssi: Optional[float], snr: Optional[float], frame_size: int) -> float:
+        """Seconds to hold a forward: weaker link = shorter, plus half an airtime of jitter"""
+        airtime = self.transceiver.tx_scheduler.airtime_ms(frame_size) / 1000.0
+        return (link_quality(rssi, snr) * self.contention_slots + random.uniform(0.0, 0.5)) * airtime
+
+    def _suppress(self, packet_id: Tuple[int, int], sender: int) -> None:
+        """Cancel our pending forward of packet_id: another repeater already sent it"""
+        request = self._pending.pop(packet_id, None)
+        if request is None:
+            return
+        if self._current is request:
+            self._current = None
+        else:
+            # Out of the queue right away: a cancelled copy must not count toward
+            # the class limit (and push out live frames) or the queue depth
+            self.forward_queue.discard(request, request.priority, request.source)
+            self.stats.queue_depth = len(self.forward_queue)
+        self.stats.forwards_suppressed += 1
+        logging.debug(f"Forward of {packet_id} suppressed: repeated by node {sender}")
+
+    def _transmit(self, request: _ForwardRequest) -> Optional[_ForwardRequest]:
+        """Send one attempt; returns the request again if it should be retried"""
+        transceiver = self.transceiver
+        use_ack = self.collision_avoidance and transceiver.rfm9x is not None
+        self._pending.pop((request.source, request.sequence), None)   # On air: no longer suppressible
+        try:
+            success = transceiver.send_frame(request.frame, use_ack=use_ack)
+        except Exception as e:
+            logging.error(f"Error forwarding packet: {e}")
+            success = False
+
+        stats = self.stats
+        if success:
+            stats.packets_forwarded += 1
+            self.last_forward = (request.source, request.dest)
+            logging.debug("Successfully forwarded packet")
+            return None
+
+        request.attempt += 1
+        if use_ack and request.attempt < self.max_retries:
+            # Back off by the frame's airtime (doubling per attempt); RX continues meanwhile
+            stats.forward_retries += 1
+            request.due = time.monotonic() + transceiver.tx_scheduler.delay_for(len(request.frame), request.attempt)
+            logging.warning(f"Forward failed (attempt {request.attempt}/{self.max_retries}), retrying")
+            return request
+
+        stats.packets_forward_failed += 1
+        logging.warning(f"Failed to forward packet from node {request.source} to {request.dest} "
+                        f"(sender={self.node_id})")
+        return None
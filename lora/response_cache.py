@@ -0,0 +1,130 @@
+"""
+Per-Scanner Response Cache
+
+Server-side record of the response frames sent for each (scanner, code), so a
+scanner retrying a scan gets the same frames again without a new lookup or
+MQTT publish, and a selective-repeat NACK can re-send single parts.
+
+Replaces a flat dict keyed by (scanner, code) that grew all day and was
+cleared per scanner by scanning every key.
+
+Design:
+- scanner -> insertion-ordered map of code -> (timestamp, frames), so
+  dropping one scanner (cleanup, HELLO after reboot) is one dict pop
+- each scanner's map is LRU-bounded (max_entries) on its own: activity on
+  one scanner never evicts another scanner's responses
+- entries older than ttl are dropped lazily when looked up or when they
+  reach the old end of their scanner's map
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import time
+
+
+class ResponseCache:
+    """Bounded, expiring per-scanner map of code -> cached response"""
+
+    def __init__(self, max_entries: int = 200, ttl: float = 3600.0):
+        """
+        Args:
+            max_entries: Responses kept per scanner; least recently used dropped first
+            ttl: Seconds a response stays valid after it was stored
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._scanners: Dict[int, OrderedDict] = {}
+        self._size = 0
+
+        # Counters
+        self.hits = 0           # Lookups that found a live response
+        self.misses = 0         # Lookups with nothing (or only an expired response) cached
+        self.inserts = 0        # Responses stored
+        self.evictions = 0      # Responses dropped to stay under max_entries
+        self.expirations = 0    # Responses dropped for exceeding ttl
+        self.invalidations = 0  # invalidate() calls that dropped entries
+
+    def get(self, scanner: int, code: Hashable) -> Optional[Any]:
+        """Cached response for a scanner's code (marked recently used), or None"""
+        entries = self._scanners.get(scanner)
+        entry = entries.get(code) if entries else None
+        if entry is None:
+            self.misses += 1
+            return None
+        stamp, value = entry
+        if time.monotonic() - stamp > self.ttl:
+            self._drop(scanner, entries, code)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        entries.move_to_end(code)
+        self.hits += 1
+        return value
+
+    def put(self, scanner: int, code: Hashable, value: Any) -> None:
+        """Store a response, evicting the scanner's least recently used beyond max_entries"""
+        now = time.monotonic()
+        entries = self._scanners.get(scanner)
+        if entries is None:
+            entries = self._scanners[scanner] = OrderedDict()
+        if entries.pop(code, None) is None:
+            self._size += 1
+        entries[code] = (now, value)
+        self.inserts += 1
+
+        # Reclaim expired entries at the old end, then enforce the bound
+        while entries:
+            oldest_code, (stamp, _) = next(iter(entries.items()))
+            if now - stamp <= self.ttl:
+                break
+            self._drop(scanner, entries, oldest_code)
+            self.expirations += 1
+        while len(entries) > self.max_entries:
+            self._drop(scanner, entries, next(iter(entries)))
+            self.evictions += 1
+
+    def invalidate(self, scanner: int) -> int:
+        """
+        Drop every response cached for one scanner in O(1)
+
+        Returns:
+            Number of responses dropped
+        """
+        entries = self._scanners.pop(scanner, None)
+        if not entries:
+            return 0
+        self._size -= len(entries)
+        self.invalidations += 1
+        return len(entries)
+
+    def clear(self) -> None:
+        """Drop all responses (counters are kept)"""
+        self._scanners.clear()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def scanner_size(self, scanner: int) -> int:
+        return len(self._scanners.get(scanner, ()))
+
+    def stats(self) -> dict:
+        """Counters for periodic status logging"""
+        lookups = self.hits + self.misses
+        return {
+            'size': self._size,
+            'scanners': len(self._scanners),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'inserts': self.inserts,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+    def _drop(self, scanner: int, entries: OrderedDict, code: Hashable) -> None:
+        del entries[code]
+        self._size -= 1
+        if not entries:
+            del self._scanners[scanner]
@@ -0,0 +1,164 @@
+"""
+Learned Next-Hop Routing Table
+
+Every frame a node hears tells it one thing about the topology: frames from
+`source_node` reach this node through `sender_node` (the source itself when
+heard directly, otherwise the repeater that forwarded it). The server and
+the repeaters record those observations here, and a reply to a scanner can
+then carry a next-hop hint (PacketFlags.NEXT_HOP) so only the repeater on
+the path forwards it instead of every repeater in range.
+
+Design:
+- destination -> {neighbor: [link quality EWMA, last heard, TTL left]},
+  insertion ordered by the last time the destination was heard, bounded by
+  max_entries
+- next_hop(dest) ranks the neighbors heard within max_age by: usable link
+  (quality >= min_quality), fewest hops (highest TTL left on arrival, so a
+  scanner heard directly beats a repeater that relayed it), then link
+  quality. When none is fresh it returns None and the caller floods
+- link quality is the 0.0 .. 1.0 scale from SNR (RSSI if the radio reports
+  no SNR) that repeater contention flooding uses as well
+
+Replies are sent right after a request from the same scanner, so in normal
+operation the route to a scanner is seconds old when it is used.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+import time
+
+# Link quality scale (weakest .. strongest)
+LINK_SNR_RANGE = (-20.0, 10.0)     # dB, SX127x demodulation floor .. clean link
+LINK_RSSI_RANGE = (-120.0, -50.0)  # dBm, used when the radio reports no SNR
+
+
+def link_quality(rssi: Optional[float], snr: Optional[float]) -> float:
+    """0.0 (weakest) .. 1.0 (strongest) from SNR, else RSSI; 0.5 if unknown"""
+    if snr is not None:
+        low, high = LINK_SNR_RANGE
+        value = snr
+    elif rssi is not None:
+        low, high = LINK_RSSI_RANGE
+        value = rssi
+    else:
+        return 0.5
+    return min(max((value - low) / (high - low), 0.0), 1.0)
+
+
+class RouteTable:
+    """Next hop per destination, learned from (source, sender, rssi, snr) with aging"""
+
+    def __init__(self, max_age: float = 300.0, max_entries: int = 256,
+                 max_neighbors: int = 4, smoothing: float = 0.3, min_quality: float = 0.25):
+        """
+        Args:
+            max_age: Seconds without hearing a destination through a neighbor
+                before that route is stale (flood instead)
+            max_entries: Destinations kept; the least recently heard is evicted
+            max_neighbors: Neighbors kept per destination; the stalest is evicted
+            smoothing: EWMA weight of a new link quality sample
+            min_quality: Links below this quality (0.25 = SNR -12.5 dB) are only
+                used when no neighbor has a better one, whatever the hop count
+        """
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.max_neighbors = max_neighbors
+        self.smoothing = smoothing
+        self.min_quality = min_quality
+
+        # dest -> {neighbor: [quality, monotonic last heard, TTL left]}, least recently heard first
+        self._routes: OrderedDict = OrderedDict()
+
+        # Counters
+        self.observations = 0
+        self.hits = 0       # next_hop() returned a fresh route
+        self.stale = 0      # Routes known, but none heard within max_age
+        self.misses = 0     # Destination never heard
+        self.evictions = 0
+
+    def observe(self, source: int, sender: int, rssi: Optional[float] = None,
+                snr: Optional[float] = None, ttl: int = 0, now: Optional[float] = None) -> None:
+        """Record that a frame from source was heard through neighbor sender, with ttl left"""
+        now = time.monotonic() if now is None else now
+        quality = link_quality(rssi, snr)
+        self.observations += 1
+
+        neighbors = self._routes.get(source)
+        if neighbors is None:
+            neighbors = self._routes[source] = {}
+            if len(self._routes) > self.max_entries:
+                self._routes.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._routes.move_to_end(source)
+
+        entry = neighbors.get(sender)
+        if entry is None:
+            if len(neighbors) >= self.max_neighbors:
+                del neighbors[min(neighbors, key=lambda n: neighbors[n][1])]
+            neighbors[sender] = [quality, now, ttl]
+        else:
+            entry[0] += self.smoothing * (quality - entry[0])
+            entry[1] = now
+            entry[2] = ttl
+
+    def next_hop(self, dest: int, exclude: Iterable[int] = (),
+                 now: Optional[float] = None) -> Optional[int]:
+        """
+        Neighbor to hand a frame for dest to, or None to flood
+
+        Args:
+            dest: Destination node
+            exclude: Neighbors not to use (e.g. the node the frame came from)
+            now: time.monotonic() override (tests)
+
+        Returns:
+            The best fresh neighbor (dest itself when it is heard directly over
+            a usable link); None if dest is unknown or every route is stale
+        """
+        neighbors = self._routes.get(dest)
+        if not neighbors:
+            self.misses += 1
+            return None
+        now = time.monotonic() if now is None else now
+        best = None
+        best_rank = None
+        for neighbor, (quality, heard, ttl) in neighbors.items():
+            if now - heard > self.max_age or neighbor in exclude:
+                continue
+            rank = (quality >= self.min_quality, ttl, quality)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = neighbor, rank
+        if best is None:
+            self.stale += 1
+            return None
+        self.hits += 1
+        return best
+
+    def forget(self, dest: int) -> bool:
+        """Drop every route to dest (e.g. it restarted); True if there were any"""
+        return self._routes.pop(dest, None) is not None
+
+    def routes(self, now: Optional[float] = None) -> List[Dict]:
+        """Snapshot for logs: one dict per (dest, neighbor), stale ones included"""
+        now = time.monotonic() if now is None else now
+        return [
+            {'dest': dest, 'via': neighbor, 'quality': round(quality, 2), 'ttl': ttl,
+             'age': round(now - heard, 1), 'stale': now - heard > self.max_age}
+            for dest, neighbors in self._routes.items()
+            for neighbor, (quality, heard, ttl) in neighbors.items()
+        ]
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def stats(self) -> dict:
+        """Table size and lookup counters"""
+        return {
+            'destinations': len(self._routes),
+            'observations': self.observations,
+            'hits': self.hits,
+            'stale': self.stale,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,134 @@
+"""
+Per-Scanner Request Dispatcher
+
+Server-side fan-out of received frames to one asyncio worker per scanner:
+
+    dispatcher = ScannerDispatcher()
+    dispatcher.submit(packet.source_node, handleInfo, text, packet.source_node, packet.packet_type)
+
+The receive loop used to await each request end to end (lookup, every
+response frame, MQTT hand-off) before reading the next frame, so a second
+scanner waited behind the first scanner's whole response. Now:
+
+- requests from one scanner run in arrival order, one at a time (a retry or
+  NACK never overtakes the request it refers to)
+- different scanners are served concurrently; their frames still go out
+  one at a time through the AsyncLoRaTransceiver TX queue
+- each scanner's queue is bounded; a scanner flooding requests only drops
+  its own newest frames
+- idle workers exit and are recreated on the next request
+- queueing delay (received -> handler started) is tracked per scanner
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from lora.metrics import WaitStat
+
+
+class _ScannerQueue:
+    """Pending requests, worker task and counters for one scanner"""
+
+    __slots__ = ('queue', 'task', 'handled', 'dropped', 'errors', 'wait')
+
+    def __init__(self, max_pending: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.task: Optional[asyncio.Task] = None
+        self.handled = 0
+        self.dropped = 0
+        self.errors = 0
+        self.wait = WaitStat()
+
+
+class ScannerDispatcher:
+    """Ordered per-scanner workers for request handlers (coroutine functions)"""
+
+    def __init__(self, max_pending: int = 16, idle_timeout: float = 300.0):
+        """
+        Args:
+            max_pending: Requests queued per scanner before new ones are dropped
+            idle_timeout: Seconds without requests before a scanner's worker exits
+        """
+        self.max_pending = max_pending
+        self.idle_timeout = idle_timeout
+        self._scanners: Dict[int, _ScannerQueue] = {}
+
+    def submit(self, scanner: int, handler: Callable[..., Awaitable], *args) -> bool:
+        """
+        Queue handler(*args) behind the scanner's earlier requests (never blocks)
+
+        Must be called from the event loop. Returns False if the scanner's
+        queue is full and the request was dropped.
+        """
+        state = self._scanners.get(scanner)
+        if state is None:
+            state = self._scanners[scanner] = _ScannerQueue(self.max_pending)
+        try:
+            state.queue.put_nowait((time.monotonic(), handler, args))
+        except asyncio.QueueFull:
+            state.dropped += 1
+            logging.warning(f"[DISPATCH] Scanner {scanner} has {self.max_pending} requests pending - dropped newest")
+            return False
+        if state.task is None or state.task.done():
+            state.task = asyncio.create_task(self._worker(scanner, state), name=f"scanner-{scanner}")
+        return True
+
+    def pending(self, scanner: int) -> int:
+        state = self._scanners.get(scanner)
+        return state.queue.qsize() if state else 0
+
+    async def join(self) -> None:
+        """Wait until every queued request has been handled"""
+        for state in list(self._scanners.values()):
+            await state.queue.join()
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Let queued requests finish for up to timeout seconds, then cancel workers"""
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning("[DISPATCH] Requests still pending at shutdown - cancelling")
+        tasks = [state.task for state in self._scanners.values() if state.task and not state.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Per-scanner queue depth, counters and queueing delay for status logging"""
+        return {
+            'workers': sum(1 for s in self._scanners.values() if s.task and not s.task.done()),
+            'scanners': {
+                scanner: {
+                    'pending': state.queue.qsize(),
+                    'handled': state.handled,
+                    'dropped': state.dropped,
+                    'errors': state.errors,
+                    'wait': state.wait.as_dict(),
+                }
+                for scanner, state in self._scanners.items()
+            },
+        }
+
+    async def _worker(self, scanner: int, state: _ScannerQueue) -> None:
+        queue = state.queue
+        while True:
+            try:
+                received_at, handler, args = await asyncio.wait_for(queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    return
+                continue
+
+            state.wait.add(time.monotonic() - received_at)
+            try:
+                await handler(*args)
+                state.handled += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                state.errors += 1
+                logging.error(f"[DISPATCH] Request from scanner {scanner} failed: {e}", exc_info=True)
+            finally:
+                queue.task_done()
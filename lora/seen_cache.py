@@ -0,0 +1,188 @@
+"""
+Seen-Packet Cache for Duplicate Suppression
+
+Bounded record of (source_node, sequence_num) pairs already handled by this
+node. Replaces the plain set that was pruned by dropping an arbitrary half.
+
+Design:
+- One insertion-ordered map → O(1) insert/lookup, true oldest-first eviction
+  and time-based expiry (entries older than max_age are ignored and reclaimed)
+- Per-source epoch counter → O(1) "forget this source" on HELLO: bumping the
+  epoch invalidates every entry of that source at once; the dead entries are
+  reclaimed lazily as they reach the old end of the map (or in one pass
+  once they outnumber max_entries) and never count toward the capacity
+- Per-source newest sequence number with RFC 1982 serial arithmetic → a
+  sequence number that is *ahead* of the newest one seen from that source
+  cannot be a duplicate, so entries left over from before a 65535 → 0 wrap
+  never suppress fresh packets
+
+Works as a drop-in for the old set in LoRaPacket.should_process():
+`(src, seq) in cache` and `cache.add((src, seq))`. Thread-safe: the radio
+thread adds while the event loop forgets sources on HELLO.
+"""
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+import threading
+import time
+import logging
+
+SEQ_MODULO = 65536          # 16-bit sequence numbers
+SEQ_HALF = SEQ_MODULO // 2  # Serial arithmetic comparison window
+
+
+def seq_ahead(seq: int, reference: int) -> bool:
+    """True if seq is newer than reference in 16-bit serial arithmetic (RFC 1982)"""
+    distance = (seq - reference) % SEQ_MODULO
+    return 0 < distance < SEQ_HALF
+
+
+class SeenPacketCache:
+    """Bounded, expiring, per-source-invalidatable set of (source, sequence) IDs"""
+
+    def __init__(self, max_entries: int = 1000, max_age: float = 300.0):
+        """
+        Args:
+            max_entries: Maximum entries kept; the oldest is evicted beyond this
+            max_age: Seconds after which an entry no longer counts as seen
+        """
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+        # (source, seq) -> (monotonic timestamp, source epoch), oldest first
+        self._entries: OrderedDict = OrderedDict()
+        self._epochs: dict = {}   # source -> current epoch
+        self._newest: dict = {}   # source -> newest seq recorded in current epoch
+        self._counts: dict = {}   # source -> live entries in current epoch
+        self._live = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0         # Lookups that found a duplicate
+        self.misses = 0       # Lookups for packets not seen yet
+        self.inserts = 0      # New IDs recorded
+        self.evictions = 0    # Live entries dropped to stay under max_entries
+        self.expirations = 0  # Live entries dropped for exceeding max_age
+        self.forgets = 0      # forget_source() calls
+
+    def __contains__(self, packet_id: Tuple[int, int]) -> bool:
+        """Duplicate check: True if (source, seq) was recorded and is still valid"""
+        with self._lock:
+            entry = self._entries.get(packet_id)
+            if entry is None:
+                self.misses += 1
+                return False
+
+            source, seq = packet_id
+            stamp, epoch = entry
+            if (epoch != self._epochs.get(source, 0)
+                    or time.monotonic() - stamp > self.max_age
+                    or seq_ahead(seq, self._newest.get(source, seq))):
+                self.misses += 1
+                return False
+
+            self.hits += 1
+            return True
+
+    def __len__(self) -> int:
+        """Number of live entries (excludes invalidated ones awaiting reclaim)"""
+        return self._live
+
+    def add(self, packet_id: Tuple[int, int]) -> None:
+        """Record (source, seq) as seen"""
+        source, seq = packet_id
+        with self._lock:
+            now = time.monotonic()
+            epoch = self._epochs.get(source, 0)
+
+            previous = self._entries.pop(packet_id, None)
+            if previous is None or previous[1] != epoch:
+                self._live += 1
+                self._counts[source] = self._counts.get(source, 0) + 1
+                self.inserts += 1
+            self._entries[packet_id] = (now, epoch)
+
+            newest = self._newest.get(source)
+            if newest is None or seq_ahead(seq, newest):
+                self._newest[source] = seq
+
+            self._reclaim(now)
+
+    def forget_source(self, source: int) -> int:
+        """
+        Invalidate every entry from one source in O(1) (e.g. node rebooted, sent HELLO)
+
+        Returns:
+            Number of live entries invalidated
+        """
+        with self._lock:
+            removed = self._counts.pop(source, 0)
+            self._live -= removed
+            self._epochs[source] = self._epochs.get(source, 0) + 1
+            self._newest.pop(source, None)
+            self.forgets += 1
+            return removed
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._epochs.clear()
+            self._newest.clear()
+            self._counts.clear()
+            self._live = 0
+
+    def stats(self) -> dict:
+        """Counters for periodic status logging"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': self._live,
+                'slots': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'inserts': self.inserts,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'forgets': self.forgets,
+            }
+
+    def _reclaim(self, now: Optional[float] = None) -> None:
+        """Pop from the old end: invalidated, expired, then over-capacity entries; lock held"""
+        entries = self._entries
+        if now is None:
+            now = time.monotonic()
+        cutoff = now - self.max_age
+
+        while entries:
+            (source, seq), (stamp, epoch) = next(iter(entries.items()))
+            live = epoch == self._epochs.get(source, 0)
+            if live and stamp >= cutoff and self._live <= self.max_entries:
+                break
+
+            entries.popitem(last=False)
+            if not live:
+                continue  # Already discounted by forget_source()
+
+            self._live -= 1
+            count = self._counts.get(source, 1) - 1
+            if count:
+                self._counts[source] = count
+            else:
+                self._counts.pop(source, None)
+                self._newest.pop(source, None)
+
+            if stamp < cutoff:
+                self.expirations += 1
+            else:
+                self.evictions += 1
+                logging.debug(f"Seen cache full, evicted oldest ({source}, {seq})")
+
+        # Dead entries stuck behind a live head: drop them all in one O(n) pass
+        if len(entries) - self._live > self.max_entries:
+            epochs = self._epochs
+            self._entries = OrderedDict(
+                (packet_id, entry) for packet_id, entry in entries.items()
+                if entry[1] == epochs.get(packet_id[0], 0)
+            )
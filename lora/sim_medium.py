@@ -0,0 +1,442 @@
+"""
+Simulated LoRa Medium
+
+An in-process RF channel shared by any number of SimulatedRadio nodes, so the
+server, repeaters and scanners can run unmodified against virtual radios and
+their real capacity limits can be measured without hardware.
+
+The channel models:
+- Airtime: each frame occupies the channel for its LoRa time-on-air
+  (lora_airtime_ms with the sending radio's SF/BW/CR) and send() blocks for it,
+  like the real driver
+- Collisions: a frame is lost at a receiver if another audible transmission
+  overlaps it, unless it is at least capture_db stronger (capture effect)
+- Half duplex: a node transmitting during a frame does not hear it, and a node
+  only hears frames that started while it was listening (in receive(), or
+  after send(keep_listening=True))
+- Links: per (tx, rx) pair loss probability, RSSI and SNR; pairs without a
+  link are out of range (default_link applies to unconfigured pairs)
+- Single-frame FIFO: a frame arriving before the previous one was read
+  replaces it (counted as an overrun)
+- ACKs: SimulatedRadio follows adafruit_rfm9x RadioHead addressing and
+  send_with_ack / receive(with_ack=True) semantics, ACKs travel the channel too
+
+Usage (one process):
+    medium = SimulatedMedium()
+    medium.set_link(102, 200, loss=0.05, rssi=-95.0)
+    scanner = LoRaTransceiver(102, NodeType.SCANNER, radio=medium.attach(102))
+
+Usage (unmodified programs): LORA_BACKEND=sim makes LoRaTransceiver attach to
+SimulatedMedium.shared(), configured from the environment:
+    LORA_SIM_TOPOLOGY  JSON file: {"default": {...} | null, "capture_db": 6,
+                       "links": [{"a": 102, "b": 200, "loss": 0.05, "rssi": -95}, ...]}
+    LORA_SIM_PORT      UDP port; media in different processes on this host
+                       exchange transmissions via loopback broadcast and share
+                       one channel (each process needs the same topology)
+    LORA_SIM_SEED      Seed for link loss (reproducible runs)
+"""
+
+import heapq
+import json
+import os
+import random
+import socket
+import struct
+import threading
+import time
+import logging
+from collections import deque
+from itertools import count
+from typing import Dict, Optional, Tuple
+
+from lora.radio_backend import RadioBackend, RH_BROADCAST_ADDRESS, RH_FLAGS_ACK, RH_FLAGS_RETRY
+from lora.tx_scheduler import lora_airtime_ms
+
+BUS_ADDRESS = '127.255.255.255'
+_BUS_HEADER = struct.Struct('>IHdd')  # medium id, sender node, start, end (epoch seconds)
+HISTORY_S = 15.0  # Keep transmissions this long for overlap checks (> max SF12 airtime)
+
+
+class SimLink:
+    """Propagation from one node to another"""
+
+    __slots__ = ('loss', 'rssi', 'snr')
+
+    def __init__(self, loss: float = 0.0, rssi: float = -60.0, snr: float = 9.5):
+        self.loss = loss
+        self.rssi = rssi
+        self.snr = snr
+
+    def __repr__(self):
+        return f"SimLink(loss={self.loss}, rssi={self.rssi}, snr={self.snr})"
+
+
+class _Transmission:
+    __slots__ = ('sender', 'frame', 'start', 'end')
+
+    def __init__(self, sender: int, frame: bytes, start: float, end: float):
+        self.sender = sender
+        self.frame = frame
+        self.start = start
+        self.end = end
+
+    def overlaps(self, other: '_Transmission') -> bool:
+        return self.start < other.end and other.start < self.end
+
+
+class SimulatedMedium:
+    """Shared RF channel for SimulatedRadio nodes"""
+
+    _shared: Optional['SimulatedMedium'] = None
+
+    def __init__(self, default_link: Optional[SimLink] = SimLink(), capture_db: float = 6.0,
+                 bus_port: Optional[int] = None, seed: Optional[int] = None):
+        """
+        Args:
+            default_link: Link for pairs without set_link (None = out of range)
+            capture_db: RSSI margin for a frame to survive an overlapping one
+            bus_port: Share the channel with other processes via loopback UDP
+            seed: Seed for link loss
+        """
+        self.default_link = default_link
+        self.capture_db = capture_db
+        self._links: Dict[Tuple[int, int], Optional[SimLink]] = {}
+        self._radios: Dict[int, 'SimulatedRadio'] = {}
+        self._rng = random.Random(seed)
+
+        self._cond = threading.Condition()
+        self._air = deque()      # Recent transmissions (overlap checks)
+        self._pending = []       # Heap of (end, n, transmission) awaiting delivery
+        self._order = count()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._id = random.getrandbits(32)
+        self._bus: Optional[socket.socket] = None
+        self.bus_port = bus_port
+        if bus_port:
+            self._bus = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._bus.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, 'SO_REUSEPORT'):
+                self._bus.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            self._bus.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            self._bus.bind(('', bus_port))
+            threading.Thread(target=self._bus_loop, name="lora-sim-bus", daemon=True).start()
+
+        # Counters
+        self.frames_sent = 0
+        self.frames_delivered = 0
+        self.collisions = 0      # Lost to an overlapping transmission
+        self.link_losses = 0     # Dropped by link loss probability
+        self.half_duplex = 0     # Receiver was transmitting
+        self.missed_idle = 0     # Receiver was not listening
+        self.overruns = 0        # Unread frame replaced in a receiver FIFO
+        self.airtime_ms = 0.0
+
+    @classmethod
+    def shared(cls) -> 'SimulatedMedium':
+        """Process-wide medium configured from LORA_SIM_* (used by LORA_BACKEND=sim)"""
+        if cls._shared is None:
+            port = os.getenv('LORA_SIM_PORT')
+            seed = os.getenv('LORA_SIM_SEED')
+            medium = cls(bus_port=int(port) if port else None,
+                         seed=int(seed) if seed else None)
+            topology = os.getenv('LORA_SIM_TOPOLOGY')
+            if topology:
+                with open(topology) as f:
+                    medium.load_topology(json.load(f))
+            cls._shared = medium
+            logging.info(f"Simulated LoRa medium: bus_port={port}, topology={topology}")
+        return cls._shared
+
+    # ------------------------------------------------------------------
+    # Topology
+    # ------------------------------------------------------------------
+    def attach(self, node_id: int, **settings) -> 'SimulatedRadio':
+        """Create a virtual radio for node_id (settings: SF/BW/CR/preamble overrides)"""
+        with self._cond:
+            if node_id in self._radios:
+                raise ValueError(f"Node {node_id} already attached to this medium")
+            radio = SimulatedRadio(self, node_id, **settings)
+            self._radios[node_id] = radio
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="lora-sim", daemon=True)
+                self._thread.start()
+        return radio
+
+    def set_link(self, a: int, b: int, loss: float = 0.0, rssi: float = -60.0,
+                 snr: float = 9.5, symmetric: bool = True) -> None:
+        """Configure propagation from a to b (and b to a if symmetric)"""
+        self._links[(a, b)] = SimLink(loss, rssi, snr)
+        if symmetric:
+            self._links[(b, a)] = SimLink(loss, rssi, snr)
+
+    def remove_link(self, a: int, b: int, symmetric: bool = True) -> None:
+        """Put b out of range of a (and a of b if symmetric)"""
+        self._links[(a, b)] = None
+        if symmetric:
+            self._links[(b, a)] = None
+
+    def link(self, tx: int, rx: int) -> Optional[SimLink]:
+        return self._links.get((tx, rx), self.default_link)
+
+    def load_topology(self, topology: dict) -> None:
+        """Apply a topology dict (see module docstring)"""
+        if 'default' in topology:
+            default = topology['default']
+            self.default_link = SimLink(**default) if default is not None else None
+        self.capture_db = topology.get('capture_db', self.capture_db)
+        for entry in topology.get('links', []):
+            entry = dict(entry)
+            a, b = entry.pop('a'), entry.pop('b')
+            symmetric = entry.pop('symmetric', True)
+            if entry.pop('range', True):
+                self.set_link(a, b, symmetric=symmetric, **entry)
+            else:
+                self.remove_link(a, b, symmetric=symmetric)
+
+    def stats(self) -> dict:
+        """Channel counters for capacity measurements"""
+        return {
+            'frames_sent': self.frames_sent,
+            'frames_delivered': self.frames_delivered,
+            'collisions': self.collisions,
+            'link_losses': self.link_losses,
+            'half_duplex': self.half_duplex,
+            'missed_idle': self.missed_idle,
+            'overruns': self.overruns,
+            'airtime_ms': round(self.airtime_ms, 1),
+        }
+
+    def close(self) -> None:
+        """Stop the delivery thread and leave the bus"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._bus is not None:
+            self._bus.close()
+            self._bus = None
+
+    # ------------------------------------------------------------------
+    # Channel
+    # ------------------------------------------------------------------
+    def _transmit(self, radio: 'SimulatedRadio', frame: bytes) -> float:
+        """Put a frame on the air from radio; returns its airtime in seconds"""
+        airtime_s = lora_airtime_ms(
+            len(frame), radio.spreading_factor, radio.signal_bandwidth, radio.coding_rate,
+            radio.preamble_length, radio.enable_crc
+        ) / 1000.0
+        start = time.time()
+        transmission = _Transmission(radio.node_id, frame, start, start + airtime_s)
+        self._register(transmission)
+        if self._bus is not None:
+            header = _BUS_HEADER.pack(self._id, radio.node_id, transmission.start, transmission.end)
+            try:
+                self._bus.sendto(header + frame, (BUS_ADDRESS, self.bus_port))
+            except OSError as e:
+                logging.error(f"Simulated medium bus send failed: {e}")
+        return airtime_s
+
+    def _register(self, transmission: _Transmission) -> None:
+        with self._cond:
+            self._air.append(transmission)
+            heapq.heappush(self._pending, (transmission.end, next(self._order), transmission))
+            self.frames_sent += 1
+            self.airtime_ms += (transmission.end - transmission.start) * 1000
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        """Deliver each transmission to every receiver when it ends"""
+        with self._cond:
+            while not self._closed:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                end = self._pending[0][0]
+                now = time.time()
+                if end > now:
+                    self._cond.wait(end - now)
+                    continue
+                transmission = heapq.heappop(self._pending)[2]
+                self._deliver(transmission)
+                cutoff = now - HISTORY_S
+                while self._air and self._air[0].end < cutoff:
+                    self._air.popleft()
+
+    def _deliver(self, transmission: _Transmission) -> None:
+        """Decide, per receiver, whether a finished transmission was heard (lock held)"""
+        overlapping = [t for t in self._air if t is not transmission and t.overlaps(transmission)]
+        delivered = False
+
+        for radio in self._radios.values():
+            if radio.node_id == transmission.sender:
+                continue
+            link = self.link(transmission.sender, radio.node_id)
+            if link is None:
+                continue  # Out of range
+
+            if any(t.sender == radio.node_id for t in overlapping):
+                self.half_duplex += 1
+                continue
+            if not radio._listening or radio._listen_since > transmission.start:
+                self.missed_idle += 1
+                continue
+
+            interference = None
+            for other in overlapping:
+                other_link = self.link(other.sender, radio.node_id)
+                if other_link is not None and (interference is None or other_link.rssi > interference):
+                    interference = other_link.rssi
+            if interference is not None and link.rssi - interference < self.capture_db:
+                self.collisions += 1
+                continue
+
+            if link.loss and self._rng.random() < link.loss:
+                self.link_losses += 1
+                continue
+
+            if radio._fifo is not None:
+                self.overruns += 1
+                radio.overruns += 1
+            radio._fifo = (bytearray(transmission.frame), link.rssi, link.snr)
+            self.frames_delivered += 1
+            delivered = True
+
+        if delivered:
+            self._cond.notify_all()
+
+    def _bus_loop(self) -> None:
+        """Register transmissions from media in other processes"""
+        while self._bus is not None:
+            try:
+                datagram = self._bus.recv(4096)
+            except OSError:
+                break
+            if len(datagram) < _BUS_HEADER.size:
+                continue
+            medium_id, sender, start, end = _BUS_HEADER.unpack_from(datagram)
+            if medium_id == self._id:
+                continue  # Our own broadcast
+            self._register(_Transmission(sender, bytes(datagram[_BUS_HEADER.size:]), start, end))
+
+
+class SimulatedRadio(RadioBackend):
+    """Virtual RFM9x on a SimulatedMedium (adafruit_rfm9x-compatible API)"""
+
+    def __init__(self, medium: SimulatedMedium, node_id: int, spreading_factor: int = 7,
+                 signal_bandwidth: int = 125000, coding_rate: int = 5,
+                 preamble_length: int = 8, enable_crc: bool = False):
+        self.medium = medium
+        self.node_id = node_id  # Position in the topology (RadioHead address is .node)
+
+        # Modulation (read by the medium for airtime and by TxScheduler.for_radio)
+        self.spreading_factor = spreading_factor
+        self.signal_bandwidth = signal_bandwidth
+        self.coding_rate = coding_rate
+        self.preamble_length = preamble_length
+        self.enable_crc = enable_crc
+
+        # adafruit_rfm9x defaults
+        self.node = RH_BROADCAST_ADDRESS
+        self.destination = RH_BROADCAST_ADDRESS
+        self.identifier = 0
+        self.flags = 0
+        self.sequence_number = 0
+        self.seen_ids = bytearray(256)
+        self.tx_power = 13
+        self.ack_delay = None
+        self.ack_wait = 0.5
+        self.ack_retries = 5
+        self.receive_timeout = 0.5
+        self.last_rssi = 0.0
+        self.last_snr = 0.0
+
+        self._fifo: Optional[tuple] = None   # (frame, rssi, snr) — holds one frame
+        self._listening = False
+        self._listen_since = 0.0
+
+        # Counters
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.overruns = 0
+
+    def send(self, data, *, keep_listening: bool = False, destination: Optional[int] = None,
+             node: Optional[int] = None, identifier: Optional[int] = None,
+             flags: Optional[int] = None) -> bool:
+        header = bytes((
+            self.destination if destination is None else destination,
+            self.node if node is None else node,
+            self.identifier if identifier is None else identifier,
+            self.flags if flags is None else flags,
+        ))
+        with self.medium._cond:
+            self._listening = False  # TX mode
+        airtime_s = self.medium._transmit(self, header + bytes(data))
+        time.sleep(airtime_s)
+        with self.medium._cond:
+            self._set_listening(keep_listening)
+        self.frames_sent += 1
+        return True
+
+    def send_with_ack(self, data) -> bool:
+        retries_remaining = self.ack_retries if self.ack_retries else 1
+        got_ack = False
+        self.sequence_number = (self.sequence_number + 1) & 0xFF
+        while not got_ack and retries_remaining:
+            self.identifier = self.sequence_number
+            self.send(data, keep_listening=True)
+            if self.destination == RH_BROADCAST_ADDRESS:
+                got_ack = True  # No ACK for broadcast
+            else:
+                ack_packet = self.receive(timeout=self.ack_wait, with_header=True)
+                if (ack_packet is not None and ack_packet[3] & RH_FLAGS_ACK
+                        and ack_packet[2] == self.identifier):
+                    got_ack = True
+                    break
+            if not got_ack:
+                time.sleep(self.ack_wait + self.ack_wait * random.random())
+            retries_remaining -= 1
+            self.flags |= RH_FLAGS_RETRY
+        self.flags = 0
+        return got_ack
+
+    def receive(self, *, keep_listening: bool = True, with_header: bool = False,
+                with_ack: bool = False, timeout: Optional[float] = None):
+        deadline = time.time() + (self.receive_timeout if timeout is None else timeout)
+        with self.medium._cond:
+            self._set_listening(True)
+            while self._fifo is None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.medium._cond.wait(remaining)
+            received, self._fifo = self._fifo, None
+            if not keep_listening:
+                self._set_listening(False)
+
+        if received is None:
+            return None
+        packet, self.last_rssi, self.last_snr = received
+        self.frames_received += 1
+        if len(packet) < 4:
+            return None
+
+        if (self.node != RH_BROADCAST_ADDRESS and packet[0] != RH_BROADCAST_ADDRESS
+                and packet[0] != self.node):
+            return None  # Addressed to another node
+        if with_ack and not packet[3] & RH_FLAGS_ACK and packet[0] != RH_BROADCAST_ADDRESS:
+            if self.ack_delay is not None:
+                time.sleep(self.ack_delay)
+            self.send(b"!", keep_listening=keep_listening, destination=packet[1], node=packet[0],
+                      identifier=packet[2], flags=packet[3] | RH_FLAGS_ACK)
+            if self.seen_ids[packet[1]] == packet[2] and packet[3] & RH_FLAGS_RETRY:
+                return None  # Retry of a frame we already ACKed
+            self.seen_ids[packet[1]] = packet[2]
+
+        return packet if with_header else packet[4:]
+
+    def _set_listening(self, listening: bool) -> None:
+        """Enter/leave RX mode (medium lock held); frames must start after RX began"""
+        if listening and not self._listening:
+            self._listen_since = time.time()
+        self._listening = listening
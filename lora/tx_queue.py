@@ -0,0 +1,235 @@
+"""
+Priority TX Queue
+
+Order in which the radio thread puts queued frames on air.
+
+With a plain FIFO, a release ACK or HELLO_ACK could wait behind another
+scanner's multi-part DATA burst, each part paced by the TxScheduler. Frames
+now carry a TxPriority class:
+
+    CONTROL       HELLO_ACK, CMD acks, NOT_FOUND / RESTRICTED replies
+    DATA          first (or only) frame of a student response
+    CONTINUATION  later parts of a multi-part response, NACK re-sends
+    STATUS        background / status-related traffic
+
+- the lowest class number with work goes first
+- aging: a class is promoted one level for every `aging` seconds its oldest
+  frame has waited in the queue, so bulk traffic is never starved under
+  control load (a popped frame held for its TX slot does not age meanwhile)
+- per-destination round robin inside a class: one busy scanner cannot
+  monopolize the channel while others wait
+- queue wait (queued -> first attempt on air) is kept per class and reported
+  as p50 / p95 / p99 / max
+- optional per-class capacity (the repeater's forward queue): a full class
+  drops its oldest frame from the destination with the most frames queued,
+  so a flooding node loses its own backlog rather than everyone's
+"""
+
+import threading
+from collections import OrderedDict, deque
+from enum import IntEnum
+from typing import Dict, Hashable, List, Optional
+
+
+class TxPriority(IntEnum):
+    """TX classes, most urgent first"""
+    CONTROL = 0
+    DATA = 1
+    CONTINUATION = 2
+    STATUS = 3
+
+
+class LatencyWindow:
+    """Last `size` samples (ms) of a latency, reported as percentiles"""
+
+    __slots__ = ('_samples', 'count')
+
+    def __init__(self, size: int = 512):
+        self._samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds * 1000)
+        self.count += 1
+
+    def as_dict(self) -> dict:
+        if not self._samples:
+            return {'count': self.count, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        ordered = sorted(self._samples)
+        last = len(ordered) - 1
+
+        def pick(q: float) -> float:
+            return round(ordered[min(last, int(q * len(ordered)))], 1)
+
+        return {
+            'count': self.count,
+            'p50_ms': pick(0.50),
+            'p95_ms': pick(0.95),
+            'p99_ms': pick(0.99),
+            'max_ms': round(ordered[last], 1),
+        }
+
+
+class PriorityTxQueue:
+    """
+    Thread-safe class / destination queue of TX requests.
+
+    Items must have an `enqueued` attribute (time.monotonic() when queued).
+    The event loop pushes; the radio thread pops.
+    """
+
+    def __init__(self, aging: float = 1.0, max_per_class: int = 0):
+        """
+        Args:
+            aging: Seconds of waiting that promote a class by one level (0 disables)
+            max_per_class: Items per class before push() drops one (0 = unbounded)
+        """
+        self.aging = aging
+        self.max_per_class = max_per_class
+        self._classes: Dict[TxPriority, OrderedDict] = {p: OrderedDict() for p in TxPriority}
+        self._counts: Dict[TxPriority, int] = {p: 0 for p in TxPriority}
+        self._lock = threading.Lock()
+        self._size = 0
+        self.promoted = 0   # Pops where aging beat a more urgent class
+        self.dropped: Dict[TxPriority, int] = {p: 0 for p in TxPriority}
+
+    def push(self, item, priority: TxPriority = TxPriority.DATA, dest: Hashable = None) -> Optional[object]:
+        """
+        Queue an item behind earlier items of the same class and destination
+
+        Returns the item dropped to make room (max_per_class reached), else None.
+        """
+        priority = TxPriority(priority)
+        with self._lock:
+            queues = self._classes[priority]
+            pending = queues.get(dest)
+            if pending is None:
+                pending = queues[dest] = deque()
+            pending.append(item)
+            self._counts[priority] += 1
+            self._size += 1
+            if self.max_per_class and self._counts[priority] > self.max_per_class:
+                return self._drop_oldest(priority)
+            return None
+
+    def push_front(self, item, priority: TxPriority, dest: Hashable = None) -> None:
+        """Put back an item taken by pop() but not sent (it goes first again)"""
+        with self._lock:
+            queues = self._classes[TxPriority(priority)]
+            pending = queues.get(dest)
+            if pending is None:
+                pending = queues[dest] = deque()
+            pending.appendleft(item)
+            queues.move_to_end(dest, last=False)
+            self._counts[TxPriority(priority)] += 1
+            self._size += 1
+
+    def discard(self, item, priority: TxPriority, dest: Hashable = None) -> bool:
+        """Remove a queued item that no longer needs sending; False if it is not queued"""
+        priority = TxPriority(priority)
+        with self._lock:
+            queues = self._classes[priority]
+            pending = queues.get(dest)
+            if pending is None:
+                return False
+            try:
+                pending.remove(item)
+            except ValueError:
+                return False
+            if not pending:
+                del queues[dest]
+            self._counts[priority] -= 1
+            self._size -= 1
+            return True
+
+    def pop(self, now: float) -> Optional[object]:
+        """Next item to transmit, or None if empty"""
+        with self._lock:
+            if not self._size:
+                return None
+            chosen, _, first = self._select(now)
+            if chosen != first:
+                self.promoted += 1
+
+            queues = self._classes[chosen]
+            dest, pending = next(iter(queues.items()))
+            item = pending.popleft()
+            if pending:
+                queues.move_to_end(dest)   # Round robin across destinations
+            else:
+                del queues[dest]
+            self._counts[chosen] -= 1
+            self._size -= 1
+            return item
+
+    def preempts(self, priority: TxPriority, waited: float, now: float) -> bool:
+        """
+        True if something queued should go before a popped request not due yet
+
+        Args:
+            priority: Class of the popped request
+            waited: Seconds it was queued before pop(); the hold since then
+                (turnaround, pacing, duty-cycle deferral) does not age it
+            now: time.monotonic()
+        """
+        with self._lock:
+            if not self._size:
+                return False
+            if priority > TxPriority.CONTROL and self._counts[TxPriority.CONTROL]:
+                return True   # Control never waits out another frame's hold
+            _, effective, _ = self._select(now)
+            return effective < self._level(priority, waited)
+
+    def _level(self, priority: TxPriority, waited: float) -> int:
+        if self.aging <= 0:
+            return priority
+        return priority - int(waited / self.aging)
+
+    def _drop_oldest(self, priority: TxPriority):
+        """Drop the oldest item of the busiest destination in a class; lock held"""
+        queues = self._classes[priority]
+        dest = max(queues, key=lambda key: (len(queues[key]), -queues[key][0].enqueued))
+        pending = queues[dest]
+        item = pending.popleft()
+        if not pending:
+            del queues[dest]
+        self._counts[priority] -= 1
+        self._size -= 1
+        self.dropped[priority] += 1
+        return item
+
+    def _select(self, now: float):
+        """(class to serve, its aged level, most urgent non-empty class); lock held"""
+        chosen = best = first = None
+        for priority, queues in self._classes.items():
+            if not queues:
+                continue
+            if first is None:
+                first = priority
+            oldest = min(pending[0].enqueued for pending in queues.values())
+            effective = self._level(priority, now - oldest)
+            if best is None or effective < best:
+                best, chosen = effective, priority
+        return chosen, best, first
+
+    def drain(self) -> List[object]:
+        """Remove and return everything still queued"""
+        with self._lock:
+            items = [item for queues in self._classes.values()
+                     for pending in queues.values() for item in pending]
+            for queues in self._classes.values():
+                queues.clear()
+            self._counts = {p: 0 for p in TxPriority}
+            self._size = 0
+            return items
+
+    def depths(self) -> Dict[str, int]:
+        """Queued items per class"""
+        with self._lock:
+            return {priority.name.lower(): count for priority, count in self._counts.items()}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
@@ -0,0 +1,245 @@
+"""
+Airtime-Aware Transmit Scheduler
+
+Paces transmissions by what the channel can actually carry instead of fixed
+sleeps. Every frame's time-on-air is computed from the radio's SF/BW/CR
+(Semtech AN1200.13), and:
+- Jitter before each TX is a random fraction of that frame's airtime, doubled
+  per retry (a 30-byte ACK waits ~15-60 ms at SF7, a 253-byte frame ~100-400 ms)
+- A rolling window tracks this node's own airtime against a duty-cycle budget;
+  sends that would exceed it wait until old airtime slides out of the window
+- Frames heard from other nodes are counted too, giving a channel utilization
+  metric (own + observed airtime / window) for the periodic stats logs
+
+Defaults match adafruit_rfm9x (SF7, 125 kHz, 4/5, 8-symbol preamble, no CRC).
+The duty-cycle budget comes from LORA_DUTY_CYCLE (fraction, default 0.3).
+
+Thread-safe: the radio thread records TX/RX while the event loop and the
+stats threads ask for delays and utilization.
+"""
+
+from collections import deque
+import math
+import os
+import random
+import threading
+import time
+import logging
+
+RADIOHEAD_HEADER_SIZE = 4  # adafruit_rfm9x prepends dest/node/id/flags to every frame
+DEFAULT_DUTY_CYCLE = float(os.getenv('LORA_DUTY_CYCLE', '0.3'))
+
+
+def lora_airtime_ms(payload_size: int, spreading_factor: int = 7, bandwidth: int = 125000,
+                    coding_rate: int = 5, preamble_length: int = 8, enable_crc: bool = False,
+                    explicit_header: bool = True) -> float:
+    """
+    LoRa time-on-air in milliseconds (Semtech AN1200.13)
+
+    Args:
+        payload_size: Bytes handed to the modem (frame + RadioHead header)
+        spreading_factor: 6-12
+        bandwidth: Hz (e.g. 125000)
+        coding_rate: Denominator of 4/x (5-8)
+        preamble_length: Programmed preamble symbols
+        enable_crc: Payload CRC enabled on the radio
+        explicit_header: LoRa explicit header mode
+
+    Returns:
+        Airtime in milliseconds
+    """
+    symbol_s = (2 ** spreading_factor) / bandwidth
+    low_data_rate = 1 if symbol_s > 0.016 else 0  # Mandated above 16 ms symbols (SF11/12 @ 125 kHz)
+
+    preamble_s = (preamble_length + 4.25) * symbol_s
+    numerator = (8 * payload_size - 4 * spreading_factor + 28
+                 + 16 * int(enable_crc) - 20 * (0 if explicit_header else 1))
+    payload_symbols = 8 + max(
+        math.ceil(numerator / (4 * (spreading_factor - 2 * low_data_rate))) * coding_rate,
+        0
+    )
+    return (preamble_s + payload_symbols * symbol_s) * 1000
+
+
+class TxScheduler:
+    """Per-node transmit pacing and channel utilization tracking"""
+
+    def __init__(self, spreading_factor: int = 7, bandwidth: int = 125000,
+                 coding_rate: int = 5, preamble_length: int = 8, enable_crc: bool = False,
+                 duty_cycle: float = DEFAULT_DUTY_CYCLE, window_s: float = 60.0,
+                 jitter: tuple = (0.25, 1.0)):
+        """
+        Args:
+            spreading_factor, bandwidth, coding_rate, preamble_length, enable_crc:
+                Radio modulation settings used for airtime
+            duty_cycle: Max fraction of window_s this node may spend transmitting
+            window_s: Rolling window for duty cycle and utilization (seconds)
+            jitter: Pre-TX random delay range as a fraction of the frame's airtime
+        """
+        self.spreading_factor = spreading_factor
+        self.bandwidth = bandwidth
+        self.coding_rate = coding_rate
+        self.preamble_length = preamble_length
+        self.enable_crc = enable_crc
+        self.duty_cycle = duty_cycle
+        self.window_s = window_s
+        self.jitter = jitter
+
+        self._airtime_cache = {}
+        self._lock = threading.Lock()
+        self._tx = deque()         # (end_time, airtime_s) for own transmissions
+        self._tx_airtime = 0.0
+        self._rx = deque()         # (end_time, airtime_s) for frames heard
+        self._rx_airtime = 0.0
+        self._busy_until = 0.0     # End of our last transmission
+
+        # Counters
+        self.frames_sent = 0
+        self.frames_observed = 0
+        self.total_airtime_ms = 0.0
+        self.total_wait_ms = 0.0
+        self.budget_deferrals = 0  # Sends delayed by the duty-cycle budget
+
+    @classmethod
+    def for_radio(cls, rfm9x=None, **kwargs) -> 'TxScheduler':
+        """Scheduler matching an adafruit_rfm9x radio's current modulation (defaults if None)"""
+        if rfm9x is not None:
+            for attr, key in (('spreading_factor', 'spreading_factor'),
+                              ('signal_bandwidth', 'bandwidth'),
+                              ('coding_rate', 'coding_rate'),
+                              ('preamble_length', 'preamble_length'),
+                              ('enable_crc', 'enable_crc')):
+                try:
+                    kwargs.setdefault(key, getattr(rfm9x, attr))
+                except Exception:
+                    pass  # Older driver without the property: keep the default
+        return cls(**kwargs)
+
+    def airtime_ms(self, frame_size: int) -> float:
+        """Time-on-air of a frame (RadioHead header added), cached per size"""
+        airtime = self._airtime_cache.get(frame_size)
+        if airtime is None:
+            airtime = lora_airtime_ms(
+                frame_size + RADIOHEAD_HEADER_SIZE, self.spreading_factor, self.bandwidth,
+                self.coding_rate, self.preamble_length, self.enable_crc
+            )
+            self._airtime_cache[frame_size] = airtime
+        return airtime
+
+    def delay_for(self, frame_size: int, attempt: int = 0) -> float:
+        """
+        Seconds to wait before sending frame_size bytes (does not sleep)
+
+        Jitter (fraction of airtime, doubled per retry) after our previous
+        transmission, or longer if the duty-cycle budget requires it. The
+        caller is expected to hold the frame that long (the radio threads
+        schedule it as a due time), so it is accounted like wait_for_slot().
+        """
+        return self._plan(frame_size, attempt)
+
+    def wait_for_slot(self, frame_size: int, attempt: int = 0) -> float:
+        """Sleep until frame_size bytes may be sent; returns seconds waited"""
+        delay = self._plan(frame_size, attempt)
+        if delay > 0:
+            time.sleep(delay)
+        logging.debug(f"TX slot: waited {delay * 1000:.1f}ms for {frame_size}-byte frame "
+                      f"({self.airtime_ms(frame_size):.1f}ms airtime)")
+        return delay
+
+    def record_tx(self, frame_size: int) -> None:
+        """Account a frame this node just finished transmitting"""
+        airtime_ms = self.airtime_ms(frame_size)
+        with self._lock:
+            now = time.monotonic()
+            self._tx.append((now, airtime_ms / 1000.0))
+            self._tx_airtime += airtime_ms / 1000.0
+            self._busy_until = now
+            self.frames_sent += 1
+            self.total_airtime_ms += airtime_ms
+            self._expire(now)
+
+    def observe(self, frame_size: int) -> None:
+        """Account a frame heard from another node (channel utilization only)"""
+        airtime_s = self.airtime_ms(frame_size) / 1000.0
+        with self._lock:
+            now = time.monotonic()
+            self._rx.append((now, airtime_s))
+            self._rx_airtime += airtime_s
+            self.frames_observed += 1
+            self._expire(now)
+
+    def utilization(self) -> float:
+        """Fraction of the window this node spent transmitting"""
+        with self._lock:
+            self._expire(time.monotonic())
+            return self._tx_airtime / self.window_s
+
+    def channel_utilization(self) -> float:
+        """Fraction of the window the channel carried frames (own + heard)"""
+        with self._lock:
+            self._expire(time.monotonic())
+            return (self._tx_airtime + self._rx_airtime) / self.window_s
+
+    def stats(self) -> dict:
+        """Metrics for periodic status logging"""
+        with self._lock:
+            self._expire(time.monotonic())
+            utilization = self._tx_airtime / self.window_s
+            return {
+                'utilization': round(utilization, 4),
+                'channel_utilization': round((self._tx_airtime + self._rx_airtime) / self.window_s, 4),
+                'duty_cycle_budget': self.duty_cycle,
+                'budget_remaining': round(max(self.duty_cycle - utilization, 0.0), 4),
+                'frames_sent': self.frames_sent,
+                'frames_observed': self.frames_observed,
+                'airtime_ms': round(self.total_airtime_ms, 1),
+                'wait_ms': round(self.total_wait_ms, 1),
+                'budget_deferrals': self.budget_deferrals,
+            }
+
+    def _plan(self, frame_size: int, attempt: int) -> float:
+        """Delay before the next TX, counted in wait_ms / budget_deferrals (warns when deferred)"""
+        with self._lock:
+            jitter_delay, budget_delay = self._delays(frame_size, attempt)
+            delay = max(jitter_delay, budget_delay)
+            deferred = budget_delay > jitter_delay
+            if deferred:
+                self.budget_deferrals += 1
+            self.total_wait_ms += delay * 1000
+        if deferred:
+            logging.warning(f"Duty-cycle budget reached ({self.duty_cycle:.0%} of {self.window_s:.0f}s), "
+                            f"deferring TX {delay * 1000:.0f}ms")
+        return delay
+
+    def _delays(self, frame_size: int, attempt: int) -> tuple:
+        """(jitter delay, duty-cycle budget delay) in seconds from now; lock held"""
+        now = time.monotonic()
+        airtime_s = self.airtime_ms(frame_size) / 1000.0
+        low, high = self.jitter
+        jitter_delay = (max(self._busy_until - now, 0.0)
+                        + random.uniform(low, high) * airtime_s * (2 ** attempt))
+
+        # Wait until enough of our old airtime leaves the window to fit this frame
+        budget_delay = 0.0
+        self._expire(now)
+        excess = self._tx_airtime + airtime_s - self.duty_cycle * self.window_s
+        if excess > 0:
+            freed = 0.0
+            for end_time, tx_airtime in self._tx:
+                freed += tx_airtime
+                if freed >= excess:
+                    budget_delay = end_time + self.window_s - now
+                    break
+        return jitter_delay, budget_delay
+
+    def _expire(self, now: float) -> None:
+        """Drop airtime older than the window from both rolling sums; lock held"""
+        cutoff = now - self.window_s
+        while self._tx and self._tx[0][0] < cutoff:
+            self._tx_airtime -= self._tx.popleft()[1]
+        while self._rx and self._rx[0][0] < cutoff:
+            self._rx_airtime -= self._rx.popleft()[1]
+        if not self._tx:
+            self._tx_airtime = 0.0  # Reset float drift when empty
+        if not self._rx:
+            self._rx_airtime = 0.0
@@ -401,6 +401,14 @@ def on_messageScreen(client, userdata, message, tmp=None):
 
         memory_data = memory_data_store[user_id]
 
+        # Batched publish (MQTT_BATCH on the server): one array per scan and class
+        if isinstance(jsonObj, list) and jsonObj and all(isinstance(item, dict) for item in jsonObj):
+            logging.info(f'[MQTT-RX] Batch of {len(jsonObj)} for user {user_id}')
+            for item in jsonObj:
+                if 'command' not in item:
+                    memory_data.publish_data(item)
+            return True
+
         if isinstance(jsonObj, dict):
             logging.info(f'[MQTT-RX] Valid JSON for user {user_id}: {jsonObj}')
             # For student queue messages, just process the data (not commands)
@@ -641,8 +649,9 @@ def _replay_buffer_for_user(user_id, class_code):
     # Replay student data
     for payload_str in data_messages:
         jsonObj = loadJson(payload_str)
-        if isinstance(jsonObj, dict) and 'command' not in jsonObj:
-            memory_data.publish_data(jsonObj)
+        for item in (jsonObj if isinstance(jsonObj, list) else [jsonObj]):
+            if isinstance(item, dict) and 'command' not in item:
+                memory_data.publish_data(item)
 
 # ---------------------------------------------------------------
 # Auto-logout: force-clean sessions older than SESSION_MAX_AGE_HOURS
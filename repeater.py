@@ -12,10 +12,20 @@ Functionality:
 - Checks if packet should be forwarded (TTL, duplicates)
 - Updates sender field and decrements TTL
 - Forwards packet with collision avoidance
+- Optionally (LORA_CONTENTION_FLOODING=TRUE) holds each forward for a
+  signal-derived delay and drops it if another repeater sends it first
+- Optionally (LORA_NEXT_HOP_ROUTING=TRUE) learns next hops from the frames
+  it hears and forwards replies hinted for another repeater no further
 - Monitors Waveshare HAT power status (Vin, Vout, RTC)
 - Listens for HAT shutdown signal on GPIO 20
 - Signals running state to HAT on GPIO 21
 
+Threads: the radio thread (lora.repeater_node.RepeaterRadio) only receives
+and forwards; the power sampler (utils.power_sampler.PowerSampler) keeps the
+HAT's serial port / I2C bus open and samples it; the main thread does the
+housekeeping (OLED screens, GPIO switch, stats) and hands STATUS packets to
+the radio thread, which sends them when the channel is idle.
+
 Usage:
     python repeater.py
 
@@ -34,7 +44,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import enhanced LoRa packet handler
-from lora import LoRaTransceiver, LoRaPacket, PacketType, NodeType, CollisionAvoidance
+from lora import LoRaTransceiver, NodeType, RepeaterRadio, RepeaterStats
 from utils.config import (
     LORA_NODE_ID, LORA_FREQUENCY, LORA_TX_POWER, LORA_TTL, LORA_ENABLE_CA,
     LOG_FILENAME, MAX_LOG_SIZE, BACKUP_COUNT, DEBUG, HOME_DIR
@@ -44,27 +54,30 @@ from utils.oled_display import get_oled_display
 # Power Management HAT selection (WAVESHARE or PISUGAR, default WAVESHARE)
 POWER_HAT = os.getenv('POWER_HAT', 'WAVESHARE').upper()
 
-# Power status monitor (optional, depends on POWER_HAT setting)
+# Power status sampler (optional): keeps the HAT's serial port / I2C bus open
+# and samples in the background, see utils/power_sampler.py
 POWER_MONITOR_AVAILABLE = False
-read_power_status = None
-format_power_status_for_lora = None
+PowerSampler = None
 
-if POWER_HAT == 'PISUGAR':
-    try:
-        from utils.pisugar_monitor import read_pisugar_status as read_power_status
-        from utils.pisugar_monitor import format_status_for_lora as format_power_status_for_lora
-        POWER_MONITOR_AVAILABLE = True
-        logging.info("PiSugar power monitor loaded")
-    except ImportError:
-        logging.info("PiSugar monitor not available")
-else:
-    try:
-        from utils.waveshare_monitor import read_waveshare_status as read_power_status
-        from utils.waveshare_monitor import format_status_for_lora as format_power_status_for_lora
-        POWER_MONITOR_AVAILABLE = True
-        logging.info("Waveshare power monitor loaded")
-    except ImportError:
-        logging.info("Waveshare monitor not available")
+try:
+    from utils.power_sampler import PowerSampler
+    POWER_MONITOR_AVAILABLE = True
+    logging.info(f"Power sampler loaded ({POWER_HAT})")
+except ImportError:
+    logging.info("Power monitor not available")
+
+# Contention flooding (several repeaters covering the same area)
+try:
+    from utils.config import LORA_CONTENTION_FLOODING
+except ImportError:
+    LORA_CONTENTION_FLOODING = False
+
+# Learned next-hop routing (server replies forwarded only along the known path)
+try:
+    from utils.config import LORA_NEXT_HOP_ROUTING, LORA_ROUTE_MAX_AGE
+except ImportError:
+    LORA_NEXT_HOP_ROUTING = False
+    LORA_ROUTE_MAX_AGE = 300
 
 # GPIO pin config from config (Waveshare HAT defaults)
 try:
@@ -112,27 +125,6 @@ try:
 except Exception as e:
     print(f'Error creating log object: {e}')
 
-# Statistics tracking
-class RepeaterStats:
-    def __init__(self):
-        self.packets_received = 0
-        self.packets_forwarded = 0
-        self.packets_dropped_ttl = 0
-        self.packets_dropped_duplicate = 0
-        self.packets_dropped_crc = 0
-        self.start_time = time.time()
-
-    def log_stats(self):
-        """Log statistics periodically"""
-        uptime = time.time() - self.start_time
-        logging.info(f"=== Repeater Stats (Uptime: {uptime/3600:.1f}h) ===")
-        logging.info(f"Received: {self.packets_received}")
-        logging.info(f"Forwarded: {self.packets_forwarded}")
-        logging.info(f"Dropped (TTL): {self.packets_dropped_ttl}")
-        logging.info(f"Dropped (Duplicate): {self.packets_dropped_duplicate}")
-        logging.info(f"Dropped (CRC): {self.packets_dropped_crc}")
-        logging.info(f"Forward Rate: {self.packets_forwarded/max(self.packets_received, 1)*100:.1f}%")
-
 
 def _get_wifi_info() -> tuple:
     """Get WiFi connection status and IP address. Returns (connected: bool, ip: str)."""
@@ -148,30 +140,11 @@ def _get_wifi_info() -> tuple:
     return False, ""
 
 
-def _get_pisugar_wakeup() -> str:
-    """Get next PiSugar RTC wakeup time. Returns time string or '--'."""
-    try:
-        result = subprocess.run(
-            ["bash", "-c", "echo 'get rtc_alarm_time' | nc -q 0 127.0.0.1 8423"],
-            capture_output=True, text=True, timeout=3
-        )
-        out = result.stdout.strip()
-        # Format: "rtc_alarm_time: 2026-04-23T13:00:00.000-05:00"
-        if "rtc_alarm_time:" in out:
-            time_str = out.split(": ", 1)[1].strip()
-            # Extract just HH:MM
-            if "T" in time_str:
-                return time_str.split("T")[1][:5]
-    except Exception:
-        pass
-    return "--"
-
-
-def _show_info_screens(oled, power_status, start_time: float):
+def _show_info_screens(oled, power_status, start_time: float, wakeup: str = "--"):
     """Show 4 info screens when the OLED switch is turned on.
 
     Screen 1 (5s): Battery level + charging status
-    Screen 2 (5s): RTC wakeup time + current time (sync check)
+    Screen 2 (5s): RTC wakeup time (PiSugar, from the power sampler) + current time (sync check)
     Screen 3 (5s): WiFi status + IP address
     Screen 4 (5s): Service start time + Node ID + current time
     """
@@ -202,7 +175,6 @@ def _show_info_screens(oled, power_status, start_time: float):
         oled.draw.text((5, 5), "RTC Schedule", font=oled.font, fill=255)
         oled.draw.rectangle((0, 18, oled.width, 20), outline=255, fill=255)
 
-        wakeup = _get_pisugar_wakeup() if POWER_HAT == 'PISUGAR' else "--"
         oled.draw.text((5, 25), f"Wakeup: {wakeup}", font=oled.font, fill=255)
         oled.draw.text((5, 42), f"Now:    {datetime.now().strftime('%H:%M:%S')}", font=oled.font, fill=255)
 
@@ -307,6 +279,9 @@ def main():
     logging.info(f"Starting LoRa Repeater Node {LORA_NODE_ID}")
     logging.info(f"Frequency: {LORA_FREQUENCY}MHz, TX Power: {LORA_TX_POWER}dBm")
     logging.info(f"Collision Avoidance: {'ENABLED' if LORA_ENABLE_CA else 'DISABLED'}")
+    logging.info(f"Contention Flooding: {'ENABLED' if LORA_CONTENTION_FLOODING else 'DISABLED'}")
+    logging.info(f"Next-Hop Routing: {'ENABLED' if LORA_NEXT_HOP_ROUTING else 'DISABLED'}"
+                 f"{f' (routes expire after {LORA_ROUTE_MAX_AGE}s)' if LORA_NEXT_HOP_ROUTING else ''}")
     logging.info(f"LoRa Pins: CS=GPIO{LORA_CS_PIN}, RST=GPIO{LORA_RST_PIN}")
 
     # Show startup on OLED
@@ -323,58 +298,69 @@ def main():
         reset_pin=rst_pin
     )
 
+    # Radio thread: only receives and forwards. This (main) thread does the
+    # housekeeping — OLED, GPIO switch, stats — so none of it
+    # ever stops reception
     stats = RepeaterStats()
+    radio = RepeaterRadio(transceiver, stats, collision_avoidance=LORA_ENABLE_CA,
+                          contention=LORA_CONTENTION_FLOODING,
+                          routing=LORA_NEXT_HOP_ROUTING, route_max_age=LORA_ROUTE_MAX_AGE)
     last_stats_time = time.time()
     last_oled_update = time.time()
     last_status_sent = time.time()
-    last_power_status = None  # Cache last Waveshare reading
-    is_transmitting = False   # Track LoRa TX state for status priority
+    last_forwarded = 0        # stats.packets_forwarded last shown on the OLED
     STATS_INTERVAL = 300      # Log stats every 5 minutes
     OLED_STATS_INTERVAL = 60  # Update OLED stats every 60 seconds
     STATUS_SEND_INTERVAL = 600  # Send status to server every 10 minutes
-
-    # Pending status to send when LoRa becomes idle
-    pending_status_event = None
-    pending_status_ready = False
+    HOUSEKEEPING_INTERVAL = 0.25  # Switch / shutdown polling
 
     # OLED switch state tracking (GPIO 5)
     oled_switch_was_on = False
     oled_display_active = False
     service_start_time = time.time()
 
+    # Power HAT sampled in the background: send_status() and the OLED read
+    # the latest sample instead of the HAT
+    sampler = None
+    if POWER_MONITOR_AVAILABLE:
+        sampler = PowerSampler.for_hat(POWER_HAT, serial_device=WAVESHARE_SERIAL_DEVICE,
+                                       baud=WAVESHARE_SERIAL_BAUD)
+        sampler.start()
+
+    def power_status():
+        return sampler.latest() if sampler is not None else None
+
     def send_status(event=None):
-        """Send a STATUS packet to the server. Only call when LoRa is idle."""
-        if not POWER_MONITOR_AVAILABLE:
-            return
+        """
+        Queue a STATUS packet with the latest power sample for the server
+
+        The payload carries min/avg/max since the previous STATUS; the radio
+        thread transmits it when the channel is idle. Returns an Event set
+        once sent, or None if there was nothing to send.
+        """
+        if sampler is None:
+            return None
         try:
-            if POWER_HAT == 'WAVESHARE':
-                status = read_power_status(WAVESHARE_SERIAL_DEVICE, WAVESHARE_SERIAL_BAUD)
-            else:
-                status = read_power_status()
-            nonlocal last_power_status
-            last_power_status = status
+            status = sampler.latest()
             if not status['available']:
                 logging.debug(f"Power status unavailable: {status['error']}")
-                return
-            status_payload = format_power_status_for_lora(status, event=event)
-            status_packet = LoRaPacket.create(
-                packet_type=PacketType.STATUS,
-                source_node=LORA_NODE_ID,
-                dest_node=1,
-                payload=status_payload.encode('utf-8'),
-                sequence_num=transceiver.get_next_sequence()
-            )
-            success = transceiver.send_packet(status_packet, use_ack=False)
+                return None
+            status_payload = sampler.status_payload(event=event)
             label = f" ({event})" if event else ""
-            if success:
-                if POWER_HAT == 'WAVESHARE':
-                    logging.info(f"Status{label} sent: Vin={status['vin_voltage']:.2f}V, Vout={status['vout_voltage']:.2f}V, Alerts={status['alerts'] or 'none'}")
+
+            def log_sent(success: bool):
+                if success:
+                    if POWER_HAT == 'WAVESHARE':
+                        logging.info(f"Status{label} sent: Vin={status['vin_voltage']:.2f}V, Vout={status['vout_voltage']:.2f}V, Alerts={status['alerts'] or 'none'}")
+                    else:
+                        logging.info(f"Status{label} sent: Battery={status['battery']:.1f}%, Voltage={status['voltage']:.2f}V, Charging={status['charging']}")
                 else:
-                    logging.info(f"Status{label} sent: Battery={status['battery']:.1f}%, Voltage={status['voltage']:.2f}V, Charging={status['charging']}")
-            else:
-                logging.warning(f"Failed to send status{label} to server")
+                    logging.warning(f"Failed to send status{label} to server")
+
+            return radio.send_status(status_payload.encode('utf-8'), on_sent=log_sent)
         except Exception as e:
             logging.error(f"Error sending status: {e}")
+            return None
 
     def check_hat_shutdown():
         """Check if Waveshare HAT is signaling shutdown via GPIO 20."""
@@ -387,9 +373,10 @@ def main():
                 return True
         return False
 
+    radio.start()
     logging.info("Repeater ready, listening for packets...")
 
-    # Show ready status on OLED briefly during startup
+    # Show ready status on OLED briefly during startup (radio already forwarding)
     time.sleep(2)
     oled.show_ready(LORA_NODE_ID, device_type="Repeater")
     time.sleep(2)
@@ -411,18 +398,19 @@ def main():
         oled_display_active = True
         oled_switch_was_on = True
 
-    # Queue STARTUP status to send when idle
-    pending_status_event = "STARTUP"
-    pending_status_ready = True
+    # STARTUP status goes out as soon as the channel is idle
+    send_status(event="STARTUP")
 
     try:
         while True:
             # Check for HAT shutdown signal (highest priority)
             if check_hat_shutdown():
                 logging.info("Waveshare HAT signaled shutdown via GPIO 20")
-                # Try to send shutdown status but don't block
-                send_status(event="SHUTDOWN")
-                stats.log_stats()
+                # Try to send shutdown status but don't block for long
+                sent = send_status(event="SHUTDOWN")
+                if sent is not None:
+                    sent.wait(3.0)
+                stats.log_stats(transceiver.seen_packets, transceiver.tx_scheduler, radio.routes)
 
                 # Show shutdown message on OLED
                 try:
@@ -439,151 +427,70 @@ def main():
                 subprocess.run(["sudo", "shutdown", "-h", "now"])
                 break
 
-            # Receive packet
-            packet = transceiver.receive_packet(timeout=1.0)
-
-            if packet is None:
-                # No packet received — LoRa is idle, safe for housekeeping
-                time.sleep(0.1)
-
-                # Send any pending status (only when idle)
-                if pending_status_ready:
-                    send_status(event=pending_status_event)
-                    pending_status_event = None
-                    pending_status_ready = False
-                    last_status_sent = time.time()
-
-                # Periodically log stats
-                if time.time() - last_stats_time > STATS_INTERVAL:
-                    stats.log_stats()
-                    last_stats_time = time.time()
-
-                # Periodically read and send power status (only when idle)
-                if POWER_MONITOR_AVAILABLE and time.time() - last_status_sent > STATUS_SEND_INTERVAL:
-                    send_status()
-                    last_status_sent = time.time()
-
-                # --- OLED switch control (GPIO 5) ---
-                oled_switch_on = (not GPIO.input(OLED_SWITCH_PIN)) if GPIO_AVAILABLE else False
-
-                if oled_switch_on and not oled_switch_was_on:
-                    # Switch just turned ON — show info screens then enter normal display
-                    logging.info("OLED switch ON — showing info screens")
-                    oled_display_active = True
-                    _show_info_screens(oled, last_power_status, service_start_time)
-                    last_oled_update = 0  # Force immediate stats display after info screens
-
-                elif not oled_switch_on and oled_switch_was_on:
-                    # Switch just turned OFF — shut down display
-                    logging.info("OLED switch OFF — display off")
-                    oled_display_active = False
-                    try:
-                        oled._turn_off()
-                    except Exception:
-                        pass
-
-                oled_switch_was_on = oled_switch_on
-
-                # Normal OLED stats (only when switch is ON)
-                if oled_display_active and time.time() - last_oled_update > OLED_STATS_INTERVAL:
-                    try:
-                        total_dropped = (stats.packets_dropped_ttl +
-                                       stats.packets_dropped_duplicate +
-                                       stats.packets_dropped_crc)
-                        vin_display = None
-                        if last_power_status and last_power_status.get('available'):
-                            if POWER_HAT == 'WAVESHARE':
-                                vin_display = int(last_power_status['vin_voltage'] * 100)
-                            else:
-                                vin_display = int(last_power_status['battery'])
-                        oled.show_repeater_stats(
-                            stats.packets_received,
-                            stats.packets_forwarded,
-                            total_dropped,
-                            vin_display
-                        )
-                        last_oled_update = time.time()
-                    except Exception as e:
-                        logging.error(f"Failed to update OLED: {e}")
-
-                continue
-
-            stats.packets_received += 1
-
-            # Check if packet should be processed
-            should_process, reason = packet.should_process(
-                LORA_NODE_ID,
-                NodeType.REPEATER,
-                transceiver.seen_packets
-            )
-
-            if not should_process:
-                if reason == "duplicate":
-                    stats.packets_dropped_duplicate += 1
-                    logging.debug(f"Dropped duplicate packet: {packet}")
-                elif reason == "ttl_expired":
-                    stats.packets_dropped_ttl += 1
-                    logging.debug(f"Dropped TTL expired packet: {packet}")
-                elif reason == "own_packet_looped":
-                    logging.warning(f"Detected own packet loop: {packet}")
-                else:
-                    logging.debug(f"Dropped packet ({reason}): {packet}")
-                continue
-
-            # Mark as seen to prevent re-forwarding
-            packet_id = (packet.source_node, packet.sequence_num)
-            transceiver.seen_packets.add(packet_id)
-
-            # Prevent unbounded growth
-            if len(transceiver.seen_packets) > transceiver.max_seen:
-                transceiver.seen_packets = set(list(transceiver.seen_packets)[500:])
-
-            # Special handling for HELLO packets: clear cache for source node
-            if packet.packet_type == PacketType.HELLO:
-                source_id = packet.source_node
-                transceiver.seen_packets = {
-                    (src, seq) for src, seq in transceiver.seen_packets
-                    if src != source_id
-                }
-                logging.info(f"HELLO from node {source_id}: cleared sequence cache before forwarding")
-
-            # Create repeated packet with updated sender and TTL
-            repeated_packet = packet.create_repeat(LORA_NODE_ID)
+            time.sleep(HOUSEKEEPING_INTERVAL)
+
+            # Periodically log stats
+            if time.time() - last_stats_time > STATS_INTERVAL:
+                stats.log_stats(transceiver.seen_packets, transceiver.tx_scheduler, radio.routes)
+                last_stats_time = time.time()
+
+            # Periodically send power status (sent when the channel is idle)
+            if POWER_MONITOR_AVAILABLE and time.time() - last_status_sent > STATUS_SEND_INTERVAL:
+                send_status()
+                last_status_sent = time.time()
+
+            # --- OLED switch control (GPIO 5) ---
+            oled_switch_on = (not GPIO.input(OLED_SWITCH_PIN)) if GPIO_AVAILABLE else False
+
+            if oled_switch_on and not oled_switch_was_on:
+                # Switch just turned ON — show info screens then enter normal display
+                # (20s of screens; the radio thread keeps forwarding meanwhile)
+                logging.info("OLED switch ON — showing info screens")
+                oled_display_active = True
+                _show_info_screens(oled, power_status(), service_start_time,
+                                   wakeup=sampler.wakeup if sampler is not None else "--")
+                last_oled_update = 0  # Force immediate stats display after info screens
+                last_forwarded = stats.packets_forwarded
+
+            elif not oled_switch_on and oled_switch_was_on:
+                # Switch just turned OFF — shut down display
+                logging.info("OLED switch OFF — display off")
+                oled_display_active = False
+                try:
+                    oled._turn_off()
+                except Exception:
+                    pass
 
-            logging.info(f"Forwarding packet: {packet}")
+            oled_switch_was_on = oled_switch_on
 
-            # Show forwarding on OLED (only when switch is ON)
-            if oled_display_active:
+            # Show the latest forward (only when switch is ON)
+            forwarded = stats.packets_forwarded
+            if oled_display_active and forwarded != last_forwarded and radio.last_forward:
                 try:
-                    oled.show_packet_forwarded(packet.source_node, packet.dest_node)
+                    oled.show_packet_forwarded(*radio.last_forward)
                 except Exception:
                     pass
+            last_forwarded = forwarded
 
-            # Forward with collision avoidance
-            try:
-                if LORA_ENABLE_CA and transceiver.rfm9x:
-                    data = repeated_packet.serialize()
-                    success = CollisionAvoidance.send_with_ca(
-                        transceiver.rfm9x,
-                        data,
-                        max_retries=3,
-                        enable_rx_guard=True,
-                        enable_random_delay=True
+            # Normal OLED stats (only when switch is ON)
+            if oled_display_active and time.time() - last_oled_update > OLED_STATS_INTERVAL:
+                try:
+                    vin_display = None
+                    last_power_status = power_status()
+                    if last_power_status and last_power_status.get('available'):
+                        if POWER_HAT == 'WAVESHARE':
+                            vin_display = int(last_power_status['vin_voltage'] * 100)
+                        else:
+                            vin_display = int(last_power_status['battery'])
+                    oled.show_repeater_stats(
+                        stats.packets_received,
+                        stats.packets_forwarded,
+                        stats.packets_dropped,
+                        vin_display
                     )
-                else:
-                    success = transceiver.send_packet(repeated_packet, use_ack=False)
-
-                if success:
-                    stats.packets_forwarded += 1
-                    logging.debug(f"Successfully forwarded packet")
-                else:
-                    logging.warning(f"Failed to forward packet: {repeated_packet}")
-
-            except Exception as e:
-                logging.error(f"Error forwarding packet: {e}")
-
-            # Brief delay to prevent tight loop
-            time.sleep(0.05)
+                    last_oled_update = time.time()
+                except Exception as e:
+                    logging.error(f"Failed to update OLED: {e}")
 
     except KeyboardInterrupt:
         logging.info("Repeater shutting down (manual stop)...")
@@ -601,12 +508,16 @@ def main():
     finally:
         # Always send SHUTDOWN status to server so device_status.log records the exact time
         try:
-            send_status(event="SHUTDOWN")
-            logging.info("SHUTDOWN status sent to server")
+            sent = send_status(event="SHUTDOWN")
+            if sent is not None and sent.wait(3.0):
+                logging.info("SHUTDOWN status sent to server")
         except Exception:
             pass
+        radio.stop()
+        if sampler is not None:
+            sampler.stop()
 
-        stats.log_stats()
+        stats.log_stats(transceiver.seen_packets, transceiver.tx_scheduler, radio.routes)
 
         # Always turn off OLED on exit — prevents battery drain after shutdown
         try:
@@ -22,14 +22,16 @@ import logging
 import logging.handlers
 import os
 import re
-from utils.config import LORA_FREQUENCY, LORA_TX_POWER, LORA_ENABLE_CA, HOME_DIR, LORA_NODE_ID, IDFACILITY
+from utils.config import LORA_FREQUENCY, LORA_TX_POWER, LORA_ENABLE_CA, LORA_NODE_ID, IDFACILITY
 from utils.matching_engine import StudentMatcher
+from utils.student_directory import StudentDirectory, is_directory_payload, students_csv_path
 
 
 if os.getenv("LOCAL", "FALSE") != "TRUE":
     import serial
     import RPi.GPIO as GPIO
-    from lora import LoRaTransceiver, LoRaPacket, PacketType, NodeType, MultiPartFlags, CollisionAvoidance
+    from lora import (LoRaTransceiver, LoRaPacket, PacketType, NodeType, MultiPartFlags, CollisionAvoidance,
+                      ReassemblyBuffer, MAX_NACK_ROUNDS)
 
 
 debug = False
@@ -68,9 +70,7 @@ def _load_validation_db():
     if _validation_df is not None:
         return _validation_df
     import pandas as pd
-    csv_path = os.path.join(HOME_DIR, "data", "students.csv")
-    if not os.path.exists(csv_path):
-        csv_path = os.path.join("data", "students.csv")
+    csv_path = students_csv_path()
     _validation_df = pd.read_csv(csv_path)
     _validation_df['DeviceID'] = _validation_df['DeviceID'].astype(str)
     logging.info(f"Validation DB loaded: {len(_validation_df)} rows from {csv_path}")
@@ -106,32 +106,6 @@ def _lookup_validation_db(code: str):
         return None
 
 
-def _format_grade(grade_str: str) -> str:
-    """Convert full grade name or code to abbreviation."""
-    if not grade_str:
-        return 'N/A'
-    g = grade_str.strip()
-    if g == 'First Grade' or g[:2] == '01':
-        return '1st'
-    if g == 'Second Grade' or g[:2] == '02':
-        return '2nd'
-    if g == 'Third Grade' or g[:2] == '03':
-        return '3rd'
-    if g == 'Fourth Grade' or g[:2] == '04':
-        return '4th'
-    if g == 'Fifth Grade' or g[:2] == '05':
-        return '5th'
-    if g == 'Sixth Grade' or g[:2] == '06':
-        return '6th'
-    if g == 'Seventh Grade' or g[:2] == '07':
-        return '7th'
-    if g == 'Eighth Grade' or g[:2] == '08':
-        return '8th'
-    if 'Kinder' in g:
-        return 'Kind'
-    return 'N/A'
-
-
 # ---------------------------------------------------------------------------
 # Serial Thread (QR scanner hardware)
 # ---------------------------------------------------------------------------
@@ -242,12 +216,23 @@ class App(tk.Tk):
         else:
             self.transceiver = None
 
+        # Student directory: advertised in HELLO so the server can answer with
+        # row IDs instead of names. Text responses still work without it.
+        self.directory = None
+        if self.transceiver:
+            try:
+                self.directory = StudentDirectory.from_csv(students_csv_path())
+                self.transceiver.directory_version = self.directory.version
+            except Exception as e:
+                logging.error(f"Student directory unavailable, using text responses: {e}")
+
         # Shared state
         self.lstCode = []
         self.car_number = 0
         self.breakLineList: list = []
         self.lastReleaseRow = 0
         self.lastCommand = None
+        self.reassembly = ReassemblyBuffer()  # Partial multi-part responses by (server, code)
         self.previousCommand = None
         self.matcher = None  # Lazy-loaded on first search
 
@@ -483,7 +468,7 @@ class App(tk.Tk):
     # -----------------------------------------------------------------------
     # LoRa communication (scanner mode)
     # -----------------------------------------------------------------------
-    def lora_receiver(self, cmd: bool):
+    def lora_receiver(self, cmd: bool, request: str = None):
         startTime = time.time()
         confirmationReceived = False
         list_received = []
@@ -495,9 +480,9 @@ class App(tk.Tk):
             if packet is not None:
                 logging.info(f'[RX] Response from Server: {packet}')
                 try:
-                    strPayload = packet.payload.decode('utf-8')
+                    strPayload = packet.text
                     logging.info(f'[RX] Payload: {strPayload}')
-                    response = strPayload.split("|")
+                    response = packet.fields
 
                     if cmd:
                         if response[1] == 'ack' and response[2] == self.lastCommand:
@@ -529,15 +514,26 @@ class App(tk.Tk):
                             self._last_response_not_found = True
                             return True
 
-                        class_code = response[1]
-                        list_received.append({"name": name, "classCode": class_code})
-
+                        # One or more "name|classCode" records per frame, or directory row IDs
+                        if is_directory_payload(strPayload):
+                            if self.directory is None:
+                                raise ValueError("Directory-coded response but no local student directory")
+                            records = self.directory.decode(strPayload)
+                        else:
+                            records = packet.records
                         if packet.is_multi_part():
+                            # Parts are kept per (server, code) across NACKs and re-requests
+                            assembly = self.reassembly.add(packet.source_node, request, packet.multi_part_index,
+                                                           packet.multi_part_total, records)
                             logging.info(f"Received packet {packet.multi_part_index}/{packet.multi_part_total}")
-                            if packet.multi_flags & MultiPartFlags.LAST:
-                                confirmationReceived = True
-                                break
-                        else:
+                            if assembly.complete:
+                                self.reassembly.discard(packet.source_node, request)
+                                records = assembly.records()
+                            elif packet.multi_flags & MultiPartFlags.LAST and self._request_missing_parts(request, assembly):
+                                startTime = time.time()  # Wait for the re-sent parts
+
+                        if not packet.is_multi_part() or assembly.complete:
+                            list_received = [{"name": record[0], "classCode": record[1]} for record in records]
                             confirmationReceived = True
                             break
 
@@ -549,6 +545,11 @@ class App(tk.Tk):
                     return False
 
             if time.time() >= startTime + 3:
+                # Parts missing (LAST lost too): selective repeat before giving up
+                assembly = self.reassembly.get(self.server_node_id, request)
+                if assembly is not None and self._request_missing_parts(request, assembly):
+                    startTime = time.time()
+                    continue
                 logging.warning('[RX] TIMEOUT waiting for response from Server')
                 return False
 
@@ -566,6 +567,25 @@ class App(tk.Tk):
             return True
         return False
 
+    def _request_missing_parts(self, request: str, assembly) -> bool:
+        """Selective repeat: ask the server to re-send only the parts not received"""
+        if assembly.nacks >= MAX_NACK_ROUNDS:
+            return False
+        assembly.nacks += 1
+        missing = assembly.missing()
+        packet = self.transceiver.create_nack_packet(self.server_node_id, request, missing)
+        logging.info(f"[NACK] Requesting parts {missing} of {assembly.total} for {request} (round {assembly.nacks})")
+        self.lbl_status.config(text=f"Recovering {len(missing)} part(s)...", bg="yellow", fg="black")
+        self.update_idletasks()
+
+        if LORA_ENABLE_CA and self.transceiver.rfm9x:
+            return CollisionAvoidance.send_with_ca(
+                self.transceiver.rfm9x, packet.serialize(), max_retries=3,
+                enable_rx_guard=True, enable_random_delay=True,
+                scheduler=self.transceiver.tx_scheduler
+            )
+        return self.transceiver.send_packet(packet, use_ack=True)
+
     def lora_sender(self, sending: bool, payload: str, cmd: bool = False, serverResponseTimeout: int = 3):
         try:
             startTime = time.time()
@@ -595,7 +615,8 @@ class App(tk.Tk):
                     data = packet.serialize()
                     success = CollisionAvoidance.send_with_ca(
                         self.transceiver.rfm9x, data, max_retries=3,
-                        enable_rx_guard=True, enable_random_delay=True
+                        enable_rx_guard=True, enable_random_delay=True,
+                        scheduler=self.transceiver.tx_scheduler
                     )
                 else:
                     success = self.transceiver.send_packet(packet, use_ack=True)
@@ -606,7 +627,7 @@ class App(tk.Tk):
                 else:
                     logging.info(f"[TX] Send OK ({cont}): {payload} | seq={packet.sequence_num}")
                     self.lbl_status.config(text=f"Info sent to Server - {cont}", bg="green")
-                    if self.lora_receiver(cmd):
+                    if self.lora_receiver(cmd, payload):
                         if not cmd and not getattr(self, '_last_response_not_found', False):
                             self.lstCode.append(payload)
                         self._last_response_not_found = False
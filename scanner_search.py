@@ -50,13 +50,15 @@ import os
 import re
 from utils.config import LORA_FREQUENCY, LORA_TX_POWER, LORA_ENABLE_CA, LORA_NODE_ID, IDFACILITY
 from utils.matching_engine import StudentMatcher
+from utils.student_directory import StudentDirectory, is_directory_payload, students_csv_path
 
 
 if os.getenv("LOCAL", "FALSE") != "TRUE":
     import serial
     import RPi.GPIO as GPIO
     # Import enhanced LoRa packet handler
-    from lora import LoRaTransceiver, LoRaPacket, PacketType, NodeType, MultiPartFlags, CollisionAvoidance
+    from lora import (LoRaTransceiver, LoRaPacket, PacketType, NodeType, MultiPartFlags, CollisionAvoidance,
+                      ReassemblyBuffer, MAX_NACK_ROUNDS)
 
 
 debug = False
@@ -194,12 +196,23 @@ class App(tk.Tk):
             )
         else:
             self.transceiver = None
+
+        # Student directory: advertised in HELLO so the server can answer with
+        # row IDs instead of names. Text responses still work without it.
+        self.directory = None
+        if self.transceiver:
+            try:
+                self.directory = StudentDirectory.from_csv(students_csv_path())
+                self.transceiver.directory_version = self.directory.version
+            except Exception as e:
+                logging.error(f"Student directory unavailable, using text responses: {e}")
         ##########################
         self.lstCode = []
         self.car_number = 0
         self.breakLineList: list = []
         self.lastReleaseRow = 0  # Track where the last release ended for graying
         self.lastCommand = None
+        self.reassembly = ReassemblyBuffer()  # Partial multi-part responses by (server, code)
         self.previousCommand = None
         self.matcher = None  # Lazy-loaded on first search
 
@@ -370,17 +383,17 @@ class App(tk.Tk):
             logging.error("HELLO retry failed")
             self._handle_hello_failure()
 
-    def lora_receiver(self, cmd: bool):
+    def lora_receiver(self, cmd: bool, request: str = None):
         """
         Receive packets from server using enhanced packet protocol
 
         Args:
             cmd: True if expecting command acknowledgment, False for data
+            request: Code the response belongs to (reassembly / NACK key)
         """
         startTime = time.time()
         confirmationReceived = False
         list_received = []
-        expected_count = 0
 
         while True:
             # Look for a new packet using enhanced protocol
@@ -393,9 +406,9 @@ class App(tk.Tk):
                 logging.info(f'[RX] Response from Server: {packet}')
 
                 try:
-                    strPayload = packet.payload.decode('utf-8')
+                    strPayload = packet.text
                     logging.info(f'[RX] Payload: {strPayload}')
-                    response = strPayload.split("|")
+                    response = packet.fields
                     logging.debug("??".join(response))
                     if cmd:
                             # Handle command acknowledgment
@@ -409,7 +422,7 @@ class App(tk.Tk):
                             return False
                     else:
                             # Handle data packet (student info)
-                            # Format: Name|ClassCode
+                            # Format: Name|ClassCode[<RS>Name|ClassCode...]
                         name = response[0]
 
                         # Handle NOT_FOUND response from server
@@ -432,22 +445,31 @@ class App(tk.Tk):
                             self._last_response_not_found = True
                             return True
 
-                        class_code = response[1]  # ClassCode (e.g., "4W" = 4th Grade, Mrs Webb)
-
-                        list_received.append({"name": name, "classCode": class_code})
-
+                        # One or more records per frame (text or directory row IDs),
+                        # ClassCode e.g. "4W" = 4th Grade, Mrs Webb
+                        if is_directory_payload(strPayload):
+                            if self.directory is None:
+                                raise ValueError("Directory-coded response but no local student directory")
+                            records = self.directory.decode(strPayload)
+                        else:
+                            records = packet.records
                         # Check if multi-packet sequence
                         if packet.is_multi_part():
-                            expected_count = packet.multi_part_total
+                            # Parts are kept per (server, code) across NACKs and re-requests
+                            assembly = self.reassembly.add(packet.source_node, request, packet.multi_part_index,
+                                                           packet.multi_part_total, records)
                             logging.info(f"Received packet {packet.multi_part_index}/{packet.multi_part_total}")
 
-                            # Check if last packet in sequence
-                            if packet.multi_flags & MultiPartFlags.LAST:
-                                confirmationReceived = True
-                                break
-                            # else: continue waiting for more packets (FIRST or MORE flag)
-                        else:
-                            # Single packet (not multi-part)
+                            if assembly.complete:
+                                self.reassembly.discard(packet.source_node, request)
+                                records = assembly.records()
+                            elif packet.multi_flags & MultiPartFlags.LAST and self._request_missing_parts(request, assembly):
+                                # Last part arrived with gaps: ask for the missing ones only
+                                startTime = time.time()
+
+                        # Single packet, or every part of a multi-packet sequence
+                        if not packet.is_multi_part() or assembly.complete:
+                            list_received = [{"name": record[0], "classCode": record[1]} for record in records]
                             confirmationReceived = True
                             break
 
@@ -460,6 +482,11 @@ class App(tk.Tk):
 
             # Check timeout
             if time.time() >= startTime + 5:
+                # Parts missing (LAST lost too): selective repeat before giving up
+                assembly = self.reassembly.get(self.server_node_id, request)
+                if assembly is not None and self._request_missing_parts(request, assembly):
+                    startTime = time.time()
+                    continue
                 logging.warning('[RX] TIMEOUT waiting for response from Server')
                 return False
 
@@ -483,6 +510,25 @@ class App(tk.Tk):
 
         return False
 
+    def _request_missing_parts(self, request: str, assembly) -> bool:
+        """Selective repeat: ask the server to re-send only the parts not received"""
+        if assembly.nacks >= MAX_NACK_ROUNDS:
+            return False
+        assembly.nacks += 1
+        missing = assembly.missing()
+        packet = self.transceiver.create_nack_packet(self.server_node_id, request, missing)
+        logging.info(f"[NACK] Requesting parts {missing} of {assembly.total} for {request} (round {assembly.nacks})")
+        self.lbl_status.config(text=f"Recovering {len(missing)} part(s)...", bg="yellow", fg="black")
+        self.update_idletasks()
+
+        if LORA_ENABLE_CA and self.transceiver.rfm9x:
+            return CollisionAvoidance.send_with_ca(
+                self.transceiver.rfm9x, packet.serialize(), max_retries=3,
+                enable_rx_guard=True, enable_random_delay=True,
+                scheduler=self.transceiver.tx_scheduler
+            )
+        return self.transceiver.send_packet(packet, use_ack=True)
+
     def lora_sender(self, sending: bool, payload: str, cmd: bool = False, serverResponseTimeout: int = 5):
         """
         Send data to server using enhanced packet protocol
@@ -531,7 +577,8 @@ class App(tk.Tk):
                         data,
                         max_retries=3,
                         enable_rx_guard=True,
-                        enable_random_delay=True
+                        enable_random_delay=True,
+                        scheduler=self.transceiver.tx_scheduler
                     )
                 else:
                     success = self.transceiver.send_packet(packet, use_ack=True)
@@ -544,7 +591,7 @@ class App(tk.Tk):
                     self.lbl_status.config(text=f"Info sent to Server - {cont}", bg="green")
 
                     # Wait for response
-                    if self.lora_receiver(cmd):
+                    if self.lora_receiver(cmd, payload):
                         if not cmd and not getattr(self, '_last_response_not_found', False):
                             self.lstCode.append(payload)
                         self._last_response_not_found = False
@@ -10,6 +10,7 @@ import queue
 import logging
 import logging.handlers
 import os
+from utils.grades import GRADE_COLUMN, grade_column
 
 # Import LORA Libraries - THIS WILL FAIL IN A NON RASPBERRY PI ENVIRONMENT
 if os.environ.get("LOCAL") != 'TRUE':
@@ -43,6 +44,7 @@ logging.getLogger().setLevel(logging.DEBUG if debug else logging.INFO)
 df = pd.read_csv("/home/iqright/Validation_DB.csv")
 # COnvert ExternalNUmber column to String
 df['DeviceID'] = df['DeviceID'].astype(str)
+df[GRADE_COLUMN] = grade_column(df['HierarchyLevel1'])
 
 
 # def serial_UART_Monitor():
@@ -149,28 +151,6 @@ class App(tk.Tk):
         self.thread.start()
         self.process_serial()
 
-    def getGrade(self, strGrade: str):
-        if strGrade == 'First Grade' or strGrade[0:2] == '01':
-            return '1st'
-        elif strGrade == 'Second Grade' or strGrade[0:2] == '02':
-            return '2nd'
-        elif strGrade == 'Third Grade' or strGrade[0:2] == '03':
-            return '3rd'
-        elif strGrade == 'Fourth Grade' or strGrade[0:2] == '04':
-            return '4th'
-        elif strGrade == 'Fifth Grade' or strGrade[0:2] == '05':
-            return '5th'
-        elif strGrade == 'Sixth Grade' or strGrade[0:2] == '06':
-            return '6th'
-        elif strGrade == 'Seventh Grade' or strGrade[0:2] == '07':
-            return '7th'
-        elif strGrade == 'Eighth Grade' or strGrade[0:2] == '08':
-            return '8th'
-        elif strGrade[1] == 'Kindergarten':
-            return 'Kind'
-        else:
-            return 'N/A'
-
     def get_user_local(self, code):
         global df
         if not code:  # Return early if code is missing
@@ -188,7 +168,7 @@ class App(tk.Tk):
                     result = {
                         "name": row['ChildName'],
                         "teacher": row['HierarchyLevel2'],
-                        "class": self.getGrade(row['HierarchyLevel1']),
+                        "class": row[GRADE_COLUMN],
                         "externalID": code,
                     }
                     logging.info(f"{code}|{row['ChildName']}|{row['HierarchyLevel2']}|{row['HierarchyLevel1']}")
@@ -50,6 +50,22 @@ run_test "test_crc_validation.py" "CRC Validation" || true
 run_test "test_multi_packet.py" "Multi-Packet Protocol" || true
 run_test "test_duplicate_detection.py" "Duplicate Detection" || true
 run_test "test_repeater_logic.py" "Repeater Logic" || true
+run_test "test_student_directory.py" "Student Directory" || true
+run_test "test_tx_scheduler.py" "TX Scheduler" || true
+run_test "test_async_transceiver.py" "Async Transceiver" || true
+run_test "test_sim_medium.py" "Simulated Medium" || true
+run_test "test_student_index.py" "Student Index" || true
+run_test "test_rendered_responses.py" "Pre-rendered Responses" || true
+run_test "test_mqtt_publisher.py" "MQTT Publisher" || true
+run_test "test_lookup_client.py" "API Lookup Client" || true
+run_test "test_scanner_dispatcher.py" "Scanner Dispatcher" || true
+run_test "test_grades.py" "Grade Normalization" || true
+run_test "test_tx_priority.py" "Priority TX Queue" || true
+run_test "test_metrics.py" "Request Metrics" || true
+run_test "test_capture_replay.py" "Frame Capture and Replay" || true
+run_test "test_repeater_radio.py" "Repeater Radio Thread" || true
+run_test "test_power_sampler.py" "Power Sampler" || true
+run_test "test_routing.py" "Next-Hop Routing" || true
 
 # Summary
 echo ""
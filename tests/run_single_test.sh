@@ -16,6 +16,22 @@ if [ -z "$1" ]; then
     echo "  test_multi_packet.py"
     echo "  test_duplicate_detection.py"
     echo "  test_repeater_logic.py"
+    echo "  test_student_directory.py"
+    echo "  test_tx_scheduler.py"
+    echo "  test_async_transceiver.py"
+    echo "  test_sim_medium.py"
+    echo "  test_student_index.py"
+    echo "  test_rendered_responses.py"
+    echo "  test_mqtt_publisher.py"
+    echo "  test_lookup_client.py"
+    echo "  test_scanner_dispatcher.py"
+    echo "  test_grades.py"
+    echo "  test_tx_priority.py"
+    echo "  test_metrics.py"
+    echo "  test_capture_replay.py"
+    echo "  test_repeater_radio.py"
+    echo "  test_power_sampler.py"
+    echo "  test_routing.py"
     exit 1
 fi
 
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Unit Test: Async LoRa Transceiver
+
+Tests the radio-thread front end: packets are received while a send waits
+for its slot, collision-avoidance sends retry on the radio thread, the RX
+queue drops oldest when full, and queue metrics are reported.
+Can run locally without LoRa radio.
+"""
+
+import sys
+import os
+import time
+import asyncio
+from collections import deque
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set LOCAL mode to avoid hardware initialization
+os.environ["LOCAL"] = "TRUE"
+
+from lora import AsyncLoRaTransceiver, LoRaTransceiver, LoRaPacket, NodeType, PacketType, TxScheduler
+
+
+class FakeRFM9x:
+    """In-memory radio: frames queued with inject() are returned by receive()"""
+
+    def __init__(self, ack=True):
+        self.ack = ack
+        self.rx = deque()
+        self.sent = []
+
+    def inject(self, packet):
+        self.rx.append(bytes(4) + packet.serialize())  # RadioHead header + frame
+
+    def receive(self, with_header=True, timeout=0.5):
+        if self.rx:
+            return self.rx.popleft()
+        time.sleep(timeout)
+        return None
+
+    def send(self, data):
+        self.sent.append((time.monotonic(), bytes(data)))
+        return True
+
+    def send_with_ack(self, data):
+        self.sent.append((time.monotonic(), bytes(data)))
+        return self.ack
+
+
+def make_server(ack=True):
+    """Server transceiver wired to a fake radio, with deterministic pacing"""
+    transceiver = LoRaTransceiver(node_id=1, node_type=NodeType.SERVER)
+    transceiver.rfm9x = FakeRFM9x(ack=ack)
+    transceiver.tx_scheduler = TxScheduler(jitter=(0.0, 0.0))
+    return transceiver
+
+
+def scanner_packet(seq):
+    return LoRaPacket.create(PacketType.DATA, 102, 1, f"1|12345|{seq}".encode('utf-8'), seq)
+
+
+def test_rx_continues_while_tx_scheduled():
+    """Test a packet arriving during a delayed send is received before it goes out"""
+    print("Testing RX continues while TX is scheduled...")
+
+    transceiver = make_server()
+    radio = AsyncLoRaTransceiver(transceiver, poll_interval=0.02)
+
+    async def scenario():
+        radio.start()
+        try:
+            reply = transceiver.create_data_packet(dest_node=102, payload=b"Ana Souza|4W")
+            send_task = asyncio.create_task(radio.send(reply, delay=0.3))
+            await asyncio.sleep(0.05)
+            transceiver.rfm9x.inject(scanner_packet(7))
+
+            packet = await radio.recv(timeout=1.0)
+            assert packet is not None and packet.sequence_num == 7
+            assert not send_task.done(), "Send should still be waiting for its slot"
+            received_at = time.monotonic()
+
+            assert await send_task
+            sent_at = transceiver.rfm9x.sent[0][0]
+            assert sent_at > received_at
+            return sent_at - received_at
+        finally:
+            radio.stop()
+
+    gap = asyncio.run(scenario())
+    print(f"  ✓ Packet received {gap * 1000:.0f}ms before the delayed response was sent")
+
+    metrics = radio.metrics()
+    assert metrics['rx_frames'] == 1 and metrics['tx_frames'] == 1
+    assert metrics['tx_wait']['max_ms'] >= 250, f"TX wait should include the delay: {metrics['tx_wait']}"
+    print(f"  ✓ Metrics: {metrics}")
+
+    return True
+
+
+def test_send_with_collision_avoidance_retries():
+    """Test collision-avoidance sends retry on the radio thread and report failure"""
+    print("\nTesting collision-avoidance retries...")
+
+    transceiver = make_server(ack=False)
+    radio = AsyncLoRaTransceiver(transceiver, poll_interval=0.01)
+
+    async def scenario():
+        radio.start()
+        try:
+            packet = transceiver.create_data_packet(dest_node=102, payload=b"Ana Souza|4W")
+            return await radio.send(packet, collision_avoidance=True, max_retries=3)
+        finally:
+            radio.stop()
+
+    assert asyncio.run(scenario()) is False
+    assert len(transceiver.rfm9x.sent) == 3
+    assert transceiver.tx_scheduler.frames_sent == 3
+    metrics = radio.metrics()
+    assert metrics['tx_retries'] == 2 and metrics['tx_failed'] == 1
+    print(f"  ✓ 3 attempts, airtime recorded for each: {transceiver.tx_scheduler.stats()['airtime_ms']}ms")
+
+    return True
+
+
+def test_rx_queue_drops_oldest():
+    """Test a full RX queue drops the oldest packet and counts it"""
+    print("\nTesting RX queue overflow...")
+
+    transceiver = make_server()
+    radio = AsyncLoRaTransceiver(transceiver, rx_queue_size=2, poll_interval=0.01)
+    for seq in range(1, 5):
+        transceiver.rfm9x.inject(scanner_packet(seq))
+
+    async def scenario():
+        radio.start()
+        try:
+            await asyncio.sleep(0.2)  # Radio thread drains all 4 frames; nobody reads
+            assert radio.metrics()['rx_queue_depth'] == 2
+            return [(await radio.recv(timeout=0.5)).sequence_num for _ in range(2)]
+        finally:
+            radio.stop()
+
+    assert asyncio.run(scenario()) == [3, 4]
+    assert radio.rx_dropped == 2
+    print(f"  ✓ Kept newest packets [3, 4], dropped {radio.rx_dropped}")
+
+    return True
+
+
+def test_lifecycle():
+    """Test send before start raises and stop resolves queued sends"""
+    print("\nTesting start/stop lifecycle...")
+
+    transceiver = make_server()
+    radio = AsyncLoRaTransceiver(transceiver)
+    packet = transceiver.create_data_packet(dest_node=102, payload=b"x")
+
+    async def scenario():
+        try:
+            await radio.send(packet)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("send() before start() should raise")
+
+        radio.start()
+        send_task = asyncio.create_task(radio.send(packet, delay=5.0))
+        await asyncio.sleep(0.05)
+        radio.stop()
+        return await asyncio.wait_for(send_task, 1.0)
+
+    assert asyncio.run(scenario()) is False
+    assert not radio.running and transceiver.rfm9x.sent == []
+    print("  ✓ Unsent request resolved False on stop")
+
+    return True
+
+
+def main():
+    """Run all async transceiver tests"""
+    print("=" * 60)
+    print("ASYNC TRANSCEIVER TESTS (LOCAL - NO HARDWARE REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_rx_continues_while_tx_scheduled,
+        test_send_with_collision_avoidance_retries,
+        test_rx_queue_drops_oldest,
+        test_lifecycle
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
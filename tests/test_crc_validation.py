@@ -12,7 +12,7 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from lora import LoRaPacket, PacketType
+from lora import LoRaPacket, PacketType, CRC16_ENGINES, set_crc_engine, get_crc_engine
 
 
 def test_crc_validation():
@@ -155,6 +155,62 @@ def test_crc_boundary_conditions():
     return True
 
 
+def test_crc_engines_identical():
+    """Test all CRC engines match the bitwise reference"""
+    print("\nTesting CRC engines against bitwise reference...")
+
+    reference = CRC16_ENGINES['bitwise']
+    assert 'table' in CRC16_ENGINES, "Table engine should always be available"
+
+    # CRC-16/CCITT-FALSE check value
+    for name, engine in CRC16_ENGINES.items():
+        assert engine(b"123456789") == 0x29B1, f"{name} failed check value"
+
+    # Every frame length from empty to the 253-byte maximum
+    for size in range(0, 254):
+        frame = bytes((i * 37 + size) & 0xFF for i in range(size))
+        expected = reference(frame)
+        for name, engine in CRC16_ENGINES.items():
+            assert engine(frame) == expected, f"{name} differs for {size}-byte frame"
+
+    print(f"  ✓ Engines identical for 0-253 byte frames: {', '.join(CRC16_ENGINES)}")
+    return True
+
+
+def test_crc_engine_interop():
+    """Test frames serialized with one engine deserialize with every other"""
+    print("\nTesting CRC engine interoperability...")
+
+    previous = get_crc_engine()
+    try:
+        for writer in CRC16_ENGINES:
+            set_crc_engine(writer)
+            data = LoRaPacket.create(
+                packet_type=PacketType.DATA,
+                source_node=1,
+                dest_node=102,
+                payload=b"Emma Smith|4W",
+                sequence_num=7
+            ).serialize()
+
+            for reader in CRC16_ENGINES:
+                set_crc_engine(reader)
+                result = LoRaPacket.deserialize(data)
+                assert result is not None, f"{writer} -> {reader} failed"
+                assert result.payload == b"Emma Smith|4W"
+    finally:
+        set_crc_engine(previous)
+
+    try:
+        set_crc_engine('bogus')
+        assert False, "Unknown engine should raise ValueError"
+    except ValueError:
+        pass
+
+    print(f"  ✓ All engine pairs interoperate, unknown engine rejected")
+    return True
+
+
 def main():
     """Run all CRC validation tests"""
     print("=" * 60)
@@ -166,7 +222,9 @@ def main():
         test_crc_header_corruption,
         test_crc_valid_packet,
         test_crc_multiple_corruptions,
-        test_crc_boundary_conditions
+        test_crc_boundary_conditions,
+        test_crc_engines_identical,
+        test_crc_engine_interop
     ]
 
     passed = 0
@@ -8,6 +8,8 @@ Can run locally without LoRa radio.
 
 import sys
 import os
+import threading
+import time
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -15,7 +17,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 # Set LOCAL mode to avoid hardware initialization
 os.environ["LOCAL"] = "TRUE"
 
-from lora import LoRaTransceiver, NodeType, LoRaPacket, PacketType
+from lora import LoRaTransceiver, NodeType, LoRaPacket, PacketType, SeenPacketCache, ResponseCache
+from lora.seen_cache import seq_ahead
 
 
 def test_duplicate_detection():
@@ -245,7 +248,7 @@ def test_broadcast_address():
 
 
 def test_seen_packets_cleanup():
-    """Test seen_packets set cleanup to prevent memory growth"""
+    """Test seen_packets stays bounded and evicts the oldest entries first"""
     print("\nTesting seen_packets cleanup...")
 
     transceiver = LoRaTransceiver(
@@ -259,22 +262,173 @@ def test_seen_packets_cleanup():
     for i in range(transceiver.max_seen + 10):
         transceiver.seen_packets.add((102, i))
 
-    # Verify we exceeded the limit
-    initial_size = len(transceiver.seen_packets)
-    assert initial_size > transceiver.max_seen, f"Test setup error: didn't exceed max_seen"
-    print(f"  ✓ Added {initial_size} packets (exceeds max_seen={transceiver.max_seen})")
+    assert len(transceiver.seen_packets) == transceiver.max_seen, \
+        f"seen_packets not bounded: {len(transceiver.seen_packets)} != {transceiver.max_seen}"
+    assert transceiver.seen_packets.evictions == 10
+    print(f"  ✓ Bounded at {len(transceiver.seen_packets)} packets, evicted {transceiver.seen_packets.evictions}")
 
-    # Simulate cleanup logic (from receive_packet method)
-    if len(transceiver.seen_packets) > transceiver.max_seen:
-        # Remove oldest half
-        transceiver.seen_packets = set(list(transceiver.seen_packets)[500:])
+    # Exactly the 10 oldest were dropped
+    assert all((102, i) not in transceiver.seen_packets for i in range(10)), "Oldest entries should be evicted"
+    assert all((102, i) in transceiver.seen_packets for i in range(10, transceiver.max_seen + 10)), \
+        "Newest entries should be kept"
+    print("  ✓ Oldest-first eviction (10 oldest gone, newest kept)")
 
-    # Should now be cleaned up
-    assert len(transceiver.seen_packets) <= transceiver.max_seen, \
-        f"seen_packets not cleaned: {len(transceiver.seen_packets)} > {transceiver.max_seen}"
+    return True
+
+
+def test_seen_cache_forget_source():
+    """Test HELLO-style forget of one source leaves other sources intact"""
+    print("\nTesting seen cache forget_source...")
+
+    cache = SeenPacketCache(max_entries=100)
+    for seq in range(10):
+        cache.add((102, seq))
+        cache.add((103, seq))
+
+    removed = cache.forget_source(102)
+    assert removed == 10, f"Expected 10 entries removed, got {removed}"
+    assert len(cache) == 10
+    assert (102, 5) not in cache, "Forgotten source should not be a duplicate"
+    assert (103, 5) in cache, "Other sources must be untouched"
+    print(f"  ✓ Forgot {removed} entries for node 102, node 103 intact")
+
+    # Rebooted node restarts at seq 0: new entries are tracked normally
+    cache.add((102, 0))
+    assert (102, 0) in cache
+    assert len(cache) == 11
+    print("  ✓ Source re-learned after forget")
+
+    # Invalidated slots are reclaimed by eviction without affecting live counts
+    for seq in range(200):
+        cache.add((104, seq))
+    assert len(cache) == 100
+    assert (103, 5) not in cache and (104, 199) in cache
+    print(f"  ✓ Stats: {cache.stats()}")
+
+    # Invalidated entries behind a live head do not count toward capacity
+    cache = SeenPacketCache(max_entries=10)
+    cache.add((103, 0))
+    for seq in range(9):
+        cache.add((102, seq))
+    cache.forget_source(102)
+    for seq in range(9):
+        cache.add((104, seq))
+    assert len(cache) == 10 and cache.evictions == 0 and (103, 0) in cache
+    for seq in range(9, 20):
+        cache.add((104, seq))
+    stats = cache.stats()
+    assert stats['evictions'] == 11 and stats['size'] == 10 and stats['slots'] <= 20, stats
+    print("  ✓ Forgotten entries never evict live ones; dead slots stay bounded")
+
+    return True
+
+
+def test_seen_cache_concurrent_forget():
+    """Test forget_source() from another thread while the radio thread adds"""
+    print("\nTesting seen cache forget_source during concurrent adds...")
+
+    cache = SeenPacketCache(max_entries=50)
+    stop = threading.Event()
+
+    def radio_thread():
+        seq = 0
+        while not stop.is_set():
+            cache.add((100 + seq % 4, seq % 65536))
+            seq += 1
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)   # Switch threads as often as possible
+    thread = threading.Thread(target=radio_thread)
+    thread.start()
+    deadline = time.monotonic() + 0.5
+    while time.monotonic() < deadline:
+        cache.forget_source(101)
+    stop.set()
+    thread.join()
+    sys.setswitchinterval(interval)
+
+    # Live count must match the entries of the current epochs
+    live = sum(1 for packet_id in list(cache._entries) if packet_id in cache)
+    assert len(cache) == live <= 50, (len(cache), live)
+    print(f"  ✓ Live count consistent after concurrent forgets ({len(cache)} entries)")
+
+    return True
+
+
+def test_seen_cache_wraparound_and_expiry():
+    """Test 16-bit wraparound and time-based expiry in the seen cache"""
+    print("\nTesting seen cache wraparound and expiry...")
+
+    # Node 102 seen with seq 5, then it wraps: 65535 -> 0 -> ... -> 5 again
+    cache = SeenPacketCache(max_entries=100)
+    cache.add((102, 5))
+    cache.add((102, 20000))
+    assert (102, 5) in cache, "Seq behind the newest is a duplicate"
+    cache.add((102, 40000))
+    cache.add((102, 65530))
+    assert (102, 5) not in cache, "Seq ahead of newest (after wrap) is not a duplicate"
+    print("  ✓ Pre-wrap entry does not suppress post-wrap sequence number")
+
+    assert seq_ahead(0, 65535) and seq_ahead(3, 65530)
+    assert not seq_ahead(65535, 0) and not seq_ahead(7, 7)
+    print("  ✓ Serial arithmetic across 65535 -> 0")
+
+    cache = SeenPacketCache(max_entries=100, max_age=0.05)
+    cache.add((102, 1))
+    assert (102, 1) in cache
+    time.sleep(0.1)
+    assert (102, 1) not in cache, "Expired entry should not be a duplicate"
+    cache.add((103, 1))
+    assert cache.expirations == 1 and len(cache) == 1
+    assert cache.hits == 1
+    print(f"  ✓ Entries expire after max_age: {cache.stats()}")
+
+    return True
+
+
+def test_response_cache_per_scanner_lru():
+    """Test server response cache bounds each scanner independently (LRU)"""
+    print("\nTesting per-scanner response cache LRU...")
+
+    cache = ResponseCache(max_entries=3)
+    for code in ("P1", "P2", "P3"):
+        cache.put(102, code, [f"frames-{code}"])
+    cache.put(103, "P9", ["frames-P9"])
+    assert cache.get(102, "P1") == ["frames-P1"], "Hit refreshes P1"
+
+    cache.put(102, "P4", ["frames-P4"])
+    assert cache.get(102, "P2") is None, "Least recently used P2 evicted"
+    assert cache.get(102, "P1") is not None and cache.get(102, "P4") is not None
+    assert cache.get(103, "P9") == ["frames-P9"], "Other scanner untouched"
+    assert len(cache) == 4 and cache.scanner_size(102) == 3
+    print(f"  ✓ LRU per scanner: {cache.stats()}")
+
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['hits'] == 4 and stats['misses'] == 1
+    return True
 
-    print(f"  ✓ After cleanup: {len(transceiver.seen_packets)} packets (≤ {transceiver.max_seen})")
 
+def test_response_cache_ttl_and_invalidate():
+    """Test response cache expiry and O(1) per-scanner invalidation"""
+    print("\nTesting response cache TTL and invalidation...")
+
+    cache = ResponseCache(max_entries=100, ttl=0.05)
+    cache.put(102, "P1", ["a"])
+    assert cache.get(102, "P1") == ["a"]
+    time.sleep(0.1)
+    assert cache.get(102, "P1") is None, "Expired response must not be re-sent"
+    assert cache.expirations == 1 and len(cache) == 0
+    print("  ✓ Responses expire after ttl")
+
+    cache = ResponseCache(max_entries=100)
+    for i in range(50):
+        cache.put(102, f"P{i}", ["x"])
+        cache.put(103, f"P{i}", ["y"])
+    assert cache.invalidate(102) == 50
+    assert cache.invalidate(102) == 0
+    assert cache.get(102, "P7") is None and cache.get(103, "P7") == ["y"]
+    assert len(cache) == 50 and cache.stats()['scanners'] == 1
+    print(f"  ✓ Scanner 102 dropped in one step, 103 intact: {cache.stats()}")
     return True
 
 
@@ -292,7 +446,12 @@ def main():
         test_not_for_me,
         test_repeater_forwarding,
         test_broadcast_address,
-        test_seen_packets_cleanup
+        test_seen_packets_cleanup,
+        test_seen_cache_forget_source,
+        test_seen_cache_concurrent_forget,
+        test_seen_cache_wraparound_and_expiry,
+        test_response_cache_per_scanner_lru,
+        test_response_cache_ttl_and_invalidate
     ]
 
     passed = 0
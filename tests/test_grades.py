@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Unit Test: Grade Normalization and Restrictions
+
+Tests the shared grade labels (names, numeric prefixes, Kindergarten,
+missing values), the per-day restricted-grade decision and the filter used
+on every scan, and the grade carried by student index records.
+Can run locally without LoRa radio (grade_column check needs pandas).
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.grades import GRADES, GradeRestrictions, grade_label, grade_column
+from utils.student_index import StudentIndex
+
+
+def test_grade_labels():
+    """Test every HierarchyLevel1 spelling maps to the same label"""
+    print("Testing grade labels...")
+
+    cases = {
+        "Fourth Grade": "4th", "04 Fourth": "4th", " 07 Seventh ": "7th", "08": "8th",
+        "First Grade": "1st", "06 Sixth": "6th", "K": "Kind", "Kindergarten": "Kind",
+        "00 Kindergarten": "Kind", "09 Ninth": "N/A", "": "N/A", None: "N/A", float('nan'): "N/A",
+    }
+    for raw, expected in cases.items():
+        assert grade_label(raw) == expected, (raw, grade_label(raw))
+    print(f"  ✓ {len(cases)} spellings labelled (names, prefixes, Kindergarten, missing)")
+
+    try:
+        import pandas as pd
+    except ImportError:
+        print("  - pandas not installed, grade_column check skipped")
+        return True
+    column = grade_column(pd.Series(["04 Fourth", "Seventh Grade", None, "04 Fourth"]))
+    assert list(column) == ["4th", "7th", "N/A", "4th"] and list(column.cat.categories) == list(GRADES)
+    print(f"  ✓ grade_column is categorical ({column.dtype})")
+    return True
+
+
+def test_restrictions_decided_once_per_day():
+    """Test the restricted set is computed once per day and the filter splits results"""
+    print("\nTesting per-day restricted-grade decision...")
+
+    restrictions = GradeRestrictions(['7th', '8th'])
+    assert restrictions.active() and restrictions.is_restricted("07 Seventh")
+    assert not restrictions.is_restricted("04 Fourth")
+
+    results = [{"name": "Ana", "hierarchyLevel1": "04 Fourth"},
+               {"name": "Leo", "hierarchyLevel1": "Seventh Grade"},
+               {"name": "Bia", "hierarchyLevel1": "08 Eighth"}]
+    kept, removed = restrictions.filter(results)
+    assert [r["name"] for r in kept] == ["Ana"] and [r["name"] for r in removed] == ["Leo", "Bia"]
+    print("  ✓ 7th/8th removed, 4th kept")
+
+    # Decision is cached until midnight: a date added today only applies after recomputation
+    from datetime import datetime
+    today = datetime.now().strftime('%Y-%m-%d')
+    restrictions.unrestricted_dates = frozenset([today])
+    assert restrictions.active(), "decision must not be recomputed within the day"
+    restrictions._valid_until = 0.0   # next calendar day
+    assert not restrictions.active() and restrictions.filter(results) == (results, [])
+    print("  ✓ Decision cached for the day; unrestricted date lets every grade through")
+
+    unrestricted = GradeRestrictions([])
+    assert not unrestricted.active() and not unrestricted.restricts("07 Seventh")
+    print("  ✓ No RESTRICTED_GRADES configured -> nothing filtered")
+    return True
+
+
+def test_index_records_carry_grade():
+    """Test student index records hold the normalized grade"""
+    print("\nTesting grade on student index records...")
+
+    rows = [("12345", "Ana Souza", "Class W", "04 Fourth", 4, "1001", "4W"),
+            ("12345", "Leo Souza", "Class E", "Seventh Grade", 7, "1002", "7E")]
+    assert [r.grade for r in StudentIndex(rows).lookup("12345")] == ["4th", "7th"]
+    assert [r.grade for r in StudentIndex(rows, ["4th", "7th"]).lookup("12345")] == ["4th", "7th"]
+    print("  ✓ Grade from the load-time column or derived from HierarchyLevel1")
+    return True
+
+
+def main():
+    """Run all grade tests"""
+    print("=" * 60)
+    print("GRADE NORMALIZATION TESTS (LOCAL - NO HARDWARE REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_grade_labels,
+        test_restrictions_decided_once_per_day,
+        test_index_records_carry_grade
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Unit Test: API Lookup Client
+
+Tests the pooled apiGetUserInfo client against a fake HTTP session: one
+session and one credential lookup for many scans, the circuit breaker
+skipping the API leg after failures or rejections and probing again, and the negative
+cache for unknown codes.
+Can run locally without network access or aiohttp.
+"""
+
+import sys
+import os
+import asyncio
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.lookup_client import ApiLookupClient, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self._body = body
+        self.json_calls = 0
+
+    async def json(self):
+        self.json_calls += 1
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """aiohttp.ClientSession stand-in; `healthy` toggles a backend outage"""
+
+    def __init__(self, students):
+        self.students = students
+        self.healthy = True
+        self.posts = 0
+        self.closed = False
+        self.responses = []
+
+    def post(self, url, json=None):
+        self.posts += 1
+        if not self.healthy:
+            raise ConnectionRefusedError("backend down")
+        code = json["searchCode"]
+        response = FakeResponse(200, self.students[code]) if code in self.students else FakeResponse(404, None)
+        self.responses.append(response)
+        return response
+
+    async def close(self):
+        self.closed = True
+
+
+def make_client(session, **kwargs):
+    credential_calls = []
+
+    def credentials():
+        credential_calls.append(1)
+        return ("user", "secret")
+
+    def factory(username, password):
+        assert (username, password) == ("user", "secret")
+        return session
+
+    client = ApiLookupClient("http://api/apiGetUserInfo", 1, credentials=credentials,
+                             session_factory=factory, **kwargs)
+    return client, credential_calls
+
+
+def test_session_and_credentials_reused():
+    """Test many lookups share one session, one credential lookup, one json() each"""
+    print("Testing pooled session reuse...")
+
+    session = FakeSession({"12345": [{"name": "Ana Souza"}]})
+    client, credential_calls = make_client(session)
+
+    async def run():
+        results = [await client.lookup("12345") for _ in range(10)]
+        await client.close()
+        return results
+
+    results = asyncio.run(run())
+    assert all(r == [{"name": "Ana Souza"}] for r in results)
+    assert session.posts == 10 and len(credential_calls) == 1 and session.closed
+    assert all(r.json_calls == 1 for r in session.responses)
+    print(f"  ✓ 10 lookups: 1 session, 1 credential lookup, 1 json() per response: {client.stats()}")
+    return True
+
+
+def test_circuit_breaker_skips_and_probes():
+    """Test the API leg is skipped after consecutive failures and probed again"""
+    print("\nTesting circuit breaker...")
+
+    session = FakeSession({"12345": [{"name": "Ana Souza"}]})
+    client, _ = make_client(session, failure_threshold=3, retry_interval=0.1)
+    session.healthy = False
+
+    async def scans(count):
+        for _ in range(count):
+            if client.available("12345"):
+                await client.lookup("12345")
+
+    asyncio.run(scans(10))
+    assert session.posts == 3 and client.breaker.state == OPEN
+    assert client.stats()['skipped_open'] == 7
+    print("  ✓ 3 failures open the circuit; next 7 scans skip the API")
+
+    time.sleep(0.12)
+    assert client.available("12345") and client.breaker.state == HALF_OPEN
+    assert not client.available("12345"), "only one probe while half-open"
+    asyncio.run(client.lookup("12345"))
+    assert client.breaker.state == OPEN and session.posts == 4
+    print("  ✓ Failed probe re-opens the circuit")
+
+    session.healthy = True
+    time.sleep(0.12)
+    asyncio.run(scans(3))
+    assert client.breaker.state == CLOSED and session.posts == 7
+    print(f"  ✓ Successful probe closes the circuit: {client.stats()}")
+    return True
+
+
+def test_rejections_open_breaker():
+    """Test 401/403/429 count as failures; only 200 and 404 count as success"""
+    print("\nTesting rejected lookups...")
+
+    session = FakeSession({"12345": [{"name": "Ana Souza"}]})
+    client, _ = make_client(session, failure_threshold=3, retry_interval=60)
+    statuses = iter((401, 403, 429))
+    session.post = lambda url, json=None: FakeResponse(next(statuses), None)
+
+    async def scans(count):
+        for _ in range(count):
+            if client.available("12345"):
+                assert await client.lookup("12345") is None
+
+    asyncio.run(scans(5))
+    stats = client.stats()
+    assert client.breaker.state == OPEN and stats['failures'] == 3 and stats['skipped_open'] == 2, stats
+    assert stats['not_found'] == 0 and not client.unknown, "a rejection says nothing about the code"
+    print(f"  ✓ Bad credentials / rate limiting open the circuit: {stats}")
+    return True
+
+
+def test_negative_cache_and_cancelled_probe():
+    """Test unknown codes skip the API for the TTL; a cancelled probe is released"""
+    print("\nTesting negative cache...")
+
+    session = FakeSession({})
+    client, _ = make_client(session, negative_ttl=0.1)
+
+    assert client.available("99999") and asyncio.run(client.lookup("99999")) is None
+    assert not client.available("99999") and session.posts == 1
+    assert client.breaker.state == CLOSED, "unknown code is not a backend failure"
+    time.sleep(0.12)
+    assert client.available("99999")
+    print("  ✓ Unknown code skipped until its TTL expires")
+
+    client.breaker.state = OPEN
+    client.breaker._opened_at = 0.0
+    client.breaker.retry_interval = 0.1
+    assert client.available("12345") and client.breaker.state == HALF_OPEN
+
+    class HangingResponse(FakeResponse):
+        async def __aenter__(self):
+            await asyncio.sleep(10)
+
+    async def cancelled():
+        # Local lookup wins the race: getInfo cancels the API task mid-call
+        task = asyncio.create_task(client.lookup("12345"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    session.post = lambda url, json=None: HangingResponse(200, None)
+    asyncio.run(cancelled())
+    assert client.breaker.state == OPEN
+    assert not client.available("12345"), "a cancelled probe must restart the retry interval"
+    time.sleep(0.12)
+    assert client.available("12345") and client.breaker.state == HALF_OPEN
+    print("  ✓ Probe cancelled by the race is given back; the next one waits a full interval")
+    return True
+
+
+def main():
+    """Run all API lookup client tests"""
+    print("=" * 60)
+    print("API LOOKUP CLIENT TESTS (LOCAL - NO NETWORK REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_session_and_credentials_reused,
+        test_circuit_breaker_skips_and_probes,
+        test_rejections_open_breaker,
+        test_negative_cache_and_cancelled_probe
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Unit Test: Request Metrics
+
+Tests the latency histograms (bucket percentiles), per-request stage traces,
+the Prometheus text output, the local /metrics endpoint and the JSON
+snapshot file.
+Can run locally without LoRa radio.
+"""
+
+import sys
+import os
+import json
+import tempfile
+import urllib.request
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lora import MetricsRegistry, MetricsServer, RequestTrace, SnapshotWriter
+from lora.metrics import Histogram
+
+
+def test_histogram_percentiles():
+    """Test percentiles land within one bucket of the true value"""
+    print("Testing histogram percentiles...")
+
+    histogram = Histogram()
+    for ms in range(1, 1001):           # 1ms .. 1s, uniform
+        histogram.observe(ms / 1000)
+    summary = histogram.as_dict()
+    assert summary['count'] == 1000 and summary['max_ms'] == 1000.0
+    for key, true_ms in (('p50_ms', 500), ('p95_ms', 950), ('p99_ms', 990)):
+        assert true_ms <= summary[key] <= true_ms * 1.5, (key, summary[key])
+    print(f"  ✓ p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms (<= 1.5x error)")
+    return True
+
+
+def test_request_trace_stages():
+    """Test a trace records each stage from its marks and counts the outcome"""
+    print("\nTesting request trace stages...")
+
+    registry = MetricsRegistry(prefix="test")
+    trace = RequestTrace(registry, scanner=102, packet_type="DATA", rx=100.0)
+    trace.marks.update({'start': 100.01, 'lookup_start': 100.02, 'lookup_end': 100.05})
+    trace.marks.update({'first_tx': 100.3, 'last_tx': 100.9, 'mqtt': 100.95})
+    trace.outcome = 'found'
+    trace.finish()
+
+    stages = {entry['labels']['stage']: entry for entry in registry.snapshot()['histograms']['request_stage']}
+    assert set(stages) == {'queue', 'lookup', 'first_tx', 'total', 'mqtt'}, stages
+    assert stages['lookup']['max_ms'] == 30.0 and stages['total']['max_ms'] == 900.0
+    assert stages['total']['labels'] == {'scanner': '102', 'type': 'DATA', 'stage': 'total'}
+    requests = registry.snapshot()['counters']['requests']
+    assert requests == [{'labels': {'scanner': '102', 'type': 'DATA', 'outcome': 'found'}, 'value': 1}]
+    print("  ✓ queue/lookup/first_tx/total/mqtt recorded per scanner and type; outcome counted")
+
+    # A CMD has no lookup: only the stages whose marks exist are recorded
+    cmd = RequestTrace(registry, scanner=103, packet_type="CMD")
+    cmd.mark('start')
+    cmd.mark_tx()
+    cmd.finish('cmd')
+    cmd_stages = {entry['labels']['stage'] for entry in registry.snapshot()['histograms']['request_stage']
+                  if entry['labels']['scanner'] == '103'}
+    assert cmd_stages == {'queue', 'first_tx', 'total'}, cmd_stages
+    print("  ✓ Missing marks skip their stage")
+    return True
+
+
+def test_prometheus_endpoint_and_snapshot():
+    """Test /metrics serves Prometheus text and the snapshot file is written"""
+    print("\nTesting /metrics endpoint and JSON snapshot...")
+
+    registry = MetricsRegistry(prefix="lora_server")
+    registry.inc('rx_packets', {'scanner': 102, 'type': 'DATA'}, 3)
+    registry.observe('request_stage', 0.2, {'scanner': 102, 'stage': 'total'})
+    reads = []
+    registry.add_source('radio', lambda: reads.append(1) or {'tx_frames': 7, 'rx_wait': {'avg_ms': 1.5},
+                                                             'state': 'closed'})
+    registry.refresh_sources()   # The event loop's refresh task; exporters only read its copy
+
+    server = MetricsServer(registry, port=0)
+    server.start()
+    try:
+        host, port = server.address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            text = response.read().decode('utf-8')
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics.json", timeout=5) as response:
+            snapshot = json.loads(response.read())
+    finally:
+        server.stop()
+
+    assert 'lora_server_rx_packets_total{scanner="102",type="DATA"} 3' in text
+    assert 'lora_server_request_stage_seconds_bucket{scanner="102",stage="total",le="+Inf"} 1' in text
+    assert 'lora_server_request_stage_seconds_count{scanner="102",stage="total"} 1' in text
+    assert 'lora_server_radio_tx_frames 7' in text and 'lora_server_radio_rx_wait_avg_ms 1.5' in text
+    assert 'state' not in text
+    assert snapshot['sources']['radio']['tx_frames'] == 7
+    assert len(reads) == 1, "exporter threads must not call sources"
+    print("  ✓ Counters, histogram buckets and source gauges in Prometheus text; JSON at /metrics.json")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metrics.json")
+        writer = SnapshotWriter(registry, path, interval=3600)
+        writer.start()
+        writer.stop()   # Writes a final snapshot
+        with open(path, encoding='utf-8') as f:
+            written = json.load(f)
+        assert written['counters']['rx_packets'][0]['value'] == 3
+        assert not os.path.exists(f"{path}.tmp")
+    print("  ✓ Snapshot written atomically on stop")
+    return True
+
+
+def main():
+    """Run all metrics tests"""
+    print("=" * 60)
+    print("REQUEST METRICS TESTS (LOCAL - NO HARDWARE REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_histogram_percentiles,
+        test_request_trace_stages,
+        test_prometheus_endpoint_and_snapshot
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
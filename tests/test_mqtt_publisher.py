@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Unit Test: MQTT Publisher Pipeline
+
+Tests the CaptureLora publish stage against a fake paho client: non-blocking
+hand-off, per-topic batching, journaling while the broker is down, ordered
+replay after reconnect and across restarts.
+Can run locally without LoRa radio or MQTT broker.
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.mqtt_publisher import MqttPublisher, batch_messages
+
+
+class FakeClient:
+    """paho Client stand-in: publish() fails with MQTT_ERR_NO_CONN while down"""
+
+    def __init__(self, connected: bool = True):
+        self.connected = connected
+        self.broker_up = connected
+        self.published = []
+        self.reconnect_calls = 0
+        self.lock = threading.Lock()
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def publish(self, topic, payload, qos=0):
+        with self.lock:
+            if not self.connected:
+                return (4, None)
+            self.published.append((topic, payload))
+            return (0, len(self.published))
+
+    def reconnect(self):
+        self.reconnect_calls += 1
+        if not self.broker_up:
+            raise ConnectionRefusedError("broker down")
+        self.connected = True
+
+
+def wait_for(condition, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def journal_file() -> str:
+    return os.path.join(tempfile.mkdtemp(), "mqtt_journal.jsonl")
+
+
+def test_publish_is_queued_and_ordered():
+    """Test publish() returns immediately and the worker delivers in order"""
+    print("Testing queued publishing...")
+
+    client = FakeClient()
+    publisher = MqttPublisher(client, journal_file())
+    publisher.start()
+    for i in range(20):
+        assert publisher.publish(f"Class{i % 3:02d}", json.dumps({"n": i}))
+    assert wait_for(lambda: len(client.published) == 20)
+    assert [json.loads(p)["n"] for _, p in client.published] == list(range(20))
+    publisher.stop()
+
+    metrics = publisher.metrics()
+    assert metrics['published'] == 20 and metrics['queue_depth'] == 0 and metrics['journal_pending'] == 0
+    print(f"  ✓ 20 messages delivered in order: {metrics}")
+    return True
+
+
+def test_batching_per_topic():
+    """Test one scan's students become one JSON array per topic"""
+    print("\nTesting per-scan batching...")
+
+    messages = [("Class04", '{"name": "Ana"}'), ("Class02", '{"name": "Leo"}'), ("Class04", '{"name": "Bia"}')]
+    batched = batch_messages(messages)
+    assert batched == [("Class04", '[{"name": "Ana"}, {"name": "Bia"}]'), ("Class02", '{"name": "Leo"}')]
+    assert [item["name"] for item in json.loads(batched[0][1])] == ["Ana", "Bia"]
+    print("  ✓ Same-topic students merged, single student stays a plain object")
+
+    client = FakeClient()
+    publisher = MqttPublisher(client, journal_file(), batch=True)
+    publisher.start()
+    publisher.publish_scan(messages)
+    assert wait_for(lambda: len(client.published) == 2)
+    publisher.stop()
+    print(f"  ✓ 3 students -> {len(client.published)} MQTT messages")
+    return True
+
+
+def test_journal_while_broker_down():
+    """Test messages are journaled during an outage and replayed in order"""
+    print("\nTesting journal and replay across a broker outage...")
+
+    client = FakeClient()
+    path = journal_file()
+    publisher = MqttPublisher(client, path, backoff_min=0.05, backoff_max=0.2)
+    publisher.start()
+    publisher.publish("Class01", "before")
+    assert wait_for(lambda: len(client.published) == 1)
+
+    client.connected = client.broker_up = False
+    started = time.monotonic()
+    for i in range(5):
+        publisher.publish("Class01", f"down-{i}")
+    assert time.monotonic() - started < 0.05, "publish() must not block while the broker is down"
+    assert wait_for(lambda: publisher.metrics()['journal_pending'] == 5)
+    with open(path) as f:
+        assert [json.loads(line)['payload'] for line in f] == [f"down-{i}" for i in range(5)]
+    print("  ✓ 5 messages journaled to disk, publish() stayed non-blocking")
+
+    assert wait_for(lambda: client.reconnect_calls >= 2)
+    client.broker_up = True
+    publisher.publish("Class01", "after")
+    assert wait_for(lambda: len(client.published) == 7)
+    assert [p for _, p in client.published] == ["before"] + [f"down-{i}" for i in range(5)] + ["after"]
+    assert not os.path.exists(path)
+    publisher.stop()
+    print(f"  ✓ Reconnected with backoff, journal replayed before new messages: {publisher.metrics()}")
+    return True
+
+
+def test_journal_survives_restart():
+    """Test a journal left by a previous run is replayed on start"""
+    print("\nTesting journal replay after restart...")
+
+    path = journal_file()
+    down = FakeClient(connected=False)
+    first = MqttPublisher(down, path, backoff_min=10.0)
+    first.start()
+    first.publish("Class03", "queued-1")
+    first.publish("Class03", "queued-2")
+    first.stop()
+    assert first.metrics()['journal_pending'] == 2
+
+    client = FakeClient()
+    second = MqttPublisher(client, path)
+    assert second.metrics()['journal_pending'] == 2
+    second.start()
+    assert wait_for(lambda: len(client.published) == 2)
+    second.stop()
+    assert [p for _, p in client.published] == ["queued-1", "queued-2"]
+    print("  ✓ Journal from previous run replayed in order")
+    return True
+
+
+def main():
+    """Run all MQTT publisher tests"""
+    print("=" * 60)
+    print("MQTT PUBLISHER TESTS (LOCAL - NO BROKER REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_publish_is_queued_and_ordered,
+        test_batching_per_topic,
+        test_journal_while_broker_down,
+        test_journal_survives_restart
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -12,7 +12,8 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from lora import LoRaPacket, PacketType, MultiPartFlags
+from lora import (LoRaPacket, PacketType, MultiPartFlags, RECORD_SEPARATOR, pack_records,
+                  ReassemblyBuffer, NACK_MARKER, parse_nack)
 
 
 def test_multi_packet_flags():
@@ -257,6 +258,113 @@ def test_transceiver_helper_multi():
     return True
 
 
+def test_multi_record_payload():
+    """Test several student records packed into one DATA frame"""
+    print("\nTesting multi-record payload packing...")
+
+    records = ["Ana Souza|4W", "Leo Souza|2E", "Bia Souza|KA"]
+    groups = pack_records(records, LoRaPacket.MAX_PAYLOAD)
+    assert groups == [records], f"3 siblings should share one frame, got {groups}"
+
+    packet = LoRaPacket.create(
+        packet_type=PacketType.DATA,
+        source_node=1,
+        dest_node=102,
+        payload=RECORD_SEPARATOR.join(groups[0]).encode('utf-8'),
+        sequence_num=7
+    )
+    decoded = LoRaPacket.deserialize(packet.serialize())
+    assert decoded.records == (("Ana Souza", "4W"), ("Leo Souza", "2E"), ("Bia Souza", "KA"))
+    assert not decoded.is_multi_part()
+    print(f"  ✓ {len(records)} records in one {len(packet.serialize())}-byte frame")
+
+    # Single record is byte-identical to the legacy "name|classCode" payload
+    legacy = LoRaPacket.create(PacketType.DATA, 1, 102, b"Ana Souza|4W", 8)
+    assert RECORD_SEPARATOR.join(pack_records(["Ana Souza|4W"])[0]).encode('utf-8') == legacy.payload
+    assert legacy.records == (legacy.fields,)
+    print("  ✓ Single-record payload unchanged on the wire")
+
+    return True
+
+
+def test_multi_record_overflow():
+    """Test records overflow into a multi-part sequence only when needed"""
+    print("\nTesting multi-record overflow...")
+
+    records = [f"Student Number {i:02d}|{i % 8}W" for i in range(20)]
+    groups = pack_records(records, LoRaPacket.MAX_PAYLOAD)
+    assert len(groups) > 1, "20 records should not fit one frame"
+    assert [r for g in groups for r in g] == records, "Order must be preserved"
+    for group in groups:
+        assert len(RECORD_SEPARATOR.join(group).encode('utf-8')) <= LoRaPacket.MAX_PAYLOAD
+    print(f"  ✓ {len(records)} records packed into {len(groups)} frames, all ≤ {LoRaPacket.MAX_PAYLOAD} bytes")
+
+    # Multi-byte UTF-8 names are measured in bytes, not characters
+    names = ["João Gonçalves Ávila|3W"] * 12
+    for group in pack_records(names, 60):
+        assert len(RECORD_SEPARATOR.join(group).encode('utf-8')) <= 60
+    print("  ✓ UTF-8 byte length respected")
+
+    assert pack_records([]) == []
+    return True
+
+
+def test_selective_repeat_reassembly():
+    """Test lost parts are tracked per (source, request) and NACKed by index"""
+    print("\nTesting selective-repeat reassembly...")
+
+    buffer = ReassemblyBuffer()
+    frames = {1: [("Ana Souza", "4W")], 2: [("Leo Souza", "2E")], 3: [("Bia Souza", "KA")]}
+
+    # Part 2 lost; parts of another request do not mix in
+    buffer.add(1, "P12345", 1, 3, frames[1])
+    buffer.add(1, "P99999", 1, 2, [("Other", "1A")])
+    assembly = buffer.add(1, "P12345", 3, 3, frames[3])
+    assert not assembly.complete and assembly.missing() == [2]
+    print(f"  ✓ Missing parts detected: {assembly.missing()}")
+
+    # NACK round trip through a real frame
+    os.environ["LOCAL"] = "TRUE"
+    from lora import LoRaTransceiver, NodeType
+    scanner = LoRaTransceiver(node_id=102, node_type=NodeType.SCANNER)
+    nack = LoRaPacket.deserialize(scanner.create_nack_packet(1, "P12345", assembly.missing()).serialize())
+    assert nack.text == f"{NACK_MARKER}|P12345|2"
+    assert parse_nack(nack.fields) == ("P12345", [2])
+    assert parse_nack(("NACK", "P1", "x")) is None and parse_nack(("1", "P1", "1")) is None
+    print(f"  ✓ NACK frame: {nack.text!r} ({nack.frame_size} bytes)")
+
+    # Re-sent part completes the response in order
+    assembly = buffer.add(1, "P12345", 2, 3, frames[2])
+    assert assembly.complete
+    assert assembly.records() == frames[1] + frames[2] + frames[3]
+    buffer.discard(1, "P12345")
+    assert buffer.get(1, "P12345") is None and len(buffer) == 1
+    print("  ✓ Re-sent part completed response in part order")
+
+    return True
+
+
+def test_reassembly_buffer_bounds():
+    """Test partial responses are bounded, aged out and reset on a new total"""
+    print("\nTesting reassembly buffer bounds...")
+
+    buffer = ReassemblyBuffer(max_entries=2, max_age=60.0)
+    for code in ("A", "B", "C"):
+        buffer.add(1, code, 1, 2, [])
+    assert buffer.get(1, "A") is None and len(buffer) == 2
+    print("  ✓ Oldest partial response evicted beyond max_entries")
+
+    assembly = buffer.add(1, "B", 1, 3, [])
+    assert assembly.total == 3 and assembly.missing() == [2, 3]
+    print("  ✓ Different total starts a new assembly")
+
+    buffer.max_age = 0.0
+    assert buffer.get(1, "C") is None and len(buffer) == 0
+    print("  ✓ Stale partial responses expire")
+
+    return True
+
+
 def main():
     """Run all multi-packet tests"""
     print("=" * 60)
@@ -269,7 +377,11 @@ def main():
         test_multi_packet_serialization,
         test_multi_packet_sequence_validation,
         test_transceiver_helper_single,
-        test_transceiver_helper_multi
+        test_transceiver_helper_multi,
+        test_multi_record_payload,
+        test_multi_record_overflow,
+        test_selective_repeat_reassembly,
+        test_reassembly_buffer_bounds
     ]
 
     passed = 0
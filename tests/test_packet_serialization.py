@@ -126,6 +126,118 @@ def test_all_packet_types():
     return True
 
 
+def test_wire_format_unchanged():
+    """Test the Struct codec produces the same bytes as the legacy pack path"""
+    print("\nTesting wire format against legacy struct.pack layout...")
+
+    import struct
+    from lora.packet_handler import crc16_bitwise
+
+    packet = LoRaPacket.create(
+        packet_type=PacketType.DATA,
+        source_node=1,
+        dest_node=102,
+        payload=b"Emma Smith|4W",
+        sequence_num=513,
+        multi_flags=MultiPartFlags.FIRST | MultiPartFlags.MORE,
+        multi_part_index=1,
+        multi_part_total=3
+    )
+
+    header = struct.pack(
+        '>HBBBBHHHHBBBBI',
+        LoRaPacket.MAGIC, LoRaPacket.VERSION, packet.packet_type, packet.flags,
+        packet.multi_flags, packet.source_node, packet.dest_node, packet.sender_node,
+        packet.sequence_num, packet.ttl, len(packet.payload), packet.multi_part_index,
+        packet.multi_part_total, packet.timestamp
+    )
+    legacy = header + packet.payload
+    legacy += struct.pack('>H', crc16_bitwise(legacy))
+
+    assert packet.serialize() == legacy, "Wire format changed"
+    assert packet.frame_size == len(legacy)
+    print(f"  ✓ {len(legacy)}-byte frame identical to legacy layout")
+    return True
+
+
+def test_serialize_into_buffer():
+    """Test packing into a preallocated buffer at an offset"""
+    print("\nTesting serialize_into preallocated buffer...")
+
+    packet = LoRaPacket.create(
+        packet_type=PacketType.CMD,
+        source_node=102,
+        dest_node=1,
+        payload=b"cmd|ack|release",
+        sequence_num=9
+    )
+
+    buffer = bytearray(300)
+    written = packet.serialize_into(buffer, offset=4)
+
+    assert written == packet.frame_size
+    assert bytes(buffer[4:4 + written]) == packet.serialize()
+    assert buffer[:4] == bytearray(4), "Bytes before offset must be untouched"
+    print(f"  ✓ Wrote {written} bytes at offset 4, identical to serialize()")
+    return True
+
+
+def test_deserialize_buffer_types():
+    """Test deserialize accepts bytearray and memoryview (radio buffer)"""
+    print("\nTesting deserialize from bytearray/memoryview...")
+
+    packet = LoRaPacket.create(
+        packet_type=PacketType.DATA,
+        source_node=102,
+        dest_node=1,
+        payload=b"102|P123456|1",
+        sequence_num=77
+    )
+
+    # Simulate rfm9x.receive(with_header=True): 4-byte RadioHead header + frame
+    raw = bytearray(b"\xff\x01\x00\x00") + packet.serialize()
+
+    for data in (bytearray(raw[4:]), memoryview(raw)[4:]):
+        result = LoRaPacket.deserialize(data)
+        assert result is not None, f"Failed for {type(data).__name__}"
+        assert result.payload == b"102|P123456|1"
+        assert isinstance(result.payload, bytes), "Payload must be detached bytes"
+        print(f"  ✓ {type(data).__name__}: OK")
+
+    return True
+
+
+def test_deserialize_many():
+    """Test bulk decoding of raw frames"""
+    print("\nTesting bulk deserialize_many...")
+
+    frames = []
+    for i in range(5):
+        frames.append(LoRaPacket.create(
+            packet_type=PacketType.DATA,
+            source_node=102,
+            dest_node=1,
+            payload=f"frame_{i}".encode('utf-8'),
+            sequence_num=i
+        ).serialize())
+
+    corrupted = bytearray(frames[2])
+    corrupted[-1] ^= 0xFF
+    frames[2] = bytes(corrupted)
+
+    packets = LoRaPacket.deserialize_many(frames)
+    assert len(packets) == 5, "Result must align with input"
+    assert packets[2] is None, "Corrupted frame should decode to None"
+    assert [p.sequence_num for p in packets if p] == [0, 1, 3, 4]
+    print(f"  ✓ 4 frames decoded, corrupted frame reported as None")
+
+    raw = [b"\xff\x01\x00\x00" + f for f in frames]
+    packets = LoRaPacket.deserialize_many(raw, skip=4)
+    assert [p.sequence_num for p in packets if p] == [0, 1, 3, 4]
+    print(f"  ✓ RadioHead header skipped with skip=4")
+    return True
+
+
 def main():
     """Run all serialization tests"""
     print("=" * 60)
@@ -136,7 +248,11 @@ def main():
         test_packet_roundtrip,
         test_packet_with_large_payload,
         test_packet_truncation,
-        test_all_packet_types
+        test_all_packet_types,
+        test_wire_format_unchanged,
+        test_serialize_into_buffer,
+        test_deserialize_buffer_types,
+        test_deserialize_many
     ]
 
     passed = 0
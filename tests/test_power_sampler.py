@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Unit Test: Power Telemetry Sampler
+
+Tests the repeater's background power sampler: the incremental Waveshare
+stream parser (blocks split across reads, a block cut short when the port
+opens), sampling over one open serial port into the ring buffer, min/avg/max
+in the STATUS payload, staleness when the HAT goes quiet, and PiSugar over one
+open I2C bus plus a persistent pisugar-server socket.
+Can run locally without hardware.
+"""
+
+import sys
+import os
+import socket
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.pisugar_monitor import PiSugarServerClient
+from utils.power_sampler import PiSugarSource, PowerSampler, WaveshareSource
+from utils.waveshare_monitor import WaveshareStreamParser
+
+
+def hat_block(vin: float, vout: float = 5.22, current: float = 226.0, rtc: int = 1) -> str:
+    now = time.strftime('%A %d %B %H:%M:%S %Y')
+    return (f"Now_time is {now}\r\n"
+            f"Power_State : 1\r\n"
+            f"Rtc_State : {rtc}\r\n"
+            f"Running_State : 1\r\n"
+            f"Vin_Voltage(V) : {vin:.2f}\r\n"
+            f"Vout_Voltage(V) : {vout:.2f}\r\n"
+            f"Vout_Current(MA) : {current:.2f}\r\n")
+
+
+class FakeSerial:
+    """Serial port handing out scripted chunks, then timing out like pyserial"""
+
+    def __init__(self, chunks, timeout: float):
+        self.chunks = [chunk.encode('ascii') for chunk in chunks]
+        self.timeout = timeout
+        self.closed = False
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size: int = 1) -> bytes:
+        if not self.chunks:
+            time.sleep(self.timeout)
+            return b''
+        time.sleep(0.01)
+        return self.chunks.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_parser():
+    """Test blocks split at arbitrary points are parsed once complete"""
+    print("Testing incremental Waveshare stream parser...")
+
+    stream = "Vout_Voltage(V) : 5.10\r\nVout_Current(MA) : 9.00\r\n" + hat_block(4.95) + hat_block(4.80, rtc=0)
+    parser = WaveshareStreamParser()
+    blocks = []
+    for start in range(0, len(stream), 7):
+        blocks.extend(parser.feed(stream[start:start + 7]))
+
+    # The tail of a block (port opened mid-block) has no Vin and is skipped
+    assert [block['vin_voltage'] for block in blocks] == [4.95, 4.80], blocks
+    assert blocks[1]['rtc_state'] == 0 and blocks[0]['vout_current'] == 226.0
+    print(f"  ✓ {len(stream)} bytes in 7-byte reads -> 2 blocks, partial first block skipped")
+    return True
+
+
+def test_waveshare_sampler_and_payload():
+    """Test one open port feeds the ring buffer; STATUS carries min/avg/max"""
+    print("\nTesting Waveshare sampler over a persistent port...")
+
+    chunks = []
+    for vin in (4.90, 5.00, 4.95, 5.05):
+        block = hat_block(vin, current=200.0 + (vin - 4.9) * 1000)
+        chunks.extend([block[:40], block[40:]])
+    opened = []
+
+    def port_factory(device, baud, timeout):
+        opened.append((device, baud))
+        return FakeSerial(chunks, timeout)
+
+    sampler = PowerSampler(WaveshareSource('/dev/ttyS0', 115200, port_factory=port_factory), interval=0.05)
+    sampler.start()
+    try:
+        deadline = time.monotonic() + 3.0
+        while sampler.summary()['samples'] < 4 and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        started = time.perf_counter()
+        for _ in range(10000):
+            status = sampler.latest()
+        per_read_us = (time.perf_counter() - started) / 10000 * 1e6
+        assert status['available'] and status['vin_voltage'] == 5.05
+        assert opened == [('/dev/ttyS0', 115200)], opened
+        print(f"  ✓ 4 samples from one port open; latest() {per_read_us:.1f}us per read")
+
+        summary = sampler.summary()
+        low, avg, high = summary['fields']['vin']
+        assert (low, round(avg, 3), high) == (4.90, 4.975, 5.05), summary
+        payload = sampler.status_payload()
+        parts = payload.split('|')
+        # Field positions the server reads are unchanged; empty event slot, then the range
+        assert parts[:6] == ['5.05', '5.22', '350.0', 'OK', 'OK', 'Waveshare'], parts
+        assert parts[6] == '' and parts[7].startswith('range=vin:4.90/4.98/5.05;vout:5.22/5.22/5.22;'), parts
+        assert parts[7].endswith(';n=4')
+        print(f"  ✓ STATUS payload: {payload}")
+
+        # The next STATUS only covers samples since this one (none yet): no range field
+        assert sampler.status_payload(event="SHUTDOWN") == "5.05|5.22|350.0|OK|OK|Waveshare|SHUTDOWN"
+        print("  ✓ Range resets after each STATUS")
+    finally:
+        sampler.stop()
+    return True
+
+
+def test_stale_when_hat_goes_quiet():
+    """Test latest() reports unavailable once samples stop arriving"""
+    print("\nTesting staleness...")
+
+    source = WaveshareSource(port_factory=lambda device, baud, timeout: FakeSerial([hat_block(4.99)], timeout))
+    sampler = PowerSampler(source, interval=0.05, stale_after=0.3)
+    sampler.start()
+    try:
+        time.sleep(0.15)
+        assert sampler.latest()['available']
+        time.sleep(0.4)
+        status = sampler.latest()
+        assert not status['available'] and 'no sample' in status['error'], status
+    finally:
+        sampler.stop()
+    print(f"  ✓ Stale sample reported unavailable ({status['error']})")
+    return True
+
+
+class FakeBus:
+    """PiSugar3 registers over I2C; counts opens via the factory"""
+
+    def __init__(self, voltage_mv: int):
+        self.registers = [0] * 256
+        self.registers[0x02] = 0x80                 # Power plugged
+        self.registers[0x04] = 40 + 27              # 27 C
+        self.voltage_mv = voltage_mv
+        self.closed = False
+
+    def read_byte_data(self, address, register):
+        return self.registers[register]
+
+    def read_i2c_block_data(self, address, start, length):
+        if start == 0:   # One register sweep per sample: battery drains 5 mV each
+            self.voltage_mv -= 5
+        self.registers[0x22], self.registers[0x23] = divmod(self.voltage_mv, 256)
+        return self.registers[start:start + length]
+
+    def close(self):
+        self.closed = True
+
+
+def pisugar_server(listener: socket.socket, connections: list):
+    """pisugar-server stand-in: pushes a button event, then answers each get"""
+    while True:
+        try:
+            conn, _ = listener.accept()
+        except OSError:
+            return
+        connections.append(conn)
+        conn.sendall(b"single\n")
+        with conn:
+            for line in conn.makefile('r'):
+                if line.strip() == 'get rtc_alarm_time':
+                    conn.sendall(b"rtc_alarm_time: 2026-04-23T06:45:00.000-05:00\n")
+
+
+def test_pisugar_sampler():
+    """Test PiSugar samples over one open bus and the wakeup over one socket"""
+    print("\nTesting PiSugar sampler...")
+
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    connections = []
+    threading.Thread(target=pisugar_server, args=(listener, connections), daemon=True).start()
+
+    buses = []
+
+    def bus_factory():
+        buses.append(FakeBus(3900))
+        return buses[-1]
+
+    server = PiSugarServerClient(port=listener.getsockname()[1])
+    sampler = PowerSampler(PiSugarSource(bus_factory, server=server, wakeup_interval=0.05), interval=0.02)
+    sampler.start()
+    try:
+        time.sleep(0.4)
+        status = sampler.latest()
+        assert status['available'] and status['model'] == 'PiSugar3' and status['charging']
+        assert sampler.wakeup == '06:45', sampler.wakeup
+        assert len(buses) == 1 and len(connections) == 1, (len(buses), len(connections))
+        payload = sampler.status_payload(event="STARTUP")
+        parts = payload.split('|')
+        assert parts[4:6] == ['PiSugar3', 'STARTUP'] and parts[6].startswith('range=battery:'), parts
+        samples = int(parts[6].rsplit('n=', 1)[1])
+        assert samples > 5
+    finally:
+        sampler.stop()
+        listener.close()
+    assert buses[0].closed
+    print(f"  ✓ {samples} samples, wakeup queries on 1 bus open and 1 socket: {payload}")
+    return True
+
+
+def main():
+    """Run all power sampler tests"""
+    print("=" * 60)
+    print("POWER SAMPLER TESTS (LOCAL - NO HARDWARE REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_stream_parser,
+        test_waveshare_sampler_and_payload,
+        test_stale_when_hat_goes_quiet,
+        test_pisugar_sampler
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
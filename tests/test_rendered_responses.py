@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Unit Test: Pre-rendered Responses
+
+Tests that responses rendered at data load match what the per-scan path
+builds: DATA payloads (text and directory-ID), MQTT JSON byte for byte, and
+the restricted-grade variants.
+Can run locally without LoRa radio.
+"""
+
+import sys
+import os
+import json
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set LOCAL mode to avoid hardware initialization
+os.environ["LOCAL"] = "TRUE"
+
+from lora import LoRaPacket, RECORD_SEPARATOR, pack_records
+from utils.rendered_responses import RenderedResponses
+from utils.student_directory import StudentDirectory
+from utils.student_index import StudentIndex
+
+# DeviceID, ChildName, HierarchyLevel2, HierarchyLevel1, IDHierarchy, ExternalNumber, ClassCode
+ROWS = [
+    ("12345", "Ana Souza", "Class W", "04 Fourth", 4, "1001", "4W"),
+    ("12345", "Leo Souza", "Class E", "07 Seventh", 7, "1002", "7E"),
+    ("67890", "Bia Lima", "Class A", "08 Eighth", 8, "1003", "8A"),
+    ("24680", "José \"Zé\" Ñunes", "Class B", "02 Second", 2, "1004", "2B"),
+]
+
+
+def restricted(grade_raw: str) -> bool:
+    return grade_raw[:2] in ('07', '08')
+
+
+def test_payloads_and_mqtt_match_per_scan_path():
+    """Test pre-rendered frames and MQTT bodies equal the per-scan output"""
+    print("Testing pre-rendered payloads and MQTT JSON...")
+
+    index = StudentIndex(ROWS)
+    responses = RenderedResponses(index)
+    for code in ("12345", "67890", "24680"):
+        variant = responses.get(code)
+        records = [f"{r.name}|{r.classCode}" for r in index.lookup(code)]
+        expected = [RECORD_SEPARATOR.join(group).encode('utf-8')
+                    for group in pack_records(records, LoRaPacket.MAX_PAYLOAD)]
+        assert [frame.payload for frame in variant.text] == expected, code
+
+        students = [s for frame in variant.text for s in frame.students]
+        results = index.results(code, "2", "-3", "Front Gate", "2025-01-01 08:00:00")
+        bodies = [s.mqtt_body("2", code, 3, "Front Gate", "2025-01-01 08:00:00") for s in students]
+        assert bodies == [json.dumps(result) for result in results], bodies
+    print("  ✓ Text payloads and MQTT JSON identical to the per-scan path (incl. escaping)")
+
+    assert responses.get("00000") is None and "12345" in responses
+    print(f"  ✓ Unknown DeviceID not cached; stats {responses.stats()}")
+    return True
+
+
+def test_multi_frame_and_directory():
+    """Test overflow into several frames and directory-ID frames"""
+    print("\nTesting multi-frame and directory-ID responses...")
+
+    rows = [("11111", f"Student Number {i:02d} With A Long Name", "Class", "03 Third", 3, str(i), "3C")
+            for i in range(12)]
+    index = StudentIndex(rows)
+    directory = StudentDirectory((r[1], r[6]) for r in rows)
+    variant = RenderedResponses(index, directory).get("11111")
+
+    assert len(variant.text) > 1 and all(len(f.payload) <= LoRaPacket.MAX_PAYLOAD for f in variant.text)
+    assert sum(len(f.students) for f in variant.text) == 12
+    print(f"  ✓ 12 students packed into {len(variant.text)} text frames")
+
+    decoded = [record for frame in variant.directory for record in directory.decode(frame.payload.decode('utf-8'))]
+    assert decoded == [(r[1], r[6]) for r in rows] and len(variant.directory) == 1
+    print(f"  ✓ Directory frame decodes to the same students ({len(variant.directory[0].payload)} bytes)")
+
+    partial = StudentDirectory((r[1], r[6]) for r in rows[:6])
+    assert RenderedResponses(index, partial).get("11111").directory is None
+    print("  ✓ Student missing from directory -> text only")
+    return True
+
+
+def test_restricted_variants():
+    """Test restricted-grade outcomes are rendered once and picked per day"""
+    print("\nTesting restricted-grade variants...")
+
+    responses = RenderedResponses(StudentIndex(ROWS), restricted_grade=restricted)
+
+    siblings = responses.get("12345", restrictions_active=True)
+    assert [s.record.name for f in siblings.text for s in f.students] == ["Ana Souza"]
+    assert [s.record.name for s in siblings.removed] == ["Leo Souza"]
+    assert siblings.text[0].payload == b"Ana Souza|4W"
+    print("  ✓ Restricted sibling removed from the frame")
+
+    only = responses.get("67890", restrictions_active=True)
+    assert only.all_restricted and only.directory is None
+    assert not responses.get("67890", restrictions_active=False).all_restricted
+    print("  ✓ All restricted -> RESTRICTED outcome; unrestricted day -> full response")
+
+    assert responses.get("24680", restrictions_active=True) is responses.get("24680")
+    assert responses.stats()['restricted_variants'] == 2
+    print(f"  ✓ Variant stored only where it differs: {responses.stats()}")
+    return True
+
+
+def main():
+    """Run all pre-rendered response tests"""
+    print("=" * 60)
+    print("PRE-RENDERED RESPONSE TESTS (LOCAL - NO HARDWARE REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_payloads_and_mqtt_match_per_scan_path,
+        test_multi_frame_and_directory,
+        test_restricted_variants
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
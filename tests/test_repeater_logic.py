@@ -246,6 +246,66 @@ def test_repeater_multi_packet_preservation():
     return True
 
 
+def test_repeat_frame_patching():
+    """Test repeat_frame patches the received frame identically to create_repeat"""
+    print("\nTesting in-place repeat frame patching...")
+
+    original = LoRaPacket.create(
+        packet_type=PacketType.DATA,
+        source_node=1,
+        dest_node=102,
+        payload=b"Emma Smith|4W",
+        sequence_num=321,
+        ttl=3,
+        flags=PacketFlags.ACK_REQ
+    )
+    wire = original.serialize()
+
+    # Repeater path: frame kept on receive, only header bytes + CRC patched
+    received = LoRaPacket.deserialize(wire, keep_frame=True)
+    patched = received.repeat_frame(200)
+    expected = received.create_repeat(200).serialize()
+    assert patched == expected, "Patched frame differs from re-serialized repeat"
+
+    # Fallback path: no kept frame
+    assert LoRaPacket.deserialize(wire).repeat_frame(200) == expected
+    print(f"  ✓ Patched frame identical to create_repeat().serialize() ({len(patched)} bytes)")
+
+    repeated = LoRaPacket.deserialize(patched)
+    assert repeated is not None, "Patched frame must pass CRC"
+    assert repeated.sender_node == 200 and repeated.ttl == 2 and repeated.is_repeat
+    assert repeated.flags & PacketFlags.ACK_REQ, "Original flags must be kept"
+    print(f"  ✓ Patched frame decodes: sender={repeated.sender_node}, ttl={repeated.ttl}")
+
+    return True
+
+
+def test_lazy_payload_fields():
+    """Test cached text/fields views and slotted packet layout"""
+    print("\nTesting lazy payload decoding...")
+
+    packet = LoRaPacket.deserialize(LoRaPacket.create(
+        packet_type=PacketType.HELLO,
+        source_node=102,
+        dest_node=1,
+        payload=b"HELLO|12|SCANNER",
+        sequence_num=13
+    ).serialize())
+
+    assert packet.fields == ('HELLO', '12', 'SCANNER')
+    assert packet.fields is packet.fields, "fields should be cached"
+    assert packet.text == "HELLO|12|SCANNER"
+    assert not hasattr(packet, '__dict__'), "LoRaPacket should be slotted"
+    print(f"  ✓ fields={packet.fields} (cached, no __dict__)")
+
+    # Caches must not affect equality
+    fresh = LoRaPacket.deserialize(packet.serialize())
+    assert fresh == packet, "Cached views must not take part in comparison"
+    print(f"  ✓ Cached views excluded from equality")
+
+    return True
+
+
 def main():
     """Run all repeater logic tests"""
     print("=" * 60)
@@ -259,7 +319,9 @@ def main():
         test_repeater_serialization,
         test_multi_hop_path,
         test_repeater_timestamp_preservation,
-        test_repeater_multi_packet_preservation
+        test_repeater_multi_packet_preservation,
+        test_repeat_frame_patching,
+        test_lazy_payload_fields
     ]
 
     passed = 0
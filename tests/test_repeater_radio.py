@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Unit Test: Repeater Radio Thread
+
+Tests the repeater split into a radio thread (receive + forward) and
+housekeeping: on a simulated medium where the scanner only reaches the server
+through the repeater, every request is forwarded while housekeeping is busy
+showing the OLED info screens; STATUS packets queued by housekeeping go out
+from the radio thread; duplicates / TTL drops are counted; the forward
+queue sends control before data before status, round robin per source,
+drops the oldest frame of the busiest source when a class is full, and
+keeps receiving while a forward waits to be retried; with contention
+flooding, of two overlapping repeaters only the one with the weaker link
+forwards and the other suppresses its copy, freeing its queue slot.
+Can run locally without LoRa radio.
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set LOCAL mode to avoid hardware initialization
+os.environ["LOCAL"] = "TRUE"
+
+from lora import (LoRaPacket, LoRaTransceiver, NodeType, PacketType, RepeaterRadio, RepeaterStats,
+                  SimulatedMedium)
+from lora.repeater_node import FORWARD_PRIORITY
+
+SERVER_ID = 1
+SCANNER_ID = 102
+REPEATER_ID = 200
+
+
+def build_site():
+    """Scanner <-> repeater <-> server; scanner and server out of range of each other"""
+    medium = SimulatedMedium(default_link=None, seed=7)
+    medium.set_link(SCANNER_ID, REPEATER_ID, rssi=-95.0, snr=3.0)
+    medium.set_link(REPEATER_ID, SERVER_ID, rssi=-80.0, snr=7.0)
+    scanner = LoRaTransceiver(SCANNER_ID, NodeType.SCANNER, radio=medium.attach(SCANNER_ID))
+    repeater = LoRaTransceiver(REPEATER_ID, NodeType.REPEATER, radio=medium.attach(REPEATER_ID))
+    server = LoRaTransceiver(SERVER_ID, NodeType.SERVER, radio=medium.attach(SERVER_ID))
+    return medium, scanner, repeater, server
+
+
+def collect(server: LoRaTransceiver, received: list, stop: threading.Event) -> None:
+    while not stop.is_set():
+        packet = server.receive_packet(timeout=0.1)
+        if packet is not None:
+            received.append(packet)
+
+
+def show_info_screens(busy: list) -> None:
+    """Housekeeping stand-in for repeater._show_info_screens: four blocking screens"""
+    busy.append(time.monotonic())
+    for _ in range(4):
+        time.sleep(0.6)
+    busy.append(time.monotonic())
+
+
+def test_forwards_while_info_screens_run():
+    """Test no forward is lost while housekeeping is blocked in the info screens"""
+    print("Testing forwarding during OLED info screens (simulated radios)...")
+
+    medium, scanner, repeater, server = build_site()
+    stats = RepeaterStats()
+    radio = RepeaterRadio(repeater, stats, collision_avoidance=False, poll_interval=0.1)
+    received, stop = [], threading.Event()
+    listener = threading.Thread(target=collect, args=(server, received, stop), daemon=True)
+    listener.start()
+    radio.start()
+    try:
+        busy = []
+        housekeeping = threading.Thread(target=show_info_screens, args=(busy,))
+        housekeeping.start()
+        time.sleep(0.05)
+        sent_at = []
+        for index in range(10):
+            request = scanner.create_data_packet(dest_node=SERVER_ID, payload=f"1|CODE{index}|1".encode())
+            sent_at.append(time.monotonic())
+            assert scanner.send_packet(request, use_ack=False)
+            time.sleep(0.12)
+        housekeeping.join()
+        time.sleep(0.3)
+    finally:
+        radio.stop()
+        stop.set()
+        listener.join(1.0)
+        medium.close()
+
+    assert busy[0] < sent_at[0] and sent_at[-1] < busy[1], "requests must be sent while screens are showing"
+    codes = sorted(packet.fields[1] for packet in received if packet.packet_type == PacketType.DATA)
+    assert codes == sorted(f"CODE{index}" for index in range(10)), codes
+    assert all(packet.sender_node == REPEATER_ID and packet.is_repeat for packet in received)
+    assert stats.packets_forwarded == 10 and stats.packets_forward_failed == 0
+    assert radio.last_forward == (SCANNER_ID, SERVER_ID)
+    print(f"  ✓ 10/10 requests forwarded during {busy[1] - busy[0]:.1f}s of info screens, 0 dropped")
+    return True
+
+
+def test_status_commands_from_housekeeping():
+    """Test STATUS packets queued by housekeeping are sent by the radio thread"""
+    print("\nTesting housekeeping STATUS commands...")
+
+    medium, scanner, repeater, server = build_site()
+    radio = RepeaterRadio(repeater, collision_avoidance=False, poll_interval=0.05, max_commands=2)
+    received, stop = [], threading.Event()
+    listener = threading.Thread(target=collect, args=(server, received, stop), daemon=True)
+    listener.start()
+    results = []
+    try:
+        # Queued before the thread runs: the third one does not fit
+        first = radio.send_status(b"STATUS|Vin=5.10", on_sent=results.append)
+        radio.send_status(b"STATUS|Vin=5.09")
+        dropped = radio.send_status(b"STATUS|Vin=5.08")
+        assert dropped.is_set() and radio.stats.commands_dropped == 1
+        radio.start()
+        assert first.wait(2.0) and results == [True]
+        shutdown = radio.send_status(b"STATUS|SHUTDOWN")
+        radio.stop()   # Pending commands are flushed on stop
+        assert shutdown.is_set()
+        time.sleep(0.3)
+    finally:
+        stop.set()
+        listener.join(1.0)
+        medium.close()
+
+    statuses = [packet.payload for packet in received if packet.packet_type == PacketType.STATUS]
+    assert statuses == [b"STATUS|Vin=5.10", b"STATUS|Vin=5.09", b"STATUS|SHUTDOWN"], statuses
+    assert all(packet.source_node == REPEATER_ID for packet in received)
+    assert radio.stats.status_sent == 3
+    print("  ✓ 3 STATUS packets sent from the radio thread, 1 dropped on a full queue, flushed on stop")
+    return True
+
+
+def test_drop_counters():
+    """Test duplicate and TTL drops are counted by handle()"""
+    print("\nTesting drop counters...")
+
+    repeater = LoRaTransceiver(REPEATER_ID, NodeType.REPEATER)
+    radio = RepeaterRadio(repeater, collision_avoidance=False)
+    packet = LoRaPacket.create(packet_type=PacketType.DATA, source_node=SCANNER_ID, dest_node=SERVER_ID,
+                               payload=b"1|CODE|1", sequence_num=5, ttl=3)
+    expired = LoRaPacket.create(packet_type=PacketType.DATA, source_node=SCANNER_ID, dest_node=SERVER_ID,
+                                payload=b"1|CODE|1", sequence_num=6, ttl=0)
+    assert radio.handle(packet) and not radio.handle(packet) and not radio.handle(expired)
+    stats = radio.stats
+    assert (stats.packets_received, stats.queue_depth) == (3, 1)
+    assert (stats.packets_dropped_duplicate, stats.packets_dropped_ttl, stats.packets_dropped) == (1, 1, 2)
+    radio.start()
+    try:
+        deadline = time.monotonic() + 2.0
+        while stats.packets_forwarded < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        radio.stop()
+    assert stats.packets_forwarded == 1 and stats.queue_depth == 0
+    print("  ✓ 1 forwarded, 1 duplicate, 1 TTL expired")
+    return True
+
+
+class RecordingRadio:
+    """Radio handing out prepared frames (RadioHead header included); records sends"""
+
+    def __init__(self, frames=(), fail_first: int = 0):
+        self.frames = list(frames)
+        self.fail_first = fail_first
+        self.sent = []          # (frame, packets received by the repeater at that moment)
+        self.stats = None
+        self.last_rssi = -90
+        self.last_snr = 5.0
+
+    def receive(self, with_header=True, timeout=0.5):
+        if not self.frames:
+            time.sleep(min(timeout, 0.01))
+            return None
+        return bytearray(bytes(4) + self.frames.pop(0))
+
+    def send(self, data, **kwargs):
+        self.sent.append((bytes(data), self.stats.packets_received if self.stats else 0))
+        return True
+
+    def send_with_ack(self, data, **kwargs):
+        if self.fail_first > 0:
+            self.fail_first -= 1
+            return False
+        return self.send(data)
+
+
+def make_packet(packet_type: PacketType, source: int, seq: int, dest: int = SERVER_ID) -> LoRaPacket:
+    return LoRaPacket.create(packet_type=packet_type, source_node=source, dest_node=dest,
+                             payload=f"{packet_type.name}|{source}|{seq}".encode(), sequence_num=seq, ttl=3)
+
+
+def test_forward_queue_priority_and_fairness():
+    """Test CONTROL > DATA > STATUS, round robin per source, drop-oldest of the busiest source"""
+    print("\nTesting forward queue priority, fairness and overflow...")
+
+    radio_hw = RecordingRadio()
+    repeater = LoRaTransceiver(REPEATER_ID, NodeType.REPEATER, radio=radio_hw)
+    radio = RepeaterRadio(repeater, collision_avoidance=False, queue_per_class=4, aging=0)
+    radio_hw.stats = radio.stats
+
+    # A burst arrives before the radio thread gets to send anything
+    queued = [make_packet(PacketType.DATA, 102, seq) for seq in range(1, 7)]      # Flooding scanner
+    queued += [make_packet(PacketType.DATA, 103, 1), make_packet(PacketType.STATUS, 201, 1)]
+    queued += [make_packet(PacketType.CMD, 104, 1), make_packet(PacketType.HELLO, 105, 1)]
+    for packet in queued:
+        assert radio.handle(packet)
+
+    stats = radio.stats
+    assert stats.packets_dropped_queue == 3 and stats.queue_drops['data'] == 3, stats.queue_drops
+    assert stats.queue_depth == stats.queue_peak == 7
+
+    radio.start()
+    try:
+        deadline = time.monotonic() + 2.0
+        while len(radio_hw.sent) < 7 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        radio.stop()
+
+    order = [LoRaPacket.deserialize(frame).text for frame, _ in radio_hw.sent]
+    assert order == ["CMD|104|1", "HELLO|105|1",
+                     "DATA|102|4", "DATA|103|1", "DATA|102|5", "DATA|102|6",
+                     "STATUS|201|1"], order
+    assert stats.packets_forwarded == 7 and stats.queue_depth == 0
+    assert FORWARD_PRIORITY[PacketType.HELLO_ACK] == FORWARD_PRIORITY[PacketType.CMD]
+    print("  ✓ Control first, scanner 103 not starved by 102, STATUS last")
+    print("  ✓ DATA class full: scanner 102's 3 oldest frames dropped, nobody else's")
+    return True
+
+
+def test_receives_while_forward_waits():
+    """Test RX continues while a forward waits for its airtime slot and retry"""
+    print("\nTesting reception during airtime pacing and retry backoff...")
+
+    frames = [make_packet(PacketType.DATA, 100 + index, 1).serialize() for index in range(5)]
+    radio_hw = RecordingRadio(frames, fail_first=1)
+    repeater = LoRaTransceiver(REPEATER_ID, NodeType.REPEATER, radio=radio_hw)
+    radio = RepeaterRadio(repeater, collision_avoidance=True, poll_interval=0.05)
+    radio_hw.stats = radio.stats
+    radio.start()
+    try:
+        deadline = time.monotonic() + 3.0
+        while radio.stats.packets_forwarded < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        radio.stop()
+
+    stats = radio.stats
+    assert stats.packets_forwarded == 5 and stats.forward_retries == 1 and stats.packets_forward_failed == 0
+    # The first frame's slot wait and failed attempt did not hold up the other four receptions
+    assert radio_hw.sent[0][1] == 5, radio_hw.sent
+    print(f"  ✓ 5/5 forwarded after 1 retry; all 5 received before the first successful send")
+    return True
+
+
+def contention_site():
+    """Scanner heard weakly by repeater 200 and strongly by 201; both reach the server and each other"""
+    medium = SimulatedMedium(default_link=None, seed=11)
+    medium.set_link(SCANNER_ID, REPEATER_ID, rssi=-112.0, snr=-11.0)
+    medium.set_link(SCANNER_ID, REPEATER_ID + 1, rssi=-72.0, snr=8.0)
+    medium.set_link(REPEATER_ID, REPEATER_ID + 1, rssi=-75.0, snr=7.0)
+    for repeater_id in (REPEATER_ID, REPEATER_ID + 1):
+        medium.set_link(repeater_id, SERVER_ID, rssi=-85.0, snr=5.0)
+    scanner = LoRaTransceiver(SCANNER_ID, NodeType.SCANNER, radio=medium.attach(SCANNER_ID))
+    server = LoRaTransceiver(SERVER_ID, NodeType.SERVER, radio=medium.attach(SERVER_ID))
+    radios = [RepeaterRadio(LoRaTransceiver(node, NodeType.REPEATER, radio=medium.attach(node)),
+                            collision_avoidance=True, poll_interval=0.05, contention=True)
+              for node in (REPEATER_ID, REPEATER_ID + 1)]
+    return medium, scanner, server, radios
+
+
+def test_contention_suppression():
+    """Test the weak-link repeater forwards first and the strong-link one cancels its copy"""
+    print("\nTesting contention flooding suppression...")
+
+    plain = LoRaPacket.create(packet_type=PacketType.DATA, source_node=SCANNER_ID, dest_node=SERVER_ID,
+                              payload=b"1|CODE|1", sequence_num=9, ttl=3)
+    repeated = LoRaPacket.deserialize(plain.repeat_frame(REPEATER_ID))
+    seen = {(SCANNER_ID, 9)}
+    assert repeated.should_process(REPEATER_ID + 1, NodeType.REPEATER, seen, contention=True) == \
+        (False, "overheard_repeat")
+    assert repeated.should_process(REPEATER_ID + 1, NodeType.REPEATER, seen) == (False, "duplicate")
+    assert plain.should_process(REPEATER_ID + 1, NodeType.REPEATER, seen, contention=True) == \
+        (False, "duplicate")
+
+    medium, scanner, server, (weak, strong) = contention_site()
+    received, stop = [], threading.Event()
+    listener = threading.Thread(target=collect, args=(server, received, stop), daemon=True)
+    listener.start()
+    for radio in (weak, strong):
+        radio.start()
+    try:
+        for index in range(5):
+            request = scanner.create_data_packet(dest_node=SERVER_ID, payload=f"1|CODE{index}|1".encode())
+            assert scanner.send_packet(request, use_ack=False)
+            time.sleep(1.0)
+    finally:
+        for radio in (weak, strong):
+            radio.stop()
+        stop.set()
+        listener.join(1.0)
+        medium.close()
+
+    assert weak.stats.packets_forwarded == 5 and strong.stats.packets_forwarded == 0, \
+        (weak.stats.packets_forwarded, strong.stats.packets_forwarded)
+    assert strong.stats.forwards_suppressed == 5 and strong.stats.repeats_overheard == 5
+    codes = sorted(packet.fields[1] for packet in received)
+    assert codes == [f"CODE{index}" for index in range(5)], codes
+    print("  ✓ 5/5 requests reached the server, forwarded once each by the weak-link repeater")
+    print("  ✓ Strong-link repeater suppressed 5 forwards after overhearing them")
+    return True
+
+
+def test_suppressed_forwards_leave_queue():
+    """Test suppressed copies leave the forward queue instead of filling its class"""
+    print("\nTesting suppressed forwards free their queue slots...")
+
+    repeater = LoRaTransceiver(REPEATER_ID, NodeType.REPEATER, radio=RecordingRadio())
+    radio = RepeaterRadio(repeater, collision_avoidance=False, queue_per_class=3, aging=0, contention=True)
+    for seq in range(1, 4):
+        assert radio.handle(make_packet(PacketType.DATA, SCANNER_ID, seq))
+    stats = radio.stats
+    assert stats.queue_depth == 3
+
+    # Another repeater forwards all three first: our copies are cancelled and dequeued
+    for seq in range(1, 4):
+        frame = make_packet(PacketType.DATA, SCANNER_ID, seq).repeat_frame(REPEATER_ID + 1)
+        assert not radio.handle(LoRaPacket.deserialize(frame))
+    assert stats.forwards_suppressed == 3 and stats.queue_depth == 0 and not radio.forward_queue
+
+    for seq in range(1, 4):
+        assert radio.handle(make_packet(PacketType.DATA, SCANNER_ID + 1, seq))
+    assert stats.packets_dropped_queue == 0 and stats.queue_depth == 3
+    print("  ✓ 3 suppressed forwards removed; 3 new frames fit a 3-frame class without drops")
+    return True
+
+
+def main():
+    """Run all repeater radio tests"""
+    print("=" * 60)
+    print("REPEATER RADIO THREAD TESTS (LOCAL - NO HARDWARE REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_forwards_while_info_screens_run,
+        test_status_commands_from_housekeeping,
+        test_drop_counters,
+        test_forward_queue_priority_and_fairness,
+        test_receives_while_forward_waits,
+        test_contention_suppression,
+        test_suppressed_forwards_leave_queue
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Unit Test: Learned Next-Hop Routing
+
+Tests the route table learned from (source, sender, rssi, snr) observations
+(best fresh link wins, aging back to flooding, bounded size), the next-hop
+hint on the wire (round trip, invisible to the payload, dropped when it does
+not fit), and on a simulated site with two repeaters: the server learns which
+repeater hears the scanner best, replies carry that repeater as next hop and
+only it forwards them; a stale route on the server, or a repeater without a
+route onward, falls back to flooding.
+Can run locally without LoRa radio.
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set LOCAL mode to avoid hardware initialization
+os.environ["LOCAL"] = "TRUE"
+
+from lora import (AsyncLoRaTransceiver, LoRaPacket, LoRaTransceiver, NodeType, PacketFlags, PacketType,
+                  RepeaterRadio, RouteTable, SimulatedMedium)
+from lora.packet_handler import set_next_hop
+
+SERVER_ID = 1
+SCANNER_ID = 102
+NEAR_ID = 200   # Repeater with the better link to the server
+FAR_ID = 201
+
+
+def test_route_table():
+    """Test the best fresh neighbor is chosen and routes age out"""
+    print("Testing route table learning and aging...")
+
+    routes = RouteTable(max_age=10.0, max_entries=3, max_neighbors=2)
+    routes.observe(SCANNER_ID, SCANNER_ID, rssi=-110, snr=-12.0, now=0.0)   # Heard directly, weak
+    routes.observe(SCANNER_ID, NEAR_ID, rssi=-70, snr=8.0, now=1.0)
+    routes.observe(SCANNER_ID, FAR_ID, rssi=-90, snr=2.0, now=2.0)          # Evicts the stalest (direct)
+    assert routes.next_hop(SCANNER_ID, now=3.0) == NEAR_ID
+    assert routes.next_hop(SCANNER_ID, exclude=(NEAR_ID,), now=3.0) == FAR_ID
+    print("  ✓ Best link wins; excluded neighbor skipped; stalest neighbor evicted")
+
+    # NEAR goes quiet: once its route is stale FAR is used, then nothing (flood)
+    routes.observe(SCANNER_ID, FAR_ID, rssi=-90, snr=2.0, now=8.0)
+    assert routes.next_hop(SCANNER_ID, now=12.0) == FAR_ID
+    assert routes.next_hop(SCANNER_ID, now=30.0) is None
+    assert routes.next_hop(999, now=30.0) is None
+    stats = routes.stats()
+    assert (stats['hits'], stats['stale'], stats['misses']) == (3, 1, 1), stats
+    print("  ✓ Stale routes fall back to the next fresh one, then to flooding")
+
+    # Fewer hops first: a scanner heard directly beats a relaying repeater, unless its link is too weak
+    routes.observe(103, NEAR_ID, snr=9.0, ttl=2, now=35.0)
+    routes.observe(103, 103, snr=-5.0, ttl=3, now=35.0)
+    assert routes.next_hop(103, now=36.0) == 103
+    routes.observe(104, NEAR_ID, snr=9.0, ttl=2, now=35.0)
+    routes.observe(104, 104, snr=-15.0, ttl=3, now=35.0)
+    assert routes.next_hop(104, now=36.0) == NEAR_ID
+    print("  ✓ Direct link preferred over a relay; a too-weak direct link is not")
+
+    for node in (103, 104, 105):
+        routes.observe(node, node, snr=5.0, now=40.0)
+    assert len(routes) == 3 and routes.stats()['evictions'] == 1
+    assert routes.forget(105) and not routes.forget(105)
+    print("  ✓ Table bounded by max_entries; forget() drops a destination")
+    return True
+
+
+def test_next_hop_on_the_wire():
+    """Test the hint round-trips and leaves the payload untouched"""
+    print("\nTesting next-hop hint encoding...")
+
+    packet = LoRaPacket.create(packet_type=PacketType.DATA, source_node=SERVER_ID, dest_node=SCANNER_ID,
+                               payload=b"Ana|4W", sequence_num=7)
+    plain = packet.serialize()
+    hinted = set_next_hop(plain, NEAR_ID)
+    decoded = LoRaPacket.deserialize(hinted, keep_frame=True)
+    assert decoded.next_hop == NEAR_ID and decoded.flags & PacketFlags.NEXT_HOP
+    assert decoded.payload == b"Ana|4W" and len(hinted) == len(plain) + 2
+    packet.next_hop = NEAR_ID
+    assert packet.serialize() == hinted and packet.frame_size == len(hinted)
+    print(f"  ✓ Hint adds 2 bytes after the payload; payload_len unchanged ({decoded})")
+
+    # Patched repeat keeps the hint; removing it restores the original frame
+    assert LoRaPacket.deserialize(decoded.repeat_frame(NEAR_ID)).next_hop == NEAR_ID
+    assert set_next_hop(hinted, None) == plain
+    assert LoRaPacket.deserialize(set_next_hop(hinted, FAR_ID)).next_hop == FAR_ID
+
+    full = LoRaPacket.create(packet_type=PacketType.DATA, source_node=SERVER_ID, dest_node=SCANNER_ID,
+                             payload=b"x" * LoRaPacket.MAX_PAYLOAD, sequence_num=8).serialize()
+    assert set_next_hop(full, NEAR_ID) == full
+    print("  ✓ Repeats keep the hint; a full-size frame is sent without one")
+    return True
+
+
+def build_site(server_max_age: float = 300.0):
+    """Scanner heard by both repeaters; the server hears NEAR much better than FAR"""
+    medium = SimulatedMedium(default_link=None, seed=5)
+    medium.set_link(SCANNER_ID, NEAR_ID, rssi=-85.0, snr=6.0)
+    medium.set_link(SCANNER_ID, FAR_ID, rssi=-95.0, snr=2.0)
+    medium.set_link(NEAR_ID, SERVER_ID, rssi=-70.0, snr=9.0)
+    medium.set_link(FAR_ID, SERVER_ID, rssi=-100.0, snr=-2.0)
+    medium.set_link(NEAR_ID, FAR_ID, rssi=-80.0, snr=7.0)
+    scanner = LoRaTransceiver(SCANNER_ID, NodeType.SCANNER, radio=medium.attach(SCANNER_ID))
+    server = LoRaTransceiver(SERVER_ID, NodeType.SERVER, radio=medium.attach(SERVER_ID))
+    server.routes = RouteTable(max_age=server_max_age)
+    repeaters = {node: RepeaterRadio(LoRaTransceiver(node, NodeType.REPEATER, radio=medium.attach(node)),
+                                     collision_avoidance=True, poll_interval=0.05, routing=True)
+                 for node in (NEAR_ID, FAR_ID)}
+    return medium, scanner, server, repeaters
+
+
+def collect(transceiver: LoRaTransceiver, received: list, stop: threading.Event) -> None:
+    while not stop.is_set():
+        packet = transceiver.receive_packet(timeout=0.1)
+        if packet is not None:
+            received.append(packet)
+
+
+def send_requests(scanner: LoRaTransceiver, server: LoRaTransceiver, count: int) -> list:
+    """Scanner requests, flooded through both repeaters; the server learns from them"""
+    received, stop = [], threading.Event()
+    listener = threading.Thread(target=collect, args=(server, received, stop), daemon=True)
+    listener.start()
+    for index in range(count):
+        request = scanner.create_data_packet(dest_node=SERVER_ID, payload=f"1|CODE{index}|1".encode())
+        assert scanner.send_packet(request, use_ack=False)
+        time.sleep(0.8)
+    stop.set()
+    listener.join(1.0)
+    return received
+
+
+async def send_replies(server: LoRaTransceiver, count: int, pause: float = 0.8) -> int:
+    radio = AsyncLoRaTransceiver(server, poll_interval=0.05)
+    radio.start()
+    try:
+        for index in range(count):
+            reply = server.create_data_packet(dest_node=SCANNER_ID, payload=f"Student{index}|4W".encode())
+            assert await radio.send(reply, use_ack=False)
+            await asyncio.sleep(pause)
+    finally:
+        radio.stop()
+    return radio.tx_routed
+
+
+def test_replies_follow_learned_path():
+    """Test only the repeater on the learned path forwards the server's replies"""
+    print("\nTesting replies along the learned path...")
+
+    medium, scanner, server, repeaters = build_site()
+    near, far = repeaters[NEAR_ID], repeaters[FAR_ID]
+    replies, stop = [], threading.Event()
+    for radio in repeaters.values():
+        radio.start()
+    try:
+        requests = send_requests(scanner, server, 4)
+        assert sorted(packet.fields[1] for packet in requests) == [f"CODE{i}" for i in range(4)], requests
+        assert server.routes.next_hop(SCANNER_ID) == NEAR_ID, server.routes.routes()
+        print(f"  ✓ 4/4 requests via both repeaters; server route to {SCANNER_ID}: "
+              f"{[(r['via'], r['quality']) for r in server.routes.routes()]}")
+
+        listener = threading.Thread(target=collect, args=(scanner, replies, stop), daemon=True)
+        listener.start()
+        routed = asyncio.run(send_replies(server, 4))
+    finally:
+        for radio in repeaters.values():
+            radio.stop()
+        stop.set()
+        medium.close()
+
+    assert routed == 4, routed
+    assert len(replies) == 4 and all(packet.next_hop == SCANNER_ID for packet in replies), replies
+    # FAR hears the server's frame (hint NEAR) and NEAR's repeat (hint scanner): quiet on both
+    assert near.stats.forwards_routed == 4 and far.stats.forwards_off_path >= 4, \
+        (near.stats.forwards_routed, far.stats.forwards_off_path)
+    # Requests: both forwarded all 4; replies: only NEAR
+    assert (near.stats.packets_forwarded, far.stats.packets_forwarded) == (8, 4), \
+        (near.stats.packets_forwarded, far.stats.packets_forwarded)
+    print(f"  ✓ 4/4 replies delivered, forwarded by {NEAR_ID} only (hint -> scanner), "
+          f"{FAR_ID} stayed quiet ({far.stats.forwards_off_path} hinted frames not forwarded)")
+    return True
+
+
+def test_stale_or_unknown_route_floods():
+    """Test a stale server route and a repeater without a route onward both flood"""
+    print("\nTesting flood fallback...")
+
+    medium, scanner, server, repeaters = build_site(server_max_age=0.5)
+    near, far = repeaters[NEAR_ID], repeaters[FAR_ID]
+    replies, stop = [], threading.Event()
+    for radio in repeaters.values():
+        radio.start()
+    try:
+        send_requests(scanner, server, 1)
+        listener = threading.Thread(target=collect, args=(scanner, replies, stop), daemon=True)
+        listener.start()
+
+        # Server route stale: the reply goes out without a hint and both repeaters forward it
+        time.sleep(0.6)
+        assert asyncio.run(send_replies(server, 1)) == 0
+        assert (near.stats.packets_forwarded, far.stats.packets_forwarded) == (2, 2)
+        print("  ✓ Stale server route: reply flooded by both repeaters")
+
+        # Fresh route on the server, but NEAR has lost its own: it drops the hint and
+        # FAR, hearing the unhinted copy, forwards it as well
+        server.routes.max_age = 300.0
+        send_requests(scanner, server, 1)
+        near.routes.forget(SCANNER_ID)
+        near.routes.forget(FAR_ID)
+        routed = asyncio.run(send_replies(server, 1))
+        assert routed == 1, routed
+        time.sleep(0.5)
+    finally:
+        for radio in repeaters.values():
+            radio.stop()
+        stop.set()
+        medium.close()
+
+    assert near.stats.forwards_flooded == 1 and far.stats.forwards_off_path == 1, \
+        (near.stats.forwards_flooded, far.stats.forwards_off_path)
+    assert (near.stats.packets_forwarded, far.stats.packets_forwarded) == (4, 4), \
+        (near.stats.packets_forwarded, far.stats.packets_forwarded)
+    assert len(replies) == 2, replies
+    print("  ✓ No route onward at the next hop: hint dropped, reply flooded from there")
+    return True
+
+
+def main():
+    """Run all routing tests"""
+    print("=" * 60)
+    print("NEXT-HOP ROUTING TESTS (LOCAL - NO HARDWARE REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_route_table,
+        test_next_hop_on_the_wire,
+        test_replies_follow_learned_path,
+        test_stale_or_unknown_route_floods
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Unit Test: Per-Scanner Request Dispatcher
+
+Tests the CaptureLora request fan-out: one scanner's requests are handled in
+order, different scanners are served concurrently while their frames share
+the radio thread's TX queue, full queues drop only that scanner's requests,
+and queueing delay is reported per scanner.
+Can run locally without LoRa radio.
+"""
+
+import sys
+import os
+import time
+import asyncio
+from collections import deque
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set LOCAL mode to avoid hardware initialization
+os.environ["LOCAL"] = "TRUE"
+
+from lora import AsyncLoRaTransceiver, LoRaTransceiver, NodeType, ScannerDispatcher, TxScheduler
+
+
+class FakeRFM9x:
+    """In-memory radio recording (time, frame) for every send"""
+
+    def __init__(self):
+        self.rx = deque()
+        self.sent = []
+
+    def receive(self, with_header=True, timeout=0.5):
+        time.sleep(timeout)
+        return None
+
+    def send(self, data):
+        self.sent.append((time.monotonic(), bytes(data)))
+        return True
+
+    send_with_ack = send
+
+
+def make_radio():
+    transceiver = LoRaTransceiver(node_id=1, node_type=NodeType.SERVER)
+    transceiver.rfm9x = FakeRFM9x()
+    transceiver.tx_scheduler = TxScheduler(jitter=(0.0, 0.0))
+    return AsyncLoRaTransceiver(transceiver, poll_interval=0.01)
+
+
+def test_order_per_scanner_concurrent_across():
+    """Test one scanner's requests stay ordered while another scanner is not held up"""
+    print("Testing per-scanner ordering and cross-scanner concurrency...")
+
+    radio = make_radio()
+    dispatcher = ScannerDispatcher()
+    done = []
+
+    async def handle(scanner, code, lookup_s):
+        await asyncio.sleep(lookup_s)   # lookup
+        for part in (1, 2):             # two response frames
+            reply = radio.transceiver.create_data_packet(dest_node=scanner, payload=f"{code}/{part}".encode())
+            assert await radio.send(reply, use_ack=True)
+        done.append((scanner, code, time.monotonic()))
+
+    async def scenario():
+        radio.start()
+        try:
+            started = time.monotonic()
+            for code in ("A1", "A2", "A3"):
+                dispatcher.submit(102, handle, 102, code, 0.1)
+            dispatcher.submit(103, handle, 103, "B1", 0.1)
+            await dispatcher.join()
+            return started, time.monotonic() - started
+        finally:
+            await dispatcher.close()
+            radio.stop()
+
+    started, elapsed = asyncio.run(scenario())
+    assert [code for scanner, code, _ in done if scanner == 102] == ["A1", "A2", "A3"]
+    finished_b1 = next(t for scanner, code, t in done if code == "B1") - started
+    finished_a1 = next(t for scanner, code, t in done if code == "A1") - started
+    assert finished_b1 < 0.2 and abs(finished_b1 - finished_a1) < 0.05, (finished_a1, finished_b1)
+    assert elapsed < 0.38, f"scanners were served serially ({elapsed:.2f}s)"
+    print(f"  ✓ Scanner 102 handled A1, A2, A3 in order; scanner 103 done after {finished_b1 * 1000:.0f}ms")
+
+    assert radio.tx_frames == 8 and len(radio.transceiver.rfm9x.sent) == 8
+    print(f"  ✓ All 8 frames went out through the single TX queue in {elapsed * 1000:.0f}ms")
+    return True
+
+
+def test_queue_bound_errors_and_stats():
+    """Test a full scanner queue drops new requests and a failing handler is isolated"""
+    print("\nTesting queue bound, handler errors and stats...")
+
+    dispatcher = ScannerDispatcher(max_pending=2)
+    handled = []
+
+    async def handle(tag):
+        await asyncio.sleep(0.05)
+        if tag == "bad":
+            raise ValueError("boom")
+        handled.append(tag)
+
+    async def scenario():
+        assert dispatcher.submit(102, handle, "bad")
+        assert dispatcher.submit(102, handle, "ok-1")
+        assert not dispatcher.submit(102, handle, "overflow"), "third request exceeds max_pending=2"
+        assert dispatcher.submit(103, handle, "other")
+        await dispatcher.join()
+        stats = dispatcher.stats()
+        await dispatcher.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert sorted(handled) == ["ok-1", "other"]
+    scanner = stats['scanners'][102]
+    assert scanner['dropped'] == 1 and scanner['errors'] == 1 and scanner['handled'] == 1
+    assert stats['scanners'][103]['dropped'] == 0
+    print("  ✓ Overflow dropped only scanner 102's newest request; error did not stop its worker")
+
+    assert scanner['wait']['max_ms'] >= 40 and stats['scanners'][103]['wait']['max_ms'] < 40
+    print(f"  ✓ Queueing delay per scanner: 102={scanner['wait']}, 103={stats['scanners'][103]['wait']}")
+    return True
+
+
+def test_idle_worker_exits_and_restarts():
+    """Test an idle scanner's worker exits and the next request starts a new one"""
+    print("\nTesting idle worker lifecycle...")
+
+    dispatcher = ScannerDispatcher(idle_timeout=0.05)
+    handled = []
+
+    async def handle(tag):
+        handled.append(tag)
+
+    async def scenario():
+        dispatcher.submit(102, handle, "first")
+        await dispatcher.join()
+        await asyncio.sleep(0.1)
+        idle_workers = dispatcher.stats()['workers']
+        dispatcher.submit(102, handle, "second")
+        await dispatcher.join()
+        await dispatcher.close()
+        return idle_workers
+
+    assert asyncio.run(scenario()) == 0
+    assert handled == ["first", "second"]
+    print("  ✓ Worker exited after idle_timeout and was recreated on demand")
+    return True
+
+
+def main():
+    """Run all scanner dispatcher tests"""
+    print("=" * 60)
+    print("SCANNER DISPATCHER TESTS (LOCAL - NO HARDWARE REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_order_per_scanner_concurrent_across,
+        test_queue_bound_errors_and_stats,
+        test_idle_worker_exits_and_restarts
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Unit Test: Simulated Radio Backend
+
+Tests the SimulatedMedium channel model (airtime, collisions and capture,
+half duplex, link loss/RSSI, RadioHead ACKs, cross-process bus) and that
+LoRaTransceiver runs unmodified on simulated radios.
+Can run locally without LoRa radio.
+"""
+
+import sys
+import os
+import random
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set LOCAL mode to avoid hardware initialization
+os.environ["LOCAL"] = "TRUE"
+
+from lora import LoRaTransceiver, NodeType, SimulatedMedium, SimulatedRadio
+
+
+def send_together(*jobs):
+    """Run (radio, data) sends at the same moment on separate threads"""
+    barrier = threading.Barrier(len(jobs))
+
+    def send(radio, data):
+        barrier.wait()
+        radio.send(data)
+
+    threads = [threading.Thread(target=send, args=job) for job in jobs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_transceivers_on_medium():
+    """Test LoRaTransceiver packets cross the medium with link RSSI/SNR"""
+    print("Testing transceivers on a simulated medium...")
+
+    medium = SimulatedMedium(seed=1)
+    medium.set_link(102, 1, rssi=-88.0, snr=4.5)
+    server = LoRaTransceiver(node_id=1, node_type=NodeType.SERVER, radio=medium.attach(1))
+    scanner = LoRaTransceiver(node_id=102, node_type=NodeType.SCANNER, radio=medium.attach(102))
+    assert isinstance(server.rfm9x, SimulatedRadio) and server.rfm9x.node == 1
+
+    server.rfm9x.receive(timeout=0)  # Start listening
+    assert scanner.send_packet(scanner.create_data_packet(dest_node=1, payload=b"1|12345|1"))
+    packet = server.receive_packet(timeout=1.0)
+    assert packet is not None and packet.text == "1|12345|1"
+    assert (packet.rssi, packet.snr) == (-88.0, 4.5)
+    assert server.tx_scheduler.frames_observed == 1
+    print(f"  ✓ Received {packet.text!r} at {packet.rssi}dBm / {packet.snr}dB")
+
+    airtime = scanner.tx_scheduler.airtime_ms(packet.frame_size)
+    assert abs(medium.airtime_ms - airtime) < 0.1, f"{medium.airtime_ms} != {airtime}"
+    print(f"  ✓ Channel occupied {medium.stats()['airtime_ms']}ms (airtime model)")
+
+    medium.close()
+    return True
+
+
+def test_collisions_and_capture():
+    """Test overlapping frames collide unless one is capture_db stronger"""
+    print("\nTesting collisions and capture effect...")
+
+    medium = SimulatedMedium(capture_db=6.0)
+    receiver, near, far = medium.attach(1), medium.attach(102), medium.attach(103)
+    medium.set_link(102, 1, rssi=-70.0)
+    medium.set_link(103, 1, rssi=-73.0)
+
+    receiver.receive(timeout=0)
+    send_together((near, b"near"), (far, b"far"))
+    assert receiver.receive(timeout=0.2) is None
+    assert medium.collisions == 2
+    print("  ✓ 3 dB apart: both frames lost")
+
+    medium.set_link(103, 1, rssi=-90.0)
+    send_together((near, b"near"), (far, b"far"))
+    assert receiver.receive(timeout=0.2) == bytearray(b"near")
+    assert medium.collisions == 3
+    print("  ✓ 20 dB apart: stronger frame captured")
+
+    medium.close()
+    return True
+
+
+def test_half_duplex_range_and_loss():
+    """Test idle/transmitting receivers miss frames, out-of-range and lossy links"""
+    print("\nTesting half duplex, range and link loss...")
+
+    medium = SimulatedMedium(default_link=None, seed=7)
+    a, b, c = medium.attach(1), medium.attach(2), medium.attach(3)
+    medium.set_link(1, 2)
+    medium.set_link(1, 3, loss=1.0)
+
+    a.send(b"not listening")
+    assert b.receive(timeout=0.1) is None and medium.missed_idle == 2
+    print("  ✓ Frame sent before receivers listened was missed")
+
+    b.receive(timeout=0)
+    c.receive(timeout=0)
+    send_together((a, b"one"), (b, b"two"))
+    assert medium.half_duplex == 2, medium.stats()
+    print("  ✓ Simultaneous senders do not hear each other")
+
+    b.receive(timeout=0)
+    a.send(b"hello")
+    assert b.receive(timeout=0.2) == bytearray(b"hello")
+    assert c.receive(timeout=0.1) is None and medium.link_losses >= 1
+    medium.remove_link(1, 2)
+    a.send(b"gone")
+    assert b.receive(timeout=0.1) is None
+    print(f"  ✓ Lossy and out-of-range links: {medium.stats()}")
+
+    medium.close()
+    return True
+
+
+def test_radiohead_ack():
+    """Test unicast send_with_ack waits for an auto-ACK from receive(with_ack=True)"""
+    print("\nTesting RadioHead ACK behavior...")
+
+    medium = SimulatedMedium()
+    sender, responder = medium.attach(102), medium.attach(1)
+    sender.node, responder.node = 102, 1
+    sender.ack_wait = 0.2
+    sender.ack_retries = 2
+
+    sender.destination = 1
+    received = []
+    listener = threading.Thread(
+        target=lambda: received.append(responder.receive(timeout=1.0, with_ack=True, with_header=True))
+    )
+    listener.start()
+    assert sender.send_with_ack(b"data")
+    listener.join()
+    assert received[0][4:] == bytearray(b"data") and received[0][:2] == bytearray((1, 102))
+    print(f"  ✓ ACKed unicast, {medium.frames_sent} frames on air (data + ACK)")
+
+    assert not sender.send_with_ack(b"nobody listening")
+    print("  ✓ No ACK without a listening peer")
+
+    sender.destination = 0xFF
+    assert sender.send_with_ack(b"broadcast")
+    print("  ✓ Broadcast needs no ACK (adafruit_rfm9x behavior)")
+
+    medium.close()
+    return True
+
+
+def test_bus_between_media():
+    """Test media sharing a bus port form one channel (cross-process mode)"""
+    print("\nTesting media linked over the loopback bus...")
+
+    port = random.randint(40000, 60000)
+    left, right = SimulatedMedium(bus_port=port), SimulatedMedium(bus_port=port)
+    sender, receiver = left.attach(102), right.attach(1)
+
+    receiver.receive(timeout=0)
+    sender.send(b"across")
+    assert receiver.receive(timeout=1.0) == bytearray(b"across")
+    assert right.frames_sent == 1 and left.frames_delivered == 0
+    print("  ✓ Frame from one medium delivered by the other")
+
+    left.close()
+    right.close()
+    return True
+
+
+def test_backend_from_environment():
+    """Test LORA_BACKEND=sim attaches transceivers to the shared medium"""
+    print("\nTesting LORA_BACKEND=sim...")
+
+    os.environ['LORA_BACKEND'] = 'sim'
+    try:
+        repeater = LoRaTransceiver(node_id=200, node_type=NodeType.REPEATER)
+    finally:
+        del os.environ['LORA_BACKEND']
+    assert isinstance(repeater.rfm9x, SimulatedRadio)
+    assert repeater.rfm9x.medium is SimulatedMedium.shared()
+    assert LoRaTransceiver(node_id=201, node_type=NodeType.REPEATER).rfm9x is None
+    print("  ✓ Simulated radio from environment; LOCAL mode unchanged without it")
+
+    return True
+
+
+def main():
+    """Run all simulated medium tests"""
+    print("=" * 60)
+    print("SIMULATED MEDIUM TESTS (LOCAL - NO HARDWARE REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_transceivers_on_medium,
+        test_collisions_and_capture,
+        test_half_duplex_range_and_loss,
+        test_radiohead_ack,
+        test_bus_between_media,
+        test_backend_from_environment
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
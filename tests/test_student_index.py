@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit Test: Student Index (CaptureLora local lookups)
+
+Tests that StudentIndex groups siblings under one DeviceID, de-duplicates by
+ChildName like the previous drop_duplicates path, skips unusable rows and
+returns the same result dicts CaptureLora publishes.
+Can run locally without LoRa radio (and without pandas).
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.student_index import StudentIndex, StudentRecord
+
+# DeviceID, ChildName, HierarchyLevel2, HierarchyLevel1, IDHierarchy, ExternalNumber, ClassCode
+ROWS = [
+    ("12345", "Ana Souza", "Class W", "Grade 4", 4, "1001", "4W"),
+    ("12345", "Leo Souza", "Class E", "Grade 2", 2, "1002", "2E"),
+    ("12345", "Ana Souza", "Class W", "Grade 4", 4, "1001", "4W"),   # Duplicate guardian row
+    ("67890", "Bia Lima", "Class A", "Kinder", 11, "1003", "KA"),
+    (None, "No Device", "Class A", "Grade 1", 1, "1004", "1A"),
+    ("55555", "Bad Hierarchy", "Class A", "Grade 1", "n/a", "1005", "1A"),
+    (float('nan'), "NaN Device", "Class A", "Grade 1", 1, "1006", "1A"),
+]
+
+
+def test_siblings_grouped_and_deduplicated():
+    """Test one DeviceID maps to each sibling once, in file order"""
+    print("Testing siblings grouped under one DeviceID...")
+
+    index = StudentIndex(ROWS)
+    records = index.lookup("12345")
+    assert [r.name for r in records] == ["Ana Souza", "Leo Souza"], records
+    assert records[0] == StudentRecord("Ana Souza", "Class W", "Grade 4", "04", "1001", "4W")
+    print(f"  ✓ {len(records)} siblings, duplicate row dropped, hierarchyID zero-padded")
+
+    assert len(index) == 2 and index.rows == len(ROWS) and index.skipped == 3
+    assert "55555" not in index and index.lookup("00000") == ()
+    print(f"  ✓ {index.skipped} unusable rows skipped, unknown DeviceID -> ()")
+    return True
+
+
+def test_results_match_published_format():
+    """Test per-scan result dicts carry the fields and order CaptureLora publishes"""
+    print("\nTesting lookup results...")
+
+    index = StudentIndex(ROWS)
+    results = index.results("67890", 3, "-7", "Front Gate", "2025-01-01 08:00:00")
+    assert results == [{
+        "name": "Bia Lima",
+        "hierarchyLevel2": "Class A",
+        "hierarchyLevel1": "Kinder",
+        "hierarchyID": "11",
+        "node": 3,
+        "externalID": "67890",
+        "distance": 7,
+        "timestamp": "2025-01-01 08:00:00",
+        "externalNumber": "1003",
+        "location": "Front Gate",
+        "classCode": "KA",
+        "source": "local"
+    }], results
+    assert list(results[0]) == ["name", "hierarchyLevel2", "hierarchyLevel1", "hierarchyID", "node",
+                                "externalID", "distance", "timestamp", "externalNumber", "location",
+                                "classCode", "source"]
+    print("  ✓ Static fields precomputed, node/distance/location/timestamp filled per scan")
+
+    assert index.results("00000", 3, 1, "Front Gate", "2025-01-01 08:00:00") == []
+    print("  ✓ Unknown DeviceID -> no results")
+    return True
+
+
+def main():
+    """Run all student index tests"""
+    print("=" * 60)
+    print("STUDENT INDEX TESTS (LOCAL - NO HARDWARE REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_siblings_grouped_and_deduplicated,
+        test_results_match_published_format
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Unit Test: Airtime-Aware TX Scheduler
+
+Tests LoRa airtime calculation, airtime-proportional pacing, duty-cycle
+budgeting and utilization metrics.
+Can run locally without LoRa radio.
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lora import TxScheduler, lora_airtime_ms, CollisionAvoidance, LoRaPacket
+
+
+class FakeRadio:
+    """Records frames instead of transmitting them"""
+
+    def __init__(self, ack=True):
+        self.sent = []
+        self.ack = ack
+
+    def send_with_ack(self, data):
+        self.sent.append(bytes(data))
+        return self.ack
+
+
+def test_airtime_formula():
+    """Test airtime against Semtech calculator reference values"""
+    print("Testing LoRa airtime formula...")
+
+    # SF7 / 125 kHz / 4/5, 8-symbol preamble, explicit header, no CRC
+    assert abs(lora_airtime_ms(28) - 61.696) < 0.01
+    assert abs(lora_airtime_ms(257) - 399.616) < 0.01
+    print(f"  ✓ SF7: 28 bytes = {lora_airtime_ms(28):.1f}ms, 257 bytes = {lora_airtime_ms(257):.1f}ms")
+
+    # SF12 uses low data rate optimization
+    assert abs(lora_airtime_ms(28, spreading_factor=12) - 1646.592) < 0.01
+    print(f"  ✓ SF12 (low data rate optimize): {lora_airtime_ms(28, spreading_factor=12):.1f}ms")
+
+    # CollisionAvoidance.estimate_airtime delegates to the same formula
+    assert CollisionAvoidance.estimate_airtime(28) == lora_airtime_ms(28)
+
+    # Scheduler adds the 4-byte RadioHead header to frame sizes
+    scheduler = TxScheduler()
+    min_frame = LoRaPacket.HEADER_SIZE + LoRaPacket.CRC_SIZE
+    assert scheduler.airtime_ms(min_frame) == lora_airtime_ms(min_frame + 4)
+    print(f"  ✓ Minimum frame {scheduler.airtime_ms(min_frame):.1f}ms, "
+          f"max frame {scheduler.airtime_ms(253):.1f}ms on air")
+
+    return True
+
+
+def test_jitter_scales_with_airtime():
+    """Test pre-TX delay is proportional to frame airtime and backs off per retry"""
+    print("\nTesting airtime-proportional jitter...")
+
+    scheduler = TxScheduler(jitter=(0.5, 0.5))  # Deterministic
+    small = scheduler.delay_for(24)
+    large = scheduler.delay_for(253)
+    assert abs(small - scheduler.airtime_ms(24) / 2000) < 1e-6
+    assert large > 5 * small, "253-byte frame should wait much longer than a 24-byte ACK"
+    assert abs(scheduler.delay_for(24, attempt=2) - 4 * small) < 1e-6
+    print(f"  ✓ 24B: {small * 1000:.1f}ms, 253B: {large * 1000:.1f}ms, 24B retry 2: {4 * small * 1000:.1f}ms")
+
+    return True
+
+
+def test_duty_cycle_budget():
+    """Test sends beyond the duty-cycle budget are deferred"""
+    print("\nTesting duty-cycle budget...")
+
+    # 1% of 20s = 200ms budget: one 253-byte frame (~400ms) exhausts it
+    scheduler = TxScheduler(duty_cycle=0.01, window_s=20.0, jitter=(0.0, 0.0))
+    assert scheduler.delay_for(253) == 0.0
+    scheduler.record_tx(253)
+
+    delay = scheduler.delay_for(24)
+    assert 19.0 < delay <= 20.0, f"Expected ~window wait, got {delay:.2f}s"
+    assert scheduler.utilization() > scheduler.duty_cycle
+    print(f"  ✓ Over budget: next TX deferred {delay:.1f}s, utilization {scheduler.utilization():.2%}")
+
+    stats = scheduler.stats()
+    assert stats['frames_sent'] == 1
+    assert stats['budget_remaining'] == 0.0
+    # delay_for() is how the radio threads pace: its deferral and wait are counted too
+    assert stats['budget_deferrals'] == 1 and stats['wait_ms'] == round(delay * 1000, 1), stats
+    print(f"  ✓ Stats: {stats}")
+
+    return True
+
+
+def test_channel_utilization():
+    """Test own and observed airtime both count toward channel utilization"""
+    print("\nTesting channel utilization metric...")
+
+    scheduler = TxScheduler(window_s=10.0)
+    scheduler.record_tx(100)
+    scheduler.observe(100)
+    scheduler.observe(100)
+
+    own = scheduler.airtime_ms(100) / 1000 / 10.0
+    assert abs(scheduler.utilization() - own) < 1e-9
+    assert abs(scheduler.channel_utilization() - 3 * own) < 1e-9
+    print(f"  ✓ Own {scheduler.utilization():.2%}, channel {scheduler.channel_utilization():.2%}")
+
+    return True
+
+
+def test_concurrent_access():
+    """Test the radio thread recording TX/RX while other threads read delays and stats"""
+    print("\nTesting concurrent scheduler access...")
+
+    scheduler = TxScheduler(window_s=0.002)   # Tiny window: every call expires entries
+    errors, stop = [], threading.Event()
+
+    def radio_thread():
+        try:
+            while not stop.is_set():
+                scheduler.record_tx(40)
+                scheduler.observe(40)
+        except Exception as e:
+            errors.append(e)
+
+    def reader_thread():
+        try:
+            while not stop.is_set():
+                scheduler.delay_for(40)
+                scheduler.stats()
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)   # Switch threads as often as possible
+    threads = [threading.Thread(target=radio_thread), threading.Thread(target=reader_thread),
+               threading.Thread(target=reader_thread)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    sys.setswitchinterval(interval)
+
+    assert not errors, errors
+    assert scheduler.frames_sent == scheduler.frames_observed > 0
+    print(f"  ✓ {scheduler.frames_sent} TX / RX records alongside delay and stats readers, no errors")
+
+    return True
+
+
+def test_send_with_ca_uses_scheduler():
+    """Test send_with_ca records airtime through the scheduler"""
+    print("\nTesting send_with_ca with scheduler...")
+
+    scheduler = TxScheduler(jitter=(0.0, 0.0))
+    radio = FakeRadio()
+    assert CollisionAvoidance.send_with_ca(radio, b"x" * 40, scheduler=scheduler)
+    assert radio.sent == [b"x" * 40]
+    assert scheduler.frames_sent == 1
+
+    radio = FakeRadio(ack=False)
+    assert not CollisionAvoidance.send_with_ca(radio, b"x" * 40, max_retries=2, scheduler=scheduler)
+    assert len(radio.sent) == 2 and scheduler.frames_sent == 3
+    print(f"  ✓ Sent and retried through scheduler: {scheduler.stats()['airtime_ms']}ms airtime recorded")
+
+    return True
+
+
+def main():
+    """Run all TX scheduler tests"""
+    print("=" * 60)
+    print("TX SCHEDULER TESTS (LOCAL - NO HARDWARE REQUIRED)")
+    print("=" * 60)
+
+    tests = [
+        test_airtime_formula,
+        test_jitter_scales_with_airtime,
+        test_duty_cycle_budget,
+        test_channel_utilization,
+        test_concurrent_access,
+        test_send_with_ca_uses_scheduler
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"  ✗ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+LoRa Packet Codec Micro-Benchmark
+
+Measures the per-frame cost of the CRC16 engines and of LoRaPacket
+serialize()/deserialize() for frame sizes from the minimum (24 bytes:
+22-byte header + 2-byte CRC) to the RFM9x maximum (253 bytes).
+
+Before timing anything, every CRC engine is cross-checked against the
+bitwise reference on random frames of every size, so the numbers are only
+reported if all engines agree.
+
+Usage:
+    python utility_tools/bench_packet_codec.py
+    python utility_tools/bench_packet_codec.py --iterations 20000
+    python utility_tools/bench_packet_codec.py --sizes 24 64 128 253
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lora import LoRaPacket, PacketType, CRC16_ENGINES, set_crc_engine, get_crc_engine
+
+MIN_FRAME = LoRaPacket.HEADER_SIZE + LoRaPacket.CRC_SIZE   # 24 bytes
+MAX_FRAME = MIN_FRAME + LoRaPacket.MAX_PAYLOAD              # 253 bytes
+DEFAULT_SIZES = [24, 32, 48, 64, 96, 128, 192, 253]
+
+
+def verify_engines(samples_per_size: int = 20) -> bool:
+    """Check every CRC engine against the bitwise reference for all frame sizes."""
+    reference = CRC16_ENGINES['bitwise']
+    rng = random.Random(0x4951)
+    mismatches = 0
+    checked = 0
+
+    for size in range(0, MAX_FRAME + 1):
+        for _ in range(samples_per_size):
+            frame = bytes(rng.getrandbits(8) for _ in range(size))
+            expected = reference(frame)
+            for name, engine in CRC16_ENGINES.items():
+                checked += 1
+                if engine(frame) != expected:
+                    mismatches += 1
+                    print(f"  ✗ {name} mismatch for {size}-byte frame: "
+                          f"0x{engine(frame):04X} != 0x{expected:04X}")
+
+    # Known-answer check: CRC-16/CCITT-FALSE of "123456789" is 0x29B1
+    for name, engine in CRC16_ENGINES.items():
+        if engine(b"123456789") != 0x29B1:
+            mismatches += 1
+            print(f"  ✗ {name} failed check value 0x29B1")
+
+    if mismatches:
+        print(f"  ✗ {mismatches} mismatches in {checked} comparisons")
+        return False
+    print(f"  ✓ {len(CRC16_ENGINES)} engines identical over {checked} comparisons (0–253 byte frames + check value)")
+    return True
+
+
+def ns_per_call(stmt, iterations: int) -> float:
+    """Best-of-3 time for one call of stmt, in nanoseconds"""
+    best = min(timeit.repeat(stmt, number=iterations, repeat=3))
+    return best / iterations * 1e9
+
+
+def bench_crc(sizes, iterations: int):
+    """Time each CRC engine for every frame size"""
+    names = list(CRC16_ENGINES)
+    print(f"\n  {'Frame':>6} | " + " | ".join(f"{n:>10}" for n in names) + " |  (ns/frame)")
+    print("  " + "-" * (9 + 13 * len(names)))
+
+    rng = random.Random(1)
+    for size in sizes:
+        frame = bytes(rng.getrandbits(8) for _ in range(size - LoRaPacket.CRC_SIZE))
+        row = []
+        for name in names:
+            engine = CRC16_ENGINES[name]
+            # The bitwise reference is ~100x slower; keep its run short
+            n = max(iterations // 50, 10) if name == 'bitwise' else iterations
+            row.append(ns_per_call(lambda: engine(frame), n))
+        print(f"  {size:>6} | " + " | ".join(f"{v:>10.0f}" for v in row) + " |")
+
+
+def bench_codec(sizes, iterations: int):
+    """Time serialize()/serialize_into()/deserialize() with each CRC engine"""
+    previous = get_crc_engine()
+    names = [n for n in CRC16_ENGINES if n != 'bitwise'] + ['bitwise']
+
+    print(f"\n  {'Frame':>6} | {'Engine':>9} | {'serialize':>10} | {'into buf':>10} | {'deserialize':>11} |  (ns/frame)")
+    print("  " + "-" * 63)
+    tx_buffer = bytearray(MAX_FRAME)
+
+    try:
+        for size in sizes:
+            payload = b"x" * (size - MIN_FRAME)
+            packet = LoRaPacket.create(
+                packet_type=PacketType.DATA,
+                source_node=1,
+                dest_node=102,
+                payload=payload,
+                sequence_num=1
+            )
+            for name in names:
+                set_crc_engine(name)
+                frame = packet.serialize()
+                assert len(frame) == size, f"Expected {size}-byte frame, got {len(frame)}"
+                assert LoRaPacket.deserialize(frame) is not None, f"{name} round trip failed"
+
+                n = max(iterations // 50, 10) if name == 'bitwise' else iterations
+                ser = ns_per_call(packet.serialize, n)
+                into = ns_per_call(lambda: packet.serialize_into(tx_buffer), n)
+                de = ns_per_call(lambda: LoRaPacket.deserialize(frame), n)
+                print(f"  {size:>6} | {name:>9} | {ser:>10.0f} | {into:>10.0f} | {de:>11.0f} |")
+    finally:
+        set_crc_engine(previous)
+
+
+def bench_bulk(iterations: int):
+    """Time deserialize_many over a batch of raw radio buffers"""
+    raw = []
+    for i in range(100):
+        frame = LoRaPacket.create(
+            packet_type=PacketType.DATA,
+            source_node=102,
+            dest_node=1,
+            payload=f"102|P{i:08d}|1".encode('utf-8'),
+            sequence_num=i
+        ).serialize()
+        raw.append(bytearray(b"\xff\x01\x00\x00") + frame)
+
+    decoded = LoRaPacket.deserialize_many(raw, skip=4)
+    assert all(p is not None for p in decoded), "Bulk decode failed"
+
+    n = max(iterations // 100, 10)
+    per_frame = ns_per_call(lambda: LoRaPacket.deserialize_many(raw, skip=4), n) / len(raw)
+    print(f"  {per_frame:.0f} ns/frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LoRa packet codec micro-benchmark")
+    parser.add_argument('--iterations', type=int, default=5000,
+                        help='Calls per timing sample (default 5000)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help=f'Frame sizes in bytes, {MIN_FRAME}-{MAX_FRAME}')
+    args = parser.parse_args()
+
+    sizes = [s for s in args.sizes if MIN_FRAME <= s <= MAX_FRAME]
+    if not sizes:
+        print(f"No valid frame sizes (must be {MIN_FRAME}-{MAX_FRAME})")
+        return 1
+
+    print("=" * 60)
+    print("LORA PACKET CODEC BENCHMARK")
+    print("=" * 60)
+    print(f"Python {sys.version.split()[0]} | active CRC engine: {get_crc_engine()}")
+
+    print("\nVerifying CRC engines against bitwise reference...")
+    if not verify_engines():
+        print("\n❌ CRC engines disagree — not benchmarking")
+        return 1
+
+    print("\nCRC16 engines:")
+    bench_crc(sizes, args.iterations)
+
+    print("\nLoRaPacket serialize/deserialize:")
+    bench_codec(sizes, args.iterations)
+
+    print("\nBulk decode (deserialize_many, 100 raw RFM9x frames with 4-byte header):")
+    bench_bulk(args.iterations)
+
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
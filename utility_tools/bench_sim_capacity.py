@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+LoRa Channel Capacity Benchmark (simulated radios)
+
+Runs a server and N scanners as LoRaTransceivers on one SimulatedMedium and
+measures how many lookups per minute the channel carries before collisions
+take over. Each scanner sends "beacon|code|distance" requests at random
+(Poisson) intervals and waits for the server's DATA response; the server
+answers every request it hears, like CaptureLora.
+
+Reported per scanner count: request/response success rate, response
+latency (p50/p95), channel utilization and the medium's loss breakdown
+(collisions, half duplex, missed while idle — counted per receiver, since
+every node hears every frame).
+
+Usage:
+    python utility_tools/bench_sim_capacity.py
+    python utility_tools/bench_sim_capacity.py --scanners 1 5 10 20 40 --duration 30
+    python utility_tools/bench_sim_capacity.py --rate 6 --response-bytes 120
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ["LOCAL"] = "TRUE"  # No hardware; radios come from the medium
+
+from lora import LoRaTransceiver, NodeType, PacketType, SimulatedMedium
+
+SERVER_ID = 1
+FIRST_SCANNER_ID = 100
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+def run(scanners: int, duration: float, rate: float, response_bytes: int, timeout: float) -> dict:
+    """One run: `scanners` nodes each sending `rate` requests/minute for `duration` seconds"""
+    medium = SimulatedMedium(seed=scanners)
+    server = LoRaTransceiver(SERVER_ID, NodeType.SERVER, radio=medium.attach(SERVER_ID))
+    stop = threading.Event()
+    response = ("x" * response_bytes).encode('utf-8')
+
+    def serve():
+        while not stop.is_set():
+            packet = server.receive_packet(timeout=0.2)
+            if packet is not None and packet.packet_type == PacketType.DATA:
+                reply = server.create_data_packet(dest_node=packet.source_node, payload=response)
+                server.send_packet(reply, use_ack=True)
+
+    sent = [0]
+    latencies = []
+    lock = threading.Lock()
+
+    def scan(node_id: int):
+        transceiver = LoRaTransceiver(node_id, NodeType.SCANNER, radio=medium.attach(node_id))
+        rng = random.Random(node_id)
+        while not stop.wait(rng.expovariate(rate / 60.0)):
+            request = transceiver.create_data_packet(dest_node=SERVER_ID, payload=f"1|{node_id}{rng.randrange(10**6)}|1".encode('utf-8'))
+            started = time.monotonic()
+            transceiver.send_packet(request, use_ack=True)
+            with lock:
+                sent[0] += 1
+            deadline = started + timeout
+            while time.monotonic() < deadline:
+                packet = transceiver.receive_packet(timeout=deadline - time.monotonic())
+                if packet is not None and packet.source_node == SERVER_ID:
+                    with lock:
+                        latencies.append(time.monotonic() - started)
+                    break
+
+    threads = [threading.Thread(target=serve, daemon=True)]
+    threads += [threading.Thread(target=scan, args=(FIRST_SCANNER_ID + i,), daemon=True) for i in range(scanners)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout + 1)
+
+    medium.close()
+    return {
+        'sent': sent[0],
+        'answered': len(latencies),
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'channel': medium.airtime_ms / 1000.0 / duration,
+        'medium': medium.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated LoRa channel capacity benchmark")
+    parser.add_argument('--scanners', type=int, nargs='+', default=[1, 5, 10, 20],
+                        help='Scanner counts to run (default 1 5 10 20)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds per run (default 30)')
+    parser.add_argument('--rate', type=float, default=12.0, help='Requests per scanner per minute (default 12)')
+    parser.add_argument('--response-bytes', type=int, default=60, help='Response payload size (default 60)')
+    parser.add_argument('--timeout', type=float, default=3.0, help='Scanner response timeout (default 3s)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("LORA CHANNEL CAPACITY BENCHMARK (SIMULATED MEDIUM)")
+    print("=" * 60)
+    print(f"{args.rate:g} req/min per scanner, {args.response_bytes}-byte responses, "
+          f"{args.duration:g}s per run, SF7/125kHz")
+
+    print(f"\n  {'Scanners':>8} | {'Sent':>5} | {'OK %':>5} | {'p50 ms':>7} | {'p95 ms':>7} | "
+          f"{'Channel':>7} | {'Collis.':>7} | {'Half-dup':>8} | {'Idle':>5}")
+    print("  " + "-" * 84)
+    for count in args.scanners:
+        result = run(count, args.duration, args.rate, args.response_bytes, args.timeout)
+        medium = result['medium']
+        success = 100.0 * result['answered'] / result['sent'] if result['sent'] else 0.0
+        print(f"  {count:>8} | {result['sent']:>5} | {success:>5.1f} | {result['p50'] * 1000:>7.0f} | "
+              f"{result['p95'] * 1000:>7.0f} | {result['channel']:>7.1%} | {medium['collisions']:>7} | "
+              f"{medium['half_duplex']:>8} | {medium['missed_idle']:>5}")
+
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Multi-Repeater Flooding Benchmark (simulated radios)
+
+Scanners that only reach the server through repeaters, with every repeater
+hearing every scanner (different signal per pair), each other and the
+server — the overlapping coverage where plain flooding rebroadcasts each
+frame once per repeater. Runs the same traffic per forwarding mode:
+
+- flood: plain flooding
+- contention: contention flooding (RepeaterRadio(contention=...),
+  LORA_CONTENTION_FLOODING on a repeater)
+- routing: learned next-hop routing on the server and the repeaters
+  (LORA_NEXT_HOP_ROUTING); requests still flood, replies carry a next hop
+- contention+routing: both (contention for the flooded requests)
+
+and reports per repeater count:
+
+- request/response success rate and response latency (p50 / p95)
+- channel utilization (medium airtime / run time)
+- repeater transmissions, forwards suppressed (contention) or skipped as
+  off the path (routing), collisions
+
+Usage:
+    python utility_tools/bench_sim_flooding.py
+    python utility_tools/bench_sim_flooding.py --repeaters 2 3 4 --scanners 8 --duration 60
+    python utility_tools/bench_sim_flooding.py --modes flood routing
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ["LOCAL"] = "TRUE"  # No hardware; radios come from the medium
+
+from lora import LoRaTransceiver, NodeType, PacketType, RepeaterRadio, RouteTable, SimulatedMedium
+
+SERVER_ID = 1
+FIRST_SCANNER_ID = 100
+FIRST_REPEATER_ID = 200
+MODES = ('flood', 'contention', 'routing', 'contention+routing')
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+def link_snr(rssi: float) -> float:
+    """Rough SNR for an RSSI at SF7/125kHz (noise floor around -117 dBm)"""
+    return max(-15.0, min(10.0, (rssi + 110.0) / 3.0))
+
+
+def build_site(repeaters: int, scanners: int, seed: int) -> SimulatedMedium:
+    rng = random.Random(seed)
+    medium = SimulatedMedium(default_link=None, seed=seed)
+    repeater_ids = [FIRST_REPEATER_ID + i for i in range(repeaters)]
+    for scanner in range(FIRST_SCANNER_ID, FIRST_SCANNER_ID + scanners):
+        for repeater in repeater_ids:
+            rssi = rng.uniform(-115.0, -70.0)
+            medium.set_link(scanner, repeater, rssi=rssi, snr=link_snr(rssi))
+    for index, repeater in enumerate(repeater_ids):
+        rssi = rng.uniform(-100.0, -80.0)
+        medium.set_link(repeater, SERVER_ID, rssi=rssi, snr=link_snr(rssi))
+        for other in repeater_ids[index + 1:]:
+            medium.set_link(repeater, other, rssi=-80.0, snr=link_snr(-80.0))
+    return medium
+
+
+def run(repeaters: int, scanners: int, duration: float, rate: float, timeout: float,
+        mode: str, seed: int, slots: float = 8.0) -> dict:
+    """One run with `repeaters` overlapping repeaters; same seed = same links and traffic"""
+    medium = build_site(repeaters, scanners, seed)
+    server = LoRaTransceiver(SERVER_ID, NodeType.SERVER, radio=medium.attach(SERVER_ID))
+    contention = 'contention' in mode
+    routing = 'routing' in mode
+    if routing:
+        server.routes = RouteTable()
+    radios = [RepeaterRadio(LoRaTransceiver(node, NodeType.REPEATER, radio=medium.attach(node)),
+                            collision_avoidance=True, poll_interval=0.05, contention=contention,
+                            contention_slots=slots, routing=routing)
+              for node in range(FIRST_REPEATER_ID, FIRST_REPEATER_ID + repeaters)]
+    stop = threading.Event()
+
+    def serve():
+        while not stop.is_set():
+            packet = server.receive_packet(timeout=0.2)
+            if packet is not None and packet.packet_type == PacketType.DATA:
+                reply = server.create_data_packet(dest_node=packet.source_node, payload=b"Student Name|4W")
+                if server.routes is not None:
+                    # What AsyncLoRaTransceiver does on the real server's first attempt
+                    reply.next_hop = server.routes.next_hop(packet.source_node)
+                server.send_packet(reply, use_ack=False)
+
+    sent = [0]
+    latencies = []
+    lock = threading.Lock()
+
+    def scan(node_id: int):
+        transceiver = LoRaTransceiver(node_id, NodeType.SCANNER, radio=medium.attach(node_id))
+        rng = random.Random(seed * 1000 + node_id)
+        while not stop.wait(rng.expovariate(rate / 60.0)):
+            request = transceiver.create_data_packet(dest_node=SERVER_ID,
+                                                     payload=f"1|{node_id}{rng.randrange(10**6)}|1".encode())
+            started = time.monotonic()
+            transceiver.send_packet(request, use_ack=False)
+            with lock:
+                sent[0] += 1
+            deadline = started + timeout
+            while time.monotonic() < deadline:
+                packet = transceiver.receive_packet(timeout=deadline - time.monotonic())
+                if packet is not None and packet.source_node == SERVER_ID:
+                    with lock:
+                        latencies.append(time.monotonic() - started)
+                    break
+
+    for radio in radios:
+        radio.start()
+    threads = [threading.Thread(target=serve, daemon=True)]
+    threads += [threading.Thread(target=scan, args=(FIRST_SCANNER_ID + i,), daemon=True) for i in range(scanners)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout + 1)
+    for radio in radios:
+        radio.stop()
+
+    medium.close()
+    return {
+        'sent': sent[0],
+        'answered': len(latencies),
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'channel': medium.airtime_ms / 1000.0 / duration,
+        'forwards': sum(radio.stats.packets_forwarded for radio in radios),
+        'suppressed': sum(radio.stats.forwards_suppressed + radio.stats.forwards_off_path for radio in radios),
+        'medium': medium.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated multi-repeater flooding benchmark")
+    parser.add_argument('--repeaters', type=int, nargs='+', default=[2, 3, 4],
+                        help='Overlapping repeater counts to run (default 2 3 4)')
+    parser.add_argument('--scanners', type=int, default=6, help='Scanners (default 6)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds per run (default 30)')
+    parser.add_argument('--rate', type=float, default=12.0, help='Requests per scanner per minute (default 12)')
+    parser.add_argument('--timeout', type=float, default=4.0, help='Scanner response timeout (default 4s)')
+    parser.add_argument('--seed', type=int, default=1, help='Links and traffic seed (default 1)')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES),
+                        help='Forwarding modes to compare (default: all)')
+    parser.add_argument('--slots', type=float, default=8.0,
+                        help='Contention window in frame airtimes (default 8, RepeaterRadio default)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MULTI-REPEATER FLOODING BENCHMARK (SIMULATED MEDIUM)")
+    print("=" * 60)
+    print(f"{args.scanners} scanners x {args.rate:g} req/min, {args.duration:g}s per run, SF7/125kHz, "
+          f"every repeater hears every scanner")
+
+    print(f"\n  {'Repeaters':>9} | {'Mode':>18} | {'Sent':>5} | {'OK %':>5} | {'p50 ms':>7} | "
+          f"{'p95 ms':>7} | {'Channel':>7} | {'Forwards':>8} | {'Quiet':>6} | {'Collis.':>7}")
+    print("  " + "-" * 107)
+    for count in args.repeaters:
+        for mode in args.modes:
+            result = run(count, args.scanners, args.duration, args.rate, args.timeout, mode, args.seed,
+                         args.slots)
+            success = 100.0 * result['answered'] / result['sent'] if result['sent'] else 0.0
+            print(f"  {count:>9} | {mode:>18} | {result['sent']:>5} | {success:>5.1f} | "
+                  f"{result['p50'] * 1000:>7.0f} | {result['p95'] * 1000:>7.0f} | {result['channel']:>7.1%} | "
+                  f"{result['forwards']:>8} | {result['suppressed']:>6} | {result['medium']['collisions']:>7}")
+
+    print("\n  Quiet: forwards suppressed (contention) or not sent as off the path (routing)")
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Student Lookup Micro-Benchmark
+
+Compares the CaptureLora local lookup through StudentIndex with the previous
+per-scan DataFrame path (boolean filter on DeviceID, drop_duplicates on
+ChildName, iterrows) on synthetic student tables of 500, 5k and 50k rows.
+About one device in four is shared by siblings, like the real data.
+
+Both paths are checked to return identical results before anything is
+timed. Reported: index build time (paid once per data load / refresh) and
+per-lookup cost for known and unknown DeviceIDs.
+
+A second table times lookup-to-first-TX on the server: per-scan lookup,
+record packing and encoding vs. the pre-rendered responses (RenderedResponses),
+each up to a serialized first DATA frame, plus the cache's warm time and
+memory footprint.
+
+Requires pandas (as on the server).
+
+Usage:
+    python utility_tools/bench_student_index.py
+    python utility_tools/bench_student_index.py --rows 500 5000 50000 200000
+    python utility_tools/bench_student_index.py --lookups 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ["LOCAL"] = "TRUE"  # No radio needed to build frames
+
+import pandas as pd
+
+from lora import LoRaPacket, LoRaTransceiver, NodeType, RECORD_SEPARATOR, pack_records
+from utils.rendered_responses import RenderedResponses
+from utils.student_index import StudentIndex
+
+TIMESTAMP = '2025-01-01 08:00:00'
+LOCATION = 'Gate'
+
+
+def make_students(rows: int, seed: int = 1) -> pd.DataFrame:
+    """Synthetic full_load table: ~25% of devices shared by 2-3 siblings"""
+    rng = random.Random(seed)
+    device_ids, names = [], []
+    device = 100000
+    while len(device_ids) < rows:
+        device += 1
+        siblings = rng.choice((1, 1, 1, 2, 3))
+        for s in range(siblings):
+            device_ids.append(str(device))
+            names.append(f"Student {device}-{s}")
+    device_ids, names = device_ids[:rows], names[:rows]
+    return pd.DataFrame({
+        'DeviceID': device_ids,
+        'ChildName': names,
+        'HierarchyLevel1': [f"Grade {rng.randint(1, 12)}" for _ in range(rows)],
+        'HierarchyLevel2': [f"Class {rng.choice('ABCD')}" for _ in range(rows)],
+        'IDHierarchy': [rng.randint(1, 30) for _ in range(rows)],
+        'ExternalNumber': [str(rng.randrange(10 ** 8)) for _ in range(rows)],
+        'ClassCode': [f"{rng.randint(1, 12)}{rng.choice('ABCD')}" for _ in range(rows)],
+        'Phone': ['555-0100'] * rows,
+        'AppApprovalStatus': ['Approved'] * rows,
+    })
+
+
+def lookup_dataframe(df, code, beacon, distance):
+    """Previous CaptureLora.get_user_local path"""
+    matches = df[df['DeviceID'] == code].drop_duplicates(subset=['ChildName'])
+    results = []
+    for _, row in matches.iterrows():
+        results.append({
+            "name": row['ChildName'],
+            "hierarchyLevel2": row['HierarchyLevel2'],
+            "hierarchyLevel1": row['HierarchyLevel1'],
+            "hierarchyID": f"{int(row['IDHierarchy']):02d}",
+            "node": beacon,
+            "externalID": code,
+            "distance": abs(int(distance)),
+            "timestamp": TIMESTAMP,
+            "externalNumber": row['ExternalNumber'],
+            "location": LOCATION,
+            "classCode": row['ClassCode'],
+            "source": "local"
+        })
+    return results
+
+
+def us_per_call(fn, codes) -> float:
+    """Best-of-3 mean time of fn(code) over codes, in microseconds"""
+    best = min(timeit.repeat(lambda: [fn(code) for code in codes], number=1, repeat=3))
+    return best / len(codes) * 1e6
+
+
+def bench(rows: int, lookups: int) -> bool:
+    df = make_students(rows)
+    started = time.perf_counter()
+    index = StudentIndex.from_dataframe(df)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(rows)
+    known = rng.sample(list(df['DeviceID'].unique()), min(lookups, df['DeviceID'].nunique()))
+    unknown = [str(rng.randrange(10 ** 9, 10 ** 10)) for _ in range(len(known))]
+
+    def via_index(code):
+        return index.results(code, 2, -3, LOCATION, TIMESTAMP)
+
+    def via_dataframe(code):
+        return lookup_dataframe(df, code, 2, -3)
+
+    for code in known + unknown[:10]:
+        if via_index(code) != via_dataframe(code):
+            print(f"  ✗ Results differ for DeviceID {code} at {rows} rows")
+            return False
+
+    old_known = us_per_call(via_dataframe, known)
+    new_known = us_per_call(via_index, known)
+    old_unknown = us_per_call(via_dataframe, unknown)
+    new_unknown = us_per_call(via_index, unknown)
+    print(f"  {rows:>7} | {len(index):>7} | {build_ms:>8.1f} | {old_known:>9.1f} | {new_known:>8.2f} | "
+          f"{old_known / new_known:>7.0f}x | {old_unknown:>9.1f} | {new_unknown:>8.2f}")
+    return True
+
+
+def bench_first_tx(rows: int, lookups: int, transceiver: LoRaTransceiver):
+    df = make_students(rows)
+    index = StudentIndex.from_dataframe(df)
+    responses = RenderedResponses(index)
+    rng = random.Random(rows)
+    known = rng.sample(list(df['DeviceID'].unique()), min(lookups, df['DeviceID'].nunique()))
+
+    def first_frame(message: bytes, total: int) -> bytes:
+        packet = transceiver.create_data_packet(dest_node=102, payload=message,
+                                                multi_part_index=1 if total > 1 else 0, multi_part_total=total)
+        return packet.serialize()
+
+    def per_scan(code):
+        items = index.results(code, 2, -3, LOCATION, TIMESTAMP)
+        groups = pack_records([f"{item['name']}|{item['classCode']}" for item in items], LoRaPacket.MAX_PAYLOAD)
+        return first_frame(RECORD_SEPARATOR.join(groups[0]).encode('utf-8'), len(groups))
+
+    def pre_rendered(code):
+        frames = responses.get(code).text
+        return first_frame(frames[0].payload, len(frames))
+
+    old = us_per_call(per_scan, known)
+    new = us_per_call(pre_rendered, known)
+    stats = responses.stats()
+    print(f"  {rows:>7} | {old:>9.1f} | {new:>9.1f} | {old / new:>7.1f}x | {stats['warm_ms']:>8.1f} | "
+          f"{stats['footprint_kb']:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Student lookup micro-benchmark")
+    parser.add_argument('--rows', type=int, nargs='+', default=[500, 5000, 50000],
+                        help='Table sizes to benchmark (default 500 5000 50000)')
+    parser.add_argument('--lookups', type=int, default=200,
+                        help='DeviceIDs looked up per timing sample (default 200)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("STUDENT LOOKUP BENCHMARK (DataFrame scan vs StudentIndex)")
+    print("=" * 60)
+    print(f"Python {sys.version.split()[0]} | pandas {pd.__version__}")
+
+    print(f"\n  {'Rows':>7} | {'Devices':>7} | {'Build ms':>8} | {'DF hit':>9} | "
+          f"{'Idx hit':>8} | {'Speedup':>8} | {'DF miss':>9} | {'Idx miss':>8}  (us/lookup)")
+    print("  " + "-" * 88)
+    for rows in args.rows:
+        if not bench(rows, args.lookups):
+            print("\n❌ Index results differ from the DataFrame path — not benchmarking")
+            return 1
+
+    print("\nLookup to first serialized DATA frame (us/scan):")
+    print(f"\n  {'Rows':>7} | {'Per-scan':>9} | {'Rendered':>9} | {'Speedup':>8} | {'Warm ms':>8} | {'Cache KB':>9}")
+    print("  " + "-" * 66)
+    transceiver = LoRaTransceiver(node_id=1, node_type=NodeType.SERVER)
+    for rows in args.rows:
+        bench_first_tx(rows, args.lookups, transceiver)
+
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Capture Replay Load Test
+
+Replays a frame capture (LORA_CAPTURE_FILE on the server, see lora/capture.py)
+into an unmodified CaptureLora.py through the replay radio backend
+(LORA_BACKEND=replay), at the recorded pace, N times faster, or as fast as the
+server reads, and reports:
+
+- throughput: requests replayed and response frames sent per second
+- response latency: replayed request -> first frame back to that scanner
+  (p50 / p95 / p99 / max)
+- divergence: recorded vs replayed responses per scanner (matched,
+  mismatched, missing, extra), compared on packet type, payload and part
+  numbers
+
+The server runs with its normal configuration (offline data, API mode,
+MQTT broker), so a busy afternoon can be re-run after a change and compared.
+
+Usage:
+    python utility_tools/replay_capture.py /etc/iqright/LoraService/log/capture.bin
+    python utility_tools/replay_capture.py capture.bin --speed 10
+    python utility_tools/replay_capture.py capture.bin --speed max --report replay.json
+    python utility_tools/replay_capture.py capture.bin --summary    (what is in the capture)
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lora import LoRaPacket, load_capture
+from lora.capture import RX, capture_files
+
+SERVER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'CaptureLora.py'))
+
+
+def summarize(path: str) -> int:
+    frames = load_capture(path)
+    if not frames:
+        print(f"No frames in {path}")
+        return 1
+    kinds = Counter()
+    scanners = Counter()
+    for frame in frames:
+        packet = LoRaPacket.deserialize(frame.frame)
+        name = packet.packet_type.name if packet is not None else 'INVALID'
+        kinds[('RX' if frame.direction == RX else 'TX', name)] += 1
+        if packet is not None and frame.direction == RX:
+            scanners[packet.source_node] += 1
+    span = frames[-1].time - frames[0].time
+    print(f"Files: {', '.join(capture_files(path))}")
+    print(f"{len(frames)} frames over {span:.1f}s")
+    for (direction, name), count in sorted(kinds.items()):
+        print(f"  {direction} {name:<10} {count:>6}")
+    print(f"RX by source node: {dict(sorted(scanners.items()))}")
+    return 0
+
+
+def replay(path: str, speed: str, settle: float, server: str) -> dict:
+    """Run the server against the capture until the replay is done; returns the report"""
+    frames = load_capture(path)
+    span = frames[-1].time - frames[0].time if frames else 0.0
+    budget = (span if speed == 'max' else span / float(speed)) * 2 + settle + 120
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, 'report.json')
+        env = dict(os.environ, LORA_BACKEND='replay', LORA_REPLAY_FILE=os.path.abspath(path),
+                   LORA_REPLAY_SPEED=speed, LORA_REPLAY_REPORT=report_path, LORA_REPLAY_SETTLE=str(settle))
+        env.pop('LOCAL', None)            # LOCAL mode exits after one fake request
+        env.pop('LORA_CAPTURE_FILE', None)
+        try:
+            subprocess.run([sys.executable, server], env=env, cwd=os.path.dirname(server), timeout=budget)
+        except subprocess.TimeoutExpired:
+            print(f"Server still running after {budget:.0f}s - stopped")
+        if not os.path.exists(report_path):
+            raise RuntimeError("Server exited without a replay report (see its log)")
+        with open(report_path, encoding='utf-8') as f:
+            return json.load(f)
+
+
+def print_report(report: dict) -> None:
+    latency = report['latency_ms']
+    divergence = report['divergence']
+    print(f"Replayed {report['rx_replayed']}/{report['rx_total']} requests "
+          f"({report['recorded_s']:.1f}s recorded) in {report['elapsed_s']:.1f}s at speed {report['speed']}")
+    print(f"Throughput: {report['requests_per_s']} requests/s, {report['tx_frames_per_s']} frames/s sent")
+    print(f"Latency (ms): p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  "
+          f"max {latency['max']}  ({latency['count']} responses)")
+    print(f"Divergence: {divergence['matched']} matched, {divergence['mismatched']} mismatched, "
+          f"{divergence['missing']} missing, {divergence['extra']} extra")
+    for scanner, counts in divergence['scanners'].items():
+        print(f"  scanner {scanner}: {counts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a LoRa frame capture into CaptureLora")
+    parser.add_argument('capture', help='Capture file (rotated .1, .2, ... files are included)')
+    parser.add_argument('--speed', default='1', help='1 = recorded pace, N = N x faster, max (default 1)')
+    parser.add_argument('--settle', type=float, default=3.0,
+                        help='Seconds of silence after the last request before stopping (default 3)')
+    parser.add_argument('--server', default=SERVER, help='Server script (default CaptureLora.py)')
+    parser.add_argument('--report', help='Also write the JSON report here')
+    parser.add_argument('--summary', action='store_true', help='Only summarize the capture')
+    args = parser.parse_args()
+
+    if args.summary:
+        return summarize(args.capture)
+    if args.speed != 'max' and float(args.speed) <= 0:
+        parser.error("--speed must be positive or 'max'")
+
+    report = replay(args.capture, args.speed, args.settle, args.server)
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    divergence = report['divergence']
+    return 1 if divergence['mismatched'] or divergence['missing'] or divergence['extra'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
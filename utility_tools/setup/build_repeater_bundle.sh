@@ -51,6 +51,19 @@ require_file "lora/__init__.py"
 require_file "lora/packet_handler.py"
 require_file "lora/node_types.py"
 require_file "lora/collision_avoidance.py"
+require_file "lora/seen_cache.py"
+require_file "lora/tx_scheduler.py"
+require_file "lora/async_transceiver.py"
+require_file "lora/radio_backend.py"
+require_file "lora/sim_medium.py"
+require_file "lora/multipart.py"
+require_file "lora/response_cache.py"
+require_file "lora/scanner_dispatcher.py"
+require_file "lora/tx_queue.py"
+require_file "lora/metrics.py"
+require_file "lora/capture.py"
+require_file "lora/repeater_node.py"
+require_file "lora/routing.py"
 require_file "utils/__init__.py"
 require_file "utils/oled_display.py"
 require_file "configs/config.repeater.py"
@@ -59,6 +72,7 @@ require_file "utility_tools/setup/repeater/run_repeater.py"
 require_file "utility_tools/setup/repeater/build_cython.py"
 require_file "utility_tools/setup/repeater/setup_repeater.sh"
 require_file "utils/waveshare_monitor.py"
+require_file "utils/power_sampler.py"
 
 if [ "$MISSING" -gt 0 ]; then
     echo -e "${RED}  $MISSING required file(s) missing — aborting bundle${NC}"
@@ -98,6 +112,19 @@ cp lora/__init__.py "$DEST/lora/"
 cp lora/packet_handler.py "$DEST/lora/"
 cp lora/node_types.py "$DEST/lora/"
 cp lora/collision_avoidance.py "$DEST/lora/"
+cp lora/seen_cache.py "$DEST/lora/"
+cp lora/tx_scheduler.py "$DEST/lora/"
+cp lora/async_transceiver.py "$DEST/lora/"
+cp lora/radio_backend.py "$DEST/lora/"
+cp lora/sim_medium.py "$DEST/lora/"
+cp lora/multipart.py "$DEST/lora/"
+cp lora/response_cache.py "$DEST/lora/"
+cp lora/scanner_dispatcher.py "$DEST/lora/"
+cp lora/tx_queue.py "$DEST/lora/"
+cp lora/metrics.py "$DEST/lora/"
+cp lora/capture.py "$DEST/lora/"
+cp lora/repeater_node.py "$DEST/lora/"
+cp lora/routing.py "$DEST/lora/"
 
 # ---------------------------------------------------------------
 # Utils (config template + oled display + pisugar monitor)
@@ -108,6 +135,7 @@ mkdir -p "$DEST/utils"
 cp utils/__init__.py "$DEST/utils/"
 cp utils/oled_display.py "$DEST/utils/"
 cp utils/waveshare_monitor.py "$DEST/utils/"
+cp utils/power_sampler.py "$DEST/utils/"
 cp configs/config.repeater.py "$DEST/utils/config.repeater.py"
 
 # Include pisugar_monitor if it exists (optional)
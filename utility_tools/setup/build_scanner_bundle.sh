@@ -52,8 +52,22 @@ require_file "lora/__init__.py"
 require_file "lora/packet_handler.py"
 require_file "lora/node_types.py"
 require_file "lora/collision_avoidance.py"
+require_file "lora/seen_cache.py"
+require_file "lora/tx_scheduler.py"
+require_file "lora/async_transceiver.py"
+require_file "lora/radio_backend.py"
+require_file "lora/sim_medium.py"
+require_file "lora/multipart.py"
+require_file "lora/response_cache.py"
+require_file "lora/scanner_dispatcher.py"
+require_file "lora/tx_queue.py"
+require_file "lora/metrics.py"
+require_file "lora/capture.py"
+require_file "lora/repeater_node.py"
+require_file "lora/routing.py"
 require_file "utils/__init__.py"
 require_file "utils/matching_engine.py"
+require_file "utils/student_directory.py"
 require_file "configs/config.scanner.py"
 require_file "configs/requirements.scanner.txt"
 require_file "utility_tools/setup/scanner/run_scanner.py"
@@ -101,6 +115,19 @@ cp lora/__init__.py "$DEST/lora/"
 cp lora/packet_handler.py "$DEST/lora/"
 cp lora/node_types.py "$DEST/lora/"
 cp lora/collision_avoidance.py "$DEST/lora/"
+cp lora/seen_cache.py "$DEST/lora/"
+cp lora/tx_scheduler.py "$DEST/lora/"
+cp lora/async_transceiver.py "$DEST/lora/"
+cp lora/radio_backend.py "$DEST/lora/"
+cp lora/sim_medium.py "$DEST/lora/"
+cp lora/multipart.py "$DEST/lora/"
+cp lora/response_cache.py "$DEST/lora/"
+cp lora/scanner_dispatcher.py "$DEST/lora/"
+cp lora/tx_queue.py "$DEST/lora/"
+cp lora/metrics.py "$DEST/lora/"
+cp lora/capture.py "$DEST/lora/"
+cp lora/repeater_node.py "$DEST/lora/"
+cp lora/routing.py "$DEST/lora/"
 
 # ---------------------------------------------------------------
 # Utils (config template + matching engine)
@@ -110,6 +137,7 @@ echo -e "${CYAN}  Packaging utils/...${NC}"
 mkdir -p "$DEST/utils"
 cp utils/__init__.py "$DEST/utils/"
 cp utils/matching_engine.py "$DEST/utils/"
+cp utils/student_directory.py "$DEST/utils/"
 cp configs/config.scanner.py "$DEST/utils/config.scanner.py"
 
 # ---------------------------------------------------------------
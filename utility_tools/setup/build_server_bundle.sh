@@ -49,6 +49,19 @@ cp lora/__init__.py "$LORA_DEST/lora/"
 cp lora/packet_handler.py "$LORA_DEST/lora/"
 cp lora/node_types.py "$LORA_DEST/lora/"
 cp lora/collision_avoidance.py "$LORA_DEST/lora/"
+cp lora/seen_cache.py "$LORA_DEST/lora/"
+cp lora/tx_scheduler.py "$LORA_DEST/lora/"
+cp lora/async_transceiver.py "$LORA_DEST/lora/"
+cp lora/radio_backend.py "$LORA_DEST/lora/"
+cp lora/sim_medium.py "$LORA_DEST/lora/"
+cp lora/multipart.py "$LORA_DEST/lora/"
+cp lora/response_cache.py "$LORA_DEST/lora/"
+cp lora/scanner_dispatcher.py "$LORA_DEST/lora/"
+cp lora/tx_queue.py "$LORA_DEST/lora/"
+cp lora/metrics.py "$LORA_DEST/lora/"
+cp lora/capture.py "$LORA_DEST/lora/"
+cp lora/repeater_node.py "$LORA_DEST/lora/"
+cp lora/routing.py "$LORA_DEST/lora/"
 
 # Utils (config + api_client + offline_data + daily_report)
 mkdir -p "$LORA_DEST/utils"
@@ -56,6 +69,12 @@ cp utils/__init__.py "$LORA_DEST/utils/"
 cp utils/config.py "$LORA_DEST/utils/"
 cp utils/api_client.py "$LORA_DEST/utils/"
 cp utils/offline_data.py "$LORA_DEST/utils/"
+cp utils/student_directory.py "$LORA_DEST/utils/"
+cp utils/grades.py "$LORA_DEST/utils/"
+cp utils/student_index.py "$LORA_DEST/utils/"
+cp utils/rendered_responses.py "$LORA_DEST/utils/"
+cp utils/mqtt_publisher.py "$LORA_DEST/utils/"
+cp utils/lookup_client.py "$LORA_DEST/utils/"
 cp utils/daily_report.py "$LORA_DEST/utils/"
 
 # Server cockpit (desktop dashboard)
@@ -103,6 +122,8 @@ cp utils/__init__.py "$WEB_DEST/utils/"
 cp utils/config.py "$WEB_DEST/utils/"
 cp utils/api_client.py "$WEB_DEST/utils/"
 cp utils/offline_data.py "$WEB_DEST/utils/"
+cp utils/grades.py "$WEB_DEST/utils/"
+cp utils/student_index.py "$WEB_DEST/utils/"
 
 # Templates
 cp -r templates "$WEB_DEST/templates"
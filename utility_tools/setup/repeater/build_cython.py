@@ -27,8 +27,8 @@ Full compilation (all files):
 
     After successful compilation, remove source files manually:
         rm repeater.py
-        rm lora/collision_avoidance.py lora/node_types.py lora/packet_handler.py
-        rm utils/config.py utils/oled_display.py utils/waveshare_monitor.py utils/pisugar_monitor.py
+        rm lora/collision_avoidance.py lora/node_types.py lora/packet_handler.py lora/seen_cache.py lora/tx_scheduler.py lora/async_transceiver.py lora/radio_backend.py lora/sim_medium.py lora/multipart.py lora/response_cache.py lora/scanner_dispatcher.py lora/tx_queue.py lora/metrics.py lora/capture.py lora/repeater_node.py lora/routing.py
+        rm utils/config.py utils/oled_display.py utils/waveshare_monitor.py utils/pisugar_monitor.py utils/power_sampler.py
         rm -rf build/ *.c lora/*.c utils/*.c
 
     Do NOT delete: __init__.py, run_repeater.py, build_cython.py, config.repeater.py
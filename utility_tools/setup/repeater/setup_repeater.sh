@@ -173,7 +173,7 @@ extract_bundle() {
     fix_ownership
 
     # Verify critical files from bundle
-    CRITICAL_FILES="repeater.py run_repeater.py build_cython.py lora/__init__.py lora/packet_handler.py lora/node_types.py lora/collision_avoidance.py utils/__init__.py utils/config.py utils/oled_display.py"
+    CRITICAL_FILES="repeater.py run_repeater.py build_cython.py lora/__init__.py lora/packet_handler.py lora/node_types.py lora/collision_avoidance.py lora/seen_cache.py lora/tx_scheduler.py lora/async_transceiver.py lora/radio_backend.py lora/sim_medium.py lora/multipart.py lora/response_cache.py lora/scanner_dispatcher.py lora/tx_queue.py lora/metrics.py lora/capture.py lora/repeater_node.py lora/routing.py utils/__init__.py utils/config.py utils/oled_display.py"
     MISSING=0
     for f in $CRITICAL_FILES; do
         if [ ! -f "${INSTALL_DIR}/$f" ]; then
@@ -383,6 +383,8 @@ LORA_FREQUENCY=915.23
 LORA_TX_POWER=23
 LORA_TTL=3
 LORA_ENABLE_CA=TRUE
+LORA_CONTENTION_FLOODING=FALSE
+LORA_NEXT_HOP_ROUTING=FALSE
 POWER_HAT=${POWER_HAT}
 OLED_DRIVER=${OLED_DRIVER}
 EOF
@@ -569,7 +571,7 @@ verify_installation() {
     ERRORS=0
 
     # Check critical files exist (either .py or .so)
-    for mod in repeater lora/packet_handler lora/node_types lora/collision_avoidance utils/oled_display utils/config; do
+    for mod in repeater lora/packet_handler lora/node_types lora/collision_avoidance lora/seen_cache lora/tx_scheduler lora/async_transceiver lora/radio_backend lora/sim_medium lora/multipart lora/response_cache lora/scanner_dispatcher lora/tx_queue lora/metrics lora/capture lora/repeater_node lora/routing utils/oled_display utils/power_sampler utils/config; do
         PY="${INSTALL_DIR}/${mod}.py"
         # .so name varies by platform: module.cpython-3XX-arch.so
         SO_MATCH=$(find "${INSTALL_DIR}" -path "*/${mod##*/}.cpython-*.so" -o -path "*/${mod##*/}.so" 2>/dev/null | head -1)
@@ -173,7 +173,7 @@ extract_bundle() {
     fix_ownership
 
     # Verify critical files from bundle
-    CRITICAL_FILES="scanner_search.py run_scanner.py build_cython.py lora/__init__.py lora/packet_handler.py utils/__init__.py utils/config.py utils/matching_engine.py data/students.csv"
+    CRITICAL_FILES="scanner_search.py run_scanner.py build_cython.py lora/__init__.py lora/packet_handler.py utils/__init__.py utils/config.py utils/matching_engine.py utils/student_directory.py data/students.csv"
     MISSING=0
     for f in $CRITICAL_FILES; do
         if [ ! -f "${INSTALL_DIR}/$f" ]; then
@@ -538,7 +538,7 @@ verify_installation() {
     ERRORS=0
 
     # Check critical files exist (either .py or .so)
-    for mod in scanner_search lora/packet_handler lora/node_types lora/collision_avoidance utils/matching_engine utils/config; do
+    for mod in scanner_search lora/packet_handler lora/node_types lora/collision_avoidance lora/seen_cache lora/tx_scheduler lora/async_transceiver lora/radio_backend lora/sim_medium lora/multipart lora/response_cache lora/scanner_dispatcher lora/tx_queue lora/metrics lora/capture lora/repeater_node lora/routing utils/matching_engine utils/student_directory utils/config; do
         PY="${INSTALL_DIR}/${mod}.py"
         # .so name varies by platform: module.cpython-3XX-arch.so
         SO_MATCH=$(find "${INSTALL_DIR}" -path "*/${mod##*/}.cpython-*.so" -o -path "*/${mod##*/}.so" 2>/dev/null | head -1)
@@ -244,6 +244,7 @@ LORA_FREQUENCY=915.23
 LORA_TX_POWER=23
 LORA_TTL=3
 LORA_ENABLE_CA=TRUE
+LORA_NEXT_HOP_ROUTING=FALSE
 API_ENABLED=TRUE
 EOF
 
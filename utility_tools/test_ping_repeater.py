@@ -261,7 +261,8 @@ def main():
                                 data,
                                 max_retries=3,
                                 enable_rx_guard=True,
-                                enable_random_delay=True
+                                enable_random_delay=True,
+                                scheduler=transceiver.tx_scheduler
                             )
                         else:
                             success = transceiver.send_packet(repeated_packet, use_ack=False)
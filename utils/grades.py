@@ -0,0 +1,110 @@
+"""
+grades.py
+
+Shared grade normalization for the server and the scanner apps.
+
+HierarchyLevel1 holds the grade either as a name ("Fourth Grade") or with a
+numeric prefix ("04 Fourth"). CaptureLora, scanner_multi and
+scanner_validation each had their own if/elif chain of string slices to turn
+that into a short label, and the restricted-grade filter re-ran it (plus a
+datetime.now().strftime) for every student of every scan.
+
+- grade_label(raw): one dict lookup per distinct raw value (memoized)
+- grade_column(series): labels a whole DataFrame column at load time as a
+  compact categorical (one small int per row)
+- GradeRestrictions: the RESTRICTED_GRADES / UNRESTRICTED_DATES decision,
+  computed once per calendar day; a per-scan check is a set lookup
+"""
+
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+NOT_AVAILABLE = 'N/A'
+
+# Category order of grade_column (code = position)
+GRADES = (NOT_AVAILABLE, 'Kind', '1st', '2nd', '3rd', '4th', '5th', '6th', '7th', '8th')
+
+GRADE_COLUMN = 'Grade'
+
+_BY_NAME = {
+    'First Grade': '1st', 'Second Grade': '2nd', 'Third Grade': '3rd', 'Fourth Grade': '4th',
+    'Fifth Grade': '5th', 'Sixth Grade': '6th', 'Seventh Grade': '7th', 'Eighth Grade': '8th',
+}
+_BY_PREFIX = {f"{n:02d}": label for n, label in enumerate(GRADES[2:], start=1)}
+
+
+@lru_cache(maxsize=1024)
+def grade_label(raw) -> str:
+    """Short grade label ('4th', 'Kind', 'N/A') for a HierarchyLevel1 value"""
+    if not isinstance(raw, str):
+        return NOT_AVAILABLE   # None / NaN
+    grade = raw.strip()
+    label = _BY_NAME.get(grade) or _BY_PREFIX.get(grade[:2])
+    if label:
+        return label
+    if grade[:1] == 'K' or 'Kinder' in grade:
+        return 'Kind'
+    return NOT_AVAILABLE
+
+
+def grade_column(series):
+    """Categorical grade labels for a HierarchyLevel1 column (classified per distinct value)"""
+    import pandas as pd
+    labels = {raw: grade_label(raw) for raw in series.unique()}
+    return series.map(labels).astype(pd.CategoricalDtype(GRADES))
+
+
+class GradeRestrictions:
+    """
+    Which grades are held back today.
+
+    Usage:
+        restrictions = GradeRestrictions(RESTRICTED_GRADES, UNRESTRICTED_DATES)
+        restrictions.is_restricted(item['hierarchyLevel1'])
+        kept, removed = restrictions.filter(results)
+    """
+
+    def __init__(self, restricted_grades: Iterable[str], unrestricted_dates: Iterable[str] = ()):
+        """
+        Args:
+            restricted_grades: Labels held back (e.g. ['7th', '8th'])
+            unrestricted_dates: 'YYYY-MM-DD' days on which nothing is held back
+        """
+        self.grades = frozenset(restricted_grades)
+        self.unrestricted_dates = frozenset(unrestricted_dates)
+        self._today: frozenset = frozenset()
+        self._valid_until = 0.0
+
+    def restricted_today(self) -> frozenset:
+        """Labels restricted today; recomputed only when the calendar day changes"""
+        if time.time() >= self._valid_until:
+            now = datetime.now()
+            unrestricted = now.strftime('%Y-%m-%d') in self.unrestricted_dates
+            self._today = frozenset() if unrestricted else self.grades
+            tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            self._valid_until = tomorrow.timestamp()
+        return self._today
+
+    def active(self) -> bool:
+        """True if any grade is restricted today"""
+        return bool(self.restricted_today())
+
+    def restricts(self, grade_raw) -> bool:
+        """True if the grade is a restricted one, whatever the day"""
+        return grade_label(grade_raw) in self.grades
+
+    def is_restricted(self, grade_raw) -> bool:
+        """True if the grade is held back today"""
+        return grade_label(grade_raw) in self.restricted_today()
+
+    def filter(self, results: List[dict]) -> Tuple[List[dict], List[dict]]:
+        """Split lookup results (hierarchyLevel1 key) into (kept, restricted today)"""
+        today = self.restricted_today()
+        if not today:
+            return results, []
+        kept, removed = [], []
+        for item in results:
+            (removed if grade_label(item.get('hierarchyLevel1', '')) in today else kept).append(item)
+        return kept, removed
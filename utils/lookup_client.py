@@ -0,0 +1,244 @@
+"""
+lookup_client.py
+
+Long-lived client for the cloud student lookup (apiGetUserInfo) used by
+CaptureLora in API + local mode.
+
+get_user_from_api used to open a new aiohttp.ClientSession per scan, resolve
+both secrets and read the response twice, and when the cloud API was down
+every scan still waited up to LOOKUP_TIMEOUT before the local result was
+used. ApiLookupClient keeps:
+
+- one pooled keep-alive session, created on first use inside the event loop
+- credentials resolved once
+- a circuit breaker: after `failure_threshold` consecutive failures (errors,
+  timeouts, 5xx, or rejections such as 401/403/429) the API leg is skipped; after `retry_interval` seconds one scan probes it again
+  (success closes the breaker, failure re-opens it)
+- a short-TTL negative cache of codes the API did not know
+
+available(code) tells getInfo whether to race the API at all, so with an
+unhealthy backend a scan costs the same as local-only mode.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe"""
+
+    def __init__(self, failure_threshold: int = 3, retry_interval: float = 30.0):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the breaker
+            retry_interval: Seconds open before one probe is let through
+        """
+        self.failure_threshold = failure_threshold
+        self.retry_interval = retry_interval
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self.opens = 0   # Times the breaker tripped
+
+    def allow(self) -> bool:
+        """True if a call may go out now (reserves the probe when half-open)"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.retry_interval:
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logging.info("[API] Circuit closed - API lookups resumed")
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.opens += 1
+                logging.warning(f"[API] Circuit open after {self.failures} failure(s) - "
+                                f"local-only lookups, probing every {self.retry_interval:g}s")
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give back a half-open probe whose call was cancelled; the next one waits a full interval"""
+        if self.state == HALF_OPEN:
+            self.state = OPEN
+            self._opened_at = time.monotonic()   # Else every scan won locally would probe again
+
+
+class NegativeCache:
+    """Codes recently reported unknown, bounded and expiring"""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._expiry: 'OrderedDict[str, float]' = OrderedDict()
+
+    def add(self, code: str) -> None:
+        self._expiry.pop(code, None)
+        self._expiry[code] = time.monotonic() + self.ttl
+        while len(self._expiry) > self.max_entries:
+            self._expiry.popitem(last=False)
+
+    def __contains__(self, code: str) -> bool:
+        expiry = self._expiry.get(code)
+        if expiry is None:
+            return False
+        if time.monotonic() >= expiry:
+            del self._expiry[code]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+
+class ApiLookupClient:
+    """
+    Pooled apiGetUserInfo client with circuit breaker and negative cache.
+
+    Usage:
+        client = ApiLookupClient(f"{API_URL}apiGetUserInfo", IDFACILITY, credentials=load_credentials)
+        if client.available(code):
+            result = await client.lookup(code)   # None: unknown, error or skipped
+        await client.close()
+    """
+
+    def __init__(self, url: str, facility, credentials: Callable[[], Optional[Tuple[str, str]]],
+                 timeout: float = 10.0, failure_threshold: int = 3, retry_interval: float = 30.0,
+                 negative_ttl: float = 60.0, pool_size: int = 4, session_factory: Callable = None):
+        """
+        Args:
+            url: apiGetUserInfo endpoint
+            facility: IDFACILITY sent in the idFacility header
+            credentials: Returns (username, password), called once when the session is created
+            timeout: Seconds per API call
+            failure_threshold: Consecutive failures before the API leg is skipped
+            retry_interval: Seconds between probes while skipped
+            negative_ttl: Seconds an unknown code is not asked again
+            pool_size: Keep-alive connections kept to the API host
+            session_factory: (username, password) -> HTTP session (default pooled aiohttp)
+        """
+        self.url = url
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.headers = {
+            "Content-Type": "application/json",
+            "accept": "application/json",
+            "caller": "LocalApp",
+            "idFacility": str(facility)
+        }
+        self.breaker = CircuitBreaker(failure_threshold, retry_interval)
+        self.unknown = NegativeCache(negative_ttl)
+        self._credentials = credentials
+        self._session = None
+        self._session_factory = session_factory or self._aiohttp_session
+
+        # Counters
+        self.calls = 0              # Requests sent
+        self.found = 0              # 200 with data
+        self.not_found = 0          # Unknown codes (now negatively cached)
+        self.failures = 0           # Timeouts, connection errors, 5xx, other non-404 statuses
+        self.skipped_open = 0       # Scans that skipped the API (breaker open)
+        self.skipped_unknown = 0    # Scans that skipped the API (negative cache)
+
+    def available(self, code: str) -> bool:
+        """Whether this scan should race the API (reserves the probe when half-open)"""
+        if code in self.unknown:
+            self.skipped_unknown += 1
+            return False
+        if not self.breaker.allow():
+            self.skipped_open += 1
+            return False
+        return True
+
+    async def lookup(self, code: str):
+        """API result for a code, or None (not found, error, or no credentials)"""
+        if self._session is None:
+            credentials = self._credentials()
+            if not credentials:
+                logging.error("[API] Lookup credentials unavailable")
+                self.record_failure()
+                return None
+            self._session = self._session_factory(*credentials)
+
+        self.calls += 1
+        started = time.monotonic()
+        try:
+            async with self._session.post(self.url, json={"searchCode": code}) as response:
+                status = response.status
+                data = await response.json() if status == 200 else None
+        except asyncio.CancelledError:
+            # Lost the race to the local lookup; says nothing about API health
+            self.breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            logging.error(f"[API] Lookup timed out after {self.timeout}s")
+            self.record_failure()
+            return None
+        except Exception as e:
+            logging.error(f"[API] Lookup error: {type(e).__name__}: {e}")
+            self.record_failure()
+            return None
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        if status not in (200, 404):
+            # 5xx, or rejected (bad credentials, rate limited): every scan would pay for it
+            outcome = "failed" if status >= 500 else "rejected"
+            logging.error(f"[API] Lookup {outcome} with status {status} ({elapsed_ms:.0f}ms)")
+            self.record_failure()
+            return None
+
+        self.breaker.record_success()
+        if data:
+            self.found += 1
+            logging.debug(f"[API] Found {code} ({elapsed_ms:.0f}ms)")
+            return data
+        self.not_found += 1
+        self.unknown.add(code)
+        logging.debug(f"[API] Code {code} unknown ({elapsed_ms:.0f}ms)")
+        return None
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> dict:
+        return {
+            'state': self.breaker.state,
+            'calls': self.calls,
+            'found': self.found,
+            'not_found': self.not_found,
+            'failures': self.failures,
+            'opens': self.breaker.opens,
+            'skipped_open': self.skipped_open,
+            'skipped_unknown': self.skipped_unknown,
+            'negative_cached': len(self.unknown),
+        }
+
+    def record_failure(self) -> None:
+        """Count a failed call (also used by callers that gave up waiting on one)"""
+        self.failures += 1
+        self.breaker.record_failure()
+
+    def _aiohttp_session(self, username: str, password: str):
+        import aiohttp
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+            auth=aiohttp.BasicAuth(username, password),
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout))
@@ -0,0 +1,302 @@
+"""
+mqtt_publisher.py
+
+Non-blocking MQTT publish stage for CaptureLora.
+
+publishMQTT used to run inline on the radio-handling path and, on failure,
+disconnect()/connect() the paho client up to 5 times — stalling LoRa
+reception for seconds while the broker was unreachable. Now the event loop
+only enqueues (topic, payload) and a worker thread owns publishing:
+
+- bounded queue; publish() never blocks (overflow goes to the journal)
+- reconnects with exponential backoff on the worker thread
+- while the broker is down, messages are appended to an on-disk journal
+  (JSON lines) and replayed in order once it is back — also after a restart
+- optional batching: the students of one scan that go to the same topic are
+  sent as one JSON array instead of one message each
+- queue depth, journal size, counters and publish latency via metrics()
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Optional, Tuple
+
+from lora.metrics import WaitStat
+
+_STOP = object()
+
+
+def batch_messages(messages: Iterable[Tuple[str, str]]) -> list:
+    """
+    Merge JSON payloads for the same topic into one JSON array payload
+
+    Topics keep the order of their first message; a topic with a single
+    message keeps the plain object payload.
+    """
+    grouped = {}
+    for topic, payload in messages:
+        grouped.setdefault(topic, []).append(payload)
+    return [(topic, payloads[0] if len(payloads) == 1 else f"[{', '.join(payloads)}]")
+            for topic, payloads in grouped.items()]
+
+
+class MqttPublisher:
+    """
+    Queue + worker thread publishing to a paho client, with journal spill-over.
+
+    Usage:
+        publisher = MqttPublisher(client, "log/mqtt_journal.jsonl", reconnect=connectMQTT)
+        publisher.start()
+        publisher.publish("Class04", json_body)          # returns immediately
+        publisher.publish_scan([(topic, body), ...])     # batched if enabled
+        publisher.stop()
+    """
+
+    def __init__(self, client, journal_path: str, reconnect: Optional[Callable[[], None]] = None,
+                 max_queue: int = 1000, batch: bool = False, qos: int = 1,
+                 backoff_min: float = 1.0, backoff_max: float = 30.0):
+        """
+        Args:
+            client: paho mqtt.Client (connected, loop started)
+            journal_path: File for messages published while the broker is down
+            reconnect: Called on the worker thread to re-establish the connection
+                       (default client.reconnect)
+            max_queue: Messages waiting for the worker before spilling to the journal
+            batch: publish_scan() merges same-topic messages into one JSON array
+            qos: MQTT QoS for every message
+            backoff_min: Seconds before the first reconnect attempt
+            backoff_max: Cap on the doubling reconnect delay
+        """
+        self._client = client
+        self._reconnect = reconnect or client.reconnect
+        self.journal_path = str(journal_path)
+        self.batch = batch
+        self.qos = qos
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._journal_lock = threading.Lock()
+        self._journal_pending = self._count_journal()
+        self._thread: Optional[threading.Thread] = None
+        self._backoff = backoff_min
+        self._next_reconnect = 0.0
+
+        # Counters
+        self.published = 0    # Messages accepted by the client
+        self.failed = 0       # Publish calls that returned an error
+        self.journaled = 0    # Messages written to the journal
+        self.replayed = 0     # Journal messages published after recovery
+        self.overflow = 0     # Messages journaled because the queue was full
+        self.reconnects = 0   # Reconnect attempts
+        self._latency = WaitStat()
+
+    # ------------------------------------------------------------------
+    # Producer side (event loop)
+    # ------------------------------------------------------------------
+    def publish(self, topic: str, payload: str) -> bool:
+        """Queue one message; False only if it could not even be journaled"""
+        item = (topic, payload, time.monotonic())
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.overflow += 1
+            return self._journal([item])
+
+    def publish_scan(self, messages: Iterable[Tuple[str, str]]) -> bool:
+        """Queue the messages of one scan, batched per topic if enabled"""
+        messages = batch_messages(messages) if self.batch else list(messages)
+        ok = True
+        for topic, payload in messages:
+            ok = self.publish(topic, payload) and ok
+        return ok
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        if self._journal_pending:
+            logging.info(f"[MQTT] {self._journal_pending} journaled message(s) waiting for replay")
+        self._thread = threading.Thread(target=self._run, name="mqtt-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush what can be published; anything left goes to the journal"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def metrics(self) -> dict:
+        """Queue depth, journal backlog, counters and publish latency for status logging"""
+        return {
+            'queue_depth': self._queue.qsize(),
+            'journal_pending': self._journal_pending,
+            'connected': self._connected(),
+            'published': self.published,
+            'failed': self.failed,
+            'journaled': self.journaled,
+            'replayed': self.replayed,
+            'overflow': self.overflow,
+            'reconnects': self.reconnects,
+            'latency': self._latency.as_dict(),
+        }
+
+    # ------------------------------------------------------------------
+    # Worker thread
+    # ------------------------------------------------------------------
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._drain_on_stop()
+                return
+
+            self._recover()
+            if item is not None:
+                # Journal backlog goes out first to keep publish order
+                if self._journal_pending or not self._connected() or not self._send(item):
+                    self._journal([item])
+
+    def _recover(self) -> None:
+        """Reconnect if needed (with backoff) and replay the journal once connected"""
+        if not self._connected():
+            now = time.monotonic()
+            if now < self._next_reconnect:
+                return
+            self.reconnects += 1
+            self._next_reconnect = now + self._backoff
+            self._backoff = min(self._backoff * 2, self.backoff_max)
+            try:
+                self._reconnect()
+            except Exception as e:
+                logging.warning(f"[MQTT] Reconnect failed ({e}), next attempt in {self._next_reconnect - now:.1f}s")
+                return
+            if not self._connected():
+                return
+            logging.info("[MQTT] Reconnected to MQTT broker")
+        self._backoff = self.backoff_min
+        if self._journal_pending:
+            self._replay()
+
+    def _connected(self) -> bool:
+        try:
+            return bool(self._client.is_connected())
+        except Exception:
+            return False
+
+    def _send(self, item) -> bool:
+        topic, payload, queued_at = item
+        try:
+            ret = self._client.publish(topic, payload, qos=self.qos)
+            ok = ret[0] == 0
+        except Exception as e:
+            logging.error(f"[MQTT-TX] Publish error on {topic}: {e}")
+            ok = False
+        if ok:
+            self.published += 1
+            self._latency.add(time.monotonic() - queued_at)
+            logging.info(f'[MQTT-TX] SUCCESS: Topic={topic}, MsgID={ret[1]}, QoS={self.qos}')
+        else:
+            self.failed += 1
+            logging.error(f'[MQTT-TX] FAILED: Topic={topic} - journaling')
+            self._next_reconnect = min(self._next_reconnect, time.monotonic())
+        return ok
+
+    def _drain_on_stop(self) -> None:
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if self._connected() and self._journal_pending:
+            self._replay()
+        for index, item in enumerate(leftover):
+            if self._journal_pending or not self._connected() or not self._send(item):
+                self._journal(leftover[index:])
+                break
+
+    # ------------------------------------------------------------------
+    # Journal
+    # ------------------------------------------------------------------
+    def _journal(self, items) -> bool:
+        lines = ''.join(json.dumps({'topic': t, 'payload': p, 'ts': time.time()}) + '\n'
+                        for t, p, _ in items)
+        with self._journal_lock:
+            try:
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+            except OSError as e:
+                logging.error(f"[MQTT] Could not journal {len(items)} message(s): {e} - DROPPED")
+                return False
+            self._journal_pending += len(items)
+            self.journaled += len(items)
+        return True
+
+    def _count_journal(self) -> int:
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                return sum(1 for line in f if line.strip())
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            logging.error(f"[MQTT] Could not read journal {self.journal_path}: {e}")
+            return 0
+
+    def _replay(self) -> None:
+        """Publish journaled messages in order; keep the rest if the broker fails again"""
+        with self._journal_lock:
+            try:
+                with open(self.journal_path, 'r', encoding='utf-8') as f:
+                    lines = [line for line in f if line.strip()]
+            except FileNotFoundError:
+                self._journal_pending = 0
+                return
+
+            sent = 0
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                    topic, payload = entry['topic'], entry['payload']
+                except (ValueError, KeyError, TypeError):
+                    logging.warning(f"[MQTT] Skipping corrupt journal line: {line.strip()[:80]}")
+                    sent += 1
+                    continue
+                try:
+                    ok = self._client.publish(topic, payload, qos=self.qos)[0] == 0
+                except Exception:
+                    ok = False
+                if not ok:
+                    self.failed += 1
+                    break
+                sent += 1
+                self.replayed += 1
+
+            remaining = lines[sent:]
+            if remaining:
+                tmp_path = f"{self.journal_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.writelines(remaining)
+                os.replace(tmp_path, self.journal_path)
+            else:
+                os.remove(self.journal_path)
+            self._journal_pending = len(remaining)
+
+        if sent:
+            logging.info(f"[MQTT] Replayed {sent} journaled message(s), {len(remaining)} pending")
@@ -11,6 +11,8 @@ from numpy.f2py.cfuncs import needs
 from pandas.core.interchange.dataframe_protocol import DataFrame
 from utils.config import LORASERVICE_PATH, IDFACILITY, OFFLINE_USERS_FILENAME, OFFLINE_FULL_LOAD_FILENAME, LOCAL_FILE_VERSIONS
 from utils.api_client import api_request, get_secret
+from utils.student_index import StudentIndex
+from utils.grades import GRADE_COLUMN, grade_column
 import json
 from pathlib import Path
 
@@ -19,6 +21,7 @@ class OfflineData:
     _offlineAPITokenExp: datetime
     _offlineUsersDF: DataFrame
     _allUsersDF: DataFrame
+    _studentIndex: StudentIndex
     _localFileVersions: dict
     offlineUserAvailable: bool
     filepath: str
@@ -38,8 +41,10 @@ class OfflineData:
         self._emptyVersions = {OFFLINE_FULL_LOAD_FILENAME: {'version': 'new'}, OFFLINE_USERS_FILENAME: {'version': 'new'}}
         self._localFileVersions = self._load_file_versions()
         self._allUsersDF = self.loadAppUsers()
+        self._studentIndex = StudentIndex.from_dataframe(self._allUsersDF)
         self.getOfflineUsers()
         self._refresh_timer = None
+        self._refresh_listeners = []
 
     def _load_file_versions(self) -> dict:
         """Loads the stored file versions from local JSON."""
@@ -323,6 +328,8 @@ class OfflineData:
             else:
                 #Convert ExternalNumber to string for search
                 df['ExternalNumber'] = df['ExternalNumber'].astype(str)
+                # Normalized grade per row, classified once at load
+                df[GRADE_COLUMN] = grade_column(df['HierarchyLevel1'])
                 return df
         except Exception as e:
             logging.error(f"Error loading app users: {str(e)}")
@@ -336,10 +343,14 @@ class OfflineData:
             logging.error(f"Error getting app users: {str(e)}")
             return None
 
+    def getStudentIndex(self) -> StudentIndex:
+        """Returns the DeviceID lookup index for the current app users."""
+        return self._studentIndex
+
     def refreshAllData(self):
         """
         Check versions and re-download both data files if newer versions exist.
-        Reloads the in-memory DataFrames on success.
+        Reloads the in-memory DataFrames (and the student index) on success.
         If download fails or the new file is empty, keeps using the previous data.
         """
         logging.info("[REFRESH] Starting scheduled data refresh...")
@@ -357,8 +368,13 @@ class OfflineData:
                 if result and result[0] and result[1] is not None and not result[1].empty:
                     new_df = result[1]
                     new_df['ExternalNumber'] = new_df['ExternalNumber'].astype(str)
+                    new_df[GRADE_COLUMN] = grade_column(new_df['HierarchyLevel1'])
+                    # Build the index before swapping so lookups never see a half-built one
+                    new_index = StudentIndex.from_dataframe(new_df)
                     self._allUsersDF = new_df
+                    self._studentIndex = new_index
                     logging.info(f"[REFRESH] {OFFLINE_FULL_LOAD_FILENAME} updated and reloaded ({len(new_df)} records)")
+                    self._notify_refresh_listeners()
                 else:
                     logging.warning(f"[REFRESH] {OFFLINE_FULL_LOAD_FILENAME} download returned empty — keeping previous data")
             else:
@@ -397,6 +413,17 @@ class OfflineData:
 
         logging.info("[REFRESH] Scheduled data refresh complete")
 
+    def add_refresh_listener(self, callback):
+        """Call callback(student_index) whenever a refresh swaps in new app users."""
+        self._refresh_listeners.append(callback)
+
+    def _notify_refresh_listeners(self):
+        for callback in self._refresh_listeners:
+            try:
+                callback(self._studentIndex)
+            except Exception as e:
+                logging.error(f"[REFRESH] Refresh listener failed: {str(e)}")
+
     def _schedule_next_refresh(self):
         """Schedule the next refresh at 1:30 PM on the next weekday."""
         now = datetime.now()
@@ -3,7 +3,9 @@
 PiSugar 3 Monitor Utility for IQRight Repeater
 
 Lean implementation using official PiSugar I2C library.
-No threads, no continuous monitoring - just read when called.
+No threads, no continuous monitoring - just read when called (the repeater's
+utils.power_sampler.PowerSampler keeps the bus and the pisugar-server socket
+open and calls in here).
 
 Usage:
     from utils.pisugar_monitor import read_pisugar_status
@@ -15,6 +17,7 @@ Usage:
 """
 
 import logging
+import socket
 from typing import Dict, Any, Optional
 
 try:
@@ -27,6 +30,10 @@ except ImportError:
 # Pi/agentsSugar I2C addresses
 PISUGAR3_ADDRESS = 0x57
 
+# pisugar-server TCP API (RTC alarm, button events)
+PISUGAR_SERVER_HOST = '127.0.0.1'
+PISUGAR_SERVER_PORT = 8423
+
 # Battery voltage to percentage curve for PiSugar3 (1200mAh)
 BATTERY_CURVE_1200_3 = [
     (4.2, 100.0),  # Full charge
@@ -101,13 +108,65 @@ def _voltage_to_percentage(voltage: float) -> float:
         return BATTERY_CURVE_1200_3[-1][1]  # 0%
 
 
-def read_pisugar_status() -> Dict[str, Any]:
+def _empty_status() -> Dict[str, Any]:
+    return {
+        'available': False,
+        'battery': 0.0,
+        'voltage': 0.0,
+        'charging': False,
+        'temperature': 0,
+        'model': 'Unknown',
+        'error': ''
+    }
+
+
+def status_from_registers(registers: list) -> Dict[str, Any]:
+    """
+    Build the status dictionary from the 256 PiSugar3 registers
+
+    Args:
+        registers: Register values from _read_registers()
+    """
+    status = _empty_status()
+
+    # Parse battery voltage (registers 0x22-0x23)
+    # High byte at 0x22, low byte at 0x23
+    high = registers[0x22]
+    low = registers[0x23]
+    voltage = ((high << 8) + low) / 1000.0  # Convert to volts
+
+    # Parse temperature (register 0x04, offset by -40)
+    temperature = registers[0x04] - 40
+
+    # Parse control register 1 (0x02) for power status
+    ctr1 = registers[0x02]
+    power_plugged = (ctr1 & (1 << 7)) != 0  # Bit 7 = power plugged
+
+    # Calculate battery percentage
+    battery_percent = _voltage_to_percentage(voltage)
+
+    # Populate status
+    status['available'] = True
+    status['battery'] = round(battery_percent, 1)
+    status['voltage'] = round(voltage, 2)
+    status['charging'] = power_plugged
+    status['temperature'] = temperature
+    status['model'] = 'PiSugar3'
+
+    return status
+
+
+def read_pisugar_status(bus=None) -> Dict[str, Any]:
     """
     Read PiSugar3 status via I2C
 
     Simple one-shot read: connect → read → parse → disconnect
     No threads, no continuous monitoring
 
+    Args:
+        bus: Open SMBus to read through and leave open (the repeater's
+            PowerSampler keeps one); None opens and closes SMBus(1)
+
     Returns:
         Dictionary with PiSugar status:
         {
@@ -120,24 +179,17 @@ def read_pisugar_status() -> Dict[str, Any]:
             'error': str             # Error message if available=False
         }
     """
-    status = {
-        'available': False,
-        'battery': 0.0,
-        'voltage': 0.0,
-        'charging': False,
-        'temperature': 0,
-        'model': 'Unknown',
-        'error': ''
-    }
+    status = _empty_status()
 
-    if not SMBUS_AVAILABLE:
+    if bus is None and not SMBUS_AVAILABLE:
         status['error'] = 'smbus module not available'
         return status
 
-    bus = None
+    owned_bus = None
     try:
         # Initialize I2C bus
-        bus = smbus.SMBus(1)
+        if bus is None:
+            bus = owned_bus = smbus.SMBus(1)
 
         # Check if PiSugar3 is present
         if not _check_device(bus, PISUGAR3_ADDRESS):
@@ -150,39 +202,17 @@ def read_pisugar_status() -> Dict[str, Any]:
             status['error'] = 'Failed to read PiSugar registers'
             return status
 
-        # Parse battery voltage (registers 0x22-0x23)
-        # High byte at 0x22, low byte at 0x23
-        high = registers[0x22]
-        low = registers[0x23]
-        voltage = ((high << 8) + low) / 1000.0  # Convert to volts
-
-        # Parse temperature (register 0x04, offset by -40)
-        temperature = registers[0x04] - 40
-
-        # Parse control register 1 (0x02) for power status
-        ctr1 = registers[0x02]
-        power_plugged = (ctr1 & (1 << 7)) != 0  # Bit 7 = power plugged
-
-        # Calculate battery percentage
-        battery_percent = _voltage_to_percentage(voltage)
-
-        # Populate status
-        status['available'] = True
-        status['battery'] = round(battery_percent, 1)
-        status['voltage'] = round(voltage, 2)
-        status['charging'] = power_plugged
-        status['temperature'] = temperature
-        status['model'] = 'PiSugar3'
+        status = status_from_registers(registers)
 
     except Exception as e:
         status['error'] = str(e)
         logging.error(f"Error reading PiSugar status: {e}")
 
     finally:
-        # Always close bus
-        if bus is not None:
+        # Always close a bus we opened
+        if owned_bus is not None:
             try:
-                bus.close()
+                owned_bus.close()
             except Exception:
                 pass
 
@@ -218,6 +248,62 @@ def format_status_for_lora(status: Dict[str, Any], event: str = None) -> str:
     return f"{base}|{event}" if event else base
 
 
+class PiSugarServerClient:
+    """
+    Persistent connection to the pisugar-server TCP API
+
+    One "get <key>" per line, answered with "<key>: <value>". The server also
+    pushes button events ("single", "double", "long") on the connection; those
+    lines are skipped. The socket is reopened on the next command after an error.
+    """
+
+    def __init__(self, host: str = PISUGAR_SERVER_HOST, port: int = PISUGAR_SERVER_PORT,
+                 timeout: float = 2.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._sock = None
+        self._pending = b''
+
+    def get(self, key: str) -> Optional[str]:
+        """Value of "get <key>", or None if the server is unreachable"""
+        try:
+            if self._sock is None:
+                self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                self._pending = b''
+            self._sock.sendall(f"get {key}\n".encode())
+            prefix = f"{key}:".encode()
+            while True:
+                while b'\n' not in self._pending:
+                    chunk = self._sock.recv(256)
+                    if not chunk:
+                        raise ConnectionError('pisugar-server closed the connection')
+                    self._pending += chunk
+                line, self._pending = self._pending.split(b'\n', 1)
+                if line.startswith(prefix):
+                    return line[len(prefix):].decode('utf-8', errors='replace').strip()
+        except (OSError, ConnectionError) as e:
+            logging.debug(f"pisugar-server {key} failed: {e}")
+            self.close()
+            return None
+
+    def rtc_alarm_time(self) -> str:
+        """Next RTC wakeup as HH:MM, or '--'"""
+        # Format: "rtc_alarm_time: 2026-04-23T13:00:00.000-05:00"
+        value = self.get('rtc_alarm_time')
+        if value and 'T' in value:
+            return value.split('T')[1][:5]
+        return '--'
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
 def get_battery_percent(status: Dict[str, Any] = None) -> Optional[int]:
     """
     Get battery percentage (for backward compatibility with OLED display)
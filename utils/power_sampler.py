@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Power Telemetry Sampler for IQRight Repeater
+
+Keeps the power HAT connection open and samples it on a background thread, so
+STATUS packets and the OLED read a cached sample instead of paying for a
+minicom subprocess (~5 s per read) or an SMBus open/close:
+
+- Waveshare: the serial port stays open (pyserial) and the HAT's status
+  blocks (~1 per second) are parsed incrementally as they arrive
+- PiSugar: the I2C bus stays open and is read every `interval` seconds; the
+  pisugar-server socket stays open for the RTC wakeup time
+
+Samples go into a ring buffer. latest() returns the newest one; status_payload()
+formats the usual STATUS payload plus min/avg/max over the samples since the
+previous STATUS:
+
+    "4.99|5.22|226.0|OK|OK|Waveshare||range=vin:4.90/4.97/5.01;vout:...;n=600"
+
+The range field always comes after the event slot (empty for periodic
+status), so servers reading only the first fields are unaffected.
+
+Usage:
+    from utils.power_sampler import PowerSampler
+
+    sampler = PowerSampler.for_hat('WAVESHARE', serial_device='/dev/ttyS0', baud=115200)
+    sampler.start()
+    status = sampler.latest()
+    payload = sampler.status_payload(event='STARTUP')
+    sampler.stop()
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils import waveshare_monitor
+from utils.waveshare_monitor import WaveshareStreamParser, status_from_parsed
+
+RETRY_INTERVAL = 5.0   # Seconds before reopening a failed port / bus
+
+
+def _serial_port(device: str, baud: int, timeout: float):
+    import serial
+    return serial.Serial(device, baud, timeout=timeout)
+
+
+def _smbus():
+    import smbus
+    return smbus.SMBus(1)
+
+
+class WaveshareSource:
+    """Waveshare HAT on a persistent serial port; the HAT paces the samples"""
+
+    model = 'Waveshare'
+    paced = False   # read() blocks until the HAT sends data
+    wakeup = '--'
+    # (label, status key, format) summarized into the STATUS range field
+    SUMMARY_FIELDS = (('vin', 'vin_voltage', '.2f'), ('vout', 'vout_voltage', '.2f'),
+                      ('current', 'vout_current', '.1f'))
+
+    def __init__(self, serial_device: str = '/dev/ttyS0', baud: int = 115200,
+                 port_factory: Optional[Callable] = None):
+        self.serial_device = serial_device
+        self.baud = baud
+        self.port_factory = port_factory or _serial_port
+        self._port = None
+        self._parser = WaveshareStreamParser()
+
+    def open(self, timeout: float) -> None:
+        if self._port is None:
+            self._port = self.port_factory(self.serial_device, self.baud, timeout)
+            self._parser = WaveshareStreamParser()
+            logging.info(f"Waveshare serial port {self.serial_device} opened ({self.baud} baud)")
+
+    def read(self) -> List[Dict[str, Any]]:
+        data = self._port.read(max(1, self._port.in_waiting))
+        if not data:
+            return []
+        blocks = self._parser.feed(data.decode('ascii', errors='replace'))
+        return [status_from_parsed(parsed, log_alerts=False) for parsed in blocks]
+
+    def refresh(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self._port is not None:
+            try:
+                self._port.close()
+            except Exception:
+                pass
+            self._port = None
+
+    @staticmethod
+    def format(status: Dict[str, Any], event: str = None) -> str:
+        return waveshare_monitor.format_status_for_lora(status, event=event)
+
+
+class PiSugarSource:
+    """PiSugar3 on a persistent I2C bus, plus the pisugar-server socket"""
+
+    model = 'PiSugar3'
+    paced = True    # polled every sampler interval
+    SUMMARY_FIELDS = (('battery', 'battery', '.1f'), ('voltage', 'voltage', '.2f'))
+
+    def __init__(self, bus_factory: Optional[Callable] = None,
+                 server=None, wakeup_interval: float = 60.0):
+        """
+        Args:
+            bus_factory: Returns the SMBus to keep open (default SMBus(1))
+            server: PiSugarServerClient for the RTC wakeup (default localhost:8423)
+            wakeup_interval: Seconds between RTC wakeup queries
+        """
+        from utils import pisugar_monitor   # Optional module (PiSugar installs only)
+        self.bus_factory = bus_factory or _smbus
+        self.server = server if server is not None else pisugar_monitor.PiSugarServerClient()
+        self.wakeup_interval = wakeup_interval
+        self.wakeup = '--'
+        self._bus = None
+        self._wakeup_checked = None
+
+    def open(self, timeout: float) -> None:
+        if self._bus is None:
+            self._bus = self.bus_factory()
+            logging.info("PiSugar I2C bus opened")
+
+    def read(self) -> List[Dict[str, Any]]:
+        from utils.pisugar_monitor import read_pisugar_status
+        status = read_pisugar_status(self._bus)
+        if not status['available']:
+            raise OSError(status['error'])   # Reopen the bus after RETRY_INTERVAL
+        return [status]
+
+    def refresh(self) -> None:
+        """RTC wakeup time, once per wakeup_interval"""
+        now = time.monotonic()
+        if self._wakeup_checked is None or now - self._wakeup_checked >= self.wakeup_interval:
+            self._wakeup_checked = now
+            self.wakeup = self.server.rtc_alarm_time()
+
+    def close(self) -> None:
+        if self._bus is not None:
+            try:
+                self._bus.close()
+            except Exception:
+                pass
+            self._bus = None
+        self.server.close()
+
+    @staticmethod
+    def format(status: Dict[str, Any], event: str = None) -> str:
+        from utils.pisugar_monitor import format_status_for_lora
+        return format_status_for_lora(status, event=event)
+
+
+class PowerSampler:
+    """
+    Background power HAT sampler with a ring buffer of recent readings.
+
+    The sampler thread is the only one touching the port / bus; readers get
+    the newest sample from an attribute, so latest() never blocks.
+    """
+
+    def __init__(self, source, interval: float = 1.0, history: int = 900,
+                 stale_after: Optional[float] = None):
+        """
+        Args:
+            source: WaveshareSource or PiSugarSource
+            interval: Port read timeout (Waveshare) or poll interval (PiSugar)
+            history: Samples kept (900 = 15 min at one per second)
+            stale_after: Seconds without a sample before latest() reports the
+                HAT unavailable (default 10 intervals, at least 10 s)
+        """
+        self.source = source
+        self.interval = interval
+        self.stale_after = stale_after if stale_after is not None else max(10.0, 10 * interval)
+        self._samples: deque = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._latest: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._alerts: Tuple[str, ...] = ()
+        self._error = ''
+        self._summary_since = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def for_hat(cls, hat: str, serial_device: str = '/dev/ttyS0', baud: int = 115200, **kwargs):
+        """Sampler for the POWER_HAT setting (WAVESHARE or PISUGAR)"""
+        if hat.upper() == 'PISUGAR':
+            return cls(PiSugarSource(), **kwargs)
+        return cls(WaveshareSource(serial_device, baud), **kwargs)
+
+    @property
+    def wakeup(self) -> str:
+        """Next RTC wakeup (HH:MM) if the HAT reports one, else '--'"""
+        return self.source.wakeup
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="power-sampler", daemon=True)
+        self._thread.start()
+        logging.info(f"Power sampler started ({self.source.model})")
+
+    def stop(self, timeout: float = 3.0) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        source = self.source
+        while not self._stop.is_set():
+            try:
+                source.open(self.interval)
+                for status in source.read():
+                    self._record(status)
+                source.refresh()
+                if source.paced:
+                    self._stop.wait(self.interval)
+            except Exception as e:
+                if str(e) != self._error:
+                    logging.error(f"Power sampler ({source.model}): {e}")
+                self._error = str(e)
+                source.close()
+                self._stop.wait(RETRY_INTERVAL)
+        source.close()
+
+    def _record(self, status: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        status['sampled_at'] = time.time()
+        with self._lock:
+            self._samples.append((now, status))
+        self._latest = (now, status)
+        self._error = status.get('error', '')
+
+        # Log alert changes, not every sample
+        alerts = tuple(status.get('alerts', ()))
+        if alerts != self._alerts:
+            for alert, detail in zip(status['alerts'], status['alert_details']):
+                if alert not in self._alerts:
+                    logging.warning(f"Power alert {alert}: {detail}")
+            cleared = [alert for alert in self._alerts if alert not in alerts]
+            if cleared:
+                logging.info(f"Power alerts cleared: {', '.join(cleared)}")
+            self._alerts = alerts
+
+    # ------------------------------------------------------------------
+    # Readers (any thread)
+    # ------------------------------------------------------------------
+    def latest(self) -> Dict[str, Any]:
+        """Newest sample; available=False if there is none or it is stale"""
+        latest = self._latest
+        if latest is None:
+            return {'available': False, 'alerts': [], 'alert_details': [],
+                    'error': self._error or 'no sample yet'}
+        sampled, status = latest
+        age = time.monotonic() - sampled
+        if age > self.stale_after:
+            stale = dict(status, available=False)
+            stale['error'] = self._error or f'no sample for {age:.0f}s'
+            return stale
+        return status
+
+    def summary(self, since: Optional[float] = None) -> Dict[str, Any]:
+        """
+        min/avg/max of the summary fields over available samples
+
+        Args:
+            since: time.monotonic() lower bound (None = whole ring buffer)
+
+        Returns:
+            {'samples': n, 'fields': {label: (min, avg, max)}}
+        """
+        with self._lock:
+            samples = [status for sampled, status in self._samples
+                       if status.get('available') and (since is None or sampled >= since)]
+        fields = {}
+        if samples:
+            for label, key, _ in self.source.SUMMARY_FIELDS:
+                values = [status[key] for status in samples if status.get(key) is not None]
+                if values:
+                    fields[label] = (min(values), sum(values) / len(values), max(values))
+        return {'samples': len(samples), 'fields': fields}
+
+    def format_range(self, summary: Dict[str, Any]) -> str:
+        """STATUS range field: range=vin:min/avg/max;...;n=samples"""
+        parts = []
+        for label, _, fmt in self.source.SUMMARY_FIELDS:
+            if label in summary['fields']:
+                low, avg, high = summary['fields'][label]
+                parts.append(f"{label}:{low:{fmt}}/{avg:{fmt}}/{high:{fmt}}")
+        parts.append(f"n={summary['samples']}")
+        return "range=" + ";".join(parts)
+
+    def status_payload(self, event: str = None) -> str:
+        """
+        STATUS payload for the latest sample, with min/avg/max since the
+        previous call (the previous STATUS) when there is more than one sample
+        """
+        status = self.latest()
+        now = time.monotonic()
+        summary = self.summary(since=self._summary_since)
+        self._summary_since = now
+        payload = self.source.format(status, event=event)
+        if status['available'] and summary['samples'] > 1:
+            if not event:
+                payload += "|"   # Empty event slot keeps the field positions
+            payload += "|" + self.format_range(summary)
+        return payload
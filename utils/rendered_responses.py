@@ -0,0 +1,203 @@
+"""
+rendered_responses.py
+
+Scanner responses pre-rendered from the StudentIndex at data load.
+
+For a scan, CaptureLora used to build result dicts, pack "name|classCode"
+records (or directory row IDs), encode them and json.dumps every student for
+MQTT. None of that depends on the scan except node, distance, location and
+timestamp, so it is done once per data load / refresh for every DeviceID:
+
+- DATA payload bytes per frame, in text and (when every student is in the
+  directory) directory-ID form
+- MQTT JSON fragments per student; the per-scan fields are spliced in
+  between, giving exactly json.dumps() of the published dict
+- a second variant for codes with restricted-grade students (filtered list,
+  or "all restricted"), stored only where it differs
+
+A lookup then only has to pick the variant; the transceiver stamps sequence
+numbers and CRCs when the frames go out.
+"""
+
+import json
+import logging
+import sys
+import time
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from lora import LoRaPacket, RECORD_SEPARATOR, pack_records
+from utils.student_directory import StudentDirectory
+from utils.student_index import StudentIndex, StudentRecord
+
+
+class RenderedStudent(NamedTuple):
+    """One student with its MQTT JSON pre-rendered around the per-scan fields"""
+    record: StudentRecord
+    mqtt_head: str      # '{"name": ..., "hierarchyID": "04", '
+    mqtt_middle: str    # '"externalNumber": "1001", "location": '
+    mqtt_tail: str      # ', "classCode": "4W", "source": "local"}'
+
+    @classmethod
+    def render(cls, record: StudentRecord) -> 'RenderedStudent':
+        head = json.dumps({
+            "name": record.name,
+            "hierarchyLevel2": record.hierarchyLevel2,
+            "hierarchyLevel1": record.hierarchyLevel1,
+            "hierarchyID": record.hierarchyID,
+        })
+        return cls(
+            record,
+            head[:-1] + ', ',
+            f'"externalNumber": {json.dumps(record.externalNumber)}, "location": ',
+            f', "classCode": {json.dumps(record.classCode)}, "source": "local"}}',
+        )
+
+    def mqtt_body(self, beacon, code, distance: int, location, timestamp: str) -> str:
+        """MQTT JSON for one scan (same bytes as json.dumps of the result dict)"""
+        return (f'{self.mqtt_head}"node": {json.dumps(beacon)}, "externalID": {json.dumps(code)}, '
+                f'"distance": {distance}, "timestamp": {json.dumps(timestamp)}, '
+                f'{self.mqtt_middle}{json.dumps(location)}{self.mqtt_tail}')
+
+
+class RenderedFrame(NamedTuple):
+    """(students, payload) for one DATA frame — same shape as buildDataFrames output"""
+    students: Tuple[RenderedStudent, ...]
+    payload: bytes
+
+
+class ResponseVariant(NamedTuple):
+    """Frames for one DeviceID under one restricted-grade outcome"""
+    text: Tuple[RenderedFrame, ...]
+    directory: Optional[Tuple[RenderedFrame, ...]]   # None if a student is not in the directory
+    removed: Tuple[RenderedStudent, ...]             # Restricted students left out
+
+    @property
+    def all_restricted(self) -> bool:
+        return not self.text and bool(self.removed)
+
+
+def _text_frames(students: Tuple[RenderedStudent, ...], max_payload: int) -> Tuple[RenderedFrame, ...]:
+    frames = []
+    start = 0
+    records = [f"{s.record.name}|{s.record.classCode}" for s in students]
+    for group in pack_records(records, max_payload):
+        frames.append(RenderedFrame(students[start:start + len(group)],
+                                    RECORD_SEPARATOR.join(group).encode('utf-8')))
+        start += len(group)
+    return tuple(frames)
+
+
+def _directory_frames(students: Tuple[RenderedStudent, ...], directory: Optional[StudentDirectory],
+                      max_payload: int) -> Optional[Tuple[RenderedFrame, ...]]:
+    if directory is None or not students:
+        return None
+    row_ids = [directory.lookup_id(s.record.name, s.record.classCode) for s in students]
+    if None in row_ids:
+        return None
+    per_frame = directory.ids_per_frame(max_payload)
+    return tuple(
+        RenderedFrame(students[i:i + per_frame], directory.encode(row_ids[i:i + per_frame]).encode('utf-8'))
+        for i in range(0, len(students), per_frame)
+    )
+
+
+class RenderedResponses:
+    """
+    Immutable DeviceID -> ResponseVariant cache, built once per data load.
+
+    Usage:
+        responses = RenderedResponses(index, directory, restricted_grade=is_restricted)
+        variant = responses.get(code, restrictions_active=True)
+        frames = variant.directory if directory_mode and variant.directory else variant.text
+    """
+
+    def __init__(self, index: StudentIndex, directory: Optional[StudentDirectory] = None,
+                 restricted_grade: Optional[Callable[[str], bool]] = None,
+                 max_payload: int = LoRaPacket.MAX_PAYLOAD):
+        """
+        Args:
+            index: Student index to render
+            directory: Student directory for directory-ID frames (None = text only)
+            restricted_grade: hierarchyLevel1 -> True if that grade is restricted
+                              (date exceptions are checked at lookup, not here)
+            max_payload: DATA payload bytes per frame
+        """
+        started = time.perf_counter()
+        self.directory_version = directory.version if directory else None
+        self._responses: Dict[str, ResponseVariant] = {}
+        self._restricted: Dict[str, ResponseVariant] = {}
+        self.failed = 0
+
+        for code, records in index.items():
+            try:
+                students = tuple(RenderedStudent.render(record) for record in records)
+                self._responses[code] = ResponseVariant(
+                    _text_frames(students, max_payload),
+                    _directory_frames(students, directory, max_payload),
+                    ()
+                )
+                if restricted_grade is None:
+                    continue
+                allowed = tuple(s for s in students if not restricted_grade(s.record.hierarchyLevel1))
+                if len(allowed) != len(students):
+                    self._restricted[code] = ResponseVariant(
+                        _text_frames(allowed, max_payload),
+                        _directory_frames(allowed, directory, max_payload),
+                        tuple(s for s in students if s not in allowed)
+                    )
+            except (TypeError, ValueError) as e:
+                # Left out of the cache; CaptureLora falls back to the per-scan path
+                self._responses.pop(code, None)
+                self.failed += 1
+                logging.debug(f"[RENDER] Could not pre-render DeviceID {code}: {e}")
+
+        self.warm_ms = (time.perf_counter() - started) * 1000
+        self.footprint_bytes = self._footprint()
+
+    def get(self, code, restrictions_active: bool = False) -> Optional[ResponseVariant]:
+        """Pre-rendered response for a DeviceID, or None if not cached"""
+        if restrictions_active:
+            variant = self._restricted.get(code)
+            if variant is not None:
+                return variant
+        return self._responses.get(code)
+
+    def __contains__(self, code) -> bool:
+        return code in self._responses
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def stats(self) -> dict:
+        return {
+            'devices': len(self._responses),
+            'restricted_variants': len(self._restricted),
+            'failed': self.failed,
+            'warm_ms': round(self.warm_ms, 1),
+            'footprint_kb': round(self.footprint_bytes / 1024, 1),
+        }
+
+    def _footprint(self) -> int:
+        """Approximate bytes held by the cache (records shared with the index excluded)"""
+        seen = set()
+
+        def size(objects: Iterable) -> int:
+            total = 0
+            for obj in objects:
+                if id(obj) not in seen:
+                    seen.add(id(obj))
+                    total += sys.getsizeof(obj)
+            return total
+
+        total = size((self._responses, self._restricted))
+        for table in (self._responses, self._restricted):
+            for code, variant in table.items():
+                total += size((code, variant))
+                for frames in (variant.text, variant.directory or ()):
+                    total += size((frames,))
+                    for frame in frames:
+                        total += size((frame, frame.students, frame.payload))
+                        for student in frame.students:
+                            total += size((student, student.mqtt_head, student.mqtt_middle, student.mqtt_tail))
+                total += size((variant.removed,))
+        return total
@@ -0,0 +1,150 @@
+"""
+student_directory.py
+
+Versioned student directory shared by the server and the scanners, used to
+send compact row IDs over LoRa instead of "name|classCode" text.
+
+Both sides build the directory independently — the server from the
+OfflineData DataFrame, scanners from data/students.csv — as the sorted set of
+unique (ChildName, ClassCode) pairs. The version is a hash of that canonical
+list, so row IDs agree exactly when the versions agree. Versions are
+exchanged in HELLO / HELLO_ACK; the server only uses directory mode for a
+scanner whose version matches its own and falls back to text otherwise.
+
+Wire format (DATA payload, ASCII):
+    DIRECTORY_MARKER + fixed-width IDs, no separators
+    e.g. "\\x1dAbZ-" = IDs 27 and 1662 with a 2-char width
+IDs are base64url digits (never '|' or RS), width = digits needed for the
+directory size: 1 char up to 64 students, 2 up to 4096, 3 up to 262144.
+"""
+
+import csv
+import hashlib
+import logging
+import os
+from typing import Iterable, List, Optional, Tuple
+
+from utils.config import HOME_DIR
+
+DIRECTORY_MARKER = '\x1d'  # ASCII GS — first byte of a directory-coded DATA payload
+ID_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+_ID_VALUES = {c: i for i, c in enumerate(ID_ALPHABET)}
+_BASE = len(ID_ALPHABET)
+
+
+def students_csv_path() -> str:
+    """Deployed students.csv under HOME_DIR, or ./data when running from the repo."""
+    csv_path = os.path.join(HOME_DIR, "data", "students.csv")
+    if not os.path.exists(csv_path):
+        csv_path = os.path.join("data", "students.csv")
+    return csv_path
+
+
+def _normalize(value) -> str:
+    """Canonical text for a directory field (both sides must agree byte-for-byte)"""
+    if value is None or value != value:
+        return ''   # Missing: None, or NaN from a blank DataFrame cell (csv gives '')
+    return str(value).strip()
+
+
+class StudentDirectory:
+    """
+    Immutable (name, classCode) table with a content hash version.
+
+    Usage:
+        directory = StudentDirectory.from_csv("data/students.csv")
+        payload = directory.encode([directory.lookup_id("Ana Souza", "4W")])
+        directory.decode(payload)   # [("Ana Souza", "4W")]
+    """
+
+    def __init__(self, records: Iterable[Tuple[str, str]]):
+        """Build from (name, classCode) pairs; order and duplicates do not matter."""
+        self._records: List[Tuple[str, str]] = sorted(
+            {(_normalize(name), _normalize(class_code)) for name, class_code in records}
+        )
+        self._ids = {record: idx for idx, record in enumerate(self._records)}
+
+        digest = hashlib.sha1()
+        for name, class_code in self._records:
+            digest.update(f"{name}|{class_code}\n".encode('utf-8'))
+        self.version = digest.hexdigest()[:8]
+
+        width = 1
+        while _BASE ** width < len(self._records):
+            width += 1
+        self.id_width = width
+
+    @classmethod
+    def from_csv(cls, filepath: str) -> 'StudentDirectory':
+        """Load from the scanner students.csv (ChildName, ClassCode columns)."""
+        with open(filepath, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            directory = cls((row.get('ChildName'), row.get('ClassCode')) for row in reader)
+        logging.info(f"Student directory loaded: {len(directory)} records, version {directory.version} from {filepath}")
+        return directory
+
+    @classmethod
+    def from_dataframe(cls, df) -> 'StudentDirectory':
+        """Build from the server OfflineData DataFrame (ChildName, ClassCode columns)."""
+        directory = cls(zip(df['ChildName'], df['ClassCode']))
+        logging.info(f"Student directory built: {len(directory)} records, version {directory.version}")
+        return directory
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def lookup_id(self, name, class_code) -> Optional[int]:
+        """Row ID for a student, or None if not in this directory version."""
+        return self._ids.get((_normalize(name), _normalize(class_code)))
+
+    def record(self, row_id: int) -> Tuple[str, str]:
+        """(name, classCode) for a row ID; raises IndexError if out of range."""
+        return self._records[row_id]
+
+    def ids_per_frame(self, max_payload: int) -> int:
+        """How many IDs fit in one payload after the marker byte."""
+        return (max_payload - len(DIRECTORY_MARKER)) // self.id_width
+
+    def encode(self, row_ids: Iterable[int]) -> str:
+        """Encode row IDs as one directory-coded payload string."""
+        width = self.id_width
+        digits = []
+        for row_id in row_ids:
+            chars = []
+            for _ in range(width):
+                row_id, rem = divmod(row_id, _BASE)
+                chars.append(ID_ALPHABET[rem])
+            digits.append(''.join(reversed(chars)))
+        return DIRECTORY_MARKER + ''.join(digits)
+
+    def decode(self, payload: str) -> List[Tuple[str, str]]:
+        """
+        Resolve a directory-coded payload to (name, classCode) records.
+
+        Raises:
+            ValueError: Not a directory payload, bad length/digit, or unknown ID
+        """
+        if not is_directory_payload(payload):
+            raise ValueError("Not a directory-coded payload")
+        body = payload[len(DIRECTORY_MARKER):]
+        width = self.id_width
+        if len(body) % width:
+            raise ValueError(f"Directory payload length {len(body)} is not a multiple of {width}")
+
+        records = []
+        for start in range(0, len(body), width):
+            row_id = 0
+            for char in body[start:start + width]:
+                value = _ID_VALUES.get(char)
+                if value is None:
+                    raise ValueError(f"Invalid directory ID digit {char!r}")
+                row_id = row_id * _BASE + value
+            if row_id >= len(self._records):
+                raise ValueError(f"Directory ID {row_id} out of range ({len(self._records)} records)")
+            records.append(self._records[row_id])
+        return records
+
+
+def is_directory_payload(payload: str) -> bool:
+    """True if a DATA payload string is directory-coded rather than text."""
+    return payload.startswith(DIRECTORY_MARKER)
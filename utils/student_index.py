@@ -0,0 +1,140 @@
+"""
+student_index.py
+
+Hash index over the OfflineData student table for CaptureLora local lookups.
+
+A scan used to filter the whole DataFrame (df[df['DeviceID'] == code]),
+de-duplicate by ChildName and iterrows() the matches — O(rows) plus pandas
+overhead on every request. The index is built once per data load as
+DeviceID -> tuple of precomputed records (siblings sharing a device, one per
+ChildName, in file order), so a lookup is one dict access and only the
+per-scan fields (node, distance, timestamp, location) are filled in.
+
+OfflineData builds a new index on load and on every refresh and swaps it in
+with a single attribute assignment; readers holding the old index keep a
+consistent snapshot.
+"""
+
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from utils.grades import GRADE_COLUMN, NOT_AVAILABLE, grade_label
+
+
+class StudentRecord(NamedTuple):
+    """Static part of a local lookup result, precomputed at index build"""
+    name: str
+    hierarchyLevel2: str
+    hierarchyLevel1: str
+    hierarchyID: str
+    externalNumber: str
+    classCode: str
+    grade: str = NOT_AVAILABLE   # Normalized label ('4th', 'Kind', ...)
+
+
+INDEX_COLUMNS = ('DeviceID', 'ChildName', 'HierarchyLevel2', 'HierarchyLevel1',
+                 'IDHierarchy', 'ExternalNumber', 'ClassCode')
+
+
+def _device_key(value) -> Optional[str]:
+    """DeviceID as the lookup key; None for missing values (None / NaN)"""
+    if value is None or value != value:
+        return None
+    return str(value)
+
+
+class StudentIndex:
+    """
+    Immutable DeviceID -> (StudentRecord, ...) map.
+
+    Usage:
+        index = StudentIndex.from_dataframe(df)
+        index.lookup("12345")                       # (StudentRecord(...), ...)
+        index.results("12345", beacon, distance, location, timestamp)  # MQTT dicts
+    """
+
+    def __init__(self, rows: Iterable[Tuple], grades: Optional[Iterable[str]] = None):
+        """
+        Build from rows ordered as INDEX_COLUMNS. Duplicate ChildNames under
+        one DeviceID keep the first row; rows with an invalid IDHierarchy or
+        no DeviceID are skipped.
+
+        grades gives each row's normalized grade label (e.g. the Grade column
+        classified at load); derived from HierarchyLevel1 when omitted.
+        """
+        if grades is None:
+            rows = list(rows)
+            grades = (grade_label(row[3]) for row in rows)
+        grouped: Dict[str, List[StudentRecord]] = {}
+        seen: Dict[str, set] = {}
+        rows_read = 0
+        skipped = 0
+        for (device_id, name, level2, level1, id_hierarchy, external_number, class_code), grade in zip(rows, grades):
+            rows_read += 1
+            key = _device_key(device_id)
+            if key is None:
+                skipped += 1
+                continue
+            names = seen.setdefault(key, set())
+            if name in names:
+                continue
+            try:
+                hierarchy_id = f"{int(id_hierarchy):02d}"
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            names.add(name)
+            grouped.setdefault(key, []).append(
+                StudentRecord(name, level2, level1, hierarchy_id, external_number, class_code, grade)
+            )
+
+        self._records: Dict[str, Tuple[StudentRecord, ...]] = {
+            key: tuple(records) for key, records in grouped.items()
+        }
+        self.rows = rows_read
+        self.skipped = skipped
+
+    @classmethod
+    def from_dataframe(cls, df) -> 'StudentIndex':
+        """Build from the OfflineData DataFrame (INDEX_COLUMNS, plus the Grade column if present)."""
+        grades = df[GRADE_COLUMN] if GRADE_COLUMN in df.columns else None
+        index = cls(zip(*(df[column] for column in INDEX_COLUMNS)), grades)
+        logging.info(f"Student index built: {len(index)} devices from {index.rows} rows")
+        if index.skipped:
+            logging.warning(f"Student index skipped {index.skipped} rows without DeviceID or valid IDHierarchy")
+        return index
+
+    def lookup(self, code) -> Tuple[StudentRecord, ...]:
+        """Records for a DeviceID, empty tuple if unknown"""
+        return self._records.get(code, ())
+
+    def results(self, code, beacon, distance, location, timestamp: str) -> List[dict]:
+        """Local lookup results for one scan (same keys and order as the API path)"""
+        distance = abs(int(distance))
+        return [
+            {
+                "name": record.name,
+                "hierarchyLevel2": record.hierarchyLevel2,
+                "hierarchyLevel1": record.hierarchyLevel1,
+                "hierarchyID": record.hierarchyID,
+                "node": beacon,
+                "externalID": code,
+                "distance": distance,
+                "timestamp": timestamp,
+                "externalNumber": record.externalNumber,
+                "location": location,
+                "classCode": record.classCode,
+                "source": "local"
+            }
+            for record in self.lookup(code)
+        ]
+
+    def items(self) -> Iterable[Tuple[str, Tuple[StudentRecord, ...]]]:
+        """(DeviceID, records) pairs, for precomputation over the whole index"""
+        return self._records.items()
+
+    def __contains__(self, code) -> bool:
+        return code in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
@@ -16,6 +16,10 @@ Serial output format from the HAT:
 
 Usage:
     from utils.waveshare_monitor import read_waveshare_status, format_status_for_lora
+
+read_waveshare_status() captures one block with minicom (CLI / one-off use);
+the repeater keeps the port open instead and feeds WaveshareStreamParser from
+utils.power_sampler.PowerSampler.
 """
 
 import logging
@@ -74,29 +78,8 @@ def _parse_serial_output(output: str) -> Optional[Dict[str, Any]]:
     return result if result.get('vin_voltage') is not None else None
 
 
-def read_waveshare_status(serial_device: str = '/dev/ttyS0',
-                          baud: int = 115200) -> Dict[str, Any]:
-    """
-    Read Waveshare Power Management HAT status via serial.
-
-    Uses minicom in non-interactive capture mode to read one status block.
-
-    Returns:
-        Dictionary with power status and alerts:
-        {
-            'available': bool,
-            'vin_voltage': float,
-            'vout_voltage': float,
-            'vout_current': float,
-            'power_state': int,
-            'rtc_state': int,
-            'hat_time_str': str,
-            'alerts': [str],        # List of alert codes
-            'alert_details': [str], # Human-readable alert messages
-            'error': str
-        }
-    """
-    status = {
+def _empty_status() -> Dict[str, Any]:
+    return {
         'available': False,
         'vin_voltage': 0.0,
         'vout_voltage': 0.0,
@@ -109,35 +92,18 @@ def read_waveshare_status(serial_device: str = '/dev/ttyS0',
         'error': ''
     }
 
-    try:
-        # Read serial output using minicom in capture mode
-        # -b baud, -o skip init, -D device, -C capture file
-        # Timeout after 5 seconds — the HAT sends status every ~1 second
-        result = subprocess.run(
-            ['minicom', '-b', str(baud), '-o', '-D', serial_device],
-            capture_output=True, text=True, timeout=5
-        )
-        raw_output = result.stdout
-    except subprocess.TimeoutExpired as e:
-        # This is expected — minicom doesn't exit on its own
-        raw_output = e.stdout if e.stdout else ''
-        if isinstance(raw_output, bytes):
-            raw_output = raw_output.decode('utf-8', errors='replace')
-    except FileNotFoundError:
-        status['error'] = 'minicom not installed'
-        return status
-    except Exception as e:
-        status['error'] = f'Serial read failed: {e}'
-        return status
 
-    if not raw_output or 'Vin_Voltage' not in raw_output:
-        status['error'] = f'No valid data from {serial_device}'
-        return status
+def status_from_parsed(parsed: Dict[str, Any], log_alerts: bool = True) -> Dict[str, Any]:
+    """
+    Build the status dictionary (with alerts) from one parsed status block.
 
-    parsed = _parse_serial_output(raw_output)
-    if parsed is None:
-        status['error'] = 'Failed to parse serial output'
-        return status
+    Args:
+        parsed: Result of _parse_serial_output()
+        log_alerts: Log a warning per alert (the background sampler logs
+            alert changes itself instead of once per second)
+    """
+    status = _empty_status()
+    log = logging.warning if log_alerts else logging.debug
 
     # Populate status
     status['available'] = True
@@ -160,7 +126,7 @@ def read_waveshare_status(serial_device: str = '/dev/ttyS0',
             status['alert_details'].append(
                 f"RTC drift {drift/60:.1f}min (HAT={status['hat_time_str']}, Pi={pi_time.strftime('%H:%M:%S')})"
             )
-            logging.warning(f"RTC timing error: drift={drift/60:.1f}min")
+            log(f"RTC timing error: drift={drift/60:.1f}min")
 
     # c) RTC scheduler state
     if status['rtc_state'] != 1:
@@ -168,25 +134,116 @@ def read_waveshare_status(serial_device: str = '/dev/ttyS0',
         status['alert_details'].append(
             f"RTC scheduler disabled (Rtc_State={status['rtc_state']})"
         )
-        logging.warning(f"RTC alarm disabled: Rtc_State={status['rtc_state']}")
+        log(f"RTC alarm disabled: Rtc_State={status['rtc_state']}")
 
     # d) Input voltage (battery/power supply)
     vin = status['vin_voltage']
     if vin < VIN_WARNING_THRESHOLD:
         status['alerts'].append('BATTERY_WARNING')
         status['alert_details'].append(f"Vin low: {vin:.2f}V (threshold {VIN_WARNING_THRESHOLD}V)")
-        logging.warning(f"Battery warning: Vin={vin:.2f}V")
+        log(f"Battery warning: Vin={vin:.2f}V")
 
     # e) Output voltage to Pi
     vout = status['vout_voltage']
     if vout < VOUT_WARNING_THRESHOLD:
         status['alerts'].append('POWER_WARNING')
         status['alert_details'].append(f"Vout low: {vout:.2f}V (threshold {VOUT_WARNING_THRESHOLD}V)")
-        logging.warning(f"Power warning: Vout={vout:.2f}V")
+        log(f"Power warning: Vout={vout:.2f}V")
 
     return status
 
 
+def read_waveshare_status(serial_device: str = '/dev/ttyS0',
+                          baud: int = 115200) -> Dict[str, Any]:
+    """
+    Read Waveshare Power Management HAT status via serial.
+
+    Uses minicom in non-interactive capture mode to read one status block.
+
+    Returns:
+        Dictionary with power status and alerts:
+        {
+            'available': bool,
+            'vin_voltage': float,
+            'vout_voltage': float,
+            'vout_current': float,
+            'power_state': int,
+            'rtc_state': int,
+            'hat_time_str': str,
+            'alerts': [str],        # List of alert codes
+            'alert_details': [str], # Human-readable alert messages
+            'error': str
+        }
+    """
+    status = _empty_status()
+
+    try:
+        # Read serial output using minicom in capture mode
+        # -b baud, -o skip init, -D device, -C capture file
+        # Timeout after 5 seconds — the HAT sends status every ~1 second
+        result = subprocess.run(
+            ['minicom', '-b', str(baud), '-o', '-D', serial_device],
+            capture_output=True, text=True, timeout=5
+        )
+        raw_output = result.stdout
+    except subprocess.TimeoutExpired as e:
+        # This is expected — minicom doesn't exit on its own
+        raw_output = e.stdout if e.stdout else ''
+        if isinstance(raw_output, bytes):
+            raw_output = raw_output.decode('utf-8', errors='replace')
+    except FileNotFoundError:
+        status['error'] = 'minicom not installed'
+        return status
+    except Exception as e:
+        status['error'] = f'Serial read failed: {e}'
+        return status
+
+    if not raw_output or 'Vin_Voltage' not in raw_output:
+        status['error'] = f'No valid data from {serial_device}'
+        return status
+
+    parsed = _parse_serial_output(raw_output)
+    if parsed is None:
+        status['error'] = 'Failed to parse serial output'
+        return status
+
+    return status_from_parsed(parsed)
+
+
+class WaveshareStreamParser:
+    """
+    Incremental parser for the HAT's serial stream (one block per ~second).
+
+    feed() takes whatever the port returned and yields each block once its
+    last line (Vout_Current) is complete; partial lines wait for the next read.
+    """
+
+    MAX_BUFFER = 4096
+
+    def __init__(self):
+        self._buffer = ''
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Add received text; returns the parsed blocks it completed"""
+        self._buffer += text
+        blocks = []
+        while True:
+            marker = self._buffer.find('Vout_Current')
+            end = self._buffer.find('\n', marker) if marker >= 0 else -1
+            if end < 0:
+                break
+            block, self._buffer = self._buffer[:end + 1], self._buffer[end + 1:]
+            # A block cut short (e.g. port opened mid-block) is superseded by the next one
+            start = block.rfind('Now_time is')
+            parsed = _parse_serial_output(block[start:] if start >= 0 else block)
+            if parsed is not None:
+                blocks.append(parsed)
+        if len(self._buffer) > self.MAX_BUFFER:
+            # Line noise without a block end: keep only the tail
+            self._buffer = self._buffer[-self.MAX_BUFFER // 4:]
+        return blocks
+
+
 def format_status_for_lora(status: Dict[str, Any], event: str = None) -> str:
     """
     Format Waveshare status for LoRa transmission.